@@ -0,0 +1,74 @@
+"""
+Dashboard query time with incremental analytics versus a full pass, and
+the cost the events add to each loan and return.
+
+Usage:
+    python -m benchmarks.bench_analytics [--patrons N] [--transactions N]
+"""
+import argparse
+import time
+import timeit
+
+from src import events
+from src.analytics import CirculationAnalytics
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DataManager, Patron
+
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD"]
+
+
+def loan_and_return(data_manager, count):
+    """
+    Lend and return items repeatedly.
+
+    Returns:
+        float: seconds taken
+    """
+    patrons = data_manager.get_all_patrons()
+    items = data_manager.get_all_items()
+    start = time.perf_counter()
+    for number in range(count):
+        patron = patrons[number % len(patrons)]
+        item = items[number % len(items)]
+        BusinessLogic.process_loan(patron, item)
+        BusinessLogic.process_return(patron, item._id)
+    return time.perf_counter() - start
+
+
+def main():
+    """Time dashboard queries and per-transaction overhead."""
+    parser = argparse.ArgumentParser(description="Circulation analytics benchmark")
+    parser.add_argument("--patrons", type=int, default=100000)
+    parser.add_argument("--transactions", type=int, default=50000)
+    args = parser.parse_args()
+
+    data_manager = DataManager()
+    for item_id in range(1000):
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}",
+                                             ITEM_TYPES[item_id % len(ITEM_TYPES)], 1000))
+    for patron_id in range(args.patrons):
+        data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 10 + patron_id % 80,
+                                       outstanding_fees=float(patron_id % 5 == 0)))
+    for patron in data_manager.get_all_patrons()[:args.patrons // 2]:
+        patron.add_loan(data_manager.get_item(patron._id % 1000))
+
+    without_events = loan_and_return(data_manager, args.transactions)
+    analytics = CirculationAnalytics(data_manager)
+    analytics.attach()
+    with_events = loan_and_return(data_manager, args.transactions)
+
+    full_pass = timeit.timeit(lambda: CirculationAnalytics.recompute(data_manager), number=3) / 3
+    incremental = timeit.timeit(analytics.dashboard, number=1000) / 1000
+    assert analytics.verify(data_manager) == []
+    analytics.detach()
+    events.set_event_bus(None)
+
+    print(f"dashboard query: full pass {full_pass * 1000:.1f} ms, "
+          f"incremental {incremental * 1e6:.1f} us")
+    print(f"loan+return: {without_events / args.transactions * 1e6:.2f} us without analytics, "
+          f"{with_events / args.transactions * 1e6:.2f} us with")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Nightly batch jobs: single-threaded patron loops versus sharded workers.
+
+The baseline is the loop the nightly run used to be: over
+get_all_patrons(), calculating each patron's overdue fees, whether they
+are blocked and which loans need a reminder. It is compared with
+batch.run_batch at several worker counts, over patron objects and over
+a ColumnarDataManager whose arrays are sliced into shards directly, with
+how many bytes of shard data each run pickles to its workers. Wall time
+only falls with more workers if the machine has the cores for them.
+
+Usage:
+    python -m benchmarks.bench_batch [--patrons N] [--workers N ...]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from datetime import timedelta
+
+from src import batch, clock, datagen
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager
+from src.policy import get_policy
+
+
+def patron_loop(data_manager):
+    """Run the three jobs the old way, one patron object at a time."""
+    policy = get_policy()
+    today = clock.today()
+    cutoff = today + timedelta(days=batch.REMIND_DAYS)
+    fees, blocked, reminders = {}, [], []
+    for patron in data_manager.get_all_patrons():
+        overdue = patron.calculate_overdue_fees()
+        if overdue:
+            fees[patron._id] = overdue
+        if (patron._outstanding_fees > 0
+                or len(patron._loans) >= policy.max_loans(patron.get_type())):
+            blocked.append(patron._id)
+        reminders.extend((patron._id, loan._item._id, loan._due_date)
+                         for loan in patron._loans if loan._due_date <= cutoff)
+    return fees, blocked, reminders
+
+
+def main():
+    """Time the nightly jobs both ways."""
+    parser = argparse.ArgumentParser(description="Sharded batch job benchmark")
+    parser.add_argument("--patrons", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalogue_file, patron_file = datagen.generate(directory, args.patrons)
+        data_manager = DataManager()
+        data_manager.load_data(catalogue_file, patron_file)
+        columnar = ColumnarDataManager()
+        columnar.load_data(catalogue_file, patron_file)
+
+    with clock.operation():
+        start = time.perf_counter()
+        fees, blocked, reminders = patron_loop(data_manager)
+        loop_seconds = time.perf_counter() - start
+
+    print(f"{os.cpu_count()} CPUs, {args.patrons} patrons")
+    print(f"{'run':<12} {'workers':>7} {'seconds':>8} {'shard KiB':>10}")
+    print(f"{'patron loop':<12} {1:>7} {loop_seconds:>8.3f} {'-':>10}")
+    for name, manager in (("objects", data_manager), ("columnar", columnar)):
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = batch.run_batch(manager, workers=workers)
+            seconds = time.perf_counter() - start
+            assert dict(zip(*results["fees"])) == fees
+            assert list(results["blocked"][0]) == blocked
+            assert len(results["reminders"][0]) == len(reminders)
+            shipped = 0 if workers == 1 else sum(
+                len(pickle.dumps(shard))
+                for shard in batch.make_shards(manager, workers * batch.SHARDS_PER_WORKER))
+            print(f"{name:<12} {workers:>7} {seconds:>8.3f} {shipped / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
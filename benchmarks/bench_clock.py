@@ -0,0 +1,76 @@
+"""
+Rendering and overdue-fee time over many patrons, before and after the clock
+service.
+
+"Before" replaces clock.today with a datetime.now() call on every read,
+which is what Loan.__str__, Patron.add_loan and calculate_overdue_fees did
+before.
+
+Usage:
+    python -m benchmarks.bench_clock [--patrons N] [--loans-per-patron N]
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from src import clock
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import Patron
+from src.loan import Loan
+
+
+def uncached_today():
+    """Read the system clock on every call."""
+    return datetime.now().date()
+
+
+def run(patrons):
+    """
+    Render every patron and compute every patron's overdue fees.
+
+    Returns:
+        tuple: (render seconds, fee seconds)
+    """
+    start = time.perf_counter()
+    for patron in patrons:
+        patron.to_full_string()
+    rendered = time.perf_counter()
+    with clock.operation():
+        for patron in patrons:
+            patron.calculate_overdue_fees()
+    return rendered - start, time.perf_counter() - rendered
+
+
+def main():
+    """Time rendering and fee runs with both clocks."""
+    parser = argparse.ArgumentParser(description="Clock service benchmark")
+    parser.add_argument("--patrons", type=int, default=50000)
+    parser.add_argument("--loans-per-patron", type=int, default=5)
+    args = parser.parse_args()
+
+    items = [BorrowableItem(item_id, f"Item {item_id}", "Fiction Book", 3)
+             for item_id in range(1000)]
+    today = date.today()
+    patrons = []
+    for patron_id in range(args.patrons):
+        patron = Patron(patron_id, f"Patron {patron_id}", 30)
+        patron._loans = [
+            Loan(items[(patron_id + offset) % len(items)],
+                 today + timedelta(days=(patron_id + offset) % 40 - 20))
+            for offset in range(args.loans_per_patron)
+        ]
+        patrons.append(patron)
+
+    cached_today = clock.today
+    clock.today = uncached_today
+    before = run(patrons)
+    clock.today = cached_today
+    after = run(patrons)
+
+    print(f"{'pass':<14} {'before ms':>10} {'after ms':>10}")
+    for name, before_seconds, after_seconds in zip(("render", "overdue fees"), before, after):
+        print(f"{name:<14} {before_seconds * 1000:>10.1f} {after_seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
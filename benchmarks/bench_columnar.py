@@ -0,0 +1,97 @@
+"""
+Memory and scan speed of the columnar patron store versus Patron objects.
+
+Usage:
+    python -m benchmarks.bench_columnar [--patrons N] [--loans-per-patron N]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from src.borrowable_item import BorrowableItem
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+from src.loan import Loan
+
+
+def populate(data_manager, num_patrons, loans_per_patron):
+    """
+    Fill a DataManager with patrons, measuring the memory they take.
+
+    Returns:
+        float: bytes per patron, including its loans
+    """
+    num_items = max(1, num_patrons // 10)
+    for item_id in range(num_items):
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", "Fiction Book", 3))
+    due_dates = [date.today() + timedelta(days=day) for day in range(-30, 30)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for patron_id in range(num_patrons):
+        patron = Patron(patron_id, f"Patron {patron_id}", 5 + patron_id % 85,
+                        outstanding_fees=float(patron_id % 7 == 0),
+                        makerspace_training=patron_id % 3 == 0)
+        patron._loans = [
+            Loan(data_manager.get_item((patron_id + offset) % num_items),
+                 due_dates[(patron_id + offset) % len(due_dates)])
+            for offset in range(loans_per_patron)
+        ]
+        data_manager.add_patron(patron)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / num_patrons
+
+
+def timed(function):
+    """Run a function and return (result, seconds)."""
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Print memory per patron and scan times for both stores."""
+    parser = argparse.ArgumentParser(description="Columnar patron store benchmark")
+    parser.add_argument("--patrons", type=int, default=200000)
+    parser.add_argument("--loans-per-patron", type=int, default=3)
+    args = parser.parse_args()
+
+    objects = DataManager()
+    columnar = ColumnarDataManager()
+    object_bytes = populate(objects, args.patrons, args.loans_per_patron)
+    columnar_bytes = populate(columnar, args.patrons, args.loans_per_patron)
+    store = columnar.get_patron_store()
+    patrons = objects.get_all_patrons()
+    today = date.today()
+
+    scans = [
+        ("age == 40",
+         lambda: [p for p in patrons if p._age == 40],
+         lambda: store.rows_with_age(40)),
+        ("fees > 0",
+         lambda: [p for p in patrons if p._outstanding_fees > 0],
+         lambda: store.rows_with_fees_over(0)),
+        ("overdue fees",
+         lambda: [p.calculate_overdue_fees() for p in patrons],
+         lambda: store.overdue_fees(today)),
+        ("makerspace mask",
+         lambda: [p._age >= 18 and p._makerspace_training for p in patrons],
+         store.makerspace_mask),
+    ]
+
+    print(f"bytes per patron: objects {object_bytes:.0f}, columnar {columnar_bytes:.0f} "
+          f"({object_bytes / columnar_bytes:.1f}x smaller)")
+    print(f"{'scan':<18} {'objects ms':>11} {'columnar ms':>12}")
+    for name, object_scan, columnar_scan in scans:
+        object_result, object_seconds = timed(object_scan)
+        columnar_result, columnar_seconds = timed(columnar_scan)
+        assert len(object_result) == len(columnar_result), name
+        print(f"{name:<18} {object_seconds * 1000:>11.1f} {columnar_seconds * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Throughput of the locked circulation layer as the number of desks grows.
+
+Each desk alternates loans and returns for its own slice of patrons against
+a shared catalogue. A short think time per operation stands in for the
+time a real desk spends scanning cards and talking to the patron; it is
+spent outside the locks, which is where extra desks pay off.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--ops N] [--think-ms MS]
+"""
+import argparse
+import threading
+import time
+
+from src.borrowable_item import BorrowableItem
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, Patron
+
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD"]
+
+
+def build_data(num_patrons, num_items):
+    """
+    Create a DataManager with adult patrons and a small catalogue.
+
+    Args:
+        num_patrons: Number of patrons to create
+        num_items: Number of items to create
+
+    Returns:
+        Populated DataManager
+    """
+    data_manager = DataManager()
+    for patron_id in range(num_patrons):
+        data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+    for item_id in range(num_items):
+        item_type = ITEM_TYPES[item_id % len(ITEM_TYPES)]
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", item_type, 5))
+    return data_manager
+
+
+def run(desks, ops_per_desk, think_seconds, num_items=200):
+    """
+    Run one benchmark round.
+
+    Args:
+        desks: Number of concurrent desk threads
+        ops_per_desk: Loan/return operations per desk
+        think_seconds: Simulated desk time per operation
+        num_items: Size of the shared catalogue
+
+    Returns:
+        tuple: (operations per second, oversubscribed item count)
+    """
+    patrons_per_desk = 50
+    data_manager = build_data(desks * patrons_per_desk, num_items)
+    circulation = Circulation(data_manager)
+
+    def desk(index):
+        first_patron = index * patrons_per_desk
+        for op in range(ops_per_desk):
+            patron_id = first_patron + op % patrons_per_desk
+            item_id = (op * 7 + index) % num_items
+            if op % 2 == 0:
+                circulation.loan(patron_id, item_id)
+            else:
+                circulation.return_item(patron_id, (item_id - 7) % num_items)
+            if think_seconds:
+                time.sleep(think_seconds)
+
+    threads = [threading.Thread(target=desk, args=(index,)) for index in range(desks)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    oversubscribed = sum(
+        1 for item in data_manager.get_all_items() if item._on_loan > item._num_copies
+    )
+    return desks * ops_per_desk / elapsed, oversubscribed
+
+
+def main():
+    """Run the benchmark for 1, 2, 4, 8 and 16 desks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=500, help="operations per desk")
+    parser.add_argument("--think-ms", type=float, default=1.0,
+                        help="simulated desk time per operation")
+    args = parser.parse_args()
+
+    print(f"{'desks':>5} {'ops/s':>10} {'oversubscribed':>15}")
+    for desks in (1, 2, 4, 8, 16):
+        throughput, oversubscribed = run(desks, args.ops, args.think_ms / 1000)
+        print(f"{desks:>5} {throughput:>10.0f} {oversubscribed:>15}")
+
+
+if __name__ == "__main__":
+    main()
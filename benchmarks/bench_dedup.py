@@ -0,0 +1,44 @@
+"""
+Duplicate patron detection scaling.
+
+Generates patron files of growing size (generated names repeat, so
+blocks fill up as the file grows) and times dedup.find_duplicates.
+Microseconds per patron staying flat as the size doubles shows the job
+scales linearly; an all-pairs comparison would double it each time.
+
+Usage:
+    python -m benchmarks.bench_dedup [--sizes N ...] [--workers N] [--window N]
+"""
+import argparse
+import os
+import tempfile
+
+from src import datagen, dedup
+from src.data_mgmt import DataManager
+
+
+def main():
+    """Time duplicate detection at growing sizes."""
+    parser = argparse.ArgumentParser(description="Duplicate patron detection benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 100000, 200000, 400000])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--window", type=int, default=dedup.WINDOW)
+    args = parser.parse_args()
+
+    print(f"{'patrons':>8} {'blocks':>7} {'comparisons':>12} {'clusters':>9} {'seconds':>8} "
+          f"{'us/patron':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            catalogue_file, patron_file = datagen.generate(os.path.join(directory, str(size)),
+                                                           size)
+            data_manager = DataManager()
+            data_manager.load_data(catalogue_file, patron_file)
+            report = dedup.find_duplicates(data_manager, window=args.window,
+                                           workers=args.workers)
+            print(f"{size:>8} {report.blocks:>7} {report.comparisons:>12} "
+                  f"{len(report.clusters):>9} {report.seconds:>8.2f} "
+                  f"{report.seconds / size * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
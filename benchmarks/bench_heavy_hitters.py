@@ -0,0 +1,103 @@
+"""
+Accuracy and memory of SpaceSaving and CountMinSketch against exact
+counting on a synthetic Zipf-like loan stream.
+
+Usage:
+    python -m benchmarks.bench_heavy_hitters [--loans N] [--items N] [--top N]
+        [--capacity N] [--epsilon E] [--delta D]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from src.heavy_hitters import CountMinSketch, SpaceSaving
+
+
+def zipf_stream(length, keys, exponent, seed):
+    """
+    Generate keys with Zipf-distributed frequencies.
+
+    Returns:
+        List of keys in 0..keys-1
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** exponent for rank in range(keys)]
+    ids = list(range(keys))
+    rng.shuffle(ids)
+    return rng.choices(ids, weights=weights, k=length)
+
+
+def traced(function):
+    """
+    Time a function, then run it again under tracemalloc.
+
+    Returns:
+        tuple: (result, seconds, bytes still allocated afterwards)
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def main():
+    """Compare the bounded structures with a Counter."""
+    # pylint: disable=too-many-locals
+    # Each measurement is reported separately
+    parser = argparse.ArgumentParser(description="Heavy hitters benchmark")
+    parser.add_argument("--loans", type=int, default=1000000)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--top", type=int, default=100)
+    parser.add_argument("--capacity", type=int, default=1000)
+    parser.add_argument("--epsilon", type=float, default=0.0005)
+    parser.add_argument("--delta", type=float, default=0.001)
+    parser.add_argument("--exponent", type=float, default=1.1)
+    args = parser.parse_args()
+
+    stream = zipf_stream(args.loans, args.items, args.exponent, seed=7)
+
+    def count_exact():
+        return Counter(stream)
+
+    def count_space_saving():
+        counter = SpaceSaving(args.capacity)
+        for key in stream:
+            counter.add(key)
+        return counter
+
+    def count_sketch():
+        sketch = CountMinSketch.from_error(args.epsilon, args.delta)
+        for key in stream:
+            sketch.add(key)
+        return sketch
+
+    exact, exact_seconds, exact_bytes = traced(count_exact)
+    space_saving, saving_seconds, saving_bytes = traced(count_space_saving)
+    sketch, sketch_seconds, sketch_bytes = traced(count_sketch)
+
+    true_top = {key for key, _ in exact.most_common(args.top)}
+    reported = space_saving.top(args.top)
+    recall = len(true_top & {key for key, _, _ in reported}) / args.top
+    saving_error = max(count - exact[key] for key, count, _ in reported)
+    sketch_error = max(sketch.estimate(key) - exact[key] for key in true_top)
+    sample = random.Random(3).sample(sorted(exact), min(10000, len(exact)))
+    sketch_sample_error = max(sketch.estimate(key) - exact[key] for key in sample)
+
+    print(f"{args.loans} loans over {len(exact)} distinct items")
+    print(f"{'structure':<14} {'seconds':>8} {'KiB':>9} {'max error':>10} {'bound':>8}")
+    print(f"{'Counter':<14} {exact_seconds:>8.2f} {exact_bytes / 1024:>9.0f} {0:>10} {0:>8}")
+    print(f"{'SpaceSaving':<14} {saving_seconds:>8.2f} {saving_bytes / 1024:>9.0f} "
+          f"{saving_error:>10} {space_saving.error_bound():>8.0f}")
+    print(f"{'CountMinSketch':<14} {sketch_seconds:>8.2f} {sketch_bytes / 1024:>9.0f} "
+          f"{max(sketch_error, sketch_sample_error):>10} {sketch.error_bound():>8.0f}")
+    print(f"top-{args.top} recall: {recall:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Cost of a return with allocation as the hold queue grows.
+
+A single hot title is held by N patrons. Each round returns the copy and
+lets the queue hand it to the next holder, who becomes the next borrower.
+The cost per return should stay flat as N grows.
+
+Usage:
+    python -m benchmarks.bench_holds
+"""
+import time
+
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DataManager, Patron
+from src.holds import HoldQueues
+
+
+def run(num_holds, rounds=2000):
+    """
+    Time returns of a hot title with num_holds patrons waiting.
+
+    Args:
+        num_holds: Number of patrons holding the title
+        rounds: Number of returns to time
+
+    Returns:
+        Microseconds per return and allocation
+    """
+    data_manager = DataManager()
+    item = BorrowableItem(1, "Hot Title", "Fiction Book", 1)
+    data_manager.add_item(item)
+    for patron_id in range(num_holds + 1):
+        data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+    holds = HoldQueues(data_manager.get_patron)
+
+    borrower = data_manager.get_patron(0)
+    BusinessLogic.process_loan(borrower, item)
+    for patron_id in range(1, num_holds + 1):
+        holds.place_hold(data_manager.get_patron(patron_id), item)
+
+    rounds = min(rounds, num_holds)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        BusinessLogic.process_return(borrower, 1, holds)
+        # Holders queued in ID order, so the next borrower is the next ID
+        borrower = data_manager.get_patron(borrower._id + 1)
+    assert borrower.has_item(1)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    """Print per-return cost for growing hold queues."""
+    print(f"{'holds':>8} {'us/return':>10}")
+    for num_holds in (10, 1000, 10000, 100000):
+        print(f"{num_holds:>8} {run(num_holds):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
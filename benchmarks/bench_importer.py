@@ -0,0 +1,44 @@
+"""
+Bulk patron import throughput.
+
+Generates our data and an incoming patrons file from another seed, so
+IDs collide and some generated names and ages repeat, then times
+importer.import_patrons and reports patrons per minute and what was
+merged. The time includes indexing our own patrons.
+
+Usage:
+    python -m benchmarks.bench_importer [--ours N] [--theirs N ...]
+"""
+import argparse
+import os
+import tempfile
+
+from src import datagen, importer
+from src.data_mgmt import DataManager
+
+
+def main():
+    """Time imports of growing incoming files."""
+    parser = argparse.ArgumentParser(description="Bulk patron import benchmark")
+    parser.add_argument("--ours", type=int, default=200000)
+    parser.add_argument("--theirs", type=int, nargs="+", default=[50000, 200000])
+    args = parser.parse_args()
+
+    print(f"{'ours':>8} {'theirs':>8} {'seconds':>8} {'per minute':>11} {'merged':>7} "
+          f"{'new IDs':>8} {'possible':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        catalogue_file, patron_file = datagen.generate(os.path.join(directory, "ours"),
+                                                       args.ours)
+        for theirs in args.theirs:
+            _, incoming = datagen.generate(os.path.join(directory, str(theirs)), theirs,
+                                           seed=theirs)
+            data_manager = DataManager()
+            data_manager.load_data(catalogue_file, patron_file)
+            report = importer.import_patrons(data_manager, incoming)
+            print(f"{args.ours:>8} {theirs:>8} {report.seconds:>8.2f} "
+                  f"{report.read / report.seconds * 60:>11,.0f} {len(report.merged):>7} "
+                  f"{len(report.reassigned):>8} {len(report.possible):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of the load-time integrity check against the rest of load_data.
+
+Times json.load of both files, integrity.check on the records (with and
+without rebuilding the on_loan counts) and the whole of load_data, and
+reports the check's share of the load.
+
+Usage:
+    python -m benchmarks.bench_integrity [--sizes N ...]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from src import datagen, integrity
+from src.data_mgmt import DataManager
+
+
+def best_of(repeats, function):
+    """Run a function several times and return the fastest time and its result."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    """Time the integrity check over growing datasets."""
+    parser = argparse.ArgumentParser(description="Load-time integrity check benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'patrons':>8} {'loans':>8} {'check ms':>9} {'rebuild ms':>11} {'load ms':>9} "
+          f"{'share':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            target = os.path.join(directory, str(size))
+            catalogue_file, patron_file = datagen.generate(target, size)
+            with open(catalogue_file, encoding="utf-8") as file:
+                item_records = json.load(file)
+            with open(patron_file, encoding="utf-8") as file:
+                patron_records = json.load(file)
+
+            check, report = best_of(args.repeats,
+                                    lambda: integrity.check(item_records, patron_records))
+            assert integrity.is_clean(report)
+            for record in item_records[::10]:
+                record["on_loan"] += 1
+            rebuild, report = best_of(1, lambda: integrity.check(item_records, patron_records,
+                                                                 rebuild=True))
+            assert report.rebuilt
+            load, _ = best_of(1, lambda: DataManager().load_data(catalogue_file, patron_file))
+            print(f"{size:>8} {report.loans:>8} {check * 1000:>9.1f} {rebuild * 1000:>11.1f} "
+                  f"{load * 1000:>9.1f} {check / load:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Single-patron query latency, loading everything versus the ID index.
+
+For each dataset size, times answering "fees for patron N" by loading
+both files into a DataManager (what run.py had to do before) and through
+json_index.load_patron with a built sidecar index. Building the index is
+timed separately; it happens once per change of the data files.
+
+Usage:
+    python -m benchmarks.bench_json_index [--sizes N ...] [--queries N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src import clock, datagen, json_index
+from src.data_mgmt import DataManager
+
+
+def full_load(patron_id, catalogue_file, patron_file):
+    """Answer a query by loading every record."""
+    data_manager = DataManager()
+    data_manager.load_data(catalogue_file, patron_file)
+    with clock.operation():
+        return data_manager.get_patron(patron_id).calculate_overdue_fees()
+
+
+def indexed(patron_id, catalogue_file, patron_file):
+    """Answer a query through the sidecar indexes."""
+    patron = json_index.load_patron(patron_id, catalogue_file, patron_file)
+    with clock.operation():
+        return patron.calculate_overdue_fees()
+
+
+def main():
+    """Time single-patron queries over growing datasets."""
+    parser = argparse.ArgumentParser(description="JSON ID index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'patrons':>8} {'full load ms':>13} {'index build ms':>15} {'indexed ms':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            target = os.path.join(directory, str(size))
+            catalogue_file, patron_file = datagen.generate(target, size)
+            rng = random.Random(size)
+            patron_ids = [rng.randint(1, size) for _ in range(args.queries)]
+
+            start = time.perf_counter()
+            for patron_id in patron_ids[:3]:
+                expected = full_load(patron_id, catalogue_file, patron_file)
+                assert expected == indexed(patron_id, catalogue_file, patron_file)
+            full = (time.perf_counter() - start) / 3
+
+            for path in (catalogue_file, patron_file):
+                os.remove(f"{path}.idx")
+            start = time.perf_counter()
+            json_index.JsonIndex.open(patron_file, "patron_id")
+            json_index.JsonIndex.open(catalogue_file, "item_id")
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for patron_id in patron_ids:
+                indexed(patron_id, catalogue_file, patron_file)
+            query = (time.perf_counter() - start) / len(patron_ids)
+            print(f"{size:>8} {full * 1000:>13.1f} {build * 1000:>15.1f} {query * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
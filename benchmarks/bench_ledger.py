@@ -0,0 +1,92 @@
+"""
+Fee ledger append rate, memory per entry and statement latency.
+
+Appends random charges and payments for many patrons over a year of
+days, then times balance lookups and one-month statements, and how long
+reopening the ledger file takes. Statement time depends on the entries
+in the range, not on the size of the ledger.
+
+Usage:
+    python -m benchmarks.bench_ledger [--entries N ...] [--patrons N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src import ledger
+
+START = date(2025, 1, 1)
+
+
+def fill(fee_ledger, entries, patrons, rng):
+    """Append entries spread evenly over a year, in date order."""
+    per_day = max(1, entries // 365)
+    for number in range(entries):
+        when = START + timedelta(days=number // per_day)
+        if rng.random() < 0.6:
+            fee_ledger.record(rng.randrange(patrons), ledger.CHARGE, rng.randrange(50, 2000),
+                              when)
+        else:
+            fee_ledger.record(rng.randrange(patrons), ledger.PAYMENT, -rng.randrange(50, 2000),
+                              when)
+
+
+def ledger_bytes(fee_ledger):
+    """Memory held by the ledger's columns, balances and per-patron indexes."""
+    # pylint: disable=protected-access
+    # Measuring the ledger's own structures
+    columns = (fee_ledger._cents, fee_ledger._days, fee_ledger._kinds, fee_ledger._balances)
+    return (sum(map(sys.getsizeof, columns))
+            + sys.getsizeof(fee_ledger._balance) + sys.getsizeof(fee_ledger._positions)
+            + sum(map(sys.getsizeof, fee_ledger._positions.values())))
+
+
+def main():
+    """Time the ledger at growing sizes."""
+    parser = argparse.ArgumentParser(description="Fee ledger benchmark")
+    parser.add_argument("--entries", type=int, nargs="+", default=[100000, 1000000, 4000000])
+    parser.add_argument("--patrons", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'entries':>9} {'append us':>10} {'bytes/entry':>12} {'balance ns':>11} "
+          f"{'statement us':>13} {'reopen s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for entries in args.entries:
+            rng = random.Random(entries)
+            path = os.path.join(directory, f"{entries}.ledger")
+            fee_ledger = ledger.FeeLedger(path)
+            start = time.perf_counter()
+            fill(fee_ledger, entries, args.patrons, rng)
+            append = (time.perf_counter() - start) / entries
+            size = ledger_bytes(fee_ledger)
+            fee_ledger.close()
+
+            patron_ids = [rng.randrange(args.patrons) for _ in range(args.queries)]
+            start = time.perf_counter()
+            for patron_id in patron_ids:
+                fee_ledger.balance(patron_id)
+            balance = (time.perf_counter() - start) / args.queries
+
+            month = (START + timedelta(days=150), START + timedelta(days=180))
+            start = time.perf_counter()
+            for patron_id in patron_ids:
+                fee_ledger.statement(patron_id, *month)
+            statement = (time.perf_counter() - start) / args.queries
+
+            start = time.perf_counter()
+            reopened = ledger.FeeLedger(path)
+            reopen = time.perf_counter() - start
+            assert reopened.balance(patron_ids[0]) == fee_ledger.balance(patron_ids[0])
+            reopened.close()
+            del fee_ledger, reopened
+            print(f"{entries:>9} {append * 1e6:>10.2f} {size / entries:>12.1f} "
+                  f"{balance * 1e9:>11.0f} {statement * 1e6:>13.1f} {reopen:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Badge-swipe lookups per second: precomputed index versus the business rules.
+
+Usage:
+    python -m benchmarks.bench_makerspace [--patrons N] [--lookups N]
+"""
+import argparse
+import random
+import time
+
+from src.access import MakerspaceAccessIndex
+from src.business_logic import BusinessLogic, can_use_makerspace
+from src.data_mgmt import DataManager, Patron
+
+
+def build_data(num_patrons, seed=0):
+    """
+    Create a DataManager with a realistic mix of patrons.
+
+    Args:
+        num_patrons: Number of patrons to create
+        seed: Random seed
+
+    Returns:
+        Populated DataManager
+    """
+    rng = random.Random(seed)
+    data_manager = DataManager()
+    for patron_id in range(num_patrons):
+        data_manager.add_patron(Patron(
+            patron_id, f"Patron {patron_id}", rng.randint(5, 95),
+            outstanding_fees=rng.choice((0.0, 0.0, 0.0, 2.5)),
+            makerspace_training=rng.random() < 0.3,
+        ))
+    return data_manager
+
+
+def rate(function, swipes):
+    """Lookups per second of function over the swipes."""
+    start = time.perf_counter()
+    for patron_id in swipes:
+        function(patron_id)
+    return len(swipes) / (time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Makerspace access benchmark")
+    parser.add_argument("--patrons", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=1000000)
+    args = parser.parse_args()
+
+    data_manager = build_data(args.patrons)
+    start = time.perf_counter()
+    index = MakerspaceAccessIndex(data_manager.get_all_patrons())
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    swipes = [rng.randrange(args.patrons) for _ in range(args.lookups)]
+
+    def rules_check(patron_id):
+        return BusinessLogic.check_makerspace_access(data_manager.get_patron(patron_id))
+
+    def rules_can_use(patron_id):
+        patron = data_manager.get_patron(patron_id)
+        return can_use_makerspace(patron._age, patron._outstanding_fees,
+                                  patron._makerspace_training)
+
+    print(f"patrons: {args.patrons}, index build {build_seconds:.2f}s, "
+          f"index size {len(index._codes) / 1e6:.1f} MB")
+    print(f"{'check':<32} {'lookups/s':>12}")
+    print(f"{'check_makerspace_access':<32} {rate(rules_check, swipes):>12,.0f}")
+    print(f"{'MakerspaceAccessIndex.check':<32} {rate(index.check, swipes):>12,.0f}")
+    print(f"{'can_use_makerspace':<32} {rate(rules_can_use, swipes):>12,.0f}")
+    print(f"{'MakerspaceAccessIndex.can_use':<32} {rate(index.can_use, swipes):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
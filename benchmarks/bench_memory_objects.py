@@ -0,0 +1,82 @@
+"""
+Bytes per patron, loan and item with the slotted classes versus plain classes.
+
+The "before" classes reuse the real __init__ methods on ordinary classes
+with a per-instance __dict__, which is how Patron, Loan and BorrowableItem
+were laid out before they gained __slots__.
+
+Usage:
+    python -m benchmarks.bench_memory_objects [--patrons N] [--loans-per-patron N]
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import date, timedelta
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import Patron
+from src.loan import Loan
+
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD", "Laptop"]
+
+LegacyPatron = type("LegacyPatron", (), {"__init__": Patron.__init__})
+LegacyLoan = type("LegacyLoan", (), {"__init__": Loan.__init__})
+LegacyItem = type("LegacyItem", (), {"__init__": BorrowableItem.__init__})
+
+
+def build(patron_class, loan_class, item_class, num_patrons, loans_per_patron):
+    """
+    Build patrons with loans, measuring the memory of each part.
+
+    Returns:
+        tuple: (bytes per item, bytes per patron, bytes per loan)
+    """
+    num_items = max(1, num_patrons // 10)
+    due_dates = [date(2025, 1, 1) + timedelta(days=day) for day in range(60)]
+    gc.collect()
+    tracemalloc.start()
+
+    before = tracemalloc.get_traced_memory()[0]
+    # A fresh type string per item, as json.load produces
+    items = [item_class(item_id, f"Item {item_id}",
+                        (ITEM_TYPES[item_id % len(ITEM_TYPES)] + " ")[:-1], 3)
+             for item_id in range(num_items)]
+    after_items = tracemalloc.get_traced_memory()[0]
+    patrons = [patron_class(patron_id, f"Patron {patron_id}", 18 + patron_id % 70)
+               for patron_id in range(num_patrons)]
+    after_patrons = tracemalloc.get_traced_memory()[0]
+    for patron_id, patron in enumerate(patrons):
+        patron._loans = [
+            loan_class(items[(patron_id + offset) % num_items],
+                       due_dates[(patron_id + offset) % len(due_dates)])
+            for offset in range(loans_per_patron)
+        ]
+    after_loans = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+    del items, patrons
+    return (
+        (after_items - before) / num_items,
+        (after_patrons - after_items) / num_patrons,
+        (after_loans - after_patrons) / (num_patrons * loans_per_patron),
+    )
+
+
+def main():
+    """Print bytes per object before and after."""
+    parser = argparse.ArgumentParser(description="Object memory benchmark")
+    parser.add_argument("--patrons", type=int, default=200000)
+    parser.add_argument("--loans-per-patron", type=int, default=3)
+    args = parser.parse_args()
+
+    legacy = build(LegacyPatron, LegacyLoan, LegacyItem, args.patrons, args.loans_per_patron)
+    slotted = build(Patron, Loan, BorrowableItem, args.patrons, args.loans_per_patron)
+
+    print(f"{'object':<8} {'before B':>9} {'after B':>8}")
+    for name, before, after in zip(("item", "patron", "loan"), legacy, slotted):
+        print(f"{name:<8} {before:>9.0f} {after:>8.0f}")
+    print("(patron excludes its loans; loan includes its share of the loans list)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cost of the metrics instrumentation on check_loan_allowed, the cheapest
+instrumented entry point.
+
+Times the same calls with metrics disabled (the original function), with
+metrics enabled, and the cost of recording into a histogram alone.
+
+Usage:
+    python -m benchmarks.bench_metrics [--calls N]
+"""
+import argparse
+import time
+
+from src import metrics
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import Patron
+
+
+def run(calls, patron, item):
+    """
+    Call check_loan_allowed repeatedly.
+
+    Returns:
+        float: Nanoseconds per call
+    """
+    check = BusinessLogic.check_loan_allowed
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        check(patron, item)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def main():
+    """Time check_loan_allowed with and without instrumentation."""
+    parser = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    patron = Patron(1, "Ada Lovelace", 30)
+    item = BorrowableItem(1, "The River", "Fiction Book", 3)
+
+    disabled = run(args.calls, patron, item)
+    metrics.enable()
+    try:
+        enabled = run(args.calls, patron, item)
+    finally:
+        metrics.disable()
+    summary = metrics.get_metrics().snapshot()["BusinessLogic.check_loan_allowed"]
+
+    histogram = metrics.LatencyHistogram()
+    start = time.perf_counter_ns()
+    for value in range(args.calls):
+        histogram.record(value)
+    record = (time.perf_counter_ns() - start) / args.calls
+
+    print(f"{'mode':<10} {'ns/call':>9}")
+    print(f"{'disabled':<10} {disabled:>9.0f}")
+    print(f"{'enabled':<10} {enabled:>9.0f}")
+    print(f"{'record':<10} {record:>9.0f}")
+    print(f"recorded p50 {summary['p50']} ns, p99 {summary['p99']} ns "
+          f"over {summary['count']} calls")
+
+
+if __name__ == "__main__":
+    main()
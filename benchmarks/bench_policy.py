@@ -0,0 +1,96 @@
+"""
+Per-call overhead of check_loan_allowed and _get_loan_period, before and after
+the policy engine.
+
+"Before" is the original implementation, which rebuilt its max_loans and
+loan_periods dictionaries on every call; it is reproduced here for the
+comparison.
+
+Usage:
+    python -m benchmarks.bench_policy [--calls N]
+"""
+import argparse
+import timeit
+
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import Patron
+
+
+def legacy_get_loan_period(item_type):
+    """The original _get_loan_period."""
+    loan_periods = {
+        "Fiction Book": 21,
+        "Non-Fiction Book": 21,
+        "Magazine": 7,
+        "DVD": 7,
+        "Laptop": 3,
+        "Study Room": 1,
+        "Gardening Tool": 14,
+        "Carpentry Tool": 14,
+    }
+    return loan_periods.get(item_type, 14)
+
+
+def legacy_check_loan_allowed(patron, item):
+    # pylint: disable=too-many-return-statements,too-many-branches
+    """The original check_loan_allowed."""
+    if not isinstance(item, BorrowableItem):
+        return False, "Invalid item"
+    if item._on_loan >= item._num_copies:
+        return False, "No copies available"
+    patron_type = patron.get_type()
+    max_loans = {"Minor": 3, "Regular": 5, "Elderly": 10}
+    if len(patron._loans) >= max_loans.get(patron_type, 5):
+        return False, f"Loan limit reached for {patron_type}"
+    if patron._outstanding_fees > 0:
+        return False, "Outstanding fees must be paid"
+    item_type = item._type
+    if item_type == "Reference Book":
+        return False, "Reference books cannot be borrowed"
+    if patron._age < 18:
+        if item_type in ["Gardening Tool", "Carpentry Tool"]:
+            return False, "Minors cannot borrow tools"
+    if item_type == "Gardening Tool" and not patron._gardening_tool_training:
+        return False, "Gardening tool training required"
+    if item_type == "Carpentry Tool" and not patron._carpentry_tool_training:
+        return False, "Carpentry tool training required"
+    for loan in patron._loans:
+        if loan._item._type == item_type:
+            return False, f"Already have a {item_type} on loan"
+    if item_type in ["Laptop", "Study Room"]:
+        if legacy_get_loan_period(item_type) == 0:
+            return False, f"{item_type} cannot be borrowed"
+    return True, "Loan allowed"
+
+
+def main():
+    """Time both implementations."""
+    parser = argparse.ArgumentParser(description="Loan policy overhead benchmark")
+    parser.add_argument("--calls", type=int, default=500000)
+    args = parser.parse_args()
+
+    patron = Patron(1, "Jane Smith", 30, gardening_tool_training=True)
+    laptop = BorrowableItem(1, "Laptop 1", "Laptop", 5)
+    shovel = BorrowableItem(2, "Shovel", "Gardening Tool", 5)
+    cases = [
+        ("check_loan_allowed (laptop)", legacy_check_loan_allowed,
+         BusinessLogic.check_loan_allowed, (patron, laptop)),
+        ("check_loan_allowed (tool)", legacy_check_loan_allowed,
+         BusinessLogic.check_loan_allowed, (patron, shovel)),
+        ("_get_loan_period", legacy_get_loan_period,
+         BusinessLogic._get_loan_period, ("Magazine",)),
+    ]
+
+    print(f"{'call':<30} {'before ns':>10} {'after ns':>10}")
+    for name, before, after, call_args in cases:
+        assert before(*call_args) == after(*call_args)
+        before_ns = timeit.timeit(lambda f=before, a=call_args: f(*a),
+                                  number=args.calls) / args.calls * 1e9
+        after_ns = timeit.timeit(lambda f=after, a=call_args: f(*a),
+                                 number=args.calls) / args.calls * 1e9
+        print(f"{name:<30} {before_ns:>10.0f} {after_ns:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Replayed desk sessions per second through parallel BatUI instances.
+
+Sessions are synthesised menu inputs (borrowing, searching and viewing
+patrons) against a generated dataset, replayed with several thread counts.
+Only prompts that every patron and item answers the same way are used,
+so the sessions stay in step with the menus whatever the data holds.
+
+Usage:
+    python -m benchmarks.bench_replay [--patrons N] [--sessions N] [--actions N]
+"""
+import argparse
+import random
+import tempfile
+
+from src import datagen, session
+from src.data_mgmt import DataManager
+
+
+def synthetic_session(rng, num_patrons, num_items, actions):
+    """
+    Build one session's input lines.
+
+    Returns:
+        List of input lines, ending with Exit
+    """
+    lines = []
+    for _ in range(actions):
+        patron = str(rng.randint(1, num_patrons))
+        action = rng.random()
+        if action < 0.4:
+            lines += ["1", str(rng.randint(1, num_items)), patron]
+        elif action < 0.7:
+            lines += ["3", "2", patron]
+        elif action < 0.8:
+            lines += ["3", "3", str(rng.randint(5, 95))]
+        else:
+            lines += ["4", patron]
+    return lines + ["7"]
+
+
+def main():
+    """Replay the same sessions with 1, 4 and 8 threads."""
+    parser = argparse.ArgumentParser(description="Session replay benchmark")
+    parser.add_argument("--patrons", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    num_items = max(1, args.patrons // 5)
+    sessions = [synthetic_session(rng, args.patrons, num_items, args.actions)
+                for _ in range(args.sessions)]
+    with tempfile.TemporaryDirectory() as directory:
+        catalogue_file, patron_file = datagen.generate(directory, args.patrons, num_items)
+        print(f"{'threads':>7} {'inputs':>8} {'seconds':>8} {'inputs/s':>9} {'errors':>6}")
+        for threads in (1, 4, 8):
+            data_manager = DataManager()
+            data_manager.load_data(catalogue_file, patron_file)
+            result = session.replay(data_manager, sessions, threads)
+            print(f"{threads:>7} {result['inputs']:>8} {result['seconds']:>8.2f} "
+                  f"{result['inputs_per_second']:>9.0f} {len(result['errors']):>6}")
+
+
+if __name__ == "__main__":
+    main()
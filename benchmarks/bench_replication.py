@@ -0,0 +1,139 @@
+"""
+Branch convergence and apply rate with one process per branch.
+
+Every branch starts from a copy of the same generated data and makes
+random loans, returns and payments, polling the other branches' logs
+between rounds. Any branch lends any item, but each item is only ever
+returned at one branch, as a physical copy would be: two branches
+returning the same loan at once is a conflict replication does not
+resolve. Once all branches have finished, each applies whatever
+is left and saves its data, and the saved data of every branch is
+compared.
+
+Usage:
+    python -m benchmarks.bench_replication [--branches N] [--rounds N] [--operations N]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from src import datagen
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager
+from src.events import set_event_bus
+from src.replication import Replicator
+
+
+def branch_fingerprint(catalogue_file, patron_file):
+    """
+    Summarise a branch's data for comparison.
+
+    Returns:
+        tuple: (on_loan per item, sorted loans and rounded fees per patron)
+    """
+    data_manager = DataManager()
+    data_manager.load_data(catalogue_file, patron_file)
+    items = {item._id: item._on_loan for item in data_manager.iter_items()}
+    patrons = {patron._id: (sorted((loan._item._id, loan._due_date) for loan in patron._loans),
+                            round(patron._outstanding_fees, 2))
+               for patron in data_manager.iter_patrons()}
+    return items, patrons
+
+
+def run_branch(name, index, count, directory, shared_dir, rounds, operations, barrier,
+               results):
+    # pylint: disable=too-many-arguments,too-many-locals
+    # Everything a branch process needs is passed in
+    """Make random transactions at one branch, replicating between rounds."""
+    set_event_bus(None)
+    catalogue_file = os.path.join(directory, "catalogue.json")
+    patron_file = os.path.join(directory, "patrons.json")
+    data_manager = DataManager()
+    data_manager.load_data(catalogue_file, patron_file)
+    replicator = Replicator(data_manager, shared_dir, name)
+    replicator.attach()
+    circulation = Circulation(data_manager)
+    rng = random.Random(name)
+    patron_ids = [patron._id for patron in data_manager.iter_patrons()]
+    item_ids = [item._id for item in data_manager.iter_items()]
+
+    applied = 0
+    poll_seconds = 0.0
+    for _ in range(rounds):
+        for _ in range(operations):
+            patron_id = rng.choice(patron_ids)
+            action = rng.random()
+            patron = data_manager.get_patron(patron_id)
+            if action < 0.5:
+                circulation.loan(patron_id, rng.choice(item_ids))
+            elif action < 0.85 and (returnable := [
+                    loan._item._id for loan in patron._loans
+                    if loan._item._id % count == index]):
+                circulation.return_item(patron_id, rng.choice(returnable))
+            elif patron._outstanding_fees > 0:
+                circulation.pay_fee(patron_id, round(patron._outstanding_fees / 2, 2))
+        start = time.perf_counter()
+        applied += replicator.poll()[0]
+        poll_seconds += time.perf_counter() - start
+
+    barrier.wait()
+    start = time.perf_counter()
+    applied += replicator.poll()[0]
+    poll_seconds += time.perf_counter() - start
+    data_manager.save_data(catalogue_file, patron_file)
+    replicator.checkpoint()
+    results.put((name, applied, poll_seconds))
+
+
+def main():
+    """Run the branches and check that their data converged."""
+    parser = argparse.ArgumentParser(description="Log-shipping replication benchmark")
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--patrons", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--operations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "source")
+        datagen.generate(source, args.patrons)
+        shared_dir = os.path.join(root, "shared")
+        names = [f"branch{number}" for number in range(args.branches)]
+        for name in names:
+            shutil.copytree(source, os.path.join(root, name))
+
+        barrier = multiprocessing.Barrier(args.branches)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(
+            target=run_branch,
+            args=(name, index, args.branches, os.path.join(root, name), shared_dir,
+                  args.rounds, args.operations, barrier, results))
+            for index, name in enumerate(names)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        stats = sorted(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        fingerprints = [branch_fingerprint(os.path.join(root, name, "catalogue.json"),
+                                           os.path.join(root, name, "patrons.json"))
+                        for name in names]
+        converged = all(fingerprint == fingerprints[0] for fingerprint in fingerprints)
+        log_bytes = sum(os.path.getsize(os.path.join(shared_dir, name))
+                        for name in os.listdir(shared_dir) if name.endswith(".jsonl"))
+
+    print(f"{'branch':<10} {'applied':>8} {'poll s':>8} {'events/s':>9}")
+    for name, applied, seconds in stats:
+        print(f"{name:<10} {applied:>8} {seconds:>8.3f} {applied / seconds:>9.0f}")
+    print(f"{args.branches} branches in {elapsed:.2f} s, logs {log_bytes / 1024:.0f} KiB, "
+          f"converged: {converged}")
+
+
+if __name__ == "__main__":
+    main()
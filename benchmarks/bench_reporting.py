@@ -0,0 +1,86 @@
+"""
+Time and peak memory of dumping every patron, before and after the
+streaming report renderer.
+
+"Before" prints each patron's to_full_string() with its own print() call,
+flushed as on a terminal, as BatUI did. "After" streams the same fields
+as a patrons report and a loans report through write_report. Both write
+to a temporary file.
+
+Usage:
+    python -m benchmarks.bench_reporting [--patrons N] [--loans-per-patron N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron
+from src.loan import Loan
+from src.reporting import open_output, write_report
+
+
+def measure(function):
+    """
+    Time a function, then run it again under tracemalloc.
+
+    Returns:
+        tuple: (seconds, peak bytes allocated)
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    """Time both ways of dumping every patron."""
+    parser = argparse.ArgumentParser(description="Report renderer benchmark")
+    parser.add_argument("--patrons", type=int, default=100000)
+    parser.add_argument("--loans-per-patron", type=int, default=3)
+    args = parser.parse_args()
+
+    data_manager = DataManager()
+    for item_id in range(1000):
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", "Fiction Book", 3))
+    today = date.today()
+    for patron_id in range(args.patrons):
+        patron = Patron(patron_id, f"Patron {patron_id}", 18 + patron_id % 70)
+        patron._loans = [
+            Loan(data_manager.get_item((patron_id + offset) % 1000),
+                 today + timedelta(days=(patron_id + offset) % 40 - 20))
+            for offset in range(args.loans_per_patron)
+        ]
+        data_manager.add_patron(patron)
+
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "dump.txt")
+
+    def before():
+        with open(path, "w", encoding="utf-8") as out:
+            for patron in data_manager.get_all_patrons():
+                print(patron.to_full_string(), file=out, flush=True)
+
+    def after():
+        with open_output(path) as out:
+            write_report(data_manager, out, "patrons",
+                         columns=["patron_id", "name", "age", "loans", "outstanding_fees"])
+            write_report(data_manager, out, "loans",
+                         columns=["patron_id", "item_name", "due", "days_overdue"])
+
+    print(f"{'dump':<8} {'seconds':>8} {'peak KiB':>9}")
+    for name, function in (("before", before), ("after", after)):
+        seconds, peak = measure(function)
+        print(f"{name:<8} {seconds:>8.2f} {peak / 1024:>9.0f}")
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
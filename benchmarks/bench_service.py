@@ -0,0 +1,167 @@
+"""
+Load generator for the BAT circulation service.
+
+Opens many concurrent connections to the service, each sending a mix of
+search, borrow, return and makerspace requests, and reports p50/p99
+request latency. Unless --port is given, a service with synthetic data is
+started in a child process.
+
+Usage:
+    python -m benchmarks.bench_service [--connections N] [--requests N] [--port P]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import resource
+import time
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron
+from src.service import CirculationServer, DEFAULT_HOST
+
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD"]
+
+
+def build_data(num_patrons, num_items):
+    """
+    Create a DataManager with synthetic patrons and items.
+
+    Args:
+        num_patrons: Number of patrons to create
+        num_items: Number of items to create
+
+    Returns:
+        Populated DataManager
+    """
+    data_manager = DataManager()
+    for patron_id in range(num_patrons):
+        data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 18 + patron_id % 70,
+                                       makerspace_training=patron_id % 2 == 0))
+    for item_id in range(num_items):
+        item_type = ITEM_TYPES[item_id % len(ITEM_TYPES)]
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", item_type, 3))
+    return data_manager
+
+
+def _run_server(port_queue, num_patrons, num_items):
+    """Child process: serve synthetic data until terminated."""
+    raise_fd_limit()
+
+    async def serve():
+        server = CirculationServer(build_data(num_patrons, num_items))
+        await server.start(DEFAULT_HOST, 0)
+        port_queue.put(server.get_port())
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def raise_fd_limit():
+    """Raise the open file limit as far as allowed for many sockets."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def make_request(rng, num_patrons, num_items):
+    """
+    Pick a random request from the desk/kiosk mix.
+
+    Args:
+        rng: random.Random to draw from
+        num_patrons: Number of patrons in the data
+        num_items: Number of items in the data
+
+    Returns:
+        Request dictionary
+    """
+    patron_id = rng.randrange(num_patrons)
+    roll = rng.random()
+    if roll < 0.5:
+        return {"op": "search", "by": "id", "patron_id": patron_id}
+    if roll < 0.7:
+        return {"op": "borrow", "patron_id": patron_id, "item_id": rng.randrange(num_items)}
+    if roll < 0.9:
+        return {"op": "return", "patron_id": patron_id, "item_id": rng.randrange(num_items)}
+    return {"op": "makerspace", "patron_id": patron_id}
+
+
+async def client(port, requests, seed, latencies, num_patrons, num_items):
+    """One connection sending requests back to back."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+    for _ in range(requests):
+        line = json.dumps(make_request(rng, num_patrons, num_items)).encode() + b"\n"
+        start = time.perf_counter()
+        writer.write(line)
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def generate_load(port, connections, requests, num_patrons, num_items):
+    """
+    Drive the service from many connections at once.
+
+    Returns:
+        tuple: (sorted latencies in seconds, elapsed wall time)
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, requests, seed, latencies, num_patrons, num_items)
+        for seed in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return latencies, elapsed
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of sorted values."""
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def main():
+    """Run the load generator and print the latency summary."""
+    parser = argparse.ArgumentParser(description="BAT service load generator")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20, help="requests per connection")
+    parser.add_argument("--port", type=int, help="use an already running service")
+    parser.add_argument("--patrons", type=int, default=100000)
+    parser.add_argument("--items", type=int, default=10000)
+    args = parser.parse_args()
+    raise_fd_limit()
+
+    server_process = None
+    port = args.port
+    if port is None:
+        port_queue = multiprocessing.Queue()
+        server_process = multiprocessing.Process(
+            target=_run_server, args=(port_queue, args.patrons, args.items), daemon=True
+        )
+        server_process.start()
+        port = port_queue.get()
+
+    try:
+        latencies, elapsed = asyncio.run(generate_load(
+            port, args.connections, args.requests, args.patrons, args.items
+        ))
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+
+    print(f"connections: {args.connections}")
+    print(f"requests:    {len(latencies)} in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} req/s)")
+    print(f"p50:         {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"p99:         {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
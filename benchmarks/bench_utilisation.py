@@ -0,0 +1,67 @@
+"""
+Memory, sampling cost and file size of the utilisation history for a
+large catalogue.
+
+Usage:
+    python -m benchmarks.bench_utilisation [--items N] [--active-share F] [--samples N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager
+from src.utilisation import HOURS, UtilisationHistory
+
+
+def main():
+    """Sample a catalogue where only some items are ever lent."""
+    parser = argparse.ArgumentParser(description="Utilisation history benchmark")
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--active-share", type=float, default=0.1,
+                        help="share of items that are ever on loan")
+    parser.add_argument("--samples", type=int, default=48)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    data_manager = DataManager()
+    for item_id in range(args.items):
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", "Laptop", 5))
+    items = data_manager.get_all_items()
+    active = rng.sample(items, int(args.items * args.active_share))
+
+    history = UtilisationHistory(data_manager)
+    elapsed = 0.0
+    for _ in range(args.samples):
+        for item in active:
+            item._on_loan = rng.randint(0, item._num_copies)
+        start = time.perf_counter()
+        history.sample()
+        elapsed += time.perf_counter() - start
+    memory = (sum(map(sys.getsizeof, history._rings.values())) +
+              sys.getsizeof(history._rings) + sys.getsizeof(history._last_busy))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "utilisation.bin")
+        start = time.perf_counter()
+        history.save(path)
+        saved = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        UtilisationHistory(data_manager).load(path)
+        loaded = time.perf_counter() - start
+
+    dense = args.items * HOURS
+    print(f"{args.items} items, {len(history)} with rings, {HOURS} hourly slots each")
+    print(f"memory: {memory / 2 ** 20:.1f} MiB (a ring for every item would be "
+          f"{dense / 2 ** 20:.0f} MiB)")
+    print(f"sample: {elapsed / args.samples * 1000:.1f} ms per hourly sample")
+    print(f"file: {size / 2 ** 20:.1f} MiB, saved in {saved * 1000:.0f} ms, "
+          f"loaded in {loaded * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
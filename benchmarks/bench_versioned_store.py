@@ -0,0 +1,121 @@
+"""
+Multi-process contention benchmark for the versioned record store.
+
+Several worker processes share one store directory and run loan/return
+transactions through VersionedStore.transact. A fraction of the traffic
+goes to a small set of hot items so that writers collide; the rest spreads
+over the whole catalogue. Afterwards the store is checked for lost updates:
+every item's on_loan count must match the loans recorded on patrons.
+
+Usage:
+    python -m benchmarks.bench_versioned_store [--workers N] [--ops N] [--hot F]
+"""
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DataManager, Patron
+from src.storage import ConflictError, VersionedStore
+
+NUM_PATRONS = 2000
+NUM_ITEMS = 500
+HOT_ITEMS = 5
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD"]
+
+
+def seed_store(directory):
+    """Write the initial patrons and items into a fresh store."""
+    seed = DataManager()
+    for patron_id in range(NUM_PATRONS):
+        seed.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+    for item_id in range(NUM_ITEMS):
+        item_type = ITEM_TYPES[item_id % len(ITEM_TYPES)]
+        seed.add_item(BorrowableItem(item_id, f"Item {item_id}", item_type, 4))
+    VersionedStore(directory).import_data(seed)
+
+
+def worker(directory, index, ops, hot_fraction, results):
+    """Run ops transactions from one process and report its counters."""
+    store = VersionedStore(directory)
+    data_manager = DataManager()
+    store.load_into(data_manager)
+    rng = random.Random(index)
+    retries = failures = 0
+    start = time.perf_counter()
+    for _ in range(ops):
+        patron = data_manager.get_patron(rng.randrange(NUM_PATRONS))
+        if rng.random() < hot_fraction:
+            item_id = rng.randrange(HOT_ITEMS)
+        else:
+            item_id = rng.randrange(NUM_ITEMS)
+        if patron.has_item(item_id):
+            def operation(patron=patron, item_id=item_id):
+                return BusinessLogic.process_return(patron, item_id)
+        else:
+            def operation(patron=patron, item=data_manager.get_item(item_id)):
+                return BusinessLogic.process_loan(patron, item)
+        try:
+            _, retried = store.transact(data_manager, operation, (patron._id,), (item_id,))
+            retries += retried
+        except ConflictError:
+            failures += 1
+    results.put((retries, failures, time.perf_counter() - start))
+
+
+def verify(directory):
+    """
+    Count items whose on_loan disagrees with the patrons' loans.
+
+    Returns:
+        Number of inconsistent items
+    """
+    data_manager = DataManager()
+    VersionedStore(directory).load_into(data_manager)
+    counts = {}
+    for patron in data_manager.get_all_patrons():
+        for loan in patron._loans:
+            counts[loan._item._id] = counts.get(loan._item._id, 0) + 1
+    return sum(1 for item in data_manager.get_all_items()
+               if item._on_loan != counts.get(item._id, 0))
+
+
+def main():
+    """Run the benchmark for increasing numbers of worker processes."""
+    parser = argparse.ArgumentParser(description="Versioned store contention benchmark")
+    parser.add_argument("--workers", type=int, default=8, help="largest worker count")
+    parser.add_argument("--ops", type=int, default=300, help="transactions per worker")
+    parser.add_argument("--hot", type=float, default=0.2,
+                        help="fraction of transactions on hot items")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'commits/s':>10} {'retries':>8} {'gave up':>8} {'lost':>5}")
+    workers = 1
+    while workers <= args.workers:
+        with tempfile.TemporaryDirectory() as directory:
+            seed_store(directory)
+            results = multiprocessing.Queue()
+            processes = [
+                multiprocessing.Process(target=worker,
+                                        args=(directory, index, args.ops, args.hot, results))
+                for index in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            totals = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            elapsed = max(total[2] for total in totals)
+            retries = sum(total[0] for total in totals)
+            failures = sum(total[1] for total in totals)
+            lost = verify(directory)
+        print(f"{workers:>7} {workers * args.ops / elapsed:>10.0f} "
+              f"{retries:>8} {failures:>8} {lost:>5}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark suite: times the core operations on generated datasets and
+writes the results as JSON to reports/ for comparison across versions.
+
+Timed operations: load_data, save_data, every src.search function,
+check_loan_allowed, process_loan + process_return, and overdue fee
+calculation over all patrons. Each timing is the best of --repeat runs.
+Loans and returns are timed on patron/item pairs the rules allow, on data
+reloaded before each run so every run starts from the same state.
+
+Usage:
+    python -m benchmarks.suite [--patrons 10000 100000] [--repeat 3] [--output FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from src import clock, search
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DataManager
+from src.datagen import generate
+
+REPORTS_DIR = "reports"
+LOOKUPS = 200
+
+
+def best_of(repeat, function, setup=None):
+    """
+    Time a function several times.
+
+    Args:
+        repeat: Number of runs
+        function: Function to time
+        setup: Function run untimed before each run (optional)
+
+    Returns:
+        float: Fastest run in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def git_commit():
+    """Get the current commit, or None outside a git checkout."""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True,
+                                capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def allowed_pairs(patrons, items, rng, attempts=100):
+    """
+    Pick patron/item pairs whose loan the rules allow.
+
+    Args:
+        patrons: Patrons to pick from
+        items: Items to pick from
+        rng: random.Random to draw from
+        attempts: Random items tried per sampled patron
+
+    Returns:
+        List of (patron ID, item ID), at most LOOKUPS long
+    """
+    pairs = []
+    used = set()
+    for patron in rng.sample(patrons, len(patrons)):
+        for item in rng.sample(items, min(attempts, len(items))):
+            if item._id not in used and BusinessLogic.check_loan_allowed(patron, item)[0]:
+                pairs.append((patron._id, item._id))
+                used.add(item._id)
+                break
+        if len(pairs) == LOOKUPS:
+            break
+    return pairs
+
+
+def bench_dataset(num_patrons, repeat, seed):
+    # pylint: disable=too-many-locals
+    # One local per timed operation keeps the cases readable
+    """
+    Generate a dataset and time every operation on it.
+
+    Returns:
+        Dictionary of operation name to {"seconds", "calls", "per_call_us"}
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        catalogue_file, patron_file = generate(directory, num_patrons, seed=seed)
+
+        def load():
+            data_manager = DataManager()
+            data_manager.load_data(catalogue_file, patron_file)
+            return data_manager
+
+        data_manager = load()
+        patrons = data_manager.get_all_patrons()
+        items = data_manager.get_all_items()
+        rng = random.Random(seed)
+        sample_patrons = rng.sample(patrons, min(LOOKUPS, len(patrons)))
+        sample_items = rng.sample(items, min(LOOKUPS, len(items)))
+        pairs = list(zip(sample_patrons, sample_items))
+        allowed_ids = allowed_pairs(patrons, items, rng)
+        loan_pairs = []
+
+        def fresh_loan_pairs():
+            fresh = load()
+            loan_pairs[:] = [(fresh.get_patron(patron_id), fresh.get_item(item_id))
+                             for patron_id, item_id in allowed_ids]
+
+        def loan_and_return():
+            for patron, item in loan_pairs:
+                BusinessLogic.process_loan(patron, item)
+                BusinessLogic.process_return(patron, item._id)
+
+        def overdue_fees():
+            with clock.operation():
+                for patron in patrons:
+                    patron.calculate_overdue_fees()
+
+        cases = [
+            ("load_data", 1, load),
+            ("save_data", 1, lambda: data_manager.save_data(
+                os.path.join(directory, "saved_catalogue.json"),
+                os.path.join(directory, "saved_patrons.json"))),
+            ("search_patron_by_name", len(sample_patrons), lambda: [
+                search.search_patron_by_name(patrons, patron._name)
+                for patron in sample_patrons]),
+            ("search_patron_by_id", len(sample_patrons), lambda: [
+                search.search_patron_by_id(patrons, patron._id)
+                for patron in sample_patrons]),
+            ("search_patron_by_age", len(sample_patrons), lambda: [
+                search.search_patron_by_age(patrons, patron._age)
+                for patron in sample_patrons]),
+            ("search_patron_by_name_and_age", len(sample_patrons), lambda: [
+                search.search_patron_by_name_and_age(patrons, patron._name, patron._age)
+                for patron in sample_patrons]),
+            ("search_item_by_id", len(sample_items), lambda: [
+                search.search_item_by_id(items, item._id) for item in sample_items]),
+            ("check_loan_allowed", len(pairs), lambda: [
+                BusinessLogic.check_loan_allowed(patron, item) for patron, item in pairs]),
+            ("process_loan_and_return", len(allowed_ids), loan_and_return, fresh_loan_pairs),
+            ("calculate_overdue_fees", len(patrons), overdue_fees),
+        ]
+
+        results = {}
+        for name, calls, function, *setup in cases:
+            seconds = best_of(repeat, function, *setup)
+            results[name] = {
+                "seconds": round(seconds, 6),
+                "calls": calls,
+                "per_call_us": round(seconds / max(calls, 1) * 1e6, 3),
+            }
+        return {"patrons": len(patrons), "items": len(items), "results": results}
+
+
+def main():
+    """Run the suite and write the JSON report."""
+    parser = argparse.ArgumentParser(description="BAT benchmark suite")
+    parser.add_argument("--patrons", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="report file (default: reports/bench-<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "datasets": [],
+    }
+    for num_patrons in args.patrons:
+        dataset = bench_dataset(num_patrons, args.repeat, args.seed)
+        report["datasets"].append(dataset)
+        for name, result in dataset["results"].items():
+            print(f"{num_patrons:>9} {name:<30} {result['seconds']:>10.4f} s "
+                  f"{result['per_call_us']:>12.1f} us/call")
+
+    output = args.output or os.path.join(REPORTS_DIR, f"bench-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+        file.write("\n")
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,9 @@ Assignment code for FIT2107 Software Quality and Testing.
 Not to be shared or distributed without permission.
 '''
 
-from src.bat import Bat
+import sys
+
+from src.bat import main
 
 if __name__ == '__main__':
-    b = Bat()
-    b.run()
\ No newline at end of file
+    sys.exit(main())
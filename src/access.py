@@ -0,0 +1,160 @@
+"""
+Precomputed makerspace access for the door reader.
+
+Each patron's access state is packed into one byte, stored in a bytearray
+indexed by patron ID. A badge swipe is then a single array read followed by
+a lookup in a 256-entry table of precomputed answers, instead of a patron
+lookup plus the age, training and fee checks. The few IDs too large (or
+negative) for the array are kept in a dictionary instead, so one odd ID
+neither takes the index down nor costs every other patron memory.
+"""
+import logging
+
+from src.business_logic import calculate_discount, type_of_patron
+
+KNOWN = 1
+AGE_18_PLUS = 2
+TRAINED = 4
+ADULT_TYPE = 8
+FEES_CLEAR = 16
+# Highest ID the array grows to hold: one byte per ID, so 64 MiB at most
+MAX_PATRON_ID = 2 ** 26 - 1
+
+_log = logging.getLogger(__name__)
+
+
+def access_code(age, outstanding_fees, makerspace_training):
+    """
+    Pack the facts that decide makerspace access into one byte.
+
+    Args:
+        age: Patron's age
+        outstanding_fees: Amount of fees owed
+        makerspace_training: Whether patron has makerspace training
+
+    Returns:
+        int: Bit flags describing the patron
+    """
+    code = KNOWN
+    if age >= 18:
+        code |= AGE_18_PLUS
+    if makerspace_training:
+        code |= TRAINED
+    if type_of_patron(age) == "Adult":
+        code |= ADULT_TYPE
+    discount = calculate_discount(age)
+    if discount != "ERROR" and outstanding_fees * (1 - discount / 100) <= 0:
+        code |= FEES_CLEAR
+    return code
+
+
+def _desk_result(code):
+    """Answer BusinessLogic.check_makerspace_access for a code."""
+    if not code & KNOWN:
+        return False, "Patron not found"
+    if not code & AGE_18_PLUS:
+        return False, "Must be 18 or older to access makerspace"
+    if not code & TRAINED:
+        return False, "Makerspace training required"
+    return True, "Access granted"
+
+
+def _can_use(code):
+    """Answer can_use_makerspace for a code."""
+    required = KNOWN | ADULT_TYPE | TRAINED | FEES_CLEAR
+    return code & required == required
+
+
+DESK_RESULTS = tuple(_desk_result(code) for code in range(256))
+CAN_USE_RESULTS = tuple(_can_use(code) for code in range(256))
+
+
+class MakerspaceAccessIndex:
+    """
+    Access flags for every patron, indexed by patron ID.
+    """
+
+    def __init__(self, patrons=()):
+        """
+        Build the index.
+
+        Args:
+            patrons: Iterable of Patron objects to index
+        """
+        self._codes = bytearray()
+        # Codes of the IDs outside 0 to MAX_PATRON_ID
+        self._outside = {}
+        for patron in patrons:
+            self.update(patron)
+
+    def update_fields(self, patron_id, age, outstanding_fees, makerspace_training):
+        """
+        Record a patron's current access facts.
+
+        Args:
+            patron_id: Non-negative integer patron ID
+            age: Patron's age
+            outstanding_fees: Amount of fees owed
+            makerspace_training: Whether patron has makerspace training
+        """
+        if not 0 <= patron_id <= MAX_PATRON_ID:
+            if patron_id not in self._outside:
+                _log.warning("Patron ID %d is outside 0 to %d; its access is kept apart",
+                             patron_id, MAX_PATRON_ID)
+            self._outside[patron_id] = access_code(age, outstanding_fees, makerspace_training)
+            return
+        if patron_id >= len(self._codes):
+            self._codes.extend(bytes(max(patron_id + 1, 2 * len(self._codes)) -
+                                     len(self._codes)))
+        self._codes[patron_id] = access_code(age, outstanding_fees, makerspace_training)
+
+    def update(self, patron):
+        """
+        Recompute one patron's entry after their age, training or fees change.
+
+        Args:
+            patron: Patron to update
+        """
+        self.update_fields(patron._id, patron._age, patron._outstanding_fees,
+                           patron._makerspace_training)
+
+    def remove(self, patron_id):
+        """
+        Forget a patron.
+
+        Args:
+            patron_id: ID of the patron to remove
+        """
+        if 0 <= patron_id < len(self._codes):
+            self._codes[patron_id] = 0
+        self._outside.pop(patron_id, None)
+
+    def _code(self, patron_id):
+        """Get the stored code for a patron, 0 if unknown."""
+        if 0 <= patron_id < len(self._codes):
+            return self._codes[patron_id]
+        return self._outside.get(patron_id, 0)
+
+    def check(self, patron_id):
+        """
+        Same answer as BusinessLogic.check_makerspace_access, in O(1).
+
+        Args:
+            patron_id: ID on the swiped badge
+
+        Returns:
+            tuple: (bool, str) - (allowed, reason_if_not_allowed)
+        """
+        return DESK_RESULTS[self._code(patron_id)]
+
+    def can_use(self, patron_id):
+        """
+        Same answer as can_use_makerspace, in O(1).
+
+        Args:
+            patron_id: ID on the swiped badge
+
+        Returns:
+            bool: True if patron can use makerspace
+        """
+        return CAN_USE_RESULTS[self._code(patron_id)]
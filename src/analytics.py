@@ -0,0 +1,256 @@
+"""
+Incremental circulation analytics.
+
+CirculationAnalytics subscribes to the circulation events and keeps
+running totals, updated in O(1) per event, so dashboard queries never
+scan the patrons. recompute() derives the same figures from the data
+with a full pass, and verify() compares the two.
+"""
+import math
+import threading
+from collections import Counter, defaultdict
+
+from src.events import LoanEvent, PaymentEvent, ReturnEvent, get_event_bus
+
+
+class CirculationAnalytics:
+    """
+    Running circulation statistics fed by events.
+
+    Figures that depend only on the current data (active loans, fees
+    outstanding) are seeded from the data; cumulative figures (loans made,
+    fees charged) count events from when the analytics were attached.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # One counter per statistic is necessary
+
+    def __init__(self, data_manager=None):
+        """
+        Initialize the analytics.
+
+        Args:
+            data_manager: DataManager to seed the current figures from (optional)
+        """
+        self._lock = threading.Lock()
+        self._loans_by_item_type = Counter()
+        self._loans_by_item = Counter()
+        self._active_by_item_type = Counter()
+        self._active_by_item = Counter()
+        self._copies = {}
+        self._fees_by_patron_type = defaultdict(float)
+        self._totals = Counter()
+        self._event_bus = None
+        if data_manager is not None:
+            self.seed(data_manager)
+
+    def seed(self, data_manager):
+        """
+        Replace the current figures with ones computed from the data.
+
+        Args:
+            data_manager: DataManager holding patrons and catalogue
+        """
+        figures = self.recompute(data_manager)
+        with self._lock:
+            self._active_by_item_type = Counter(figures["active_by_item_type"])
+            self._active_by_item = Counter(figures["active_by_item"])
+            self._fees_by_patron_type = defaultdict(float, figures["fees_by_patron_type"])
+            self._copies = {item._id: item._num_copies for item in data_manager.iter_items()}
+
+    def attach(self, event_bus=None):
+        """
+        Start receiving events.
+
+        Args:
+            event_bus: EventBus to subscribe to (default: the BusinessLogic bus)
+        """
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+        self._event_bus.subscribe(LoanEvent, self.on_loan)
+        self._event_bus.subscribe(ReturnEvent, self.on_return)
+        self._event_bus.subscribe(PaymentEvent, self.on_payment)
+
+    def detach(self):
+        """Stop receiving events."""
+        if self._event_bus is None:
+            return
+        self._event_bus.unsubscribe(LoanEvent, self.on_loan)
+        self._event_bus.unsubscribe(ReturnEvent, self.on_return)
+        self._event_bus.unsubscribe(PaymentEvent, self.on_payment)
+        self._event_bus = None
+
+    def on_loan(self, event):
+        """
+        Count a loan.
+
+        Args:
+            event: LoanEvent
+        """
+        item = event.item
+        with self._lock:
+            self._loans_by_item_type[item._type] += 1
+            self._loans_by_item[item._id] += 1
+            self._active_by_item_type[item._type] += 1
+            self._active_by_item[item._id] += 1
+            self._copies[item._id] = item._num_copies
+            self._totals["loans"] += 1
+
+    def on_return(self, event):
+        """
+        Count a return and any overdue fee charged.
+
+        Args:
+            event: ReturnEvent
+        """
+        item = event.item
+        with self._lock:
+            self._active_by_item_type[item._type] -= 1
+            self._active_by_item[item._id] -= 1
+            self._totals["returns"] += 1
+            if event.fee > 0:
+                self._fees_by_patron_type[event.patron.get_type()] += event.fee
+                self._totals["fees_charged"] += event.fee
+
+    def on_payment(self, event):
+        """
+        Count a fee payment.
+
+        Args:
+            event: PaymentEvent
+        """
+        with self._lock:
+            self._fees_by_patron_type[event.patron.get_type()] -= event.amount
+            self._totals["payments"] += event.amount
+
+    def loans_by_item_type(self):
+        """
+        Get the number of loans made per item type since attaching.
+
+        Returns:
+            Dictionary of item type to number of loans
+        """
+        with self._lock:
+            return dict(self._loans_by_item_type)
+
+    def active_loans_by_item_type(self):
+        """
+        Get the number of items currently on loan per item type.
+
+        Returns:
+            Dictionary of item type to number of active loans
+        """
+        with self._lock:
+            return {item_type: count
+                    for item_type, count in self._active_by_item_type.items() if count}
+
+    def utilisation(self, item_id):
+        """
+        Get the share of an item's copies currently on loan.
+
+        Args:
+            item_id: ID of the item
+
+        Returns:
+            float between 0 and 1, or None for an unknown item
+        """
+        with self._lock:
+            copies = self._copies.get(item_id)
+            if not copies:
+                return None
+            return self._active_by_item[item_id] / copies
+
+    def most_borrowed(self, count=10):
+        """
+        Get the items lent most often since attaching.
+
+        Args:
+            count: Number of items to return
+
+        Returns:
+            List of (item ID, number of loans), most borrowed first
+        """
+        with self._lock:
+            return self._loans_by_item.most_common(count)
+
+    def fees_outstanding_by_patron_type(self):
+        """
+        Get the total fees owed per patron type.
+
+        Returns:
+            Dictionary of patron type to fees owed
+        """
+        with self._lock:
+            return {patron_type: round(fees, 2)
+                    for patron_type, fees in self._fees_by_patron_type.items()}
+
+    def dashboard(self):
+        """
+        Get every statistic at once.
+
+        Returns:
+            Dictionary of statistic name to value
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        return {
+            "loans": totals.get("loans", 0),
+            "returns": totals.get("returns", 0),
+            "fees_charged": round(totals.get("fees_charged", 0.0), 2),
+            "payments": round(totals.get("payments", 0.0), 2),
+            "loans_by_item_type": self.loans_by_item_type(),
+            "active_loans_by_item_type": self.active_loans_by_item_type(),
+            "fees_outstanding_by_patron_type": self.fees_outstanding_by_patron_type(),
+            "most_borrowed": self.most_borrowed(),
+        }
+
+    @staticmethod
+    def recompute(data_manager):
+        """
+        Compute the current figures with a full pass over the data.
+
+        Args:
+            data_manager: DataManager holding patrons and catalogue
+
+        Returns:
+            Dictionary with active_by_item_type, active_by_item and
+            fees_by_patron_type
+        """
+        active_by_item_type = Counter()
+        active_by_item = Counter()
+        fees_by_patron_type = defaultdict(float)
+        for patron in data_manager.iter_patrons():
+            for loan in patron._loans:
+                active_by_item_type[loan._item._type] += 1
+                active_by_item[loan._item._id] += 1
+            fees_by_patron_type[patron.get_type()] += patron._outstanding_fees
+        return {
+            "active_by_item_type": dict(active_by_item_type),
+            "active_by_item": dict(active_by_item),
+            "fees_by_patron_type": dict(fees_by_patron_type),
+        }
+
+    def verify(self, data_manager):
+        """
+        Compare the running figures with a full recompute.
+
+        Args:
+            data_manager: DataManager holding patrons and catalogue
+
+        Returns:
+            List of (statistic, key, running value, recomputed value) for every
+            figure that differs; empty if they all agree
+        """
+        figures = self.recompute(data_manager)
+        with self._lock:
+            running = {
+                "active_by_item_type": dict(self._active_by_item_type),
+                "active_by_item": dict(self._active_by_item),
+                "fees_by_patron_type": dict(self._fees_by_patron_type),
+            }
+        differences = []
+        for statistic, expected in figures.items():
+            actual = running[statistic]
+            for key in sorted(set(expected) | set(actual), key=str):
+                value, wanted = actual.get(key, 0), expected.get(key, 0)
+                if not math.isclose(value, wanted, abs_tol=0.005):
+                    differences.append((statistic, key, value, wanted))
+        return differences
@@ -1,20 +1,283 @@
 """
 Main entry point for the BAT (Borrowing and Access Tracking) system.
+
+Usage:
+    python run.py                        interactive menus
+    python run.py --script commands.txt  run commands from a file
+    producer | python run.py --script -  run commands from standard input
+    python run.py --record desk1.jsonl   interactive menus, recording the input
+    python run.py --replay desk*.jsonl --threads 8
+                                         replay recorded sessions in parallel
+    python run.py patron show 42         one-shot queries that read only the
+    python run.py item show 7            records they need, through the
+    python run.py fees 42                JSON files' ID indexes
+    python run.py --shared-dir /srv/bat-logs --branch north
+                                         replicate with the other branches
+    python run.py --ledger fees.ledger   record every fee charged and paid
+    python run.py --columnar             keep patrons in the columnar store
+    python run.py --store /srv/bat-store commit each loan, return and payment
+                                         to a store shared by several desks
 """
+import argparse
+import os
+import sys
+import tracemalloc
+
+from src import (clock, config, json_index, ledger, memprofile, metrics, replication,
+                 session, user_input)
 from src.bat_ui import BatUI
 from src.business_logic import BusinessLogic
+from src.columnar import ColumnarDataManager
 from src.data_mgmt import DataManager
+from src.policy import reload_policy
+from src.storage import StoredDataManager, VersionedStore
+
+# Set to record operation latencies from startup; kill -USR1 dumps them
+METRICS_ENV = "BAT_METRICS"
+# Set to trace allocations from startup; kill -USR2 writes a memory report
+MEMPROFILE_ENV = "BAT_MEMPROFILE"
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Borrowing and Access Tracking system")
+    parser.add_argument("--script", metavar="FILE",
+                        help='run commands from FILE ("-" for standard input) instead of '
+                             'the menus: "borrow PATRON ITEM", "return PATRON ITEM", '
+                             '"pay PATRON AMOUNT"')
+    parser.add_argument("--record", metavar="FILE",
+                        help="record the interactive session's input to FILE")
+    parser.add_argument("--replay", metavar="SESSION", nargs="+",
+                        help="replay recorded sessions through parallel menus")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="sessions replayed at once (default: 4)")
+    parser.add_argument("--no-save", action="store_true",
+                        help="discard the changes made by a script or replay")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("--shared-dir", metavar="DIR",
+                        help="directory of branch event logs to replicate through")
+    parser.add_argument("--branch", help="this branch's name (required with --shared-dir)")
+    parser.add_argument("--ledger", metavar="FILE",
+                        help="append every fee charged and paid to this ledger file")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep patrons in the columnar (struct-of-arrays) store")
+    parser.add_argument("--store", metavar="DIR",
+                        help="commit every change to a versioned store shared with other "
+                             "desks (seeded from the JSON files when empty)")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND",
+                                     help="one-shot query instead of the menus")
+    patron = commands.add_parser("patron", help="patron show ID: a patron and their loans")
+    patron.add_argument("action", choices=["show"])
+    patron.add_argument("id", type=int)
+    item = commands.add_parser("item", help="item show ID: a catalogue item")
+    item.add_argument("action", choices=["show"])
+    item.add_argument("id", type=int)
+    fees = commands.add_parser("fees", help="fees ID: a patron's fees")
+    fees.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+    if args.shared_dir is not None and not args.branch:
+        parser.error("--shared-dir needs --branch")
+    if args.shared_dir is not None and args.no_save:
+        # The branch log is appended as changes are made, so other branches
+        # would apply changes this branch then throws away
+        parser.error("--shared-dir and --no-save cannot be used together")
+    if args.shared_dir is not None and args.store is not None:
+        parser.error("--shared-dir and --store cannot be used together")
+    if args.columnar and args.store is not None:
+        parser.error("--columnar and --store cannot be used together")
+    return args
+
+
+def run_query(args):
+    """
+    Answer a one-shot query, reading only the records it needs.
+
+    Args:
+        args: Parsed command line
+
+    Returns:
+        int: Exit status, 1 if the patron or item does not exist
+    """
+    if args.command == "item":
+        item = json_index.load_item(args.id, args.catalogue)
+        if item is None:
+            print(f"Item with ID {args.id} not found.", file=sys.stderr)
+            return 1
+        print(item)
+        return 0
+
+    patron = json_index.load_patron(args.id, args.catalogue, args.patrons)
+    if patron is None:
+        print(f"Patron with ID {args.id} not found.", file=sys.stderr)
+        return 1
+    if args.command == "patron":
+        print(patron.to_full_string())
+    else:
+        with clock.operation():
+            overdue = patron.calculate_overdue_fees()
+        print(f"Outstanding fees: ${patron._outstanding_fees:.2f}")
+        print(f"Overdue fees accruing: ${overdue:.2f}")
+        print(f"Total if returned today: ${patron._outstanding_fees + overdue:.2f}")
+    return 0
+
+
+def run_interactive(ui, args, replicator=None):
+    """
+    Run the menus, applying the other branches' events while they are open.
+
+    Args:
+        ui: BatUI to run
+        args: Parsed command line
+        replicator: Replicator for this branch (optional)
+    """
+    if replicator is None:
+        ui.run(args.catalogue, args.patrons)
+        return
+    ui.data_manager.load_data(args.catalogue, args.patrons)
+    replicator.poll()
+    replicator.start()
+    try:
+        ui.menu_loop()
+    finally:
+        replicator.stop()
+    replicator.poll()
+    ui.data_manager.save_data(args.catalogue, args.patrons)
+    replicator.checkpoint()
+    print("Data saved. Goodbye!")
 
 
-def main():
+def run_script(ui, args, replicator=None):
+    """
+    Load the data, run a command script through the UI and save the data.
+
+    Args:
+        ui: BatUI to run the commands
+        args: Parsed command line
+        replicator: Replicator for this branch (optional)
+
+    Returns:
+        int: Exit status, 1 if any command failed
+    """
+    ui.data_manager.load_data(args.catalogue, args.patrons)
+    if replicator is not None:
+        replicator.poll()
+    if args.script == "-":
+        succeeded, failed = ui.run_script(sys.stdin)
+    else:
+        with open(args.script, encoding="utf-8") as file:
+            succeeded, failed = ui.run_script(file)
+    if replicator is not None:
+        replicator.poll()
+    if not args.no_save:
+        ui.data_manager.save_data(args.catalogue, args.patrons)
+        if replicator is not None:
+            replicator.checkpoint()
+    print(f"{succeeded} succeeded, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def run_replay(ui, args):
+    """
+    Load the data, replay recorded sessions in parallel and save the data.
+
+    Args:
+        ui: BatUI whose data the sessions share
+        args: Parsed command line
+
+    Returns:
+        int: Exit status, 1 if any session raised an error
+    """
+    sessions = [session.load_session(path) for path in args.replay]
+    ui.data_manager.load_data(args.catalogue, args.patrons)
+    result = session.replay(ui.data_manager, sessions, args.threads, ui.circulation.business_logic)
+    if not args.no_save:
+        ui.data_manager.save_data(args.catalogue, args.patrons)
+    for index, error in result["errors"]:
+        print(f"{args.replay[index]}: {error!r}", file=sys.stderr)
+    print(f"{result['sessions']} sessions, {result['inputs']} inputs in "
+          f"{result['seconds']:.2f} s: {result['inputs_per_second']:.0f} inputs/s")
+    return 1 if result["errors"] else 0
+
+
+def main(argv=None):
     """
     Main function to run the BAT system.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status
     """
-    data_manager = DataManager()
+    args = parse_args(argv)
+    reload_policy(missing_ok=True)
+    if args.command is not None:
+        return run_query(args)
+    if os.environ.get(METRICS_ENV):
+        metrics.enable()
+    metrics.install_signal_handler()
+    if os.environ.get(MEMPROFILE_ENV):
+        tracemalloc.start()
+    if args.store is not None:
+        data_manager = StoredDataManager(VersionedStore(args.store))
+    elif args.columnar:
+        data_manager = ColumnarDataManager()
+    else:
+        data_manager = DataManager()
+    memprofile.install_signal_handler(data_manager)
     business_logic = BusinessLogic()
     ui = BatUI(data_manager, business_logic)
-    ui.run()
+    replicator = None
+    if args.shared_dir is not None:
+        replicator = replication.Replicator(data_manager, args.shared_dir, args.branch)
+        replicator.attach()
+    fee_ledger = None
+    if args.ledger is not None:
+        fee_ledger = ledger.FeeLedger(args.ledger)
+        fee_ledger.attach()
+    try:
+        return run(ui, args, replicator)
+    finally:
+        if fee_ledger is not None:
+            fee_ledger.close()
+
+
+def run(ui, args, replicator=None):
+    """
+    Run the scripted, replay or interactive mode the command line asks for.
+
+    Args:
+        ui: BatUI to run
+        args: Parsed command line
+        replicator: Replicator for this branch (optional)
+
+    Returns:
+        int: Exit status
+    """
+    if args.script is not None:
+        return run_script(ui, args, replicator)
+    if args.replay:
+        return run_replay(ui, args)
+    if args.record is None:
+        run_interactive(ui, args, replicator)
+        return 0
+    with open(args.record, "a", encoding="utf-8") as file:
+        user_input.set_input_source(session.RecordingSource(file))
+        try:
+            run_interactive(ui, args, replicator)
+        finally:
+            user_input.set_input_source(None)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,9 +1,26 @@
 """
 User interface module for the BAT system.
+
+BatUI runs the interactive menus, or, through run_script(), a stream of
+commands such as "borrow 12 4" with one tab-separated result per line.
+Both go through the same Circulation transactions.
 """
+import math
+import sys
 
+from src import config
+from src import metrics
 from src import user_input
 from src import search
+from src.business_logic import BusinessLogic
+from src.concurrency import Circulation
+
+# Script command: (argument names, argument types)
+SCRIPT_COMMANDS = {
+    "borrow": (("PATRON", "ITEM"), (int, int)),
+    "return": (("PATRON", "ITEM"), (int, int)),
+    "pay": (("PATRON", "AMOUNT"), (int, float)),
+}
 
 
 class BatUI:
@@ -21,6 +38,7 @@ class BatUI:
         """
         self.data_manager = data_manager
         self.business_logic = business_logic
+        self.circulation = Circulation(data_manager, business_logic or BusinessLogic)
         self._current_screen = None
 
     def get_current_screen(self):
@@ -48,14 +66,25 @@ class BatUI:
 
         return screen_map.get(choice, None)
 
-    def run(self):
+    def run(self, catalogue_file=config.CATALOGUE_FILE, patron_file=config.PATRON_FILE):
         """Run the BAT system (alias for main_menu)."""
-        self.main_menu()
+        self.main_menu(catalogue_file, patron_file)
+
+    def main_menu(self, catalogue_file=config.CATALOGUE_FILE, patron_file=config.PATRON_FILE):
+        """
+        Load the data, handle the main menu until Exit, then save the data.
 
-    def main_menu(self):
-        """Display and handle the main menu."""
-        self.data_manager.load_data()
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+        """
+        self.data_manager.load_data(catalogue_file, patron_file)
+        self.menu_loop()
+        self.data_manager.save_data(catalogue_file, patron_file)
+        print("Data saved. Goodbye!")
 
+    def menu_loop(self):
+        """Display and handle the main menu until Exit is chosen."""
         while True:
             print("\n=== BAT Main Menu ===")
             print("1. Borrow item")
@@ -63,11 +92,12 @@ class BatUI:
             print("3. Search patrons")
             print("4. View patron details")
             print("5. Pay fees")
-            print("6. Exit")
+            print("6. View metrics")
+            print("7. Exit")
 
             choice = user_input.get_menu_choice(
                 "Enter choice: ",
-                ['1', '2', '3', '4', '5', '6']
+                ['1', '2', '3', '4', '5', '6', '7']
             )
 
             if choice == '1':
@@ -81,8 +111,8 @@ class BatUI:
             elif choice == '5':
                 self.pay_fees()
             elif choice == '6':
-                self.data_manager.save_data()
-                print("Data saved. Goodbye!")
+                self.view_metrics()
+            elif choice == '7':
                 break
 
     def search_patrons(self):
@@ -112,7 +142,7 @@ class BatUI:
         """Search for a patron by name."""
         name = user_input.get_string_input("Enter patron name: ")
         patron = search.search_patron_by_name(
-            self.data_manager._patron_data,
+            self.data_manager.iter_patrons(),
             name
         )
         if patron:
@@ -123,10 +153,7 @@ class BatUI:
     def search_by_id(self):
         """Search for a patron by ID."""
         patron_id = user_input.get_int_input("Enter patron ID: ")
-        patron = search.search_patron_by_id(
-            self.data_manager._patron_data,
-            patron_id
-        )
+        patron = self.data_manager.get_patron(patron_id)
         if patron:
             print(f"\nFound: {patron}")
         else:
@@ -140,13 +167,12 @@ class BatUI:
             120
         )
         patrons = search.search_patron_by_age(
-            self.data_manager._patron_data,
+            self.data_manager.iter_patrons(),
             age
         )
         if patrons:
             print(f"\nFound {len(patrons)} patron(s):")
-            for patron in patrons:
-                print(f"  - {patron}")
+            print("\n".join(f"  - {patron}" for patron in patrons))
         else:
             print(f"\nNo patrons found with age: {age}")
 
@@ -159,14 +185,13 @@ class BatUI:
             120
         )
         patrons = search.search_patron_by_name_and_age(
-            self.data_manager._patron_data,
+            self.data_manager.iter_patrons(),
             name,
             age
         )
         if patrons:
             print(f"\nFound {len(patrons)} patron(s):")
-            for patron in patrons:
-                print(f"  - {patron}")
+            print("\n".join(f"  - {patron}" for patron in patrons))
         else:
             print(
                 f"\nNo patrons found with name "
@@ -178,10 +203,7 @@ class BatUI:
         print("\n=== Borrow Item ===")
 
         item_id = user_input.get_int_input("Enter item ID: ")
-        item = search.search_item_by_id(
-            self.data_manager._catalogue_data,
-            item_id
-        )
+        item = self.data_manager.get_item(item_id)
 
         if item is None:
             print(f"Item with ID {item_id} not found.")
@@ -190,31 +212,25 @@ class BatUI:
         print(f"Item: {item}")
 
         patron_id = user_input.get_int_input("Enter patron ID: ")
-        patron = search.search_patron_by_id(
-            self.data_manager._patron_data,
-            patron_id
-        )
+        patron = self.data_manager.get_patron(patron_id)
 
         if patron is None:
             print(f"Patron with ID {patron_id} not found.")
             return
 
-        result = self.business_logic.borrow_item(patron, item)
+        success, message = self.circulation.loan(patron_id, item_id)
 
-        if result is True:
-            print("Success! Item borrowed.")
+        if success:
+            print(f"Success! {message}")
         else:
-            print(f"Cannot borrow: {result}")
+            print(f"Cannot borrow: {message}")
 
     def return_item(self):
         """Handle returning an item."""
         print("\n=== Return Item ===")
 
         patron_id = user_input.get_int_input("Enter patron ID: ")
-        patron = search.search_patron_by_id(
-            self.data_manager._patron_data,
-            patron_id
-        )
+        patron = self.data_manager.get_patron(patron_id)
 
         if patron is None:
             print(f"Patron with ID {patron_id} not found.")
@@ -225,29 +241,25 @@ class BatUI:
             return
 
         print("\nCurrent loans:")
-        for loan in patron._loans:
-            print(f"  - ID: {loan._item._id}, Item: {loan._item}")
+        print("\n".join(f"  - ID: {loan._item._id}, Item: {loan._item}" for loan in patron._loans))
 
         item_id = user_input.get_int_input(
             "Enter item ID to return: "
         )
 
-        result = self.business_logic.return_item(patron, item_id)
+        success, message, _ = self.circulation.return_item(patron_id, item_id)
 
-        if result:
-            print("Item returned successfully.")
+        if success:
+            print(message)
         else:
-            print("Patron does not have this item on loan.")
+            print(f"Cannot return: {message}")
 
     def view_patron_details(self):
         """Display detailed information about a patron."""
         print("\n=== View Patron Details ===")
 
         patron_id = user_input.get_int_input("Enter patron ID: ")
-        patron = search.search_patron_by_id(
-            self.data_manager._patron_data,
-            patron_id
-        )
+        patron = self.data_manager.get_patron(patron_id)
 
         if patron is None:
             print(f"Patron with ID {patron_id} not found.")
@@ -267,10 +279,7 @@ class BatUI:
         print("\n=== Pay Fees ===")
 
         patron_id = user_input.get_int_input("Enter patron ID: ")
-        patron = search.search_patron_by_id(
-            self.data_manager._patron_data,
-            patron_id
-        )
+        patron = self.data_manager.get_patron(patron_id)
 
         if patron is None:
             print(f"Patron with ID {patron_id} not found.")
@@ -292,12 +301,96 @@ class BatUI:
             patron._outstanding_fees
         )
 
-        remaining = patron.pay_fee(amount)
+        success, message, remaining = self.circulation.pay_fee(patron_id, amount)
 
-        if remaining == 0:
+        if not success:
+            print(f"Payment failed: {message}")
+        elif remaining == 0:
             print("Payment successful! No outstanding fees.")
         else:
             print(
                 f"Payment successful! "
                 f"Remaining: ${remaining:.2f}"
             )
+
+    def view_metrics(self):
+        """Show operation latencies, offering to start recording them."""
+        print("\n=== Metrics ===")
+
+        if not metrics.is_enabled():
+            print("Metrics are not being recorded.")
+            if user_input.get_yes_no_input("Start recording? (y/n): "):
+                metrics.enable()
+                print("Recording started.")
+            return
+
+        print(metrics.get_metrics().format(), end="")
+        if user_input.get_yes_no_input("Reset metrics? (y/n): "):
+            metrics.get_metrics().reset()
+
+    def run_script(self, lines, out=None):
+        """
+        Run commands without menus or prompts.
+
+        Each non-blank line that is not a # comment is one of
+        "borrow PATRON ITEM", "return PATRON ITEM" or "pay PATRON AMOUNT".
+        One tab-separated line is written per command: line number, status
+        (ok, fail or error for a malformed command), command, amount (the
+        overdue fee for a return, the remaining balance for a payment,
+        otherwise empty) and message.
+
+        Args:
+            lines: Iterable of command lines, such as an open file
+            out: Text file to write results to (default: standard output)
+
+        Returns:
+            tuple: (commands succeeded, commands failed or malformed)
+        """
+        write = (out if out is not None else sys.stdout).write
+        handlers = {
+            "borrow": self.circulation.loan,
+            "return": self.circulation.return_item,
+            "pay": self.circulation.pay_fee,
+        }
+        succeeded = failed = 0
+        for number, line in enumerate(lines, 1):
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            command = words[0].lower()
+            arguments = self._parse_command(command, words[1:])
+            if isinstance(arguments, str):
+                failed += 1
+                write(f"{number}\terror\t{command}\t\t{arguments}\n")
+                continue
+            result = handlers[command](*arguments)
+            amount = f"{result[2]:.2f}" if len(result) > 2 else ""
+            if result[0]:
+                succeeded += 1
+            else:
+                failed += 1
+            write(f"{number}\t{'ok' if result[0] else 'fail'}\t{command}\t{amount}\t"
+                  f"{result[1]}\n")
+        return succeeded, failed
+
+    @staticmethod
+    def _parse_command(command, words):
+        """
+        Convert a script command's arguments.
+
+        Returns:
+            List of arguments, or a str describing why the command is malformed
+        """
+        if command not in SCRIPT_COMMANDS:
+            return f"Unknown command; expected one of {', '.join(SCRIPT_COMMANDS)}"
+        names, types = SCRIPT_COMMANDS[command]
+        usage = f"Usage: {command} {' '.join(names)}"
+        if len(words) != len(types):
+            return usage
+        try:
+            arguments = [convert(word) for convert, word in zip(types, words)]
+        except ValueError:
+            return usage
+        if not all(math.isfinite(argument) for argument in arguments):
+            return usage
+        return arguments
@@ -0,0 +1,330 @@
+"""
+Nightly batch jobs run in a process pool over patron shards.
+
+The patrons are split into shards, each a handful of typed arrays (IDs,
+ages, fees and the flat loan columns) rather than patron objects, so a
+shard pickles as a few byte strings. Every shard is sent to a worker once
+and all the requested jobs run on it there; each job returns typed arrays
+too, and the per-shard results are concatenated in shard order, so the
+result is the same whatever the number of workers.
+
+Jobs:
+    fees       overdue fees accruing on each patron's loans today. They
+               are reported, not charged: fees are charged on return.
+    blocked    patrons who cannot borrow anything, with the reason
+    reminders  loans overdue or due within the reminder window
+
+Usage:
+    python -m src.batch [--jobs fees,blocked,reminders] [--workers N] [-o results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import accumulate, islice
+from operator import sub
+
+from src import clock, config
+from src.data_mgmt import DataManager
+from src.policy import get_policy
+
+BLOCKED_FEES = 1
+BLOCKED_LIMIT = 2
+REMIND_DAYS = 2
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+# Everything a job needs besides the shard, worked out once in the parent
+# so workers do not depend on the policy or clock of the parent process
+BatchContext = namedtuple("BatchContext", ["today", "fee_per_day", "max_loans",
+                                           "remind_days"])
+
+
+# A run of patrons and their loans as parallel typed arrays: IDs
+# array('q'), ages array('h'), fees array('d'), loan_offsets array('q')
+# (row r's loans are loan_items[loan_offsets[r]:loan_offsets[r + 1]]),
+# loan_items array('q') and loan_due array('l') of due date ordinals
+Shard = namedtuple("Shard", ["ids", "ages", "fees", "loan_offsets", "loan_items", "loan_due"])
+
+
+def _bounds(total, count):
+    """Split range(total) into count nearly equal runs."""
+    count = max(1, min(count, total))
+    return [(total * number // count, total * (number + 1) // count) for number in range(count)]
+
+
+def shard_patrons(patrons, count):
+    """
+    Split patron objects into shards of nearly equal size.
+
+    Args:
+        patrons: List of Patron (or PatronView) objects
+        count: Number of shards wanted
+
+    Returns:
+        List of Shard, fewer than count if there are fewer patrons
+    """
+    shards = []
+    for start, end in _bounds(len(patrons), count):
+        run = patrons[start:end]
+        loans = [loan for patron in run for loan in patron._loans]
+        shards.append(Shard(
+            array('q', [patron._id for patron in run]),
+            array('h', [patron._age for patron in run]),
+            array('d', [patron._outstanding_fees for patron in run]),
+            array('q', accumulate((len(patron._loans) for patron in run), initial=0)),
+            array('q', [loan._item._id for loan in loans]),
+            array('l', [loan._due_date.toordinal() for loan in loans])))
+    return shards
+
+
+def shard_store(store, count):
+    """
+    Split a columnar patron store into shards by slicing its arrays.
+
+    Loans changed since the store was last compacted are folded in first.
+
+    Args:
+        store: ColumnarPatronStore
+        count: Number of shards wanted
+
+    Returns:
+        List of Shard, fewer than count if there are fewer patrons
+    """
+    # pylint: disable=protected-access
+    # The shards are slices of the store's own columns
+    store.compact()
+    offsets = store._loan_offsets
+    shards = []
+    for start, end in _bounds(len(store), count):
+        base, top = offsets[start], offsets[end]
+        shards.append(Shard(
+            store._ids[start:end], store._ages[start:end], store._fees[start:end],
+            array('q', [offset - base for offset in offsets[start:end + 1]]),
+            store._loan_items[base:top], store._loan_due[base:top]))
+    return shards
+
+
+def make_shards(data_manager, count):
+    """
+    Split a DataManager's patrons into shards.
+
+    Args:
+        data_manager: DataManager, or ColumnarDataManager whose arrays
+            are sliced instead of reading patron objects
+        count: Number of shards wanted
+
+    Returns:
+        List of Shard
+    """
+    if hasattr(data_manager, "get_patron_store"):
+        return shard_store(data_manager.get_patron_store(), count)
+    return shard_patrons(data_manager.get_all_patrons(), count)
+
+
+def accrue_fees(shard, context):
+    """
+    Compute the overdue fees accruing on each patron's loans.
+
+    Returns:
+        tuple: (array('q') of patron IDs, array('d') of their fees), only
+        for patrons with overdue loans
+    """
+    today = context.today
+    running = [0]
+    running.extend(accumulate(today - due if due < today else 0 for due in shard.loan_due))
+    offsets = shard.loan_offsets
+    ids, fees = array('q'), array('d')
+    for row, patron_id in enumerate(shard.ids):
+        days = running[offsets[row + 1]] - running[offsets[row]]
+        if days:
+            ids.append(patron_id)
+            fees.append(days * context.fee_per_day)
+    return ids, fees
+
+
+def find_blocked(shard, context):
+    """
+    Find the patrons check_loan_allowed would refuse whatever the item.
+
+    Returns:
+        tuple: (array('q') of patron IDs, array('B') of BLOCKED_* flags)
+    """
+    minor, regular, elderly = context.max_loans
+    offsets = shard.loan_offsets
+    ids, reasons = array('q'), array('B')
+    for patron_id, age, fees, count in zip(shard.ids, shard.ages, shard.fees,
+                                           map(sub, islice(offsets, 1, None), offsets)):
+        reason = BLOCKED_FEES if fees > 0 else 0
+        if count >= (minor if age < 18 else elderly if age >= 65 else regular):
+            reason |= BLOCKED_LIMIT
+        if reason:
+            ids.append(patron_id)
+            reasons.append(reason)
+    return ids, reasons
+
+
+def build_reminders(shard, context):
+    """
+    List the loans that are overdue or due within the reminder window.
+
+    Only the due date column is scanned; the patron of each matching loan
+    is found by binary search over the loan offsets.
+
+    Returns:
+        tuple: (array('q') of patron IDs, array('q') of item IDs,
+        array('l') of due date ordinals), one entry per loan
+    """
+    cutoff = context.today + context.remind_days
+    positions = [position for position, due in enumerate(shard.loan_due) if due <= cutoff]
+    offsets = shard.loan_offsets
+    return (array('q', [shard.ids[bisect_right(offsets, position) - 1]
+                        for position in positions]),
+            array('q', [shard.loan_items[position] for position in positions]),
+            array('l', [shard.loan_due[position] for position in positions]))
+
+
+JOBS = {
+    "fees": accrue_fees,
+    "blocked": find_blocked,
+    "reminders": build_reminders,
+}
+
+
+def _run_shard(shard, job_names, context):
+    """Run the jobs on one shard; the unit of work sent to a worker."""
+    return [JOBS[name](shard, context) for name in job_names]
+
+
+def make_context(today=None, remind_days=REMIND_DAYS):
+    """
+    Capture the date and policy the jobs run with.
+
+    Args:
+        today: datetime.date to run as of (default: clock.today())
+        remind_days: Remind about loans due up to this many days ahead
+
+    Returns:
+        BatchContext
+    """
+    policy = get_policy()
+    return BatchContext((today or clock.today()).toordinal(), policy.overdue_fee_per_day(),
+                        tuple(policy.max_loans(patron_type)
+                              for patron_type in ("Minor", "Regular", "Elderly")),
+                        remind_days)
+
+
+def run_batch(data_manager, job_names=tuple(JOBS), workers=None, shards=None, context=None):
+    """
+    Run batch jobs over every patron.
+
+    Args:
+        data_manager: DataManager or ColumnarDataManager holding the patrons
+        job_names: Names of the jobs to run (keys of JOBS)
+        workers: Worker processes (default: one per CPU); 1 runs the jobs
+            in this process
+        shards: Number of shards (default: SHARDS_PER_WORKER per worker)
+        context: BatchContext (default: make_context())
+
+    Returns:
+        Dictionary of job name to its result columns, each the
+        concatenation of that column over the shards
+
+    Raises:
+        ValueError: If a job name is unknown
+    """
+    unknown = [name for name in job_names if name not in JOBS]
+    if unknown:
+        raise ValueError(f"Unknown batch jobs: {', '.join(unknown)}")
+    workers = workers or os.cpu_count() or 1
+    context = context or make_context()
+    shard_list = make_shards(data_manager, shards or workers * SHARDS_PER_WORKER)
+
+    if workers == 1:
+        results = [_run_shard(shard, job_names, context) for shard in shard_list]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_shard, shard_list, [job_names] * len(shard_list),
+                                    [context] * len(shard_list)))
+
+    merged = {}
+    for position, name in enumerate(job_names):
+        columns = None
+        for shard_results in results:
+            if columns is None:
+                columns = shard_results[position]
+            else:
+                for column, part in zip(columns, shard_results[position]):
+                    column.extend(part)
+        merged[name] = columns
+    return merged
+
+
+def to_records(results):
+    """
+    Turn batch results into JSON-friendly records.
+
+    Args:
+        results: Dictionary returned by run_batch
+
+    Returns:
+        Dictionary of job name to a list of record dictionaries
+    """
+    records = {}
+    if "fees" in results:
+        records["fees"] = [{"patron_id": patron_id, "overdue_fees": round(fee, 2)}
+                           for patron_id, fee in zip(*results["fees"])]
+    if "blocked" in results:
+        records["blocked"] = [{"patron_id": patron_id,
+                               "fees": bool(reason & BLOCKED_FEES),
+                               "loan_limit": bool(reason & BLOCKED_LIMIT)}
+                              for patron_id, reason in zip(*results["blocked"])]
+    if "reminders" in results:
+        records["reminders"] = [{"patron_id": patron_id, "item_id": item_id,
+                                 "due": date.fromordinal(due).isoformat()}
+                                for patron_id, item_id, due in zip(*results["reminders"])]
+    return records
+
+
+def main(argv=None):
+    """
+    Run the nightly batch jobs from the command line.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Run nightly batch jobs over all patrons")
+    parser.add_argument("--jobs", default=",".join(JOBS),
+                        help=f"comma-separated jobs to run (default: {','.join(JOBS)})")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--shards", type=int, help="patron shards (default: 4 per worker)")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+    job_names = [name for name in args.jobs.split(",") if name]
+    if any(name not in JOBS for name in job_names):
+        parser.error(f"jobs must be among: {', '.join(JOBS)}")
+
+    data_manager = DataManager()
+    data_manager.load_data(args.catalogue, args.patrons)
+    start = time.perf_counter()
+    results = run_batch(data_manager, job_names, args.workers, args.shards)
+    seconds = time.perf_counter() - start
+
+    for name in job_names:
+        print(f"{name}: {len(results[name][0])} rows", file=sys.stderr)
+    print(f"{len(data_manager.get_all_patrons())} patrons in {seconds:.2f} s", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(to_records(results), file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 """
 Borrowable item module for library system.
 """
+import sys
 
 
 class BorrowableItem:
     """
     Represents an item that can be borrowed from the library.
     """
+    __slots__ = (
+        "_id", "_name", "_type", "_num_copies", "_on_loan", "_location", "_year", "_version",
+    )
 
-    def __init__(self, item_id, name, item_type, num_copies=1, on_loan=0, location="Main Library"):
+    def __init__(self, item_id, name, item_type, num_copies=1, on_loan=0, location="Main Library",
+                 year=None):
         # pylint: disable=too-many-arguments
-        # Six parameters are necessary for complete item initialization
+        # Seven parameters are necessary for complete item initialization
         """
         Initialize a BorrowableItem.
 
@@ -21,13 +26,16 @@ class BorrowableItem:
             num_copies: Total number of copies available
             on_loan: Number of copies currently on loan
             location: Physical location of the item
+            year: Year the item was published or acquired
         """
         self._id = item_id
         self._name = name
-        self._type = item_type
+        self._type = sys.intern(item_type)
         self._num_copies = num_copies
         self._on_loan = on_loan
         self._location = location
+        self._year = year
+        self._version = 0
 
     def is_available(self):
         """
@@ -1,8 +1,13 @@
 """
 Business logic for the library system.
 """
+import math
+
+from src import clock
 from src.borrowable_item import BorrowableItem
+from src.events import LoanEvent, PaymentEvent, ReturnEvent, get_event_bus
 from src.loan import Loan
+from src.policy import get_policy
 
 
 class BusinessLogic:
@@ -29,11 +34,11 @@ class BusinessLogic:
         if item._on_loan >= item._num_copies:
             return False, "No copies available"
 
+        policy = get_policy()
+
         # Check patron loan limit
         patron_type = patron.get_type()
-        max_loans = {"Minor": 3, "Regular": 5, "Elderly": 10}
-
-        if len(patron._loans) >= max_loans.get(patron_type, 5):
+        if len(patron._loans) >= policy.max_loans(patron_type):
             return False, f"Loan limit reached for {patron_type}"
 
         # Check outstanding fees
@@ -42,19 +47,16 @@ class BusinessLogic:
 
         # Check age restrictions
         item_type = item._type
-        if item_type == "Reference Book":
-            return False, "Reference books cannot be borrowed"
+        rule = policy.item_rule(item_type)
+        if rule.not_borrowable:
+            return False, rule.not_borrowable
 
-        if patron._age < 18:
-            if item_type in ["Gardening Tool", "Carpentry Tool"]:
-                return False, "Minors cannot borrow tools"
+        if patron._age < 18 and rule.minor_restriction:
+            return False, rule.minor_restriction
 
         # Check training requirements
-        if item_type == "Gardening Tool" and not patron._gardening_tool_training:
-            return False, "Gardening tool training required"
-
-        if item_type == "Carpentry Tool" and not patron._carpentry_tool_training:
-            return False, "Carpentry tool training required"
+        if rule.training_field and not getattr(patron, rule.training_field):
+            return False, rule.training_reason
 
         # Check for duplicate loans
         for loan in patron._loans:
@@ -62,10 +64,8 @@ class BusinessLogic:
                 return False, f"Already have a {item_type} on loan"
 
         # Check specific item restrictions
-        if item_type in ["Laptop", "Study Room"]:
-            loan_period = BusinessLogic._get_loan_period(item_type)
-            if loan_period == 0:
-                return False, f"{item_type} cannot be borrowed"
+        if rule.loan_period == 0:
+            return False, f"{item_type} cannot be borrowed"
 
         return True, "Loan allowed"
 
@@ -80,17 +80,7 @@ class BusinessLogic:
         Returns:
             int: Number of days for loan period
         """
-        loan_periods = {
-            "Fiction Book": 21,
-            "Non-Fiction Book": 21,
-            "Magazine": 7,
-            "DVD": 7,
-            "Laptop": 3,
-            "Study Room": 1,
-            "Gardening Tool": 14,
-            "Carpentry Tool": 14,
-        }
-        return loan_periods.get(item_type, 14)
+        return get_policy().loan_period(item_type)
 
     @staticmethod
     def process_loan(patron, item):
@@ -110,6 +100,9 @@ class BusinessLogic:
 
         loan_period = BusinessLogic._get_loan_period(item._type)
         patron.add_loan(item, loan_period)
+        event_bus = get_event_bus()
+        if event_bus.has_subscribers(LoanEvent):
+            event_bus.publish(LoanEvent(patron, item, patron._loans[-1]._due_date))
         return True, f"Loan successful. Due in {loan_period} days."
 
     @staticmethod
@@ -130,33 +123,71 @@ class BusinessLogic:
         return True, "Return allowed"
 
     @staticmethod
-    def process_return(patron, item_id):
+    def process_return(patron, item_id, holds=None):
         """
         Process a return transaction.
 
         Args:
             patron: The Patron returning the item
             item_id: ID of the item being returned
+            holds: HoldQueues to hand the returned copy on to (optional)
 
         Returns:
             tuple: (bool, str, float) - (success, message, fees)
         """
-        allowed, reason = BusinessLogic.check_return_allowed(patron, item_id)
-        if not allowed:
-            return False, reason, 0.0
+        with clock.operation():
+            allowed, reason = BusinessLogic.check_return_allowed(patron, item_id)
+            if not allowed:
+                return False, reason, 0.0
+
+            # Calculate overdue fees before return; the fee and any loan to a
+            # waiting patron use the same date
+            overdue_fees = patron.calculate_overdue_fees()
+            # return_item removes the first loan of the item, so this is the one
+            loan = next(loan for loan in patron._loans if loan._item._id == item_id)
+            item = loan._item
+
+            # Process return
+            success = patron.return_item(item_id)
+            if success:
+                if overdue_fees > 0:
+                    patron.add_fee(overdue_fees)
+                    message = f"Return successful. Overdue fee: ${overdue_fees:.2f}"
+                else:
+                    message = "Return successful. No fees."
+                event_bus = get_event_bus()
+                if event_bus.has_subscribers(ReturnEvent):
+                    event_bus.publish(ReturnEvent(patron, item, overdue_fees, loan._due_date))
+                if holds is not None:
+                    holder = holds.allocate(item)
+                    if holder is not None:
+                        message += f" Allocated to waiting patron {holder._id}."
+                return True, message, overdue_fees
+
+            return False, "Return failed", 0.0
 
-        # Calculate overdue fees before return
-        overdue_fees = patron.calculate_overdue_fees()
+    @staticmethod
+    def process_payment(patron, amount):
+        """
+        Process a fee payment.
 
-        # Process return
-        success = patron.return_item(item_id)
-        if success:
-            if overdue_fees > 0:
-                patron.add_fee(overdue_fees)
-                return True, f"Return successful. Overdue fee: ${overdue_fees:.2f}", overdue_fees
-            return True, "Return successful. No fees.", 0.0
+        Args:
+            patron: The Patron paying
+            amount: Amount offered
 
-        return False, "Return failed", 0.0
+        Returns:
+            tuple: (bool, str, float) - (success, message, remaining balance)
+        """
+        # NaN would poison the balance and infinity would clear any debt
+        if not math.isfinite(amount) or amount <= 0:
+            return False, "Payment must be positive", patron._outstanding_fees
+
+        owed = patron._outstanding_fees
+        remaining = patron.pay_fee(amount)
+        event_bus = get_event_bus()
+        if event_bus.has_subscribers(PaymentEvent):
+            event_bus.publish(PaymentEvent(patron, owed - remaining, remaining))
+        return True, f"Payment successful. Remaining: ${remaining:.2f}", remaining
 
     @staticmethod
     def check_makerspace_access(patron):
@@ -0,0 +1,150 @@
+"""
+Clock service for the library system.
+
+Loans, patrons and business logic ask this module for "today" instead of
+calling datetime.now() themselves. The system clock caches the date until
+the next local midnight, and operation() pins one date for the whole of an
+operation or batch, so rendering or charging many loans reads the clock
+once. A SimulatedClock can be put in force to move time on in fee runs
+and tests.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+
+class SystemClock:
+    """
+    Today's date from the system clock, cached until midnight.
+    """
+
+    def __init__(self):
+        """Initialize the clock with an empty cache."""
+        self._today = None
+        self._expires = 0.0
+
+    def today(self):
+        """
+        Get today's date.
+
+        Returns:
+            datetime.date
+        """
+        if time.time() >= self._expires:
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            self._today = now.date()
+            self._expires = midnight.timestamp()
+        return self._today
+
+
+class SimulatedClock:
+    """
+    A clock that stays on one date until it is moved.
+    """
+
+    def __init__(self, today=None):
+        """
+        Initialize the clock.
+
+        Args:
+            today: datetime.date to start on (default: the real date)
+        """
+        self._today = today if today is not None else date.today()
+
+    def today(self):
+        """
+        Get the simulated date.
+
+        Returns:
+            datetime.date
+        """
+        return self._today
+
+    def advance(self, days=1):
+        """
+        Move the clock forward.
+
+        Args:
+            days: Number of days to move forward
+
+        Returns:
+            The new date
+        """
+        self._today += timedelta(days=days)
+        return self._today
+
+    def set_today(self, today):
+        """
+        Move the clock to a date.
+
+        Args:
+            today: datetime.date to move to
+        """
+        self._today = today
+
+
+_clock = SystemClock()
+_local = threading.local()
+
+
+def get_clock():
+    """
+    Get the clock currently in force.
+
+    Returns:
+        SystemClock or SimulatedClock
+    """
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Put a clock in force.
+
+    Args:
+        clock: Object with a today() method, or None for the system clock
+
+    Returns:
+        The clock that was in force before
+    """
+    global _clock  # pylint: disable=global-statement
+    previous = _clock
+    _clock = clock if clock is not None else SystemClock()
+    return previous
+
+
+def today():
+    """
+    Get today's date for the current operation.
+
+    Returns:
+        datetime.date pinned by operation(), or the clock's date
+    """
+    pinned = getattr(_local, "today", None)
+    if pinned is not None:
+        return pinned
+    return _clock.today()
+
+
+@contextmanager
+def operation():
+    """
+    Pin today's date for the duration of an operation or batch.
+
+    Nested operations share the outermost date. The pin is per thread, so
+    concurrent desks each read the clock once per operation.
+
+    Yields:
+        The pinned datetime.date
+    """
+    pinned = getattr(_local, "today", None)
+    if pinned is not None:
+        yield pinned
+        return
+    _local.today = _clock.today()
+    try:
+        yield _local.today
+    finally:
+        _local.today = None
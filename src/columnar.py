@@ -0,0 +1,592 @@
+"""
+Columnar (struct-of-arrays) patron storage.
+
+Patron fields are kept in parallel typed arrays, one entry per row:
+
+    ids          array('q')   patron IDs
+    ages         array('h')
+    fees         array('d')   outstanding fees
+    flags        array('B')   training bitfield
+    names        bytearray    UTF-8 names, sliced by name_offsets
+    loan_offsets array('q')   row r's loans are loan_items[offsets[r]:offsets[r + 1]]
+    loan_items   array('q')   item ID of every loan
+    loan_due     array('l')   due date of every loan, as a date ordinal
+
+Scans such as age search, overdue fees and eligibility masks run straight
+over the arrays without creating patron objects, and every array exposes
+the buffer protocol, so callers with numpy can wrap them without copying.
+Patron objects are replaced by thin PatronView objects created on demand.
+"""
+import weakref
+from array import array
+from bisect import bisect_left
+from datetime import date
+from itertools import accumulate, islice
+from operator import sub
+
+from src import config
+from src.data_mgmt import DataManager, Patron, item_to_record, write_records, DUE_DATE_FORMAT
+from src.loan import Loan
+from src.policy import get_policy
+
+GARDENING = 1
+CARPENTRY = 2
+MAKERSPACE = 4
+
+
+class ColumnarPatronStore:
+    """
+    Patrons and their loans stored as parallel typed arrays.
+
+    Loans of rows changed since the last compact() are kept as Loan lists
+    in an overlay; compact() folds them back into the flat arrays. Rows
+    that are only read never enter the overlay: their Loan lists are only
+    weakly cached, so every read of a row gets the same list while any
+    caller still holds it, and a scan over all rows keeps none of them.
+    Names of replaced rows that changed are overlaid the same way.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # One attribute per column is necessary for the columnar layout
+
+    def __init__(self, get_item):
+        """
+        Initialize an empty store.
+
+        Args:
+            get_item: Function returning the BorrowableItem for an item ID
+        """
+        self._get_item = get_item
+        self._ids = array('q')
+        self._ages = array('h')
+        self._fees = array('d')
+        self._flags = array('B')
+        self._versions = array('q')
+        self._names = bytearray()
+        self._name_offsets = array('q', [0])
+        self._loan_offsets = array('q', [0])
+        self._loan_items = array('q')
+        self._loan_due = array('l')
+        self._loan_overlay = {}
+        self._loan_reads = weakref.WeakValueDictionary()
+        self._name_overlay = {}
+        self._index = None
+
+    def __len__(self):
+        """Number of patrons stored."""
+        return len(self._ids)
+
+    def row_of(self, patron_id):
+        """
+        Find the row holding a patron.
+
+        IDs added in ascending order are found by binary search over the
+        ID column; a dictionary index is only built if IDs arrive out of
+        order.
+
+        Args:
+            patron_id: ID of the patron
+
+        Returns:
+            int row, or None if the patron is not stored
+        """
+        if self._index is not None:
+            return self._index.get(patron_id)
+        row = bisect_left(self._ids, patron_id)
+        if row < len(self._ids) and self._ids[row] == patron_id:
+            return row
+        return None
+
+    def add(self, patron):
+        """
+        Store a patron, replacing any patron with the same ID.
+
+        Args:
+            patron: Patron (or PatronView) to store
+        """
+        flags = ((GARDENING if patron._gardening_tool_training else 0) |
+                 (CARPENTRY if patron._carpentry_tool_training else 0) |
+                 (MAKERSPACE if patron._makerspace_training else 0))
+        row = self.row_of(patron._id)
+        if row is not None:
+            self._ages[row] = patron._age
+            self._fees[row] = patron._outstanding_fees
+            self._flags[row] = flags
+            self._versions[row] = patron._version
+            if patron._name != self.name(row):
+                self._name_overlay[row] = patron._name
+            self._loan_overlay[row] = list(patron._loans)
+            self._loan_reads.pop(row, None)
+            return
+
+        row = len(self._ids)
+        if self._index is None and self._ids and patron._id < self._ids[-1]:
+            self._index = {patron_id: index for index, patron_id in enumerate(self._ids)}
+        if self._index is not None:
+            self._index[patron._id] = row
+        self._ids.append(patron._id)
+        self._ages.append(patron._age)
+        self._fees.append(patron._outstanding_fees)
+        self._flags.append(flags)
+        self._versions.append(patron._version)
+        self._names += patron._name.encode()
+        self._name_offsets.append(len(self._names))
+        for loan in patron._loans:
+            self._loan_items.append(loan._item._id)
+            self._loan_due.append(loan._due_date.toordinal())
+        self._loan_offsets.append(len(self._loan_items))
+
+    def view(self, row):
+        """
+        Get a patron view for a row.
+
+        Args:
+            row: Row number
+
+        Returns:
+            PatronView
+        """
+        return PatronView(self, row)
+
+    def name(self, row):
+        """Decode a row's name."""
+        name = self._name_overlay.get(row)
+        if name is not None:
+            return name
+        return self._names[self._name_offsets[row]:self._name_offsets[row + 1]].decode()
+
+    def loan_pairs(self, row):
+        """
+        Get a row's loans as (item ID, due ordinal) pairs.
+
+        Args:
+            row: Row number
+
+        Returns:
+            List of (int, int) tuples
+        """
+        overlay = self._loan_overlay.get(row)
+        if overlay is not None:
+            return [(loan._item._id, loan._due_date.toordinal()) for loan in overlay]
+        start, end = self._loan_offsets[row], self._loan_offsets[row + 1]
+        return list(zip(self._loan_items[start:end], self._loan_due[start:end]))
+
+    def loans(self, row):
+        """
+        Get a row's loans as a mutable list of Loan objects.
+
+        Reading the list leaves the arrays untouched. The first change made
+        to it (by Patron.add_loan or return_item, for example) moves the list
+        into the overlay, so the change is stored. Reads of the row return
+        the same list, and so the same Loan objects, while it is in use, so
+        a loan found by iterating can be removed through a later read.
+
+        Args:
+            row: Row number
+
+        Returns:
+            List of Loan objects
+        """
+        overlay = self._loan_overlay.get(row)
+        if overlay is not None:
+            return overlay
+        loans = self._loan_reads.get(row)
+        if loans is not None:
+            return loans
+        loans = self._loan_reads[row] = _RowLoans(self, row)
+        start, end = self._loan_offsets[row], self._loan_offsets[row + 1]
+        for item_id, due in zip(self._loan_items[start:end], self._loan_due[start:end]):
+            item = self._get_item(item_id)
+            if item is not None:
+                list.append(loans, Loan(item, date.fromordinal(due)))
+        return loans
+
+    def set_loans(self, row, loans):
+        """Replace a row's loans."""
+        self._loan_overlay[row] = list(loans)
+        self._loan_reads.pop(row, None)
+
+    def compact(self):
+        """
+        Fold overlaid names and loans back into the flat arrays.
+        """
+        if self._name_overlay:
+            names = bytearray()
+            name_offsets = array('q', [0])
+            for row in range(len(self._ids)):
+                names += self.name(row).encode()
+                name_offsets.append(len(names))
+            self._names, self._name_offsets = names, name_offsets
+            self._name_overlay = {}
+        if not self._loan_overlay:
+            return
+        offsets = array('q', [0])
+        items = array('q')
+        due = array('l')
+        for row in range(len(self._ids)):
+            for item_id, due_ordinal in self.loan_pairs(row):
+                items.append(item_id)
+                due.append(due_ordinal)
+            offsets.append(len(items))
+        self._loan_offsets, self._loan_items, self._loan_due = offsets, items, due
+        self._loan_overlay = {}
+
+    def loan_counts(self):
+        """
+        Get the number of loans of every row.
+
+        Returns:
+            array('l') of loan counts by row
+        """
+        offsets = self._loan_offsets
+        counts = array('l', map(sub, islice(offsets, 1, None), offsets))
+        for row, loans in self._loan_overlay.items():
+            counts[row] = len(loans)
+        return counts
+
+    def rows_with_age(self, age):
+        """
+        Find rows by age.
+
+        The age column is searched with array.index, so the scan between
+        matches runs in C.
+
+        Returns:
+            List of rows whose age matches
+        """
+        rows = []
+        row = -1
+        try:
+            while True:
+                row = self._ages.index(age, row + 1)
+                rows.append(row)
+        except (ValueError, OverflowError, TypeError):
+            return rows
+
+    def rows_with_fees_over(self, amount):
+        """
+        Find rows owing more than an amount.
+
+        Returns:
+            List of rows whose outstanding fees exceed the amount
+        """
+        return [row for row, fees in enumerate(self._fees) if fees > amount]
+
+    def overdue_fees(self, today):
+        """
+        Compute every row's overdue fees without creating any objects.
+
+        Days overdue are computed once per loan over the flat due column and
+        summed per row from a running total, so no per-row loop touches the
+        loans.
+
+        Args:
+            today: datetime.date to compute fees at
+
+        Returns:
+            array('d') of overdue fees by row
+        """
+        today_ordinal = today.toordinal()
+        fee_per_day = get_policy().overdue_fee_per_day()
+        running = [0]
+        running.extend(accumulate(
+            [today_ordinal - due if due < today_ordinal else 0 for due in self._loan_due]
+        ))
+        offsets = self._loan_offsets
+        fees = array('d', [
+            (running[offsets[row + 1]] - running[offsets[row]]) * fee_per_day
+            for row in range(len(self._ids))
+        ])
+        for row in self._loan_overlay:
+            fees[row] = sum(max(0, today_ordinal - due)
+                            for _, due in self.loan_pairs(row)) * fee_per_day
+        return fees
+
+    def makerspace_mask(self):
+        """
+        Compute check_makerspace_access for every row.
+
+        Returns:
+            bytearray with 1 for rows allowed into the makerspace
+        """
+        return bytearray([
+            1 if age >= 18 and flags & MAKERSPACE else 0
+            for age, flags in zip(self._ages, self._flags)
+        ])
+
+    def loan_eligibility_mask(self):
+        """
+        Find rows that could borrow something right now.
+
+        A row is eligible if it owes no fees and is below its loan limit.
+
+        Returns:
+            bytearray with 1 for eligible rows
+        """
+        policy = get_policy()
+        limits = [
+            policy.max_loans("Minor" if age < 18 else "Elderly" if age >= 65 else "Regular")
+            for age in range(max(self._ages, default=0) + 1)
+        ]
+        return bytearray([
+            1 if fees <= 0 and count < limits[age] else 0
+            for age, fees, count in zip(self._ages, self._fees, self.loan_counts())
+        ])
+
+    def sorted_rows(self, field, descending=False):
+        """
+        Sort rows by a column without creating any patron views.
+
+        Args:
+            field: "patron_id", "age" or "outstanding_fees"
+            descending: Sort largest first
+
+        Returns:
+            List of rows in sorted order, or None if the field has no column
+        """
+        column = {"patron_id": self._ids, "age": self._ages,
+                  "outstanding_fees": self._fees}.get(field)
+        if column is None:
+            return None
+        return sorted(range(len(column)), key=column.__getitem__, reverse=descending)
+
+    def records(self):
+        """
+        Generate patrons.json records straight from the arrays.
+
+        Yields:
+            Dictionary in the patrons.json schema for every row
+        """
+        for row in range(len(self._ids)):
+            flags = self._flags[row]
+            yield {
+                "patron_id": self._ids[row],
+                "name": self.name(row),
+                "age": self._ages[row],
+                "outstanding_fees": self._fees[row],
+                "gardening_tool_training": bool(flags & GARDENING),
+                "carpentry_tool_training": bool(flags & CARPENTRY),
+                "makerspace_training": bool(flags & MAKERSPACE),
+                "loans": [
+                    {"item": item_id,
+                     "due": date.fromordinal(due).strftime(DUE_DATE_FORMAT)}
+                    for item_id, due in self.loan_pairs(row)
+                ],
+                "version": self._versions[row],
+            }
+
+
+class _RowLoans(list):
+    """
+    A row's loans read from the flat arrays.
+
+    Every mutating method first stores the list in the overlay, so a view's
+    loans can be changed in place like a Patron's.
+    """
+    __slots__ = ("_store", "_row", "__weakref__")
+    # pylint: disable=missing-function-docstring
+    # The overrides behave exactly as the list methods they wrap
+
+    def __init__(self, store, row):
+        super().__init__()
+        self._store = store
+        self._row = row
+
+    def _stored(self):
+        """Put this list in the overlay and return the row's overlay list."""
+        return self._store._loan_overlay.setdefault(self._row, self)
+
+    def append(self, loan):
+        list.append(self._stored(), loan)
+
+    def extend(self, loans):
+        list.extend(self._stored(), loans)
+
+    def insert(self, index, loan):
+        list.insert(self._stored(), index, loan)
+
+    def remove(self, loan):
+        list.remove(self._stored(), loan)
+
+    def pop(self, index=-1):
+        return list.pop(self._stored(), index)
+
+    def clear(self):
+        list.clear(self._stored())
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self._stored(), index, value)
+
+    def __delitem__(self, index):
+        list.__delitem__(self._stored(), index)
+
+    def __iadd__(self, loans):
+        self.extend(loans)
+        return self
+
+
+def _flag_property(flag):
+    """Make a read/write property for one training flag."""
+    def getter(self):
+        return bool(self._store._flags[self._row] & flag)
+
+    def setter(self, value):
+        if value:
+            self._store._flags[self._row] |= flag
+        else:
+            self._store._flags[self._row] &= ~flag & 0xFF
+
+    return property(getter, setter)
+
+
+def _column_property(column):
+    """Make a read/write property for one numeric column."""
+    def getter(self):
+        return getattr(self._store, column)[self._row]
+
+    def setter(self, value):
+        getattr(self._store, column)[self._row] = value
+
+    return property(getter, setter)
+
+
+class PatronView:
+    """
+    A patron backed by one row of a ColumnarPatronStore.
+
+    Exposes the same attributes and methods as Patron, reading and writing
+    the store's arrays, so BusinessLogic and search work on it unchanged.
+    """
+    __slots__ = ("_store", "_row")
+    # pylint: disable=missing-function-docstring
+    # The properties stand in for the Patron attributes of the same names
+
+    def __init__(self, store, row):
+        """
+        Initialize a view.
+
+        Args:
+            store: ColumnarPatronStore holding the patron
+            row: Row of the patron in the store
+        """
+        self._store = store
+        self._row = row
+
+    @property
+    def _id(self):
+        return self._store._ids[self._row]
+
+    @property
+    def _name(self):
+        return self._store.name(self._row)
+
+    @property
+    def _loans(self):
+        return self._store.loans(self._row)
+
+    @_loans.setter
+    def _loans(self, loans):
+        self._store.set_loans(self._row, loans)
+
+    _age = _column_property("_ages")
+    _outstanding_fees = _column_property("_fees")
+    _version = _column_property("_versions")
+    _gardening_tool_training = _flag_property(GARDENING)
+    _carpentry_tool_training = _flag_property(CARPENTRY)
+    _makerspace_training = _flag_property(MAKERSPACE)
+
+    get_type = Patron.get_type
+    add_loan = Patron.add_loan
+    return_item = Patron.return_item
+    has_item = Patron.has_item
+    calculate_overdue_fees = Patron.calculate_overdue_fees
+    add_fee = Patron.add_fee
+    pay_fee = Patron.pay_fee
+    __str__ = Patron.__str__
+    to_full_string = Patron.to_full_string
+
+    def __eq__(self, other):
+        return (isinstance(other, PatronView) and other._store is self._store and
+                other._row == self._row)
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+
+class ColumnarDataManager(DataManager):
+    """
+    DataManager that keeps patrons in a ColumnarPatronStore.
+
+    The catalogue is still stored as BorrowableItem objects; patrons are
+    returned as PatronView objects.
+    """
+
+    def __init__(self):
+        """Initialize the DataManager with an empty columnar store."""
+        super().__init__()
+        # Patrons live only in the store; an empty inherited dictionary would
+        # let code reading it directly see no patrons instead of failing
+        del self._patron_data
+        self._patron_store = ColumnarPatronStore(self.get_item)
+
+    def get_patron_store(self):
+        """
+        Get the columnar store for array scans.
+
+        Returns:
+            ColumnarPatronStore
+        """
+        return self._patron_store
+
+    def add_patron(self, patron):
+        """
+        Add a patron to the data manager.
+
+        Args:
+            patron: Patron object to add
+        """
+        self._patron_store.add(patron)
+
+    def get_patron(self, patron_id):
+        """
+        Retrieve a patron by ID.
+
+        Args:
+            patron_id: ID of the patron to retrieve
+
+        Returns:
+            PatronView or None if not found
+        """
+        row = self._patron_store.row_of(patron_id)
+        return None if row is None else self._patron_store.view(row)
+
+    def get_all_patrons(self):
+        """
+        Get all patrons.
+
+        Returns:
+            List of PatronView objects
+        """
+        return [self._patron_store.view(row) for row in range(len(self._patron_store))]
+
+    def iter_patrons(self):
+        """
+        Iterate over all patrons, creating one view at a time.
+
+        Yields:
+            PatronView objects
+        """
+        store = self._patron_store
+        for row in range(len(store)):
+            yield store.view(row)
+
+    def save_data(self, catalogue_file=config.CATALOGUE_FILE,
+                  patron_file=config.PATRON_FILE):
+        """
+        Save the catalogue and patrons, writing patrons straight from the arrays.
+
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+        """
+        write_records(catalogue_file, map(item_to_record, self.get_all_items()))
+        write_records(patron_file, self._patron_store.records())
@@ -0,0 +1,253 @@
+"""
+Concurrency support for serving several circulation desks from one process.
+"""
+import threading
+from contextlib import contextmanager
+
+from src.business_logic import BusinessLogic
+
+# Result message when a change could not be committed to a shared store
+CONFLICT_MESSAGE = "Another desk changed this record at the same time; please try again"
+
+
+class LockManager:
+    """
+    Hands out one lock per patron and one lock per item.
+
+    Locks are always acquired patrons first, then items, each in ascending
+    ID order. Every transaction follows the same order, so two desks can
+    never wait on each other in a cycle.
+    """
+
+    def __init__(self):
+        """Initialize the LockManager with no locks allocated."""
+        self._registry_lock = threading.Lock()
+        self._patron_locks = {}
+        self._item_locks = {}
+
+    def _lock_for(self, table, key):
+        """
+        Get the lock for a key, creating it on first use.
+
+        Args:
+            table: Dictionary of locks to look in
+            key: ID the lock protects
+
+        Returns:
+            threading.Lock for the key
+        """
+        lock = table.get(key)
+        if lock is None:
+            with self._registry_lock:
+                lock = table.setdefault(key, threading.Lock())
+        return lock
+
+    def patron_lock(self, patron_id):
+        """
+        Get the lock protecting a patron.
+
+        Args:
+            patron_id: ID of the patron
+
+        Returns:
+            threading.Lock for the patron
+        """
+        return self._lock_for(self._patron_locks, patron_id)
+
+    def item_lock(self, item_id):
+        """
+        Get the lock protecting a catalogue item.
+
+        Args:
+            item_id: ID of the item
+
+        Returns:
+            threading.Lock for the item
+        """
+        return self._lock_for(self._item_locks, item_id)
+
+    @contextmanager
+    def hold(self, patron_ids=(), item_ids=()):
+        """
+        Hold the locks for a set of patrons and items.
+
+        Args:
+            patron_ids: IDs of the patrons touched by the transaction
+            item_ids: IDs of the items touched by the transaction
+
+        Yields:
+            None, while all of the requested locks are held
+        """
+        locks = [self.patron_lock(patron_id) for patron_id in sorted(set(patron_ids))]
+        locks += [self.item_lock(item_id) for item_id in sorted(set(item_ids))]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+class Circulation:
+    """
+    Runs loan, return and payment transactions atomically.
+
+    Each transaction only locks the patron and item it touches, so desks
+    working with different patrons and items never block each other.
+    """
+
+    def __init__(self, data_manager, business_logic=BusinessLogic, holds=None,
+                 access_index=None):
+        """
+        Initialize the Circulation service.
+
+        Args:
+            data_manager: DataManager holding patrons and catalogue
+            business_logic: BusinessLogic used to apply the rules
+            holds: HoldQueues for items with no copies available (optional)
+            access_index: MakerspaceAccessIndex to keep up to date with fees (optional)
+        """
+        self.data_manager = data_manager
+        self.business_logic = business_logic
+        self.holds = holds
+        self.access_index = access_index
+        self._locks = data_manager.get_lock_manager()
+
+    def loan(self, patron_id, item_id):
+        """
+        Loan an item to a patron.
+
+        Args:
+            patron_id: ID of the patron borrowing the item
+            item_id: ID of the item being borrowed
+
+        Returns:
+            tuple: (bool, str) - (success, message)
+        """
+        patron = self.data_manager.get_patron(patron_id)
+        if patron is None:
+            return False, f"Patron with ID {patron_id} not found"
+        item = self.data_manager.get_item(item_id)
+        if item is None:
+            return False, f"Item with ID {item_id} not found"
+
+        with self._locks.hold((patron_id,), (item_id,)):
+            return self.data_manager.transact(
+                lambda: self.business_logic.process_loan(patron, item),
+                (patron_id,), (item_id,), on_conflict=(False, CONFLICT_MESSAGE))
+
+    def return_item(self, patron_id, item_id):
+        """
+        Return an item on loan to a patron.
+
+        Args:
+            patron_id: ID of the patron returning the item
+            item_id: ID of the item being returned
+
+        Returns:
+            tuple: (bool, str, float) - (success, message, fees)
+        """
+        patron = self.data_manager.get_patron(patron_id)
+        if patron is None:
+            return False, f"Patron with ID {patron_id} not found", 0.0
+
+        with self._locks.hold((patron_id,), (item_id,)):
+            result = self.data_manager.transact(
+                lambda: self.business_logic.process_return(patron, item_id),
+                (patron_id,), (item_id,), on_conflict=(False, CONFLICT_MESSAGE, 0.0))
+            if result[2] and self.access_index is not None:
+                self.access_index.update(patron)
+
+        if result[0] and self.holds is not None:
+            holder = self._allocate(self.data_manager.get_item(item_id))
+            if holder is not None:
+                result = (result[0], f"{result[1]} Allocated to waiting patron {holder._id}.",
+                          result[2])
+        return result
+
+    def place_hold(self, patron_id, item_id):
+        """
+        Join the hold queue for an item.
+
+        Args:
+            patron_id: ID of the patron placing the hold
+            item_id: ID of the item to hold
+
+        Returns:
+            tuple: (bool, str) - (success, message)
+        """
+        patron = self.data_manager.get_patron(patron_id)
+        if patron is None:
+            return False, f"Patron with ID {patron_id} not found"
+        item = self.data_manager.get_item(item_id)
+        if item is None:
+            return False, f"Item with ID {item_id} not found"
+        if self.holds is None:
+            return False, "Holds are not enabled"
+
+        with self._locks.hold((patron_id,), (item_id,)):
+            if item.is_available():
+                return False, "Copies are available to borrow"
+            return self.holds.place_hold(patron, item)
+
+    def _allocate(self, item):
+        """
+        Hand a returned copy to the next eligible holder.
+
+        The returning patron's lock is released first, and each candidate
+        holder is locked before the item, keeping the global lock order.
+
+        Args:
+            item: BorrowableItem that was just returned
+
+        Returns:
+            The Patron the item was loaned to, or None
+        """
+        while True:
+            holder_id = self.holds.peek(item._id)
+            if holder_id is None:
+                return None
+            with self._locks.hold((holder_id,), (item._id,)):
+                available, holder = self.data_manager.transact(
+                    lambda holder_id=holder_id: self._allocate_to(item, holder_id),
+                    (holder_id,), (item._id,), on_conflict=(False, None))
+            if not available:
+                return None
+            if holder is not None:
+                return holder
+
+    def _allocate_to(self, item, holder_id):
+        """
+        Loan a returned copy to one holder if it is still available.
+
+        Returns:
+            tuple: (whether a copy was available, the Patron it was loaned to or None)
+        """
+        if not item.is_available():
+            return False, None
+        return True, self.holds.allocate_to(item, holder_id)
+
+    def pay_fee(self, patron_id, amount):
+        """
+        Pay off some or all of a patron's outstanding fees.
+
+        Args:
+            patron_id: ID of the patron paying
+            amount: Amount to pay
+
+        Returns:
+            tuple: (bool, str, float) - (success, message, remaining balance)
+        """
+        patron = self.data_manager.get_patron(patron_id)
+        if patron is None:
+            return False, f"Patron with ID {patron_id} not found", 0.0
+        with self._locks.hold((patron_id,)):
+            result = self.data_manager.transact(
+                lambda: self.business_logic.process_payment(patron, amount),
+                (patron_id,), on_conflict=(False, CONFLICT_MESSAGE, patron._outstanding_fees))
+            if result[0] and self.access_index is not None:
+                self.access_index.update(patron)
+        return result
@@ -4,6 +4,8 @@ Configuration settings for the BAT system.
 
 CATALOGUE_FILE = "data/catalogue.json"
 PATRON_FILE = "data/patrons.json"
+POLICY_FILE = "data/policy.json"
+UTILISATION_FILE = "data/utilisation.bin"
 
 MAX_LOANS = 4
 OVERDUE_FEE_PER_DAY = 1.0
@@ -1,17 +1,29 @@
 """
 Data management module for patron data.
 """
+import json
+import os
 from datetime import datetime, timedelta
+from functools import lru_cache
+from src import clock
+from src import config
+from src import integrity
 from src.borrowable_item import BorrowableItem
+from src.concurrency import LockManager
 from src.loan import Loan
+from src.policy import get_policy
 
 
 class Patron:
     """
     Represents a library patron.
     """
+    __slots__ = (
+        "_id", "_name", "_age", "_outstanding_fees", "_gardening_tool_training",
+        "_carpentry_tool_training", "_makerspace_training", "_loans", "_version",
+    )
     # pylint: disable=too-many-instance-attributes
-    # Eight attributes are necessary for patron management
+    # Nine attributes are necessary for patron management
 
     def __init__(self, patron_id, name, age, outstanding_fees=0.0,
                  gardening_tool_training=False,
@@ -39,6 +51,7 @@ class Patron:
         self._carpentry_tool_training = carpentry_tool_training
         self._makerspace_training = makerspace_training
         self._loans = []
+        self._version = 0
 
     def get_type(self):
         """
@@ -61,7 +74,7 @@ class Patron:
             item: The BorrowableItem being loaned
             due_days: Number of days until due (default 14)
         """
-        due_date = datetime.now().date() + timedelta(days=due_days)
+        due_date = clock.today() + timedelta(days=due_days)
         loan = Loan(item, due_date)
         self._loans.append(loan)
         item._on_loan += 1
@@ -106,12 +119,13 @@ class Patron:
             Total overdue fees as float
         """
         total_fees = 0.0
-        today = datetime.now().date()
+        today = clock.today()
+        fee_per_day = get_policy().overdue_fee_per_day()
 
         for loan in self._loans:
             if loan._due_date < today:
                 days_overdue = (today - loan._due_date).days
-                total_fees += days_overdue * 1.0
+                total_fees += days_overdue * fee_per_day
 
         return total_fees
 
@@ -153,14 +167,174 @@ class Patron:
         Returns:
             Detailed string with patron info and loans
         """
-        result = str(self) + "\n"
-        if self._loans:
-            result += "  Current loans:\n"
-            for loan in self._loans:
-                result += f"    - {loan}\n"
-        else:
-            result += "  No current loans\n"
-        return result
+        with clock.operation():
+            lines = [str(self)]
+            if self._loans:
+                lines.append("  Current loans:")
+                lines.extend(f"    - {loan}" for loan in self._loans)
+            else:
+                lines.append("  No current loans")
+        lines.append("")
+        return "\n".join(lines)
+
+
+DUE_DATE_FORMAT = "%d/%m/%Y"
+
+
+@lru_cache(maxsize=4096)
+def parse_due_date(text):
+    """
+    Parse a due date from a loan record.
+
+    Loans share a small set of due dates, so parsed dates are cached and
+    the same date object is reused by every loan due that day.
+
+    Args:
+        text: Date in DUE_DATE_FORMAT
+
+    Returns:
+        datetime.date
+    """
+    return datetime.strptime(text, DUE_DATE_FORMAT).date()
+
+
+def item_to_record(item):
+    """
+    Convert a catalogue item to its JSON record.
+
+    Args:
+        item: BorrowableItem to convert
+
+    Returns:
+        Dictionary in the catalogue.json schema
+    """
+    return {
+        "item_id": item._id,
+        "item_name": item._name,
+        "item_type": item._type,
+        "year": item._year,
+        "number_owned": item._num_copies,
+        "on_loan": item._on_loan,
+        "version": item._version,
+    }
+
+
+def patron_to_record(patron):
+    """
+    Convert a patron and their loans to a JSON record.
+
+    Args:
+        patron: Patron to convert
+
+    Returns:
+        Dictionary in the patrons.json schema
+    """
+    return {
+        "patron_id": patron._id,
+        "name": patron._name,
+        "age": patron._age,
+        "outstanding_fees": patron._outstanding_fees,
+        "gardening_tool_training": patron._gardening_tool_training,
+        "carpentry_tool_training": patron._carpentry_tool_training,
+        "makerspace_training": patron._makerspace_training,
+        "loans": [
+            {"item": loan._item._id, "due": loan._due_date.strftime(DUE_DATE_FORMAT)}
+            for loan in patron._loans
+        ],
+        "version": patron._version,
+    }
+
+
+def item_from_record(record):
+    """
+    Create a catalogue item from its JSON record.
+
+    Args:
+        record: Dictionary in the catalogue.json schema
+
+    Returns:
+        BorrowableItem
+    """
+    item = BorrowableItem(
+        record["item_id"],
+        record["item_name"],
+        record["item_type"],
+        record["number_owned"],
+        record["on_loan"],
+        year=record.get("year"),
+    )
+    item._version = record.get("version", 0)
+    return item
+
+
+def loans_from_records(loan_records, get_item):
+    """
+    Create loans from their JSON records.
+
+    Loans of items that cannot be found are skipped.
+
+    Args:
+        loan_records: List of {"item", "due"} dictionaries
+        get_item: Function returning the BorrowableItem for an item ID
+
+    Returns:
+        List of Loan objects
+    """
+    loans = []
+    for loan_record in loan_records:
+        item = get_item(loan_record["item"])
+        if item is None:
+            continue
+        loans.append(Loan(item, parse_due_date(loan_record["due"])))
+    return loans
+
+
+def patron_from_record(record, get_item):
+    """
+    Create a patron and their loans from a JSON record.
+
+    Args:
+        record: Dictionary in the patrons.json schema
+        get_item: Function returning the BorrowableItem for an item ID
+
+    Returns:
+        Patron
+    """
+    patron = Patron(
+        record["patron_id"],
+        record["name"],
+        record["age"],
+        record["outstanding_fees"],
+        record["gardening_tool_training"],
+        record["carpentry_tool_training"],
+        record["makerspace_training"],
+    )
+    patron._loans = loans_from_records(record["loans"], get_item)
+    patron._version = record.get("version", 0)
+    return patron
+
+
+def write_records(path, records):
+    """
+    Write JSON records to a file, one record per line.
+
+    The file is written next to the target and then moved into place, so
+    readers never see a half-written file.
+
+    Args:
+        path: File to write
+        records: Iterable of JSON-serialisable dictionaries
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.write("[")
+        separator = "\n"
+        for record in records:
+            file.write(separator)
+            file.write(json.dumps(record))
+            separator = ",\n"
+        file.write("\n]\n")
+    os.replace(temp_path, path)
 
 
 class DataManager:
@@ -172,6 +346,84 @@ class DataManager:
         """Initialize the DataManager with empty data structures."""
         self._patron_data = {}
         self._catalogue_data = {}
+        self._lock_manager = LockManager()
+        self._integrity_report = None
+
+    def get_lock_manager(self):
+        """
+        Get the per-patron and per-item locks for this data.
+
+        Returns:
+            LockManager shared by every desk using this DataManager
+        """
+        return self._lock_manager
+
+    def transact(self, operation, patron_ids=(), item_ids=(), on_conflict=None):
+        """
+        Apply a change to some patrons and items.
+
+        Data held only in memory applies it directly; StoredDataManager
+        also commits it to its shared store.
+
+        Args:
+            operation: Function with no arguments that makes the change
+            patron_ids: IDs of the patrons the operation may change
+            item_ids: IDs of the items the operation may change
+            on_conflict: Result if the change cannot be committed
+
+        Returns:
+            The operation's result
+        """
+        # pylint: disable=unused-argument
+        # The IDs and conflict result are only needed by a shared store
+        return operation()
+
+    def load_data(self, catalogue_file=config.CATALOGUE_FILE,
+                  patron_file=config.PATRON_FILE, rebuild_counts=False):
+        """
+        Load the catalogue and patrons from their JSON files.
+
+        The loans are checked against the catalogue before anything is
+        built; see get_integrity_report(). Loans of unknown items are
+        dropped, and the on_loan counts come from the catalogue file
+        unless rebuild_counts is set.
+
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+            rebuild_counts: Set each item's on_loan to its number of loans
+        """
+        with open(catalogue_file, encoding="utf-8") as file:
+            item_records = json.load(file)
+        with open(patron_file, encoding="utf-8") as file:
+            patron_records = json.load(file)
+        self._integrity_report = integrity.check(item_records, patron_records, rebuild_counts)
+
+        for record in item_records:
+            self.add_item(item_from_record(record))
+        for record in patron_records:
+            self.add_patron(patron_from_record(record, self.get_item))
+
+    def get_integrity_report(self):
+        """
+        Get what the last load_data() found wrong with the files.
+
+        Returns:
+            IntegrityReport, or None if nothing has been loaded
+        """
+        return self._integrity_report
+
+    def save_data(self, catalogue_file=config.CATALOGUE_FILE,
+                  patron_file=config.PATRON_FILE):
+        """
+        Save the catalogue and patrons to their JSON files.
+
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+        """
+        write_records(catalogue_file, map(item_to_record, self.get_all_items()))
+        write_records(patron_file, map(patron_to_record, self.get_all_patrons()))
 
     def add_patron(self, patron):
         """
@@ -224,6 +476,24 @@ class DataManager:
         """
         return list(self._patron_data.values())
 
+    def iter_patrons(self):
+        """
+        Iterate over all patrons without building a list.
+
+        Yields:
+            Patron objects
+        """
+        yield from self._patron_data.values()
+
+    def iter_items(self):
+        """
+        Iterate over all catalogue items without building a list.
+
+        Yields:
+            BorrowableItem objects
+        """
+        yield from self._catalogue_data.values()
+
     def get_all_items(self):
         """
         Get all catalogue items.
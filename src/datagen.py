@@ -0,0 +1,234 @@
+"""
+Synthetic patron and catalogue data at any scale.
+
+Writes patrons.json and catalogue.json in the same schema as data/, so
+load_data and every other tool can read them. Records are generated and
+written one at a time, so 10 million patrons need no more memory than the
+per-item loan counts.
+
+Usage:
+    python -m src.datagen --patrons 100000 --output-dir /tmp/bat-data
+"""
+import argparse
+import os
+import random
+from array import array
+from datetime import timedelta
+
+from src import clock
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DUE_DATE_FORMAT, Patron, write_records
+from src.loan import Loan
+from src.policy import get_policy
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Wei", "Priya", "Mohammed", "Aiko", "Olga",
+    "Mateo", "Fatima", "Liam", "Chloe", "Noah", "Zara", "Arjun", "Mei", "Lucas", "Ava",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas",
+    "Taylor", "Moore", "Jackson", "Martin", "Lee", "Nguyen", "Chen", "Patel", "Kim",
+    "Singh", "Khan", "Tanaka", "Ivanova", "Rossi", "Murphy", "O'Brien", "Kowalski",
+]
+TITLE_WORDS = [
+    "River", "Shadow", "Garden", "Silent", "Empire", "Winter", "Light", "Journey",
+    "Secret", "Ocean", "Iron", "Glass", "Forest", "Machine", "Stars", "History",
+    "Kingdom", "Harvest", "City", "Memory", "Storm", "Northern", "Paper", "Crown",
+]
+
+# Item type, share of the catalogue, copies owned (low, high)
+ITEM_TYPES = [
+    ("Fiction Book", 0.40, (1, 8)),
+    ("Non-Fiction Book", 0.25, (1, 5)),
+    ("Magazine", 0.10, (1, 4)),
+    ("DVD", 0.08, (1, 3)),
+    ("Reference Book", 0.05, (1, 2)),
+    ("Laptop", 0.04, (2, 20)),
+    ("Study Room", 0.02, (1, 3)),
+    ("Gardening Tool", 0.03, (1, 4)),
+    ("Carpentry Tool", 0.03, (1, 4)),
+]
+
+# Age band (low, high) and share of patrons
+AGE_BANDS = [((5, 17), 0.15), ((18, 64), 0.65), ((65, 95), 0.20)]
+
+
+def _item_types(num_items, rng):
+    """Choose every item's type index."""
+    weights = [share for _, share, _ in ITEM_TYPES]
+    return array('B', rng.choices(range(len(ITEM_TYPES)), weights=weights, k=num_items))
+
+
+def _copies(type_indexes, rng):
+    """Choose how many copies of every item are owned."""
+    return array('l', (rng.randint(*ITEM_TYPES[index][2]) for index in type_indexes))
+
+
+def _loan_count(age, rng):
+    """Draw how many loans a patron holds, most holding none or one."""
+    limit = get_policy().max_loans("Minor" if age < 18 else "Elderly" if age >= 65 else "Regular")
+    count = 0
+    while count < limit and rng.random() < 0.45:
+        count += 1
+    return count
+
+
+def generate_patrons(num_patrons, type_indexes, copies, on_loan, rng, overdue_share=0.15):
+    # pylint: disable=too-many-arguments,too-many-locals
+    # The catalogue arrays are shared with generate_items
+    """
+    Generate patron records with loans the business rules allow.
+
+    Every loan is checked with BusinessLogic.check_loan_allowed against
+    the patron as generated so far, so loan limits, one item per type,
+    age restrictions, training and unborrowable types are all respected.
+    Fees are drawn after the loans, as if run up since. At most half the
+    copies of any item are lent, so most items stay available to borrow,
+    and on_loan is updated for every loan handed out.
+
+    Args:
+        num_patrons: Number of patrons
+        type_indexes: Item type index of every item
+        copies: Copies owned of every item
+        on_loan: Copies on loan of every item, updated in place
+        rng: random.Random to draw from
+        overdue_share: Share of loans that are overdue
+
+    Yields:
+        Dictionaries in the patrons.json schema
+    """
+    today = clock.today()
+    policy = get_policy()
+    periods = [policy.loan_period(item_type) or 1 for item_type, _, _ in ITEM_TYPES]
+    bands = [band for band, _ in AGE_BANDS]
+    band_weights = [share for _, share in AGE_BANDS]
+    num_items = len(type_indexes)
+    due_text = {}
+
+    for patron_id in range(1, num_patrons + 1):
+        low, high = rng.choices(bands, weights=band_weights)[0]
+        age = rng.randint(low, high)
+        adult = age >= 18
+        patron = Patron(patron_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", age,
+                        gardening_tool_training=adult and rng.random() < 0.15,
+                        carpentry_tool_training=adult and rng.random() < 0.12,
+                        makerspace_training=adult and rng.random() < 0.25)
+        loans = []
+        for _ in range(_loan_count(age, rng) if num_items else 0):
+            index = rng.randrange(num_items)
+            if 2 * (on_loan[index] + 1) > copies[index]:
+                continue
+            type_index = type_indexes[index]
+            item = BorrowableItem(index + 1, "", ITEM_TYPES[type_index][0], copies[index],
+                                  on_loan[index])
+            if not BusinessLogic.check_loan_allowed(patron, item)[0]:
+                continue
+            on_loan[index] += 1
+            if rng.random() < overdue_share:
+                offset = -rng.randint(1, 60)
+            else:
+                offset = rng.randint(0, periods[type_index])
+            patron._loans.append(Loan(item, today + timedelta(days=offset)))
+            due = due_text.get(offset)
+            if due is None:
+                due = due_text[offset] = (today + timedelta(days=offset)).strftime(
+                    DUE_DATE_FORMAT)
+            loans.append({"item": index + 1, "due": due})
+        owes = rng.random() < 0.2
+        yield {
+            "patron_id": patron_id,
+            "name": patron._name,
+            "age": age,
+            "outstanding_fees": round(rng.uniform(0.5, 30.0), 2) if owes else 0.0,
+            "gardening_tool_training": patron._gardening_tool_training,
+            "carpentry_tool_training": patron._carpentry_tool_training,
+            "makerspace_training": patron._makerspace_training,
+            "loans": loans,
+        }
+
+
+def generate_items(type_indexes, copies, on_loan, rng):
+    """
+    Generate catalogue records.
+
+    Args:
+        type_indexes: Item type index of every item
+        copies: Copies owned of every item
+        on_loan: Copies on loan of every item
+        rng: random.Random to draw from
+
+    Yields:
+        Dictionaries in the catalogue.json schema
+    """
+    for index, type_index in enumerate(type_indexes):
+        item_type = ITEM_TYPES[type_index][0]
+        title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+        if "Book" in item_type:
+            name = f"The {title} by {rng.choice(LAST_NAMES)}"
+        else:
+            name = f"{title} {index + 1}"
+        yield {
+            "item_id": index + 1,
+            "item_name": name,
+            "item_type": item_type,
+            "year": rng.randint(1950, clock.today().year),
+            "number_owned": copies[index],
+            "on_loan": on_loan[index],
+        }
+
+
+def generate(output_dir, num_patrons, num_items=None, seed=0):
+    """
+    Write a patrons.json and catalogue.json pair.
+
+    Args:
+        output_dir: Directory to write the files to
+        num_patrons: Number of patrons
+        num_items: Number of catalogue items (default: one per five patrons)
+        seed: Seed; the same arguments on the same day give the same files
+
+    Returns:
+        tuple: (catalogue file path, patron file path)
+    """
+    if num_items is None:
+        num_items = max(1, num_patrons // 5)
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    catalogue_file = os.path.join(output_dir, "catalogue.json")
+    patron_file = os.path.join(output_dir, "patrons.json")
+
+    type_indexes = _item_types(num_items, rng)
+    copies = _copies(type_indexes, rng)
+    on_loan = array('l', [0]) * num_items
+    write_records(patron_file,
+                  generate_patrons(num_patrons, type_indexes, copies, on_loan, rng))
+    write_records(catalogue_file, generate_items(type_indexes, copies, on_loan, rng))
+    return catalogue_file, patron_file
+
+
+def main(argv=None):
+    """
+    Write a synthetic dataset.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic BAT data")
+    parser.add_argument("--patrons", type=int, default=10000)
+    parser.add_argument("--items", type=int, help="default: one per five patrons")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="data/generated")
+    args = parser.parse_args(argv)
+
+    catalogue_file, patron_file = generate(args.output_dir, args.patrons, args.items,
+                                           args.seed)
+    print(f"Wrote {args.patrons} patrons to {patron_file} and the catalogue to "
+          f"{catalogue_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Duplicate patron detection with blocking and similarity scoring.
+
+Comparing every pair of patrons is quadratic, so patrons are first put
+into blocks by age and the Soundex code of the first word of the name,
+and again by age and the Soundex code of the last word, so a misspelling
+in one name still leaves the pair sharing a block. Names are only compared
+within a block: patrons with the same name match outright, and each
+distinct name is scored only against its nearest neighbours in name
+order (a sorted-neighbourhood window), so even a block of common names
+costs linear rather than quadratic time and the whole job scales with
+the number of patrons.
+
+Blocks are scored in a process pool. Pairs scoring at or above the
+threshold are joined with union-find into candidate clusters, for a
+person to review; nothing is merged automatically.
+
+Usage:
+    python -m src.dedup [--threshold 0.85] [--window 10] [--workers N] [-o clusters.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from itertools import groupby, pairwise
+from operator import itemgetter
+
+from src import config
+from src.data_mgmt import DataManager
+from src.matching import name_tokens, soundex
+
+THRESHOLD = 0.85
+WINDOW = 10
+# Chunks of blocks per worker, so a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+# patron_ids: sorted IDs; score: lowest score among the pairs that joined them
+Cluster = namedtuple("Cluster", ["patron_ids", "score"])
+DedupReport = namedtuple("DedupReport", ["patrons", "blocks", "comparisons", "pairs",
+                                         "clusters", "seconds"])
+
+
+def make_blocks(patrons):
+    """
+    Group patrons into blocks by age and phonetic name keys.
+
+    Args:
+        patrons: Iterable of patrons
+
+    Returns:
+        List of blocks with at least two patrons, each a tuple of
+        (patron ID, name with its words sorted) pairs sorted by name
+    """
+    blocks = {}
+    for patron in patrons:
+        tokens = name_tokens(patron._name)
+        if not tokens:
+            continue
+        entry = (patron._id, " ".join(sorted(tokens)))
+        # Either end of the name may be the surname ("Doe, John" or "John Doe")
+        for code in {soundex(tokens[0]), soundex(tokens[-1])}:
+            blocks.setdefault((patron._age, code), []).append(entry)
+    return [tuple(sorted(block, key=itemgetter(1)))
+            for block in blocks.values() if len(block) > 1]
+
+
+def score_blocks(blocks, threshold=THRESHOLD, window=WINDOW):
+    """
+    Score each distinct name against its next neighbours within its block.
+
+    Args:
+        blocks: Blocks from make_blocks
+        threshold: Lowest similarity (0 to 1) reported as a pair
+        window: Distinct neighbouring names each name is compared with
+
+    Returns:
+        tuple: (list of (patron ID, patron ID, score) pairs, names compared)
+    """
+    pairs = []
+    comparisons = 0
+    matcher = SequenceMatcher(autojunk=False)
+    for block in blocks:
+        # Patrons with the same name match outright; only the distinct
+        # names are scored, each standing for its group
+        names = []
+        for name, group in groupby(block, key=itemgetter(1)):
+            patron_ids = [patron_id for patron_id, _ in group]
+            pairs.extend((first, second, 1.0) for first, second in pairwise(patron_ids))
+            names.append((patron_ids[0], name))
+        for position, (patron_id, name) in enumerate(names):
+            # SequenceMatcher caches what it learns about its second sequence
+            matcher.set_seq2(name)
+            for other_id, other_name in names[position + 1:position + 1 + window]:
+                comparisons += 1
+                matcher.set_seq1(other_name)
+                if (matcher.real_quick_ratio() >= threshold
+                        and matcher.quick_ratio() >= threshold):
+                    score = matcher.ratio()
+                    if score >= threshold:
+                        pairs.append((patron_id, other_id, score))
+    return pairs, comparisons
+
+
+def _chunks(blocks, count):
+    """Split blocks into count runs of roughly equal total size."""
+    total = sum(map(len, blocks))
+    chunks = [[] for _ in range(max(1, count))]
+    filled = 0
+    for block in blocks:
+        chunks[min(len(chunks) - 1, filled * len(chunks) // max(1, total))].append(block)
+        filled += len(block)
+    return [chunk for chunk in chunks if chunk]
+
+
+def cluster_pairs(pairs):
+    """
+    Join scored pairs into clusters with union-find.
+
+    Args:
+        pairs: List of (patron ID, patron ID, score)
+
+    Returns:
+        List of Cluster, ordered by lowest patron ID
+    """
+    parent = {}
+
+    def find(patron_id):
+        root = patron_id
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[patron_id] != root:
+            parent[patron_id], patron_id = root, parent[patron_id]
+        return root
+
+    for first, second, _ in pairs:
+        first_root, second_root = find(first), find(second)
+        if first_root != second_root:
+            parent[max(first_root, second_root)] = min(first_root, second_root)
+
+    members = {}
+    scores = {}
+    for patron_id in parent:
+        members.setdefault(find(patron_id), []).append(patron_id)
+    for first, _, score in pairs:
+        root = find(first)
+        scores[root] = min(score, scores.get(root, 1.0))
+    return [Cluster(tuple(sorted(members[root])), round(scores[root], 3))
+            for root in sorted(members)]
+
+
+def find_duplicates(data_manager, threshold=THRESHOLD, window=WINDOW, workers=None):
+    """
+    Find candidate clusters of duplicate patrons.
+
+    Args:
+        data_manager: DataManager holding the patrons
+        threshold: Lowest name similarity (0 to 1) taken as a match
+        window: Distinct neighbouring names each name is compared with
+        workers: Worker processes (default: one per CPU); 1 scores the
+            blocks in this process
+
+    Returns:
+        DedupReport
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    patrons = data_manager.get_all_patrons()
+    blocks = make_blocks(patrons)
+    if workers == 1:
+        pairs, comparisons = score_blocks(blocks, threshold, window)
+    else:
+        chunks = _chunks(blocks, workers * CHUNKS_PER_WORKER)
+        pairs, comparisons = [], 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_pairs, chunk_comparisons in pool.map(
+                    score_blocks, chunks, [threshold] * len(chunks), [window] * len(chunks)):
+                pairs.extend(chunk_pairs)
+                comparisons += chunk_comparisons
+    clusters = cluster_pairs(pairs)
+    return DedupReport(len(patrons), len(blocks), comparisons, len(pairs), clusters,
+                       time.perf_counter() - start)
+
+
+def main(argv=None):
+    """
+    Report candidate duplicate patrons from the command line.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Find likely duplicate patron registrations")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"lowest name similarity taken as a match (default: {THRESHOLD})")
+    parser.add_argument("--window", type=int, default=WINDOW,
+                        help=f"neighbouring names each is compared with (default: {WINDOW})")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("-o", "--output", help="write the clusters to this JSON file")
+    args = parser.parse_args(argv)
+
+    data_manager = DataManager()
+    data_manager.load_data(args.catalogue, args.patrons)
+    report = find_duplicates(data_manager, args.threshold, args.window, args.workers)
+    print(f"{report.patrons} patrons in {report.blocks} blocks, {report.comparisons} "
+          f"comparisons in {report.seconds:.2f} s: {len(report.clusters)} candidate clusters")
+    for cluster in report.clusters[:10]:
+        names = ", ".join(data_manager.get_patron(patron_id)._name
+                          for patron_id in cluster.patron_ids)
+        print(f"  {cluster.score:.3f}  {list(cluster.patron_ids)}  {names}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump([{"patron_ids": list(cluster.patron_ids), "score": cluster.score,
+                        "names": [data_manager.get_patron(patron_id)._name
+                                  for patron_id in cluster.patron_ids]}
+                       for cluster in report.clusters], file, indent=1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Circulation events.
+
+BusinessLogic publishes an event for every completed loan, return and fee
+payment. Subscribers such as analytics are called synchronously, in the
+thread that made the change, while the patron and item are still locked.
+A change that may be retried or abandoned, such as a commit to a shared
+store, holds its events back until it succeeds (see EventBus.hold).
+"""
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+LoanEvent = namedtuple("LoanEvent", ["patron", "item", "due_date"])
+ReturnEvent = namedtuple("ReturnEvent", ["patron", "item", "fee", "due_date"])
+PaymentEvent = namedtuple("PaymentEvent", ["patron", "amount", "remaining"])
+
+EVENT_TYPES = (LoanEvent, ReturnEvent, PaymentEvent)
+
+
+class EventBus:
+    """
+    Delivers events to the handlers subscribed to their type.
+    """
+
+    def __init__(self):
+        """Initialize a bus with no subscribers."""
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._held = threading.local()
+
+    def subscribe(self, event_type, handler):
+        """
+        Call a handler for every event of a type.
+
+        Args:
+            event_type: One of EVENT_TYPES
+            handler: Function taking the event
+        """
+        with self._lock:
+            # Handler tuples are replaced, never changed, so publish needs no lock
+            self._handlers[event_type] = self._handlers.get(event_type, ()) + (handler,)
+
+    def unsubscribe(self, event_type, handler):
+        """
+        Stop calling a handler.
+
+        Args:
+            event_type: Event type the handler was subscribed to
+            handler: Function passed to subscribe
+        """
+        with self._lock:
+            handlers = list(self._handlers.get(event_type, ()))
+            if handler in handlers:
+                handlers.remove(handler)
+            self._handlers[event_type] = tuple(handlers)
+
+    def has_subscribers(self, event_type):
+        """
+        Check whether anything listens for an event type.
+
+        Publishers use this to skip building events nobody receives.
+
+        Args:
+            event_type: One of EVENT_TYPES
+
+        Returns:
+            True if at least one handler is subscribed
+        """
+        return bool(self._handlers.get(event_type))
+
+    @contextmanager
+    def hold(self):
+        """
+        Hold back the events this thread publishes until the block completes.
+
+        The events are delivered when the block exits normally and dropped
+        if it raises, so an attempt that is retried or abandoned announces
+        nothing.
+
+        Yields:
+            None, while events are held
+        """
+        outer = getattr(self._held, "events", None)
+        self._held.events = events = []
+        try:
+            yield
+        finally:
+            self._held.events = outer
+        for event in events:
+            self.publish(event)
+
+    def publish(self, event):
+        """
+        Deliver an event to its subscribers.
+
+        Args:
+            event: LoanEvent, ReturnEvent or PaymentEvent
+        """
+        held = getattr(self._held, "events", None)
+        if held is not None:
+            held.append(event)
+            return
+        for handler in self._handlers.get(type(event), ()):
+            handler(event)
+
+
+_event_bus = EventBus()
+
+
+def get_event_bus():
+    """
+    Get the bus BusinessLogic publishes to.
+
+    Returns:
+        EventBus
+    """
+    return _event_bus
+
+
+def set_event_bus(event_bus):
+    """
+    Replace the bus BusinessLogic publishes to.
+
+    Args:
+        event_bus: EventBus, or None for a new empty bus
+
+    Returns:
+        The EventBus that was in use before
+    """
+    global _event_bus  # pylint: disable=global-statement
+    previous = _event_bus
+    _event_bus = event_bus if event_bus is not None else EventBus()
+    return previous
@@ -0,0 +1,391 @@
+"""
+Bounded-memory heavy hitters over the circulation event stream.
+
+SpaceSaving keeps the most frequent keys in a fixed number of counters;
+every count it reports is at most total / capacity too high. A
+CountMinSketch estimates the count of any key in fixed memory, never too
+low and at most epsilon * total too high with probability 1 - delta.
+CirculationTrends combines them to answer "most borrowed items this
+month" and "patrons with unusually many loans" from LoanEvents.
+"""
+import heapq
+import math
+import random
+import threading
+from array import array
+
+from src import clock
+from src.events import LoanEvent, get_event_bus
+
+
+class SpaceSaving:
+    """
+    The SpaceSaving top-k counter.
+
+    Each monitored key has a count and an error: the key occurred at least
+    count - error and at most count times.
+    """
+
+    def __init__(self, capacity):
+        """
+        Initialize the counter.
+
+        Args:
+            capacity: Number of keys monitored; counts are at most
+                total / capacity too high
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self._capacity = capacity
+        self._counts = {}
+        self._errors = {}
+        # Lazy min-heap of (count, key); entries whose count is stale are skipped
+        self._heap = []
+        self._total = 0
+
+    def __len__(self):
+        """Number of keys monitored."""
+        return len(self._counts)
+
+    @property
+    def total(self):
+        """Total of every count added."""
+        return self._total
+
+    @property
+    def capacity(self):
+        """Maximum number of keys monitored."""
+        return self._capacity
+
+    def add(self, key, count=1):
+        """
+        Count occurrences of a key.
+
+        Args:
+            key: Hashable key
+            count: Number of occurrences
+        """
+        self._total += count
+        counts = self._counts
+        current = counts.get(key)
+        if current is not None:
+            counts[key] = current + count
+        elif len(counts) < self._capacity:
+            counts[key] = count
+            self._errors[key] = 0
+        else:
+            # Replace the key with the smallest count; its count becomes the
+            # newcomer's error
+            smallest, evicted = self._pop_smallest()
+            del counts[evicted]
+            del self._errors[evicted]
+            counts[key] = smallest + count
+            self._errors[key] = smallest
+        heapq.heappush(self._heap, (counts[key], key))
+        if len(self._heap) > 4 * self._capacity:
+            self._heap = [(value, item) for item, value in counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        """Remove the heap entry for the key with the smallest current count."""
+        heap = self._heap
+        counts = self._counts
+        while True:
+            count, key = heapq.heappop(heap)
+            if counts.get(key) == count:
+                return count, key
+
+    def estimate(self, key):
+        """
+        Get the upper bound on a key's count.
+
+        Args:
+            key: Hashable key
+
+        Returns:
+            int: Count if monitored, otherwise the largest count an
+            unmonitored key could have
+        """
+        count = self._counts.get(key)
+        if count is not None:
+            return count
+        if len(self._counts) < self._capacity:
+            return 0
+        return min(self._counts.values())
+
+    def guaranteed(self, key):
+        """
+        Get the lower bound on a key's count.
+
+        Args:
+            key: Hashable key
+
+        Returns:
+            int: Occurrences the key certainly had
+        """
+        count = self._counts.get(key)
+        if count is None:
+            return 0
+        return count - self._errors[key]
+
+    def error_bound(self):
+        """
+        Get the most any reported count can be too high.
+
+        Returns:
+            float: total / capacity
+        """
+        return self._total / self._capacity
+
+    def top(self, count=10):
+        """
+        Get the keys with the highest counts.
+
+        Args:
+            count: Number of keys to return
+
+        Returns:
+            List of (key, count, error), highest count first
+        """
+        errors = self._errors
+        return [(key, value, errors[key]) for key, value in
+                heapq.nlargest(count, self._counts.items(), key=lambda entry: entry[1])]
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of key frequencies in fixed memory.
+    """
+
+    def __init__(self, width, depth, seed=0):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            width: Counters per row
+            depth: Number of rows, each with its own hash
+            seed: Seed for the row hashes
+        """
+        if width < 1 or depth < 1:
+            raise ValueError("Width and depth must be at least 1")
+        self._width = width
+        self._depth = depth
+        self._salt = random.Random(seed).getrandbits(61)
+        self._rows = [array('q', bytes(8 * width)) for _ in range(depth)]
+        self._total = 0
+
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        """
+        Build a sketch with a given error bound.
+
+        Args:
+            epsilon: Estimates are at most epsilon * total too high...
+            delta: ...except with probability delta
+            seed: Seed for the row hashes
+
+        Returns:
+            CountMinSketch
+        """
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    @property
+    def total(self):
+        """Total of every count added."""
+        return self._total
+
+    def _columns(self, key):
+        """
+        Get the counter index of a key in every row.
+
+        Row i uses h1 + i * h2 from two independent hashes of the key
+        (Kirsch and Mitzenmacher), which keeps the count-min guarantees
+        while hashing the key only twice.
+        """
+        first = hash(key)
+        second = hash((self._salt, key)) | 1
+        width = self._width
+        return [(first + row * second) % width for row in range(self._depth)]
+
+    def add(self, key, count=1):
+        """
+        Count occurrences of a key.
+
+        Args:
+            key: Hashable key
+            count: Number of occurrences
+        """
+        self._total += count
+        for row, column in zip(self._rows, self._columns(key)):
+            row[column] += count
+
+    def estimate(self, key):
+        """
+        Estimate a key's count.
+
+        Args:
+            key: Hashable key
+
+        Returns:
+            int: Never lower than the true count
+        """
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+    def error_bound(self):
+        """
+        Get the most an estimate is too high, with probability 1 - delta.
+
+        Returns:
+            float: e * total / width
+        """
+        return math.e * self._total / self._width
+
+
+class CirculationTrends:
+    """
+    Most borrowed items and heaviest borrowers for the current month.
+
+    The structures are rebuilt at the start of each month, and last month's
+    results are kept for comparison.
+    """
+
+    def __init__(self, item_capacity=1000, patron_capacity=1000, epsilon=0.0005,
+                 delta=0.001):
+        """
+        Initialize the trends.
+
+        Args:
+            item_capacity: Items monitored for the top-N list
+            patron_capacity: Patrons monitored as heavy-borrower candidates
+            epsilon: Count-min error as a share of the month's loans
+            delta: Probability of exceeding the count-min error
+        """
+        self._item_capacity = item_capacity
+        self._patron_capacity = patron_capacity
+        self._epsilon = epsilon
+        self._delta = delta
+        self._lock = threading.Lock()
+        self._event_bus = None
+        self._month = None
+        self._previous = None
+        self._items = self._patrons = self._patron_sketch = None
+        self._start_month(None)
+
+    def _start_month(self, month):
+        """Start counting a new month."""
+        self._month = month
+        self._items = SpaceSaving(self._item_capacity)
+        self._patrons = SpaceSaving(self._patron_capacity)
+        self._patron_sketch = CountMinSketch.from_error(self._epsilon, self._delta)
+
+    def attach(self, event_bus=None):
+        """
+        Start receiving loan events.
+
+        Args:
+            event_bus: EventBus to subscribe to (default: the BusinessLogic bus)
+        """
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+        self._event_bus.subscribe(LoanEvent, self.on_loan)
+
+    def detach(self):
+        """Stop receiving loan events."""
+        if self._event_bus is not None:
+            self._event_bus.unsubscribe(LoanEvent, self.on_loan)
+            self._event_bus = None
+
+    def on_loan(self, event):
+        """
+        Count a loan in the current month.
+
+        Args:
+            event: LoanEvent
+        """
+        today = clock.today()
+        month = (today.year, today.month)
+        with self._lock:
+            if month != self._month:
+                if self._month is not None:
+                    self._previous = (self._month, self._items.top(self._item_capacity))
+                self._start_month(month)
+            self._items.add(event.item._id)
+            patron_id = event.patron._id
+            self._patrons.add(patron_id)
+            self._patron_sketch.add(patron_id)
+
+    def month(self):
+        """
+        Get the month being counted.
+
+        Returns:
+            tuple: (year, month), or None before the first loan
+        """
+        return self._month
+
+    def loans_this_month(self):
+        """Number of loans counted this month."""
+        with self._lock:
+            return self._items.total
+
+    def top_items(self, count=100):
+        """
+        Get this month's most borrowed items.
+
+        Args:
+            count: Number of items to return
+
+        Returns:
+            List of (item ID, loans, error), most borrowed first
+        """
+        with self._lock:
+            return self._items.top(count)
+
+    def previous_month(self):
+        """
+        Get last month's most borrowed items.
+
+        Returns:
+            tuple: ((year, month), list of (item ID, loans, error)), or None
+        """
+        return self._previous
+
+    def patron_loans(self, patron_id):
+        """
+        Estimate a patron's loans this month.
+
+        Args:
+            patron_id: ID of the patron
+
+        Returns:
+            int: Upper bound from the tighter of the two structures
+        """
+        with self._lock:
+            return self._patron_loans(patron_id)
+
+    def _patron_loans(self, patron_id):
+        """Estimate a patron's loans; the caller holds the lock."""
+        return min(self._patrons.estimate(patron_id), self._patron_sketch.estimate(patron_id))
+
+    def heavy_borrowers(self, min_loans=None, factor=10.0):
+        """
+        Find patrons with unusually many loans this month.
+
+        Args:
+            min_loans: Loans that count as heavy (default: factor times the
+                average loans per monitored patron)
+            factor: Multiple of the average used when min_loans is not given
+
+        Returns:
+            List of (patron ID, estimated loans), heaviest first
+        """
+        heavy = []
+        with self._lock:
+            if min_loans is None:
+                monitored = max(1, len(self._patrons))
+                min_loans = factor * self._patrons.total / monitored
+            for patron_id, _, _ in self._patrons.top(self._patron_capacity):
+                loans = self._patron_loans(patron_id)
+                if loans >= min_loans:
+                    heavy.append((patron_id, loans))
+        heavy.sort(key=lambda entry: entry[1], reverse=True)
+        return heavy
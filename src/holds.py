@@ -0,0 +1,194 @@
+"""
+Hold (reservation) queues for items with no copies available.
+"""
+import threading
+from collections import deque
+from itertools import count
+
+from src.business_logic import BusinessLogic
+
+
+class HoldQueues:
+    """
+    Per-item FIFO hold queues with an index of each patron's holds.
+
+    Cancelling a hold only removes it from the index; the queue entry is
+    skipped when it reaches the front. Each hold carries a ticket so that a
+    cancelled and re-placed hold goes to the back of the queue rather than
+    reusing its old place. A queue is dropped once nobody is waiting, and
+    compacted once most of its entries are stale, so memory follows the
+    holds still active rather than every hold ever placed.
+    """
+
+    def __init__(self, get_patron, business_logic=BusinessLogic):
+        """
+        Initialize empty hold queues.
+
+        Args:
+            get_patron: Function returning the Patron for a patron ID
+            business_logic: BusinessLogic used to check and process loans
+        """
+        self._get_patron = get_patron
+        self._business_logic = business_logic
+        self._queues = {}
+        self._patron_holds = {}
+        self._active = {}
+        self._tickets = count()
+        self._lock = threading.Lock()
+
+    def place_hold(self, patron, item):
+        """
+        Join the queue for an item.
+
+        Args:
+            patron: Patron placing the hold
+            item: BorrowableItem to hold
+
+        Returns:
+            tuple: (bool, str) - (success, message)
+        """
+        if patron.has_item(item._id):
+            return False, "Item already on loan to this patron"
+        with self._lock:
+            holds = self._patron_holds.setdefault(patron._id, {})
+            if item._id in holds:
+                return False, "Hold already placed"
+            ticket = next(self._tickets)
+            holds[item._id] = ticket
+            self._queues.setdefault(item._id, deque()).append((patron._id, ticket))
+            self._active[item._id] = self._active.get(item._id, 0) + 1
+            position = self._active[item._id]
+        return True, f"Hold placed. Position in queue: {position}"
+
+    def cancel_hold(self, patron_id, item_id):
+        """
+        Leave the queue for an item.
+
+        Args:
+            patron_id: ID of the patron cancelling
+            item_id: ID of the held item
+
+        Returns:
+            True if a hold was cancelled, False otherwise
+        """
+        with self._lock:
+            holds = self._patron_holds.get(patron_id)
+            if not holds or item_id not in holds:
+                return False
+            self._remove(patron_id, item_id)
+            return True
+
+    def _remove(self, patron_id, item_id):
+        """Drop a hold from the index and prune its queue. Caller holds the lock."""
+        holds = self._patron_holds[patron_id]
+        del holds[item_id]
+        if not holds:
+            del self._patron_holds[patron_id]
+        active = self._active[item_id] - 1
+        queue = self._queues.get(item_id)
+        if not active:
+            del self._active[item_id]
+            self._queues.pop(item_id, None)
+            return
+        self._active[item_id] = active
+        if queue is not None and len(queue) > 2 * active:
+            self._queues[item_id] = deque(
+                (holder, ticket) for holder, ticket in queue
+                if self._patron_holds.get(holder, {}).get(item_id) == ticket)
+
+    def get_holds(self, patron_id):
+        """
+        Get the items a patron is waiting for.
+
+        Args:
+            patron_id: ID of the patron
+
+        Returns:
+            List of held item IDs, oldest first
+        """
+        holds = self._patron_holds.get(patron_id, {})
+        return sorted(holds, key=holds.get)
+
+    def queue_length(self, item_id):
+        """
+        Get the number of patrons waiting for an item.
+
+        Args:
+            item_id: ID of the item
+
+        Returns:
+            Number of active holds
+        """
+        return self._active.get(item_id, 0)
+
+    def peek(self, item_id):
+        """
+        Get the patron at the front of an item's queue.
+
+        Cancelled entries reaching the front are discarded.
+
+        Args:
+            item_id: ID of the item
+
+        Returns:
+            Patron ID, or None if nobody is waiting
+        """
+        with self._lock:
+            queue = self._queues.get(item_id)
+            while queue:
+                patron_id, ticket = queue[0]
+                if self._patron_holds.get(patron_id, {}).get(item_id) == ticket:
+                    return patron_id
+                queue.popleft()
+            if queue is not None:
+                del self._queues[item_id]
+            return None
+
+    def allocate_to(self, item, patron_id):
+        """
+        Loan an item to the patron at the front of its queue.
+
+        The hold is used up whether or not the loan goes ahead; a holder
+        who is no longer eligible (for example, has since run up fees)
+        loses their place.
+
+        Args:
+            item: Available BorrowableItem
+            patron_id: ID the caller saw at the front of the queue
+
+        Returns:
+            The Patron the item was loaned to, or None
+        """
+        with self._lock:
+            queue = self._queues.get(item._id)
+            if not queue or queue[0][0] != patron_id:
+                return None
+            ticket = queue.popleft()[1]
+            # The hold may have been cancelled since the caller peeked
+            if self._patron_holds.get(patron_id, {}).get(item._id) != ticket:
+                return None
+            self._remove(patron_id, item._id)
+        patron = self._get_patron(patron_id)
+        if patron is None:
+            return None
+        success, _ = self._business_logic.process_loan(patron, item)
+        return patron if success else None
+
+    def allocate(self, item):
+        """
+        Hand an available item to the next eligible patron waiting for it.
+
+        Args:
+            item: BorrowableItem that has just become available
+
+        Returns:
+            The Patron the item was loaned to, or None
+        """
+        while item.is_available():
+            patron_id = self.peek(item._id)
+            if patron_id is None:
+                return None
+            patron = self.allocate_to(item, patron_id)
+            if patron is not None:
+                return patron
+        return None
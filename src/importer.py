@@ -0,0 +1,227 @@
+"""
+Bulk import of another library's patrons.
+
+The incoming patrons file is streamed record by record and merged into
+the loaded data in one pass:
+
+- a record whose normalised name and age match an existing patron (or
+  one imported earlier in the same file) is merged into that patron:
+  fees are added, trainings combined and loans carried over;
+- any other record is added, under a new ID if its own is taken;
+- an added record that shares a blocking key with an existing patron is
+  reported as a possible duplicate for a person to check;
+- a record repeating an incoming ID already read is skipped, so a file
+  with repeated records does not add their fees and loans twice.
+
+Matching is a hash join: the existing patrons are indexed once by exact
+and blocking key (see src.matching) and each incoming record is looked
+up in those dictionaries. Loans of items not in this catalogue are
+dropped. A loan of an item the patron already has on loan (as when a
+patron is imported again) is skipped, and a loan that would put more
+copies on loan than are owned is refused and reported; the loans kept
+are counted in their items' on_loan.
+
+Usage:
+    python -m src.importer THEIR_PATRONS.json [--report merges.json] [--dry-run]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+
+from src import config
+from src.data_mgmt import DataManager, patron_from_record
+from src.json_index import iter_records
+from src.matching import blocking_key, exact_key, name_tokens, probe_keys
+
+# merged: (incoming ID, ID merged into); reassigned: (incoming ID, new ID);
+# possible: (ID the record was added as, existing patron it may duplicate);
+# repeated: incoming IDs of skipped repeat records;
+# refused_loans: (incoming ID, item ID) of loans beyond the copies owned
+ImportReport = namedtuple("ImportReport", ["read", "added", "merged", "reassigned", "possible",
+                                           "repeated", "dropped_loans", "duplicate_loans",
+                                           "refused_loans", "seconds"])
+
+
+def _merge(existing, incoming):
+    """Fold an incoming duplicate's fees and trainings into the existing patron."""
+    existing._outstanding_fees += incoming._outstanding_fees
+    existing._gardening_tool_training = (existing._gardening_tool_training
+                                         or incoming._gardening_tool_training)
+    existing._carpentry_tool_training = (existing._carpentry_tool_training
+                                         or incoming._carpentry_tool_training)
+    existing._makerspace_training = (existing._makerspace_training
+                                     or incoming._makerspace_training)
+
+
+def _carry_loans(loans, patron):
+    """
+    Give a patron the incoming loans they can hold.
+
+    Args:
+        loans: Incoming Loan objects
+        patron: Patron receiving them
+
+    Returns:
+        tuple: (number skipped as already held, item IDs refused for lack of copies)
+    """
+    held = {loan._item._id for loan in patron._loans}
+    duplicates = 0
+    refused = []
+    for loan in loans:
+        item = loan._item
+        if item._id in held:
+            duplicates += 1
+        elif item._on_loan >= item._num_copies:
+            refused.append(item._id)
+        else:
+            item._on_loan += 1
+            held.add(item._id)
+            patron._loans.append(loan)
+    return duplicates, refused
+
+
+def import_patrons(data_manager, path):
+    """
+    Merge a patrons JSON file into the loaded data.
+
+    Args:
+        data_manager: DataManager (or ColumnarDataManager) holding our patrons
+            and catalogue
+        path: Incoming file in the patrons.json schema
+
+    Returns:
+        ImportReport
+
+    Raises:
+        ValueError: If the file is not a JSON array of objects
+    """
+    start = time.perf_counter()
+    exact = {}
+    blocks = {}
+    next_id = 1
+    for patron in data_manager.iter_patrons():
+        tokens = name_tokens(patron._name)
+        exact.setdefault(exact_key(tokens, patron._age), patron._id)
+        key = blocking_key(tokens, patron._age)
+        if key is not None:
+            blocks.setdefault(key, patron._id)
+        next_id = max(next_id, patron._id + 1)
+
+    merged, reassigned, possible, repeated, refused_loans = [], [], [], [], []
+    read = dropped_loans = duplicate_loans = 0
+    seen = set()
+    get_patron = data_manager.get_patron
+    for _, _, record in iter_records(path):
+        read += 1
+        incoming = patron_from_record(record, data_manager.get_item)
+        incoming_id = incoming._id
+        if incoming_id in seen:
+            repeated.append(incoming_id)
+            continue
+        seen.add(incoming_id)
+        dropped_loans += len(record["loans"]) - len(incoming._loans)
+        loans, incoming._loans = incoming._loans, []
+
+        tokens = name_tokens(incoming._name)
+        key = exact_key(tokens, incoming._age)
+        match_id = exact.get(key)
+        if match_id is not None:
+            patron = get_patron(match_id)
+            _merge(patron, incoming)
+            merged.append((incoming_id, match_id))
+        else:
+            # The version belongs to the other library's store
+            incoming._version = 0
+            if get_patron(incoming_id) is not None:
+                reassigned.append((incoming_id, next_id))
+                incoming._id = next_id
+            next_id = max(next_id, incoming._id + 1)
+            data_manager.add_patron(incoming)
+            # A columnar store hands back a view of the row just added
+            patron = get_patron(incoming._id)
+            exact[key] = incoming._id
+            for probe in probe_keys(tokens, incoming._age):
+                if probe in blocks:
+                    possible.append((incoming._id, blocks[probe]))
+                    break
+            block = blocking_key(tokens, incoming._age)
+            if block is not None:
+                blocks.setdefault(block, incoming._id)
+
+        duplicates, refused = _carry_loans(loans, patron)
+        duplicate_loans += duplicates
+        refused_loans.extend((incoming_id, item_id) for item_id in refused)
+
+    return ImportReport(read, read - len(merged) - len(repeated), merged, reassigned, possible,
+                        repeated, dropped_loans, duplicate_loans, refused_loans,
+                        time.perf_counter() - start)
+
+
+def format_report(report, limit=10):
+    """
+    Describe an import.
+
+    Args:
+        report: ImportReport
+        limit: Most examples listed for each kind of change
+
+    Returns:
+        str: Report text
+    """
+    rate = report.read / report.seconds * 60 if report.seconds else 0.0
+    lines = [f"{report.read} patrons read in {report.seconds:.2f} s ({rate:,.0f} per minute): "
+             f"{report.added} added, {len(report.merged)} merged into existing patrons"]
+    sections = [
+        ("merged", report.merged, "incoming {} merged into {}"),
+        ("given new IDs", report.reassigned, "incoming {} added as {}"),
+        ("possible duplicates to check", report.possible, "{} may be {}"),
+        ("loans refused for lack of copies", report.refused_loans,
+         "incoming {} could not keep item {}"),
+    ]
+    for title, changes, template in sections:
+        if not changes:
+            continue
+        lines.append(f"{len(changes)} {title}:")
+        lines.extend("  " + template.format(*change) for change in changes[:limit])
+        if len(changes) > limit:
+            lines.append(f"  ... and {len(changes) - limit} more")
+    if report.repeated:
+        lines.append(f"{len(report.repeated)} repeated records skipped")
+    if report.dropped_loans:
+        lines.append(f"{report.dropped_loans} loans of items not in the catalogue dropped")
+    if report.duplicate_loans:
+        lines.append(f"{report.duplicate_loans} loans already held skipped")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Import a patrons file from the command line.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Merge another library's patrons into ours")
+    parser.add_argument("incoming", help="patrons JSON file to import")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("--report", metavar="FILE", help="write every change to a JSON file")
+    parser.add_argument("--dry-run", action="store_true", help="report without saving")
+    args = parser.parse_args(argv)
+
+    data_manager = DataManager()
+    data_manager.load_data(args.catalogue, args.patrons)
+    report = import_patrons(data_manager, args.incoming)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report._asdict(), file, indent=1)
+    if not args.dry_run:
+        data_manager.save_data(args.catalogue, args.patrons)
+        print("Data saved")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
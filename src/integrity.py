@@ -0,0 +1,182 @@
+"""
+Referential integrity checks between the catalogue and patron files.
+
+catalogue.json stores each item's on_loan count while patrons.json lists
+the loans themselves, and nothing but care keeps the two in step. check()
+joins them on the raw JSON records before any objects are built: one
+Counter over every loan's item ID, compared against the catalogue's
+counts, finds every mismatch in a single pass over the loans. It also
+finds duplicate IDs and loans of items missing from the catalogue, and
+can rewrite the on_loan counts from the loans.
+
+Usage:
+    python -m src.integrity [--catalogue FILE] [--patrons FILE] [--fix]
+"""
+import argparse
+import sys
+from collections import Counter, namedtuple
+from itertools import chain
+from operator import itemgetter
+
+from src import config
+
+# duplicate_item_ids / duplicate_patron_ids: IDs on more than one record;
+# as on load, the last record with an ID is the one kept
+# dangling_loans: (patron ID, item ID) of loans of unknown items, which
+# are dropped on load
+# on_loan_mismatches: (item ID, on_loan recorded, loans found)
+# over_lent: (item ID, copies owned, loans found) where loans exceed copies
+# rebuilt: True if the on_loan counts were rewritten from the loans
+IntegrityReport = namedtuple("IntegrityReport", [
+    "items", "patrons", "loans", "duplicate_item_ids", "duplicate_patron_ids",
+    "dangling_loans", "on_loan_mismatches", "over_lent", "rebuilt",
+])
+
+
+_ITEM_ID = itemgetter("item_id")
+_PATRON_ID = itemgetter("patron_id")
+_LOANS = itemgetter("loans")
+_LOAN_ITEM = itemgetter("item")
+
+
+def _duplicates(ids):
+    """Get the IDs that occur more than once, in first-seen order."""
+    ids = list(ids)
+    if len(set(ids)) == len(ids):
+        return []
+    return [record_id for record_id, count in Counter(ids).items() if count > 1]
+
+
+def check(item_records, patron_records, rebuild=False):
+    """
+    Check that the patron records' loans agree with the catalogue records.
+
+    Args:
+        item_records: List of catalogue.json records
+        patron_records: List of patrons.json records
+        rebuild: Set every item record's on_loan to the number of loans
+            of it found in the patron records
+
+    Returns:
+        IntegrityReport
+    """
+    items = dict(zip(map(_ITEM_ID, item_records), item_records))
+    duplicate_item_ids = (_duplicates(map(_ITEM_ID, item_records))
+                          if len(items) != len(item_records) else [])
+    duplicate_patron_ids = _duplicates(map(_PATRON_ID, patron_records))
+    if duplicate_patron_ids:
+        # Only the last record of each patron is loaded, so only its loans count
+        patron_records = list({record["patron_id"]: record
+                               for record in patron_records}.values())
+
+    # map and chain keep the loop over every loan in C
+    loans = Counter(map(_LOAN_ITEM, chain.from_iterable(map(_LOANS, patron_records))))
+    dangling_loans = []
+    if not loans.keys() <= items.keys():
+        dangling_loans = [(record["patron_id"], loan["item"])
+                          for record in patron_records for loan in record["loans"]
+                          if loan["item"] not in items]
+
+    on_loan_mismatches = []
+    over_lent = []
+    for item_id, record in items.items():
+        count = loans.get(item_id, 0)
+        if record["on_loan"] != count:
+            on_loan_mismatches.append((item_id, record["on_loan"], count))
+        if count > record["number_owned"]:
+            over_lent.append((item_id, record["number_owned"], count))
+
+    rebuilt = rebuild and bool(on_loan_mismatches or duplicate_item_ids)
+    if rebuilt:
+        for record in item_records:
+            record["on_loan"] = loans.get(record["item_id"], 0)
+
+    return IntegrityReport(len(items), len(patron_records), sum(loans.values()),
+                           duplicate_item_ids, duplicate_patron_ids, dangling_loans,
+                           on_loan_mismatches, over_lent, rebuilt)
+
+
+def is_clean(report):
+    """
+    Check whether a report found nothing wrong.
+
+    Args:
+        report: IntegrityReport
+
+    Returns:
+        bool: True if there were no duplicates, dangling loans or mismatches
+    """
+    return not (report.duplicate_item_ids or report.duplicate_patron_ids
+                or report.dangling_loans or report.on_loan_mismatches or report.over_lent)
+
+
+def format_report(report, limit=10):
+    """
+    Describe an integrity report.
+
+    Args:
+        report: IntegrityReport
+        limit: Most examples listed for each kind of problem
+
+    Returns:
+        str: Report text
+    """
+    lines = [f"{report.items} items, {report.patrons} patrons, {report.loans} loans"]
+    sections = [
+        ("duplicate item IDs", report.duplicate_item_ids, "{}"),
+        ("duplicate patron IDs", report.duplicate_patron_ids, "{}"),
+        ("loans of unknown items", report.dangling_loans, "patron {} item {}"),
+        ("on_loan mismatches", report.on_loan_mismatches,
+         "item {}: on_loan {}, {} loans" + (" (rebuilt)" if report.rebuilt else "")),
+        ("items lent beyond copies owned", report.over_lent, "item {}: {} owned, {} loans"),
+    ]
+    for title, problems, template in sections:
+        if not problems:
+            continue
+        lines.append(f"{len(problems)} {title}:")
+        for problem in problems[:limit]:
+            values = problem if isinstance(problem, tuple) else (problem,)
+            lines.append("  " + template.format(*values))
+        if len(problems) > limit:
+            lines.append(f"  ... and {len(problems) - limit} more")
+    if is_clean(report):
+        lines.append("No problems found")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Check the data files from the command line.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Exit status, 1 if problems remain
+    """
+    # Imported here: data_mgmt runs check() on every load
+    from src.data_mgmt import DataManager  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description="Check the catalogue against the patron loans")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("--fix", action="store_true",
+                        help="rebuild on_loan counts from the loans and save the files")
+    args = parser.parse_args(argv)
+
+    data_manager = DataManager()
+    data_manager.load_data(args.catalogue, args.patrons, rebuild_counts=args.fix)
+    report = data_manager.get_integrity_report()
+    print(format_report(report))
+    if is_clean(report):
+        return 0
+    if not args.fix:
+        return 1
+    data_manager.save_data(args.catalogue, args.patrons)
+    print("Data saved")
+    # Loans beyond the copies owned need a person to sort out
+    return 1 if report.over_lent else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
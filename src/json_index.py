@@ -0,0 +1,310 @@
+"""
+ID-to-offset indexes over the patron and catalogue JSON files.
+
+A JsonIndex maps each record's ID to the byte range of the record in the
+file, so one record can be read with a seek and a single json.loads
+instead of loading the whole file. The index is kept in a sidecar file
+next to the JSON file (patrons.json.idx) and rebuilt whenever the JSON
+file's size or modification time no longer match.
+
+iter_records() is the streaming scanner the index is built with: it
+yields the records of a JSON array one at a time, with their byte
+offsets, without reading the whole file into memory.
+"""
+import codecs
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from src.data_mgmt import item_from_record, patron_from_record
+
+_MAGIC = b"BATI"
+_FORMAT_VERSION = 2
+# magic, version, JSON file size, JSON file mtime_ns, record count, padding
+# to 32 bytes so the columns that follow are 8-byte aligned
+_HEADER = struct.Struct("<4sHqqI6x")
+_CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+
+def iter_records(path, chunk_size=_CHUNK_SIZE):
+    """
+    Stream the objects of a JSON array file.
+
+    Args:
+        path: JSON file holding an array of objects
+        chunk_size: Bytes read at a time
+
+    Yields:
+        tuple: (start byte offset, end byte offset, record dictionary)
+
+    Raises:
+        ValueError: If the file is not a JSON array of objects
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as file:
+        buffer = ""
+        position = 0
+        offset = 0
+        at_eof = False
+        started = False
+
+        def more():
+            """Append the next chunk to the buffer; False at the end of the file."""
+            nonlocal buffer, position, at_eof
+            if at_eof:
+                return False
+            data = file.read(chunk_size)
+            at_eof = not data
+            buffer = buffer[position:] + text_decoder.decode(data, final=at_eof)
+            position = 0
+            return True
+
+        while True:
+            # Skip whitespace, the opening bracket and the separating comma
+            while True:
+                while position == len(buffer):
+                    if not more():
+                        raise ValueError(f"{path}: unexpected end of file")
+                character = buffer[position]
+                if character in _WHITESPACE or (character == "," and started):
+                    position += 1
+                    offset += 1
+                elif character == "[" and not started:
+                    started = True
+                    position += 1
+                    offset += 1
+                else:
+                    break
+            if not started:
+                raise ValueError(f"{path}: not a JSON array")
+            if character == "]":
+                return
+            if character != "{":
+                raise ValueError(f"{path}: array element at byte {offset} is not an object")
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError as error:
+                    if not more():
+                        raise ValueError(f"{path}: {error}") from error
+            text = buffer[position:end]
+            size = len(text) if text.isascii() else len(text.encode("utf-8"))
+            yield offset, offset + size, record
+            offset += size
+            position = end
+
+
+class JsonIndex:
+    """
+    Sorted record IDs with the byte range of each record.
+    """
+
+    def __init__(self, path, key, ids, starts, ends):
+        """
+        Initialize the index; use open() or build() instead.
+
+        Args:
+            path: JSON file indexed
+            key: Record field holding the ID
+            ids: array or memoryview of IDs in ascending order
+            starts: Record start offsets, parallel to ids
+            ends: Record end offsets, parallel to ids
+        """
+        self._path = path
+        self._key = key
+        self._ids = ids
+        self._starts = starts
+        self._ends = ends
+
+    @classmethod
+    def build(cls, path, key):
+        """
+        Index a JSON file by scanning it.
+
+        When several records share an ID only the last is indexed, the
+        one DataManager.load_data keeps.
+
+        Args:
+            path: JSON file holding an array of records
+            key: Record field holding the ID
+
+        Returns:
+            JsonIndex
+        """
+        ids, starts, ends = array('q'), array('q'), array('q')
+        for start, end, record in iter_records(path):
+            ids.append(record[key])
+            starts.append(start)
+            ends.append(end)
+        if any(ids[position] >= ids[position + 1] for position in range(len(ids) - 1)):
+            # The sort is stable, so duplicates stay in file order; keeping
+            # the last of each is the rule load_data follows
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            order = [position for position, following in zip(order, order[1:] + [None])
+                     if following is None or ids[position] != ids[following]]
+            ids = array('q', (ids[position] for position in order))
+            starts = array('q', (starts[position] for position in order))
+            ends = array('q', (ends[position] for position in order))
+        return cls(path, key, ids, starts, ends)
+
+    @classmethod
+    def open(cls, path, key, index_path=None):
+        """
+        Load a JSON file's sidecar index, rebuilding it if it is missing or stale.
+
+        Args:
+            path: JSON file holding an array of records
+            key: Record field holding the ID
+            index_path: Sidecar file (default: path + ".idx")
+
+        Returns:
+            JsonIndex
+        """
+        index_path = index_path or f"{path}.idx"
+        status = os.stat(path)
+        index = cls._load(path, key, index_path, status)
+        if index is None:
+            index = cls.build(path, key)
+            try:
+                index.save(index_path, status)
+            except OSError:
+                # A read-only data directory still gets an in-memory index
+                pass
+        return index
+
+    @classmethod
+    def _load(cls, path, key, index_path, status):
+        """
+        Map a sidecar index, or return None if it is missing, stale or corrupt.
+
+        The columns are memory-mapped rather than read, so a lookup only
+        touches the pages its binary search visits.
+        """
+        try:
+            with open(index_path, "rb") as file:
+                header = file.read(_HEADER.size)
+                if len(header) != _HEADER.size:
+                    return None
+                magic, version, size, mtime, count = _HEADER.unpack(header)
+                if (magic, version, size, mtime) != (_MAGIC, _FORMAT_VERSION, status.st_size,
+                                                     status.st_mtime_ns):
+                    return None
+                if os.fstat(file.fileno()).st_size != _HEADER.size + 24 * count:
+                    return None
+                mapped = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            return None
+        columns = [mapped[_HEADER.size + 8 * count * column:
+                          _HEADER.size + 8 * count * (column + 1)].cast('q')
+                   for column in range(3)]
+        return cls(path, key, *columns)
+
+    def save(self, index_path, status=None):
+        """
+        Write the index to a sidecar file.
+
+        Args:
+            index_path: File to write
+            status: os.stat_result of the JSON file (default: stat it now)
+        """
+        status = status or os.stat(self._path)
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, status.st_size,
+                                    status.st_mtime_ns, len(self._ids)))
+            self._ids.tofile(file)
+            self._starts.tofile(file)
+            self._ends.tofile(file)
+        os.replace(temp_path, index_path)
+
+    def __len__(self):
+        """Number of records indexed."""
+        return len(self._ids)
+
+    def __contains__(self, record_id):
+        """True if a record has this ID."""
+        return self._position(record_id) is not None
+
+    def _position(self, record_id):
+        """Get the position of an ID in the index, or None."""
+        position = bisect_left(self._ids, record_id)
+        if position < len(self._ids) and self._ids[position] == record_id:
+            return position
+        return None
+
+    def get(self, record_id):
+        """
+        Read one record.
+
+        Args:
+            record_id: ID of the record
+
+        Returns:
+            Record dictionary, or None if there is none with this ID
+        """
+        return self.get_many((record_id,)).get(record_id)
+
+    def get_many(self, record_ids):
+        """
+        Read several records, in file order, with one open.
+
+        Args:
+            record_ids: IDs of the records
+
+        Returns:
+            Dictionary of ID to record dictionary for the IDs found
+        """
+        positions = sorted({position for position in map(self._position, record_ids)
+                            if position is not None}, key=self._starts.__getitem__)
+        records = {}
+        if not positions:
+            return records
+        with open(self._path, "rb") as file:
+            for position in positions:
+                file.seek(self._starts[position])
+                data = file.read(self._ends[position] - self._starts[position])
+                records[self._ids[position]] = json.loads(data)
+        return records
+
+
+def load_patron(patron_id, catalogue_file, patron_file):
+    """
+    Load one patron, their loans and only the items on loan to them.
+
+    Args:
+        patron_id: ID of the patron
+        catalogue_file: Path to the catalogue JSON file
+        patron_file: Path to the patron JSON file
+
+    Returns:
+        Patron, or None if there is no patron with this ID
+    """
+    record = JsonIndex.open(patron_file, "patron_id").get(patron_id)
+    if record is None:
+        return None
+    item_records = JsonIndex.open(catalogue_file, "item_id").get_many(
+        loan["item"] for loan in record["loans"])
+    items = {item_id: item_from_record(item_record)
+             for item_id, item_record in item_records.items()}
+    return patron_from_record(record, items.get)
+
+
+def load_item(item_id, catalogue_file):
+    """
+    Load one catalogue item.
+
+    Args:
+        item_id: ID of the item
+        catalogue_file: Path to the catalogue JSON file
+
+    Returns:
+        BorrowableItem, or None if there is no item with this ID
+    """
+    record = JsonIndex.open(catalogue_file, "item_id").get(item_id)
+    return None if record is None else item_from_record(record)
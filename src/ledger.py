@@ -0,0 +1,358 @@
+"""
+Append-only fee ledger in integer cents.
+
+Every fee charged and every payment is recorded as an entry, never
+changed afterwards, in integer cents. The ledger is an audit trail that
+mirrors Patron._outstanding_fees, which stays the balance the business
+rules use: each entry is rounded to the cent, so the ledger's own sums
+never drift, and where the float balance has drifted (or was changed
+outside the circulation desk) an adjustment entry shows by how much.
+Entries are kept as parallel typed arrays, about 30 bytes each including
+the indexes:
+
+    cents     array('q')  amount, positive for charges, negative for payments
+    days      array('i')  date of the entry as a date ordinal
+    kinds     array('B')  ADJUSTMENT, CHARGE or PAYMENT
+    balances  array('q')  the patron's balance after the entry
+
+Each patron's current balance is kept in a dictionary, so reading it is
+O(1), and each patron's entry positions in an array, in date order, so a
+statement for a date range finds its first entry by binary search and
+then reads only the entries in the range.
+
+FeeLedger subscribes to the circulation events. When an event shows a
+patron owed something other than the ledger balance before it (fees
+carried over from before the ledger started, or changed outside the
+circulation desk), an adjustment entry records the difference first.
+Event handlers never raise: an event dated before the patron's last
+entry (a reopened ledger with the clock set back, say) is recorded on
+the date of that last entry, since the fee has already been applied.
+
+With a path, entries are also appended to a file of fixed-size binary
+records, read back when the ledger is opened again.
+
+Usage:
+    python -m src.ledger LEDGER_FILE PATRON_ID [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date
+
+from src import clock
+from src.events import PaymentEvent, ReturnEvent, get_event_bus
+
+ADJUSTMENT = 0
+CHARGE = 1
+PAYMENT = 2
+KIND_NAMES = ("adjustment", "charge", "payment")
+
+# patron ID, cents, date ordinal, kind, padding to 24 bytes
+_RECORD = struct.Struct("<qqiB3x")
+
+Statement = namedtuple("Statement", ["patron_id", "start", "end", "opening", "entries",
+                                     "closing"])
+StatementLine = namedtuple("StatementLine", ["date", "kind", "cents", "balance"])
+
+
+def to_cents(amount):
+    """
+    Convert a dollar amount to integer cents.
+
+    Args:
+        amount: Amount in dollars
+
+    Returns:
+        int: Amount in cents, rounded to the nearest cent
+    """
+    return round(amount * 100)
+
+
+def format_cents(cents):
+    """
+    Format cents as dollars.
+
+    Args:
+        cents: Amount in cents
+
+    Returns:
+        str: e.g. "$12.50" or "-$0.75"
+    """
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+class FeeLedger:
+    """
+    Every fee charged and paid, with running balances per patron.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # One attribute per column is necessary for the columnar layout
+
+    def __init__(self, path=None):
+        """
+        Initialize the ledger, reading any entries already in its file.
+
+        Args:
+            path: File to append entries to (optional; in memory only if None)
+        """
+        self._lock = threading.Lock()
+        self._cents = array('q')
+        self._days = array('i')
+        self._kinds = array('B')
+        self._balances = array('q')
+        self._balance = {}
+        self._positions = {}
+        self._event_bus = None
+        self._file = None
+        if path is not None:
+            self._read(path)
+            self._file = open(path, "ab")  # pylint: disable=consider-using-with
+
+    def _read(self, path):
+        """Load the entries of a ledger file, dropping a half-written last record."""
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as file:
+            data = file.read()
+            complete = len(data) - len(data) % _RECORD.size
+            if complete < len(data):
+                file.truncate(complete)
+        if not complete:
+            return
+        # Columns are unzipped in C; only the running balances and the
+        # per-patron positions need a Python loop
+        patron_ids, cents, days, kinds = zip(*_RECORD.iter_unpack(memoryview(data)[:complete]))
+        self._cents = array('q', cents)
+        self._days = array('i', days)
+        self._kinds = array('B', kinds)
+        balance = self._balance
+        positions = {}
+        balances = []
+        for position, (patron_id, amount) in enumerate(zip(patron_ids, cents)):
+            running = balance.get(patron_id, 0) + amount
+            balance[patron_id] = running
+            balances.append(running)
+            if patron_id in positions:
+                positions[patron_id].append(position)
+            else:
+                positions[patron_id] = [position]
+        self._balances = array('q', balances)
+        self._positions = {patron_id: array('q', entries)
+                           for patron_id, entries in positions.items()}
+
+    def _append(self, patron_id, cents, day, kind):
+        """Add an entry to the columns and indexes; the caller holds the lock."""
+        balance = self._balance.get(patron_id, 0) + cents
+        positions = self._positions.get(patron_id)
+        if positions is None:
+            positions = self._positions[patron_id] = array('q')
+        elif day < self._days[positions[-1]]:
+            raise ValueError(f"Ledger entries for patron {patron_id} must be in date order")
+        positions.append(len(self._cents))
+        self._cents.append(cents)
+        self._days.append(day)
+        self._kinds.append(kind)
+        self._balances.append(balance)
+        self._balance[patron_id] = balance
+
+    def record(self, patron_id, kind, cents, when=None):
+        """
+        Append an entry.
+
+        Args:
+            patron_id: ID of the patron
+            kind: ADJUSTMENT, CHARGE or PAYMENT
+            cents: Amount in cents, negative for payments
+            when: datetime.date of the entry (default: clock.today())
+
+        Returns:
+            int: The patron's balance in cents after the entry
+
+        Raises:
+            ValueError: If the entry is dated before the patron's last entry
+        """
+        day = (when or clock.today()).toordinal()
+        with self._lock:
+            self._write(patron_id, cents, day, kind)
+            return self._balance[patron_id]
+
+    def _write(self, patron_id, cents, day, kind):
+        """Append an entry and log it to the file; the caller holds the lock."""
+        self._append(patron_id, cents, day, kind)
+        if self._file is not None:
+            self._file.write(_RECORD.pack(patron_id, cents, day, kind))
+
+    def _settle(self, patron_id, before, cents, kind):
+        """
+        Record an event's entry, adjusting first if the balance before it differs.
+
+        The entry is dated today, or on the patron's last entry if that is
+        later, so recording an event that has already happened never fails.
+
+        Args:
+            patron_id: ID of the patron
+            before: What the patron owed before the event, in cents
+            cents: Amount of the event, negative for payments
+            kind: CHARGE or PAYMENT
+        """
+        day = clock.today().toordinal()
+        with self._lock:
+            positions = self._positions.get(patron_id)
+            if positions:
+                day = max(day, self._days[positions[-1]])
+            difference = before - self._balance.get(patron_id, 0)
+            if difference:
+                self._write(patron_id, difference, day, ADJUSTMENT)
+            self._write(patron_id, cents, day, kind)
+
+    def attach(self, event_bus=None):
+        """
+        Start recording fees from circulation events.
+
+        Args:
+            event_bus: EventBus to subscribe to (default: the BusinessLogic bus)
+        """
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+        self._event_bus.subscribe(ReturnEvent, self.on_return)
+        self._event_bus.subscribe(PaymentEvent, self.on_payment)
+
+    def detach(self):
+        """Stop recording fees from circulation events."""
+        if self._event_bus is None:
+            return
+        self._event_bus.unsubscribe(ReturnEvent, self.on_return)
+        self._event_bus.unsubscribe(PaymentEvent, self.on_payment)
+        self._event_bus = None
+
+    def on_return(self, event):
+        """
+        Record the overdue fee charged on a return, if any.
+
+        Args:
+            event: ReturnEvent
+        """
+        if event.fee <= 0:
+            return
+        fee = to_cents(event.fee)
+        self._settle(event.patron._id, to_cents(event.patron._outstanding_fees) - fee, fee,
+                     CHARGE)
+
+    def on_payment(self, event):
+        """
+        Record a fee payment.
+
+        Args:
+            event: PaymentEvent
+        """
+        paid = to_cents(event.amount)
+        self._settle(event.patron._id, to_cents(event.remaining) + paid, -paid, PAYMENT)
+
+    def flush(self):
+        """Write buffered entries to the ledger file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """Stop recording events and close the ledger file."""
+        self.detach()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self):
+        """Number of entries."""
+        return len(self._cents)
+
+    def balance(self, patron_id):
+        """
+        Get what a patron owes.
+
+        Args:
+            patron_id: ID of the patron
+
+        Returns:
+            int: Balance in cents, 0 for a patron with no entries
+        """
+        return self._balance.get(patron_id, 0)
+
+    def statement(self, patron_id, start=None, end=None):
+        """
+        List a patron's entries between two dates.
+
+        Args:
+            patron_id: ID of the patron
+            start: First datetime.date included (default: the first entry)
+            end: Last datetime.date included (default: the last entry)
+
+        Returns:
+            Statement with the opening balance, a StatementLine per entry
+            and the closing balance, all in cents
+        """
+        with self._lock:
+            positions = self._positions.get(patron_id, array('q'))
+            days = self._days
+            first = 0 if start is None else bisect_left(
+                positions, start.toordinal(), key=days.__getitem__)
+            last = len(positions) if end is None else bisect_right(
+                positions, end.toordinal(), key=days.__getitem__)
+            opening = self._balances[positions[first - 1]] if first else 0
+            entries = [StatementLine(date.fromordinal(days[position]),
+                                     KIND_NAMES[self._kinds[position]],
+                                     self._cents[position], self._balances[position])
+                       for position in positions[first:last]]
+        closing = entries[-1].balance if entries else opening
+        return Statement(patron_id, start, end, opening, entries, closing)
+
+
+def format_statement(statement):
+    """
+    Describe a statement.
+
+    Args:
+        statement: Statement from FeeLedger.statement
+
+    Returns:
+        str: Statement text
+    """
+    period = f"{statement.start or 'start'} to {statement.end or 'today'}"
+    lines = [f"Statement for patron {statement.patron_id}, {period}",
+             f"{'Opening balance':<34} {format_cents(statement.opening):>10}"]
+    for line in statement.entries:
+        lines.append(f"{line.date.isoformat():<12} {line.kind:<10} "
+                     f"{format_cents(line.cents):>11} {format_cents(line.balance):>10}")
+    lines.append(f"{'Closing balance':<34} {format_cents(statement.closing):>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """
+    Print a patron's statement from a ledger file.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Print a patron's fee statement")
+    parser.add_argument("ledger", help="ledger file written by run.py --ledger")
+    parser.add_argument("patron_id", type=int)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, metavar="YYYY-MM-DD")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.ledger):
+        parser.error(f"no ledger file {args.ledger}")
+    ledger = FeeLedger(args.ledger)
+    try:
+        print(format_statement(ledger.statement(args.patron_id, args.start, args.end)))
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,14 @@
 """
 Loan module for library system.
 """
-from datetime import datetime
+from src import clock
 
 
 class Loan:
     """
     Represents a loan of an item to a patron.
     """
+    __slots__ = ("_item", "_due_date")
 
     def __init__(self, item, due_date):
         """
@@ -22,7 +23,7 @@ class Loan:
 
     def __str__(self):
         """String representation of the loan."""
-        today = datetime.now().date()
+        today = clock.today()
         if self._due_date < today:
             days_overdue = (today - self._due_date).days
             return f"{self._item._name} (OVERDUE by {days_overdue} days)"
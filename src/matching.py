@@ -0,0 +1,123 @@
+"""
+Name normalisation and match keys for finding duplicate patrons.
+
+Two records are taken to be the same person when their normalised names
+and ages are equal: the exact key. Names are normalised by dropping
+accents, case and punctuation and sorting the words, so "O'Brien, Seán"
+and "sean obrien" agree. Records that only share a blocking key (surname,
+first initial and an age at most a year apart) are possible duplicates,
+left for a person to check.
+
+Keys are tuples of strings and ints, so matching is a dictionary lookup:
+a hash join of the incoming records against the existing ones. soundex()
+gives the phonetic codes src.dedup blocks on.
+"""
+import re
+import unicodedata
+
+_APOSTROPHES = re.compile(r"['’]")
+_NON_WORD = re.compile(r"[\W_]+")
+_SOUNDEX_CODES = dict(zip("bfpvcgjkqsxzdtlmnr", "111122222222334556"))
+
+
+def name_tokens(name):
+    """
+    Split a name into normalised words, in their original order.
+
+    Args:
+        name: Name as entered
+
+    Returns:
+        List of lower-case words without accents or punctuation
+    """
+    if not name.isascii():
+        name = "".join(character for character in unicodedata.normalize("NFKD", name)
+                       if not unicodedata.combining(character))
+    return _NON_WORD.sub(" ", _APOSTROPHES.sub("", name).casefold()).split()
+
+
+def normalise_name(name):
+    """
+    Normalise a name for comparison.
+
+    Args:
+        name: Name as entered
+
+    Returns:
+        str: Sorted normalised words joined by spaces
+    """
+    return " ".join(sorted(name_tokens(name)))
+
+
+def exact_key(tokens, age):
+    """
+    Key that is equal for records taken to be the same person.
+
+    Args:
+        tokens: Result of name_tokens()
+        age: Patron's age
+
+    Returns:
+        tuple: (sorted words, age)
+    """
+    return " ".join(sorted(tokens)), age
+
+
+def blocking_key(tokens, age):
+    """
+    Key under which a record is filed for finding possible duplicates.
+
+    Args:
+        tokens: Result of name_tokens()
+        age: Patron's age
+
+    Returns:
+        tuple: (surname, first initial, age), or None for an empty name
+    """
+    if not tokens:
+        return None
+    return tokens[-1], tokens[0][0], age
+
+
+def probe_keys(tokens, age):
+    """
+    Blocking keys to look a record up under, allowing for a birthday.
+
+    Args:
+        tokens: Result of name_tokens()
+        age: Patron's age
+
+    Returns:
+        List of blocking keys for ages age - 1 to age + 1
+    """
+    if not tokens:
+        return []
+    return [(tokens[-1], tokens[0][0], age + offset) for offset in (0, -1, 1)]
+
+
+def soundex(word):
+    """
+    American Soundex code of a word, so names that sound alike agree.
+
+    Args:
+        word: A normalised word from name_tokens()
+
+    Returns:
+        str: Initial letter and three digits (e.g. "R163"), or "" if the
+        word has no letters
+    """
+    letters = [character for character in word if character.isalpha()]
+    if not letters:
+        return ""
+    code = [letters[0].upper()]
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code.append(digit)
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code; vowels do
+        if letter not in "hw":
+            previous = digit
+    return "".join(code).ljust(4, "0")
@@ -0,0 +1,285 @@
+"""
+Memory accounting per subsystem.
+
+profile() deep-sizes the catalogue, the loans, the patrons and every other
+structure a DataManager holds (locks, indexes, caches), plus any extra
+structures passed in such as hold queues or analytics. Objects reachable
+from several subsystems are charged once, to the first that reaches them,
+so the sections add up to the retained total. If tracemalloc is tracing,
+the report also lists the source files that allocated the most memory.
+
+Reports are written to reports/ as a text table and as JSON.
+
+Usage:
+    python -m src.memprofile [--catalogue FILE] [--patrons FILE] [--columnar]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+from src import config
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+REPORTS_DIR = "reports"
+
+# Code and types are shared by the whole process, not retained by the data
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+_slot_names = {}
+
+
+def _slots_of(cls):
+    """Get the names of every slot an instance of cls has."""
+    names = _slot_names.get(cls)
+    if names is None:
+        names = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(name for name in slots if name not in ("__dict__", "__weakref__"))
+        names = _slot_names[cls] = tuple(names)
+    return names
+
+
+def _measure(roots, seen):
+    """
+    Deep-size objects not yet seen.
+
+    Args:
+        roots: Iterable of objects to start from
+        seen: Set of ids already charged, updated in place
+
+    Returns:
+        tuple: (bytes, objects)
+    """
+    size = 0
+    objects = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        objects += 1
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            attributes = getattr(obj, "__dict__", None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            for name in _slots_of(type(obj)):
+                value = getattr(obj, name, None)
+                if value is not None:
+                    stack.append(value)
+    return size, objects
+
+
+def deep_size(obj, seen=None):
+    """
+    Get the bytes retained by an object and everything it references.
+
+    Args:
+        obj: Object to size
+        seen: Set of object ids to skip, updated in place (optional)
+
+    Returns:
+        tuple: (bytes, objects)
+    """
+    return _measure((obj,), set() if seen is None else seen)
+
+
+def profile(data_manager, extra=None, top=10):
+    """
+    Attribute retained memory to subsystems.
+
+    Args:
+        data_manager: DataManager to account for
+        extra: Dictionary of section name to other structures to account
+            for, measured after the data (optional)
+        top: Number of allocating source files to list when tracemalloc is
+            tracing
+
+    Returns:
+        Dictionary with timestamp, sections (name, bytes, objects), total,
+        peak_rss and tracemalloc (None when not tracing)
+    """
+    # Snapshot first, so the sizing's own bookkeeping is not traced
+    traced = _traced(top) if tracemalloc.is_tracing() else None
+    seen = set()
+    sections = []
+
+    def charge(name, roots):
+        size, objects = _measure(roots, seen)
+        sections.append({"name": name, "bytes": size, "objects": objects})
+
+    state = dict(vars(data_manager))
+    seen.add(id(data_manager))
+    charge("catalogue", (state.pop("_catalogue_data", {}),))
+    patrons = state.pop("_patron_data", {})
+    # Loans are charged before patrons so the patron figure excludes them;
+    # the items they point to are already charged to the catalogue
+    charge("loans", [patron._loans for patron in patrons.values()])
+    charge("patrons", (patrons,))
+    for attribute, value in state.items():
+        charge(attribute.lstrip("_"), (value,))
+    for name, value in (extra or {}).items():
+        charge(name, (value,))
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sections": sections,
+        "total": sum(section["bytes"] for section in sections),
+        "peak_rss": _peak_rss(),
+        "tracemalloc": traced,
+    }
+
+
+def _peak_rss():
+    """Get the process's peak resident set size in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _traced(top):
+    """Summarise tracemalloc's current allocations by source file."""
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),))
+    return {
+        "current": current,
+        "peak": peak,
+        "by_file": [{"file": stat.traceback[0].filename, "bytes": stat.size,
+                     "blocks": stat.count}
+                    for stat in snapshot.statistics("filename")[:top]],
+    }
+
+
+def format_report(report):
+    """
+    Format a profile as a text table.
+
+    Args:
+        report: Dictionary from profile()
+
+    Returns:
+        str
+    """
+    total = report["total"] or 1
+    width = max([len("section")] + [len(section["name"]) for section in report["sections"]])
+    lines = [f"Memory report {report['timestamp']}",
+             f"{'section':<{width}} {'KiB':>12} {'share':>7} {'objects':>10}"]
+    for section in sorted(report["sections"], key=lambda entry: entry["bytes"], reverse=True):
+        lines.append(f"{section['name']:<{width}} {section['bytes'] / 1024:>12.1f} "
+                     f"{section['bytes'] / total:>7.1%} {section['objects']:>10}")
+    lines.append(f"{'total':<{width}} {report['total'] / 1024:>12.1f}")
+    if report["peak_rss"] is not None:
+        lines.append(f"peak RSS {report['peak_rss'] / 1024:.1f} KiB")
+    traced = report["tracemalloc"]
+    if traced is not None:
+        lines.append(f"traced {traced['current'] / 1024:.1f} KiB, "
+                     f"peak {traced['peak'] / 1024:.1f} KiB; largest allocators:")
+        for entry in traced["by_file"]:
+            lines.append(f"  {entry['bytes'] / 1024:>12.1f} KiB {entry['blocks']:>10} "
+                         f"blocks  {entry['file']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, directory=REPORTS_DIR):
+    """
+    Write a profile as text and JSON.
+
+    Args:
+        report: Dictionary from profile()
+        directory: Directory to write to
+
+    Returns:
+        str: Path of the text report; the JSON has the same name with .json
+    """
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, "memory-" + report["timestamp"].replace(":", ""))
+    with open(stem + ".txt", "w", encoding="utf-8") as file:
+        file.write(format_report(report))
+    with open(stem + ".json", "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    return stem + ".txt"
+
+
+def install_signal_handler(data_manager, signum=None, extra=None, directory=REPORTS_DIR):
+    """
+    Write a memory report whenever the process receives a signal.
+
+    Args:
+        data_manager: DataManager to account for
+        signum: Signal number (default: SIGUSR2)
+        extra: Dictionary of section name to other structures (optional)
+        directory: Directory to write reports to
+
+    Returns:
+        True if the handler was installed; False where the signal does not exist
+    """
+    # pylint: disable=import-outside-toplevel
+    # Only needed when a handler is installed
+    import signal
+
+    if signum is None:
+        signum = getattr(signal, "SIGUSR2", None)
+        if signum is None:
+            return False
+    signal.signal(signum, lambda _signum, _frame: print(
+        f"Memory report written to "
+        f"{write_report(profile(data_manager, extra), directory)}", file=sys.stderr))
+    return True
+
+
+def main(argv=None):
+    """
+    Load the data under tracemalloc and write a memory report.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    # pylint: disable=import-outside-toplevel
+    # The columnar store is only imported when asked for
+    from src.data_mgmt import DataManager
+
+    parser = argparse.ArgumentParser(description="Write a memory report for the BAT data")
+    parser.add_argument("--catalogue", default=config.CATALOGUE_FILE)
+    parser.add_argument("--patrons", default=config.PATRON_FILE)
+    parser.add_argument("--columnar", action="store_true", help="use the columnar patron store")
+    parser.add_argument("--top", type=int, default=10, help="allocating files to list")
+    parser.add_argument("--output-dir", default=REPORTS_DIR)
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    if args.columnar:
+        from src.columnar import ColumnarDataManager
+        data_manager = ColumnarDataManager()
+    else:
+        data_manager = DataManager()
+    data_manager.load_data(args.catalogue, args.patrons)
+    report = profile(data_manager, top=args.top)
+    tracemalloc.stop()
+
+    path = write_report(report, args.output_dir)
+    print(format_report(report), end="")
+    print(f"Written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Operation counters and latency histograms.
+
+enable() wraps the DataManager, search and BusinessLogic entry points in
+timing wrappers, and disable() puts the original functions back, so
+instrumentation costs nothing while it is off. Latencies are recorded in
+HDR-style log-linear histograms: fixed memory, and every recorded value
+is kept to within about 3% of its true value.
+
+A text dump is available from BatUI's metrics screen and, once
+install_signal_handler() has run, by sending the process SIGUSR1.
+"""
+import functools
+import signal
+import sys
+import threading
+import time
+from array import array
+
+# 2 ** SUB_BUCKET_BITS sub-buckets per power of two: about 3% precision
+SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = 2 * _SUB_BUCKETS
+# Values up to 2 ** 40 ns (about 18 minutes) get their own bucket
+_MAX_BITS = 40
+_BUCKETS = _LINEAR_LIMIT + (_MAX_BITS - SUB_BUCKET_BITS - 1) * _SUB_BUCKETS
+_SHIFT_OFFSET = SUB_BUCKET_BITS + 1
+
+
+def bucket_index(value):
+    """
+    Get the histogram bucket of a value.
+
+    Values below 64 have a bucket each; above that, every power of two is
+    split into 32 equal buckets.
+
+    Args:
+        value: Non-negative int
+
+    Returns:
+        int bucket index
+    """
+    if value < _LINEAR_LIMIT:
+        return max(value, 0)
+    # 64 + (shift - 1) * 32 + (value >> shift) - 32 simplifies to this
+    shift = value.bit_length() - _SHIFT_OFFSET
+    return min((shift << SUB_BUCKET_BITS) + (value >> shift), _BUCKETS - 1)
+
+
+def bucket_bounds(index):
+    """
+    Get the range of values in a bucket.
+
+    Args:
+        index: Bucket index
+
+    Returns:
+        tuple: (lowest value, highest value)
+    """
+    if index < _LINEAR_LIMIT:
+        return index, index
+    shift = (index - _LINEAR_LIMIT) // _SUB_BUCKETS + 1
+    top = (index - _LINEAR_LIMIT) % _SUB_BUCKETS + _SUB_BUCKETS
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in nanoseconds.
+    """
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self._lock = threading.Lock()
+        self._counts = array('q', bytes(8 * _BUCKETS))
+        self._total = 0
+        self._max = 0
+
+    @property
+    def count(self):
+        """Number of values recorded."""
+        return sum(self._counts)
+
+    def record(self, nanoseconds):
+        """
+        Record one latency.
+
+        Recording takes no lock, as it sits on the timed path: two threads
+        recording at the same instant can, rarely, lose one count.
+
+        Args:
+            nanoseconds: Latency in nanoseconds
+        """
+        if nanoseconds < _LINEAR_LIMIT:
+            self._counts[max(nanoseconds, 0)] += 1
+        else:
+            shift = nanoseconds.bit_length() - _SHIFT_OFFSET
+            self._counts[min((shift << SUB_BUCKET_BITS) + (nanoseconds >> shift),
+                             _BUCKETS - 1)] += 1
+        self._total += nanoseconds
+        if nanoseconds > self._max:
+            self._max = nanoseconds
+
+    def clear(self):
+        """Forget every recorded value."""
+        with self._lock:
+            self._counts = array('q', bytes(8 * _BUCKETS))
+            self._total = 0
+            self._max = 0
+
+    def merge(self, other):
+        """
+        Add another histogram's values to this one.
+
+        Args:
+            other: LatencyHistogram
+        """
+        with self._lock:
+            for index, count in enumerate(other._counts):
+                if count:
+                    self._counts[index] += count
+            self._total += other._total
+            self._max = max(self._max, other._max)
+
+    def percentile(self, percentile):
+        """
+        Get a latency percentile.
+
+        Args:
+            percentile: 0 to 100
+
+        Returns:
+            int: Highest value of the bucket holding the percentile, capped at
+            the largest value recorded; 0 if empty
+        """
+        return self._percentiles((percentile,))[0]
+
+    def _percentiles(self, percentiles):
+        """Get several percentiles in one pass over the buckets."""
+        with self._lock:
+            counts = self._counts.tolist()
+            largest = self._max
+        count = sum(counts)
+        if not count:
+            return [0] * len(percentiles)
+        ranks = sorted((max(1, -(-percentile * count // 100)), position)
+                       for position, percentile in enumerate(percentiles))
+        results = [largest] * len(percentiles)
+        seen = 0
+        next_rank = 0
+        for index, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while next_rank < len(ranks) and seen >= ranks[next_rank][0]:
+                if index < _BUCKETS - 1:
+                    results[ranks[next_rank][1]] = min(bucket_bounds(index)[1], largest)
+                next_rank += 1
+            if next_rank == len(ranks):
+                break
+        return results
+
+    def summary(self):
+        """
+        Summarise the histogram.
+
+        Returns:
+            Dictionary of count, mean, min, p50, p90, p99 and max in nanoseconds;
+            min is the lowest value of the lowest bucket used
+        """
+        with self._lock:
+            counts = self._counts.tolist()
+            total = self._total
+            largest = self._max
+        count = sum(counts)
+        lowest = next((index for index, value in enumerate(counts) if value), 0)
+        p50, p90, p99 = self._percentiles((50, 90, 99))
+        return {
+            "count": count,
+            "mean": total / count if count else 0,
+            "min": bucket_bounds(lowest)[0] if count else 0,
+            "p50": p50,
+            "p90": p90,
+            "p99": p99,
+            "max": largest,
+        }
+
+
+class Metrics:
+    """
+    Named latency histograms, one per operation.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        """
+        Get an operation's histogram, creating it the first time.
+
+        Args:
+            name: Operation name
+
+        Returns:
+            LatencyHistogram
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, name, nanoseconds):
+        """
+        Record a latency for an operation.
+
+        Args:
+            name: Operation name
+            nanoseconds: Latency in nanoseconds
+        """
+        self.histogram(name).record(nanoseconds)
+
+    def snapshot(self):
+        """
+        Summarise every operation that has recorded a latency.
+
+        Returns:
+            Dictionary of operation name to LatencyHistogram.summary()
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        snapshot = {}
+        for name, histogram in histograms:
+            summary = histogram.summary()
+            if summary["count"]:
+                snapshot[name] = summary
+        return snapshot
+
+    def reset(self):
+        """Forget every recorded latency."""
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.clear()
+
+    def format(self):
+        """
+        Format every operation as a text table, latencies in microseconds.
+
+        Returns:
+            str
+        """
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "No operations recorded.\n"
+        width = max(len("operation"), max(map(len, snapshot)))
+        lines = [f"{'operation':<{width}} {'count':>8} {'mean':>9} {'p50':>9} "
+                 f"{'p90':>9} {'p99':>9} {'max':>9}"]
+        for name, summary in snapshot.items():
+            lines.append(
+                f"{name:<{width}} {summary['count']:>8} " + " ".join(
+                    f"{summary[key] / 1000:>9.1f}"
+                    for key in ("mean", "p50", "p90", "p99", "max")
+                )
+            )
+        lines.append("(latencies in microseconds)")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+_installed = []
+
+
+def get_metrics():
+    """
+    Get the registry the instrumented entry points record to.
+
+    Returns:
+        Metrics
+    """
+    return _metrics
+
+
+def timed(name, function, metrics=None):
+    """
+    Wrap a function so every call records its latency.
+
+    Args:
+        name: Operation name to record under
+        function: Function to wrap
+        metrics: Metrics to record to (default: the shared registry)
+
+    Returns:
+        Wrapped function
+    """
+    registry = metrics if metrics is not None else _metrics
+    record = registry.histogram(name).record
+    clock = time.perf_counter_ns
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(clock() - start)
+
+    return wrapper
+
+
+def _entry_points():
+    """List (owner, attribute, operation name, is static) for every instrumented call."""
+    # pylint: disable=import-outside-toplevel,unused-import
+    # Imported here so the instrumented modules can themselves use metrics;
+    # columnar and storage are imported so their DataManager subclasses exist
+    from src import columnar, search, storage
+    from src.business_logic import BusinessLogic
+    from src.data_mgmt import DataManager
+
+    # Subclasses override some of these, so their own definitions are
+    # timed too, under their own names
+    managers = [DataManager]
+    for manager in managers:
+        managers.extend(manager.__subclasses__())
+    points = [(manager, name, f"{manager.__name__}.{name}", False)
+              for manager in managers
+              for name in ("load_data", "save_data", "add_patron", "get_patron", "get_item")
+              if name in manager.__dict__]
+    points += [(search, name, f"search.{name}", False)
+               for name in ("search_patron_by_name", "search_patron_by_id",
+                            "search_patron_by_age", "search_patron_by_name_and_age",
+                            "search_item_by_id")]
+    points += [(BusinessLogic, name, f"BusinessLogic.{name}", True)
+               for name in ("check_loan_allowed", "process_loan", "process_return",
+                            "process_payment", "check_makerspace_access")]
+    return points
+
+
+def is_enabled():
+    """True while the entry points are instrumented."""
+    return bool(_installed)
+
+
+def enable():
+    """
+    Instrument the DataManager, search and BusinessLogic entry points.
+    """
+    if _installed:
+        return
+    for owner, attribute, name, static in _entry_points():
+        original = owner.__dict__[attribute]
+        function = original.__func__ if static else original
+        wrapper = timed(name, function)
+        setattr(owner, attribute, staticmethod(wrapper) if static else wrapper)
+        _installed.append((owner, attribute, original))
+
+
+def disable():
+    """
+    Put the original entry points back; recorded latencies are kept.
+    """
+    while _installed:
+        owner, attribute, original = _installed.pop()
+        setattr(owner, attribute, original)
+
+
+def dump(file=None):
+    """
+    Write the metrics table.
+
+    Args:
+        file: Text file to write to (default: standard error)
+    """
+    file = file if file is not None else sys.stderr
+    file.write(_metrics.format())
+    file.flush()
+
+
+def install_signal_handler(signum=None, file=None):
+    """
+    Dump the metrics whenever the process receives a signal.
+
+    Args:
+        signum: Signal number (default: SIGUSR1)
+        file: Text file to write to (default: standard error)
+
+    Returns:
+        True if the handler was installed; False where the signal does not exist
+    """
+    if signum is None:
+        signum = getattr(signal, "SIGUSR1", None)
+        if signum is None:
+            return False
+    signal.signal(signum, lambda _signum, _frame: dump(file))
+    return True
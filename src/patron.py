@@ -1,17 +1,23 @@
 """
 Patron module for library system.
 """
-from datetime import datetime, timedelta
+from datetime import timedelta
+from src import clock
 from src.borrowable_item import BorrowableItem
 from src.loan import Loan
+from src.policy import get_policy
 
 
 class Patron:
     """
     Represents a library patron.
     """
+    __slots__ = (
+        "_id", "_name", "_age", "_outstanding_fees", "_gardening_tool_training",
+        "_carpentry_tool_training", "_makerspace_training", "_loans", "_version",
+    )
     # pylint: disable=too-many-instance-attributes
-    # Eight attributes are necessary for patron management
+    # Nine attributes are necessary for patron management
 
     def __init__(self, patron_id, name, age, outstanding_fees=0.0,
                  gardening_tool_training=False,
@@ -39,6 +45,7 @@ class Patron:
         self._carpentry_tool_training = carpentry_tool_training
         self._makerspace_training = makerspace_training
         self._loans = []
+        self._version = 0
 
     def get_type(self):
         """
@@ -61,7 +68,7 @@ class Patron:
             item: The BorrowableItem being loaned
             due_days: Number of days until due (default 14)
         """
-        due_date = datetime.now().date() + timedelta(days=due_days)
+        due_date = clock.today() + timedelta(days=due_days)
         loan = Loan(item, due_date)
         self._loans.append(loan)
         item._on_loan += 1
@@ -106,12 +113,13 @@ class Patron:
             Total overdue fees as float
         """
         total_fees = 0.0
-        today = datetime.now().date()
+        today = clock.today()
+        fee_per_day = get_policy().overdue_fee_per_day()
 
         for loan in self._loans:
             if loan._due_date < today:
                 days_overdue = (today - loan._due_date).days
-                total_fees += days_overdue * 1.0
+                total_fees += days_overdue * fee_per_day
 
         return total_fees
 
@@ -153,11 +161,12 @@ class Patron:
         Returns:
             Detailed string with patron info and loans
         """
-        result = str(self) + "\n"
-        if self._loans:
-            result += "  Current loans:\n"
-            for loan in self._loans:
-                result += f"    - {loan}\n"
-        else:
-            result += "  No current loans\n"
-        return result
+        with clock.operation():
+            lines = [str(self)]
+            if self._loans:
+                lines.append("  Current loans:")
+                lines.extend(f"    - {loan}" for loan in self._loans)
+            else:
+                lines.append("  No current loans")
+        lines.append("")
+        return "\n".join(lines)
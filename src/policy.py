@@ -0,0 +1,288 @@
+"""
+Loan policy: loan limits, loan periods, fee rates and item restrictions.
+
+The policy is built once into read-only lookup tables. The current policy
+can be replaced from a JSON policy file while the system is running; the
+swap is a single reference assignment, so callers see either the old
+policy or the new one, never a mixture.
+"""
+import json
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from src import config
+
+PATRON_TRAINING_FIELDS = frozenset({
+    "gardening_tool_training",
+    "carpentry_tool_training",
+    "makerspace_training",
+})
+
+ItemRule = namedtuple(
+    "ItemRule",
+    ["loan_period", "not_borrowable", "minor_restriction", "training_field", "training_reason"]
+)
+
+
+class LoanPolicy:
+    """
+    Immutable set of loan rules.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # Ten attributes are necessary to describe the loan rules
+
+    def __init__(self, max_loans, loan_periods, default_max_loans=config.MAX_LOANS,
+                 default_loan_period=14, overdue_fee_per_day=config.OVERDUE_FEE_PER_DAY,
+                 not_borrowable=None, minor_restrictions=None, training_required=None):
+        # pylint: disable=too-many-arguments
+        # Eight parameters are necessary for complete policy initialization
+        """
+        Initialize a LoanPolicy.
+
+        Args:
+            max_loans: Dictionary of patron type to maximum number of loans
+            loan_periods: Dictionary of item type to loan period in days
+            default_max_loans: Loan limit for patron types not listed
+            default_loan_period: Loan period for item types not listed
+            overdue_fee_per_day: Fee charged per day an item is overdue
+            not_borrowable: Dictionary of item type to refusal reason
+            minor_restrictions: Dictionary of item type to refusal reason for minors
+            training_required: Dictionary of item type to patron training field
+        """
+        self._max_loans = MappingProxyType(dict(max_loans))
+        self._loan_periods = MappingProxyType(dict(loan_periods))
+        self._default_max_loans = default_max_loans
+        self._default_loan_period = default_loan_period
+        self._overdue_fee_per_day = overdue_fee_per_day
+        self._not_borrowable = MappingProxyType(dict(not_borrowable or {}))
+        self._minor_restrictions = MappingProxyType(dict(minor_restrictions or {}))
+        self._training_required = MappingProxyType({
+            item_type: (f"_{field}", f"{item_type.capitalize()} training required")
+            for item_type, field in (training_required or {}).items()
+        })
+        self._default_rule = ItemRule(default_loan_period, None, None, None, None)
+        item_types = (set(self._loan_periods) | set(self._not_borrowable) |
+                      set(self._minor_restrictions) | set(self._training_required))
+        self._item_rules = MappingProxyType({
+            item_type: ItemRule(
+                self._loan_periods.get(item_type, default_loan_period),
+                self._not_borrowable.get(item_type),
+                self._minor_restrictions.get(item_type),
+                *self._training_required.get(item_type, (None, None))
+            )
+            for item_type in item_types
+        })
+
+    def max_loans(self, patron_type):
+        """
+        Get the loan limit for a patron type.
+
+        Args:
+            patron_type: Type of the patron
+
+        Returns:
+            int: Maximum number of concurrent loans
+        """
+        return self._max_loans.get(patron_type, self._default_max_loans)
+
+    def item_rule(self, item_type):
+        """
+        Get every rule for an item type in one lookup.
+
+        Args:
+            item_type: Type of the item
+
+        Returns:
+            ItemRule: loan period, refusal reasons and required training
+        """
+        return self._item_rules.get(item_type, self._default_rule)
+
+    def loan_period(self, item_type):
+        """
+        Get the loan period for an item type.
+
+        Args:
+            item_type: Type of the item
+
+        Returns:
+            int: Number of days for loan period
+        """
+        return self._item_rules.get(item_type, self._default_rule).loan_period
+
+    def overdue_fee_per_day(self):
+        """
+        Get the fee charged per overdue day.
+
+        Returns:
+            float: Fee per day
+        """
+        return self._overdue_fee_per_day
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a LoanPolicy from its policy file contents.
+
+        Args:
+            data: Dictionary decoded from a policy file
+
+        Returns:
+            LoanPolicy
+
+        Raises:
+            ValueError: If the policy is incomplete or invalid
+        """
+        try:
+            training = dict(data.get("training_required", {}))
+            unknown = set(training.values()) - PATRON_TRAINING_FIELDS
+            if unknown:
+                raise ValueError(f"Unknown training fields: {sorted(unknown)}")
+            policy = cls(
+                max_loans={key: int(value) for key, value in data["max_loans"].items()},
+                loan_periods={key: int(value) for key, value in data["loan_periods"].items()},
+                default_max_loans=int(data.get("default_max_loans", config.MAX_LOANS)),
+                default_loan_period=int(data.get("default_loan_period", 14)),
+                overdue_fee_per_day=float(
+                    data.get("overdue_fee_per_day", config.OVERDUE_FEE_PER_DAY)
+                ),
+                not_borrowable=dict(data.get("not_borrowable", {})),
+                minor_restrictions=dict(data.get("minor_restrictions", {})),
+                training_required=training,
+            )
+        except (KeyError, TypeError, AttributeError) as error:
+            raise ValueError(f"Invalid policy: {error}") from error
+        return policy
+
+    def to_dict(self):
+        """
+        Convert the policy to its policy file contents.
+
+        Returns:
+            Dictionary suitable for json.dump
+        """
+        return {
+            "max_loans": dict(self._max_loans),
+            "loan_periods": dict(self._loan_periods),
+            "default_max_loans": self._default_max_loans,
+            "default_loan_period": self._default_loan_period,
+            "overdue_fee_per_day": self._overdue_fee_per_day,
+            "not_borrowable": dict(self._not_borrowable),
+            "minor_restrictions": dict(self._minor_restrictions),
+            "training_required": {
+                item_type: field[1:]
+                for item_type, (field, _) in self._training_required.items()
+            },
+        }
+
+
+DEFAULT_POLICY = LoanPolicy(
+    max_loans={"Minor": 3, "Regular": 5, "Elderly": 10},
+    loan_periods={
+        "Fiction Book": 21,
+        "Non-Fiction Book": 21,
+        "Magazine": 7,
+        "DVD": 7,
+        "Laptop": 3,
+        "Study Room": 1,
+        "Gardening Tool": 14,
+        "Carpentry Tool": 14,
+    },
+    not_borrowable={"Reference Book": "Reference books cannot be borrowed"},
+    minor_restrictions={
+        "Gardening Tool": "Minors cannot borrow tools",
+        "Carpentry Tool": "Minors cannot borrow tools",
+    },
+    training_required={
+        "Gardening Tool": "gardening_tool_training",
+        "Carpentry Tool": "carpentry_tool_training",
+    },
+)
+
+_current_policy = DEFAULT_POLICY
+_policy_mtime = None
+_reload_lock = threading.Lock()
+
+
+def get_policy():
+    """
+    Get the policy currently in force.
+
+    Returns:
+        LoanPolicy
+    """
+    return _current_policy
+
+
+def set_policy(policy):
+    """
+    Put a policy in force.
+
+    Args:
+        policy: LoanPolicy to use from now on
+    """
+    global _current_policy  # pylint: disable=global-statement
+    _current_policy = policy
+
+
+def load_policy(path):
+    """
+    Read a policy file.
+
+    Args:
+        path: Path to a JSON policy file
+
+    Returns:
+        LoanPolicy
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is not a valid policy
+    """
+    with open(path, encoding="utf-8") as file:
+        return LoanPolicy.from_dict(json.load(file))
+
+
+def reload_policy(path=config.POLICY_FILE, missing_ok=False):
+    """
+    Replace the policy in force with the contents of a policy file.
+
+    If the file cannot be read or is invalid, the current policy stays in
+    force and the error is raised.
+
+    Args:
+        path: Path to a JSON policy file
+        missing_ok: Keep the current policy quietly if the file does not exist
+
+    Returns:
+        The LoanPolicy now in force
+    """
+    global _policy_mtime  # pylint: disable=global-statement
+    with _reload_lock:
+        if missing_ok and not os.path.exists(path):
+            return _current_policy
+        mtime = os.path.getmtime(path)
+        set_policy(load_policy(path))
+        _policy_mtime = mtime
+    return _current_policy
+
+
+def reload_policy_if_changed(path=config.POLICY_FILE):
+    """
+    Reload the policy file only if it changed since it was last loaded.
+
+    Args:
+        path: Path to a JSON policy file
+
+    Returns:
+        True if a new policy was put in force
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return False
+    if mtime == _policy_mtime:
+        return False
+    reload_policy(path)
+    return True
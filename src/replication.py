@@ -0,0 +1,340 @@
+"""
+Multi-branch replication by shipping circulation event logs.
+
+Every branch appends its own loans, returns and payments to a log file in
+a directory shared by all branches (<branch>.events.jsonl), one JSON line
+per event. Each branch then reads the other branches' logs from where it
+left off and applies the new events to its own data, so catalogue
+on_loan counts, patron loans and fees converge. Only the new lines of
+each log are read, and a log is only ever written by its own branch.
+
+Each event carries the sequence numbers of the other branches' events its
+branch had applied when it was logged (a vector clock). An event is only
+applied once everything it depends on has been, so a return logged at
+one branch is never applied elsewhere before the loan it ends. Events
+that are ready are applied branch by branch in name order, which makes
+the result the same on every branch.
+
+A return names the loan it ends by item and due date. A loan returned at
+two branches at once is a conflict this does not resolve, so a loan
+should only be returned at one branch, as a physical copy would be.
+Payments applied from another branch are not clamped at zero, so two
+branches taking payment of the same fee leave the same credit everywhere.
+
+Replicated events change the data directly and are not published on the
+local event bus.
+
+A branch's own changes are logged as they are made, but its data files
+are only written when it saves. A branch that crashes, or discards its
+changes, before saving has logged changes its own data no longer holds:
+the other branches apply them and this branch never does, so the
+branches diverge. BAT therefore refuses --no-save with --shared-dir; after
+a crash, restore the lost changes by hand before carrying on.
+"""
+import json
+import os
+import threading
+from collections import deque
+from datetime import date
+
+from src.events import LoanEvent, PaymentEvent, ReturnEvent, get_event_bus
+from src.loan import Loan
+
+LOG_SUFFIX = ".events.jsonl"
+STATE_SUFFIX = ".state.json"
+# Enough to hold the last line of a log when recovering its sequence number
+_TAIL_SIZE = 1 << 16
+
+
+def _recover_log(path):
+    """
+    Get the last sequence number in a log, dropping a half-written last line.
+
+    Args:
+        path: Log file
+
+    Returns:
+        int: Sequence number of the last complete event, 0 for a new log
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as file:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(max(0, size - _TAIL_SIZE))
+        tail = file.read()
+        end = tail.rfind(b"\n") + 1
+        if end < len(tail):
+            # A crash while appending leaves a partial line; later appends
+            # would run on from it
+            file.truncate(size - len(tail) + end)
+        lines = tail[:end].splitlines()
+        return json.loads(lines[-1])["seq"] if lines else 0
+
+
+class Replicator:
+    """
+    Publishes this branch's events and applies every other branch's.
+    """
+    # pylint: disable=too-many-instance-attributes
+    # Per-branch read positions, queues and applied sequence numbers
+
+    def __init__(self, data_manager, shared_dir, branch, state_file=None):
+        """
+        Initialize the replicator.
+
+        Args:
+            data_manager: This branch's DataManager
+            shared_dir: Directory holding every branch's log
+            branch: Name of this branch, unique among the branches
+            state_file: Where this branch records how far it has applied
+                each log (default: <shared_dir>/<branch>.state.json)
+        """
+        self.data_manager = data_manager
+        self.branch = branch
+        self._shared_dir = shared_dir
+        self._state_file = state_file or os.path.join(shared_dir, branch + STATE_SUFFIX)
+        self._log_path = os.path.join(shared_dir, branch + LOG_SUFFIX)
+        # Desks log events while holding patron and item locks, and polls
+        # take those locks to apply events, so the two never share a lock
+        self._log_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._event_bus = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        os.makedirs(shared_dir, exist_ok=True)
+        self._sequence = _recover_log(self._log_path)
+        # Per other branch: sequence applied, byte offset after it, offset
+        # read up to and events read but not yet applied
+        self._applied = {}
+        self._offsets = {}
+        self._read_offsets = {}
+        self._pending = {}
+        if os.path.exists(self._state_file):
+            with open(self._state_file, encoding="utf-8") as file:
+                for name, state in json.load(file)["applied"].items():
+                    self._applied[name] = state["seq"]
+                    self._offsets[name] = self._read_offsets[name] = state["offset"]
+
+    def attach(self, event_bus=None):
+        """
+        Start logging this branch's events.
+
+        Args:
+            event_bus: EventBus to subscribe to (default: the BusinessLogic bus)
+        """
+        self._event_bus = event_bus if event_bus is not None else get_event_bus()
+        self._event_bus.subscribe(LoanEvent, self.on_loan)
+        self._event_bus.subscribe(ReturnEvent, self.on_return)
+        self._event_bus.subscribe(PaymentEvent, self.on_payment)
+
+    def detach(self):
+        """Stop logging this branch's events."""
+        if self._event_bus is None:
+            return
+        self._event_bus.unsubscribe(LoanEvent, self.on_loan)
+        self._event_bus.unsubscribe(ReturnEvent, self.on_return)
+        self._event_bus.unsubscribe(PaymentEvent, self.on_payment)
+        self._event_bus = None
+
+    def vector_clock(self):
+        """
+        Get how many events of each branch this branch has.
+
+        Returns:
+            Dictionary of branch name to sequence number
+        """
+        with self._log_lock:
+            clock = {name: seq for name, seq in dict(self._applied).items() if seq}
+            clock[self.branch] = self._sequence
+            return clock
+
+    def _append(self, record):
+        """Log one of this branch's events."""
+        with self._log_lock:
+            self._sequence += 1
+            record["seq"] = self._sequence
+            record["clock"] = {name: seq for name, seq in dict(self._applied).items() if seq}
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            with open(self._log_path, "a", encoding="utf-8") as file:
+                file.write(line)
+
+    def on_loan(self, event):
+        """
+        Log a loan.
+
+        Args:
+            event: LoanEvent
+        """
+        self._append({"type": "loan", "patron": event.patron._id, "item": event.item._id,
+                      "due": event.due_date.isoformat()})
+
+    def on_return(self, event):
+        """
+        Log a return and the overdue fee charged.
+
+        Args:
+            event: ReturnEvent
+        """
+        self._append({"type": "return", "patron": event.patron._id, "item": event.item._id,
+                      "due": event.due_date.isoformat(), "fee": event.fee})
+
+    def on_payment(self, event):
+        """
+        Log a fee payment.
+
+        Args:
+            event: PaymentEvent
+        """
+        self._append({"type": "payment", "patron": event.patron._id, "amount": event.amount})
+
+    def _read_new(self):
+        """Queue the complete lines appended to the other branches' logs."""
+        for name in os.listdir(self._shared_dir):
+            if not name.endswith(LOG_SUFFIX):
+                continue
+            branch = name[:-len(LOG_SUFFIX)]
+            if branch == self.branch:
+                continue
+            offset = self._read_offsets.get(branch, 0)
+            with open(os.path.join(self._shared_dir, name), "rb") as file:
+                file.seek(offset)
+                data = file.read()
+            end = data.rfind(b"\n") + 1
+            queue = self._pending.setdefault(branch, deque())
+            for line in data[:end].splitlines(keepends=True):
+                offset += len(line)
+                queue.append((offset, json.loads(line)))
+            self._read_offsets[branch] = offset
+
+    def _ready(self, record):
+        """True once every event a record depends on has been applied here."""
+        for branch, seq in record["clock"].items():
+            have = self._sequence if branch == self.branch else self._applied.get(branch, 0)
+            if have < seq:
+                return False
+        return True
+
+    def poll(self):
+        """
+        Apply every event the other branches have logged since the last poll.
+
+        Events whose dependencies have not arrived yet stay queued for a
+        later poll.
+
+        Returns:
+            tuple: (events applied, events skipped because the patron or
+            item is unknown here or the loan being returned is missing)
+        """
+        applied = skipped = 0
+        with self._poll_lock:
+            self._read_new()
+            progress = True
+            while progress:
+                progress = False
+                for branch in sorted(self._pending):
+                    queue = self._pending[branch]
+                    while queue and self._ready(queue[0][1]):
+                        offset, record = queue.popleft()
+                        if self._apply(branch, record):
+                            applied += 1
+                        else:
+                            skipped += 1
+                        self._offsets[branch] = offset
+                        progress = True
+        return applied, skipped
+
+    def _apply(self, branch, record):
+        """
+        Apply another branch's event to this branch's data.
+
+        The event is counted as applied before its patron and item are
+        unlocked, so any local event that sees its effect depends on it.
+
+        Returns:
+            False if the event could not be applied
+        """
+        patron = self.data_manager.get_patron(record["patron"])
+        item = None if record["type"] == "payment" else self.data_manager.get_item(
+            record["item"])
+        if patron is None or (item is None and record["type"] != "payment"):
+            self._applied[branch] = record["seq"]
+            return False
+
+        item_ids = () if item is None else (item._id,)
+        with self.data_manager.get_lock_manager().hold((patron._id,), item_ids):
+            self._applied[branch] = record["seq"]
+            if record["type"] == "payment":
+                # Not clamped at zero like pay_fee: concurrent payments at two
+                # branches must leave the same balance everywhere
+                patron._outstanding_fees -= record["amount"]
+            elif record["type"] == "loan":
+                patron._loans.append(Loan(item, date.fromisoformat(record["due"])))
+                item._on_loan += 1
+            else:
+                return self._apply_return(patron, item, record)
+        return True
+
+    @staticmethod
+    def _apply_return(patron, item, record):
+        """
+        End the loan a return event names and charge its fee.
+
+        The loan is matched on due date as well as item, so a patron lent
+        the same item at two branches at once loses the same loan everywhere.
+
+        Returns:
+            False if the patron has no such loan
+        """
+        due_date = date.fromisoformat(record["due"])
+        for loan in patron._loans:
+            if loan._item is item and loan._due_date == due_date:
+                patron._loans.remove(loan)
+                item._on_loan -= 1
+                if record["fee"] > 0:
+                    patron.add_fee(record["fee"])
+                return True
+        return False
+
+    def checkpoint(self):
+        """
+        Record how far each log has been applied.
+
+        Call this after the data holding the applied events has been
+        saved, so a restart neither loses nor repeats an event.
+        """
+        with self._poll_lock:
+            state = {"applied": {branch: {"seq": self._applied[branch],
+                                          "offset": self._offsets[branch]}
+                                 for branch in sorted(self._applied)}}
+        temp_path = f"{self._state_file}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+        os.replace(temp_path, self._state_file)
+
+    def start(self, interval=1.0):
+        """
+        Poll in a background thread.
+
+        Args:
+            interval: Seconds between polls
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.poll()
+
+        self._thread = threading.Thread(target=run, name=f"replicator-{self.branch}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread, if running."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
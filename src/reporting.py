@@ -0,0 +1,346 @@
+"""
+Streaming reports of patrons, loans and catalogue items.
+
+Reports are written row by row in batches through a buffered writer, so
+memory use does not grow with the number of patrons unless the report is
+sorted by a field with no index. Sorting a ColumnarDataManager by ID, age
+or fees sorts the column arrays instead of patron objects.
+
+Usage:
+    python -m src.reporting patrons --format csv --columns patron_id,name,age
+    python -m src.reporting loans --sort days_overdue --descending -o loans.jsonl
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from operator import attrgetter, itemgetter
+
+from src import clock
+from src.data_mgmt import DataManager
+
+BATCH_SIZE = 1000
+BUFFER_SIZE = 1 << 16
+
+Column = namedtuple("Column", ["title", "spec", "value"])
+
+
+PATRON_COLUMNS = {
+    "patron_id": Column("ID", ">8", attrgetter("_id")),
+    "name": Column("Name", "<24", attrgetter("_name")),
+    "age": Column("Age", ">4", attrgetter("_age")),
+    "type": Column("Type", "<8", lambda patron: patron.get_type()),
+    "loans": Column("Loans", ">5", lambda patron: len(patron._loans)),
+    "outstanding_fees": Column("Fees", ">9.2f", attrgetter("_outstanding_fees")),
+    "overdue_fees": Column("Overdue", ">9.2f", lambda patron: patron.calculate_overdue_fees()),
+}
+
+# Loan report records are the tuples built by _loan_records
+LOAN_COLUMNS = {
+    "patron_id": Column("Patron", ">8", itemgetter(0)),
+    "patron_name": Column("Patron name", "<24", itemgetter(1)),
+    "item_id": Column("Item", ">8", itemgetter(2)),
+    "item_name": Column("Item name", "<30", itemgetter(3)),
+    "due": Column("Due", "<10", itemgetter(4)),
+    "days_overdue": Column("Overdue", ">7", itemgetter(5)),
+}
+
+ITEM_COLUMNS = {
+    "item_id": Column("ID", ">8", attrgetter("_id")),
+    "name": Column("Name", "<30", attrgetter("_name")),
+    "type": Column("Type", "<16", attrgetter("_type")),
+    "year": Column("Year", ">4", attrgetter("_year")),
+    "copies": Column("Copies", ">6", attrgetter("_num_copies")),
+    "on_loan": Column("On loan", ">7", attrgetter("_on_loan")),
+    "available": Column("Free", ">4", lambda item: item._num_copies - item._on_loan),
+    "location": Column("Location", "<16", attrgetter("_location")),
+}
+
+REPORT_COLUMNS = {
+    "patrons": PATRON_COLUMNS,
+    "loans": LOAN_COLUMNS,
+    "items": ITEM_COLUMNS,
+}
+
+
+class TextFormat:
+    """
+    Fixed-width text columns with a header and rule.
+
+    Each row is formatted with one template built from the column specs.
+    """
+
+    def __init__(self, out, columns):
+        """
+        Initialize the format.
+
+        Args:
+            out: Text file to write to
+            columns: List of Column objects being written
+        """
+        self._out = out
+        self._specs = [column.spec for column in columns]
+        self._widths = [int(column.spec[1:].split(".")[0]) for column in columns]
+        self._template = " ".join(f"{{:{spec}}}" for spec in self._specs) + "\n"
+        self._header = " ".join(
+            f"{column.title:{column.spec[0]}{width}}"
+            for column, width in zip(columns, self._widths)
+        ) + "\n"
+
+    def write_header(self):
+        """Write the column titles."""
+        self._out.write(self._header)
+        self._out.write(" ".join("-" * width for width in self._widths) + "\n")
+
+    def write_rows(self, rows):
+        """
+        Write a batch of rows.
+
+        Args:
+            rows: List of value tuples
+        """
+        template = self._template
+        try:
+            self._out.write("".join([template.format(*row) for row in rows]))
+        except (TypeError, ValueError):
+            self._out.write("".join(map(self._line, rows)))
+
+    def _line(self, values):
+        """Format one row of values whose types do not match their specs."""
+        cells = []
+        for value, spec, width in zip(values, self._specs, self._widths):
+            try:
+                cells.append(format(value, spec))
+            except (TypeError, ValueError):
+                cells.append(format("" if value is None else str(value), f"{spec[0]}{width}"))
+        return " ".join(cells) + "\n"
+
+
+class CsvFormat:
+    """
+    Comma-separated values with a header row.
+    """
+
+    def __init__(self, out, names):
+        """
+        Initialize the format.
+
+        Args:
+            out: Text file to write to
+            names: Field names of the columns being written
+        """
+        self._writer = csv.writer(out, lineterminator="\n")
+        self._names = names
+
+    def write_header(self):
+        """Write the field names."""
+        self._writer.writerow(self._names)
+
+    def write_rows(self, rows):
+        """
+        Write a batch of rows.
+
+        Args:
+            rows: List of value tuples
+        """
+        self._writer.writerows(rows)
+
+
+class JsonlFormat:
+    """
+    One JSON object per line, keyed by field name.
+    """
+
+    def __init__(self, out, names):
+        """
+        Initialize the format.
+
+        Args:
+            out: Text file to write to
+            names: Field names of the columns being written
+        """
+        self._out = out
+        self._names = names
+
+    def write_header(self):
+        """JSON lines have no header."""
+
+    def write_rows(self, rows):
+        """
+        Write a batch of rows.
+
+        Args:
+            rows: List of value tuples
+        """
+        names = self._names
+        self._out.write("".join(json.dumps(dict(zip(names, row))) + "\n" for row in rows))
+
+
+FORMATS = ("text", "csv", "jsonl")
+
+
+def _make_format(output_format, out, columns, names):
+    """Create the writer for an output format."""
+    if output_format == "text":
+        return TextFormat(out, columns)
+    if output_format == "csv":
+        return CsvFormat(out, names)
+    if output_format == "jsonl":
+        return JsonlFormat(out, names)
+    raise ValueError(f"Unknown format: {output_format}")
+
+
+def _sorted_patrons(data_manager, sort_by, descending):
+    """
+    Iterate over patrons in report order.
+
+    Uses the columnar store's arrays when the data manager has one and the
+    field is a column; otherwise sorts the patrons in memory.
+    """
+    if sort_by is None:
+        return data_manager.iter_patrons()
+    if hasattr(data_manager, "get_patron_store"):
+        store = data_manager.get_patron_store()
+        rows = store.sorted_rows(sort_by, descending)
+        if rows is not None:
+            return map(store.view, rows)
+    key = PATRON_COLUMNS[sort_by].value
+    return iter(sorted(data_manager.iter_patrons(), key=key, reverse=descending))
+
+
+def _loan_records(data_manager):
+    """
+    Iterate over every loan as a flat record.
+
+    Loans share a small set of due dates, so each date is formatted once.
+
+    Yields:
+        tuple: (patron ID, patron name, item ID, item name, ISO due date, days overdue)
+    """
+    today = clock.today()
+    due_text = {}
+    for patron in data_manager.iter_patrons():
+        for loan in patron._loans:
+            item = loan._item
+            due = loan._due_date
+            text = due_text.get(due)
+            if text is None:
+                text = due_text[due] = due.isoformat()
+            yield (patron._id, patron._name, item._id, item._name, text,
+                   (today - due).days if due < today else 0)
+
+
+def _report_rows(data_manager, report, sort_by, descending):
+    """Iterate over the records of a report in order."""
+    if report == "patrons":
+        return _sorted_patrons(data_manager, sort_by, descending)
+    if report == "loans":
+        rows = _loan_records(data_manager)
+    else:
+        rows = data_manager.iter_items()
+    if sort_by is None:
+        return rows
+    key = REPORT_COLUMNS[report][sort_by].value
+    return iter(sorted(rows, key=key, reverse=descending))
+
+
+def write_report(data_manager, out, report="patrons", output_format="text",
+                 columns=None, sort_by=None, descending=False):
+    # pylint: disable=too-many-arguments,too-many-locals
+    # Report options are independent and all are needed here
+    """
+    Write a report.
+
+    Args:
+        data_manager: DataManager holding the patrons and catalogue
+        out: Text file to write to
+        report: "patrons", "loans" or "items"
+        output_format: "text", "csv" or "jsonl"
+        columns: List of field names to include (default: all)
+        sort_by: Field name to sort by (default: storage order)
+        descending: Sort largest first
+
+    Returns:
+        int: Number of rows written
+
+    Raises:
+        ValueError: If the report, format, a column or the sort field is unknown
+    """
+    if report not in REPORT_COLUMNS:
+        raise ValueError(f"Unknown report: {report}")
+    available = REPORT_COLUMNS[report]
+    names = list(columns) if columns else list(available)
+    unknown = [name for name in names + ([sort_by] if sort_by else []) if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown {report} columns: {', '.join(unknown)}")
+    selected = [available[name] for name in names]
+    getters = [column.value for column in selected]
+    writer = _make_format(output_format, out, selected, names)
+
+    count = 0
+    with clock.operation():
+        writer.write_header()
+        records = _report_rows(data_manager, report, sort_by, descending)
+        while True:
+            chunk = list(islice(records, BATCH_SIZE))
+            if not chunk:
+                break
+            # Extract a column at a time; zip reassembles the rows
+            writer.write_rows(list(zip(*[map(getter, chunk) for getter in getters])))
+            count += len(chunk)
+    return count
+
+
+@contextmanager
+def open_output(path=None):
+    """
+    Open a buffered text output for a report.
+
+    Args:
+        path: File to write, or None or "-" for standard output
+
+    Yields:
+        Text file; standard output is flushed rather than closed
+    """
+    if path in (None, "-"):
+        try:
+            yield sys.stdout
+        finally:
+            sys.stdout.flush()
+        return
+    with open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as file:
+        yield file
+
+
+def main(argv=None):
+    """
+    Write a report of the saved data.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="BAT reports")
+    parser.add_argument("report", choices=sorted(REPORT_COLUMNS))
+    parser.add_argument("--format", dest="output_format", choices=FORMATS, default="text")
+    parser.add_argument("--columns", help="comma-separated field names")
+    parser.add_argument("--sort", dest="sort_by", help="field name to sort by")
+    parser.add_argument("--descending", action="store_true")
+    parser.add_argument("-o", "--output", help="file to write (default: standard output)")
+    args = parser.parse_args(argv)
+
+    data_manager = DataManager()
+    data_manager.load_data()
+    columns = args.columns.split(",") if args.columns else None
+    with open_output(args.output) as out:
+        try:
+            write_report(data_manager, out, args.report, args.output_format,
+                         columns, args.sort_by, args.descending)
+        except ValueError as error:
+            parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
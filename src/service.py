@@ -0,0 +1,348 @@
+"""
+Long-running circulation service for the BAT system.
+
+Clients send one JSON object per line and receive one JSON object per line
+in reply, over TCP or a Unix socket. Every request carries an "op" and may
+carry an "id", which is echoed back so clients can match replies.
+
+Supported operations:
+    ping
+    search      by=name|id|age|name_and_age, name, age, patron_id
+    borrow      patron_id, item_id
+    return      patron_id, item_id
+    hold        patron_id, item_id
+    pay         patron_id, amount
+    makerspace  patron_id
+    reload_policy
+    save
+
+Sending SIGHUP to the service also reloads the policy file. While it runs,
+the service samples every item's copies on loan once an hour into a
+utilisation history, saved after each sample (see src.utilisation).
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+from src import config, search
+from src.access import MakerspaceAccessIndex
+from src.business_logic import BusinessLogic
+from src.columnar import ColumnarDataManager
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, patron_to_record
+from src.holds import HoldQueues
+from src.policy import reload_policy
+from src.utilisation import UtilisationHistory
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# How often the sampler checks whether the hour's utilisation sample is due
+SAMPLE_CHECK_SECONDS = 60
+
+
+class RequestError(Exception):
+    """Raised when a request is malformed."""
+
+
+def _field(request, name, kind):
+    """
+    Read a required field from a request.
+
+    Args:
+        request: Decoded request dictionary
+        name: Name of the field
+        kind: Type the field is converted to
+
+    Returns:
+        The converted field value
+    """
+    if name not in request:
+        raise RequestError(f"Missing field: {name}")
+    try:
+        return kind(request[name])
+    except (TypeError, ValueError, OverflowError) as error:
+        raise RequestError(f"Invalid value for {name}") from error
+
+
+class CirculationServer:
+    """
+    Serves search, loan, return, payment and makerspace requests.
+    """
+
+    def __init__(self, data_manager, business_logic=BusinessLogic):
+        """
+        Initialize the server.
+
+        Args:
+            data_manager: Loaded DataManager shared by all clients
+            business_logic: BusinessLogic used to apply the rules
+        """
+        self.data_manager = data_manager
+        self.business_logic = business_logic
+        self.holds = HoldQueues(data_manager.get_patron, business_logic)
+        self.access_index = MakerspaceAccessIndex(data_manager.get_all_patrons())
+        self._circulation = Circulation(data_manager, business_logic, self.holds,
+                                        self.access_index)
+        self.utilisation = UtilisationHistory(data_manager)
+        self._handlers = {
+            "ping": self._ping,
+            "search": self._search,
+            "borrow": self._borrow,
+            "return": self._return,
+            "hold": self._hold,
+            "pay": self._pay,
+            "makerspace": self._makerspace,
+            "reload_policy": self._reload_policy,
+            "save": self._save,
+        }
+        self._server = None
+
+    def dispatch(self, request):
+        """
+        Handle one decoded request.
+
+        Every request gets a reply: a request the handlers cannot serve is
+        answered with "ok" false rather than raising.
+
+        Args:
+            request: Decoded request dictionary
+
+        Returns:
+            Reply dictionary
+        """
+        if not isinstance(request, dict):
+            return {"ok": False, "message": "Request must be a JSON object"}
+        op = request.get("op")
+        handler = self._handlers.get(op) if isinstance(op, str) else None
+        if handler is None:
+            reply = {"ok": False, "message": f"Unknown op: {op}"}
+        else:
+            try:
+                reply = handler(request)
+            except RequestError as error:
+                reply = {"ok": False, "message": str(error)}
+            except Exception as error:  # pylint: disable=broad-except
+                # One bad request must not end the client's connection
+                reply = {"ok": False, "message": f"Request failed: {error!r}"}
+        if "id" in request:
+            reply["id"] = request["id"]
+        return reply
+
+    def handle_line(self, line):
+        """
+        Handle one encoded request line.
+
+        Args:
+            line: Bytes holding one JSON request
+
+        Returns:
+            Bytes holding the JSON reply, newline terminated
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            reply = {"ok": False, "message": "Invalid JSON"}
+        else:
+            reply = self.dispatch(request)
+        return json.dumps(reply).encode() + b"\n"
+
+    async def handle_client(self, reader, writer):
+        """
+        Serve requests from one connection until it closes.
+
+        Args:
+            reader: asyncio.StreamReader for the connection
+            writer: asyncio.StreamWriter for the connection
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(self.handle_line(line))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """
+        Start listening for clients.
+
+        Args:
+            host: Host to bind for TCP
+            port: Port to bind for TCP (0 picks a free port)
+            unix_path: Path of a Unix socket to use instead of TCP
+
+        Returns:
+            The asyncio server
+        """
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            self._server = await asyncio.start_server(
+                self.handle_client, host, port, backlog=4096
+            )
+        return self._server
+
+    def get_port(self):
+        """Get the TCP port the server is bound to."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Serve clients until cancelled."""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def sample_utilisation(self, path=None, interval=SAMPLE_CHECK_SECONDS):
+        """
+        Sample item utilisation once an hour until cancelled.
+
+        Args:
+            path: File the history is saved to after each sample (optional)
+            interval: Seconds between checks for a due sample
+        """
+        while True:
+            if self.utilisation.sample_if_due() and path:
+                try:
+                    self.utilisation.save(path)
+                except OSError as error:
+                    print(f"Utilisation history not saved: {error}")
+            await asyncio.sleep(interval)
+
+    def _ping(self, _request):
+        """Reply to a liveness check."""
+        return {"ok": True, "message": "pong"}
+
+    def _search(self, request):
+        """Search for patrons."""
+        by = request.get("by", "name")
+        if by == "id":
+            patron = self.data_manager.get_patron(_field(request, "patron_id", int))
+            patrons = [patron] if patron else []
+        elif by == "name":
+            patron = search.search_patron_by_name(
+                self.data_manager.get_all_patrons(), _field(request, "name", str)
+            )
+            patrons = [patron] if patron else []
+        elif by == "age":
+            patrons = search.search_patron_by_age(
+                self.data_manager.get_all_patrons(), _field(request, "age", int)
+            )
+        elif by == "name_and_age":
+            patrons = search.search_patron_by_name_and_age(
+                self.data_manager.get_all_patrons(),
+                _field(request, "name", str),
+                _field(request, "age", int),
+            )
+        else:
+            raise RequestError(f"Unknown search: {by}")
+        return {"ok": True, "patrons": [patron_to_record(patron) for patron in patrons]}
+
+    def _borrow(self, request):
+        """Loan an item to a patron."""
+        success, message = self._circulation.loan(
+            _field(request, "patron_id", int), _field(request, "item_id", int)
+        )
+        return {"ok": success, "message": message}
+
+    def _return(self, request):
+        """Return an item from a patron."""
+        success, message, fees = self._circulation.return_item(
+            _field(request, "patron_id", int), _field(request, "item_id", int)
+        )
+        return {"ok": success, "message": message, "fees": fees}
+
+    def _hold(self, request):
+        """Join the hold queue for an item."""
+        success, message = self._circulation.place_hold(
+            _field(request, "patron_id", int), _field(request, "item_id", int)
+        )
+        return {"ok": success, "message": message}
+
+    def _pay(self, request):
+        """Pay some of a patron's fees."""
+        success, message, remaining = self._circulation.pay_fee(
+            _field(request, "patron_id", int), _field(request, "amount", float)
+        )
+        return {"ok": success, "message": message, "remaining": remaining}
+
+    def _makerspace(self, request):
+        """Check whether a patron may enter the makerspace."""
+        allowed, message = self.access_index.check(_field(request, "patron_id", int))
+        return {"ok": allowed, "message": message}
+
+    def _reload_policy(self, _request):
+        """Put the policy file's current contents in force."""
+        try:
+            reload_policy()
+        except (OSError, ValueError) as error:
+            return {"ok": False, "message": f"Policy not reloaded: {error}"}
+        return {"ok": True, "message": "Policy reloaded"}
+
+    def _save(self, _request):
+        """Write the current data back to disk."""
+        self.data_manager.save_data()
+        return {"ok": True, "message": "Data saved"}
+
+
+async def serve(data_manager, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None,
+                utilisation_file=config.UTILISATION_FILE):
+    """
+    Run a CirculationServer until cancelled, saving data on the way out.
+
+    Args:
+        data_manager: Loaded DataManager
+        host: Host to bind for TCP
+        port: Port to bind for TCP
+        unix_path: Path of a Unix socket to use instead of TCP
+        utilisation_file: File the utilisation history is kept in
+    """
+    server = CirculationServer(data_manager)
+    if os.path.exists(utilisation_file):
+        try:
+            server.utilisation.load(utilisation_file)
+        except (OSError, ValueError) as error:
+            print(f"Utilisation history not loaded: {error}")
+    await server.start(host, port, unix_path)
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, lambda: print(server.dispatch({"op": "reload_policy"})["message"])
+        )
+    print(f"BAT service listening on {unix_path or f'{host}:{server.get_port()}'}")
+    sampler = asyncio.create_task(server.sample_utilisation(utilisation_file))
+    try:
+        await server.serve_forever()
+    finally:
+        sampler.cancel()
+        data_manager.save_data()
+
+
+def main():
+    """
+    Load the data once and serve it until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="BAT circulation service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", dest="unix_path", help="serve on a Unix socket instead")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep patrons in the columnar (struct-of-arrays) store")
+    args = parser.parse_args()
+
+    reload_policy(missing_ok=True)
+    data_manager = ColumnarDataManager() if args.columnar else DataManager()
+    data_manager.load_data()
+    try:
+        asyncio.run(serve(data_manager, args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        print("Data saved. Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Thin blocking client for the BAT circulation service.
+"""
+import json
+import socket
+
+from src.service import DEFAULT_HOST, DEFAULT_PORT
+
+
+class ServiceClient:
+    """
+    Sends requests to a running CirculationServer over one connection.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, timeout=10.0):
+        """
+        Connect to the service.
+
+        Args:
+            host: Service host for TCP
+            port: Service port for TCP
+            unix_path: Path of the service's Unix socket, used instead of TCP
+            timeout: Socket timeout in seconds
+        """
+        if unix_path:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(unix_path)
+        else:
+            self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, op, **fields):
+        """
+        Send one request and wait for its reply.
+
+        Args:
+            op: Name of the operation
+            **fields: Operation arguments
+
+        Returns:
+            Reply dictionary
+        """
+        self._next_id += 1
+        fields["op"] = op
+        fields["id"] = self._next_id
+        self._file.write(json.dumps(fields).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Service closed the connection")
+        return json.loads(line)
+
+    def search_by_name(self, name):
+        """Search for a patron by name."""
+        return self.request("search", by="name", name=name)
+
+    def search_by_id(self, patron_id):
+        """Search for a patron by ID."""
+        return self.request("search", by="id", patron_id=patron_id)
+
+    def search_by_age(self, age):
+        """Search for patrons by age."""
+        return self.request("search", by="age", age=age)
+
+    def borrow(self, patron_id, item_id):
+        """Loan an item to a patron."""
+        return self.request("borrow", patron_id=patron_id, item_id=item_id)
+
+    def return_item(self, patron_id, item_id):
+        """Return an item from a patron."""
+        return self.request("return", patron_id=patron_id, item_id=item_id)
+
+    def pay(self, patron_id, amount):
+        """Pay some of a patron's fees."""
+        return self.request("pay", patron_id=patron_id, amount=amount)
+
+    def makerspace(self, patron_id):
+        """Check a patron's makerspace access."""
+        return self.request("makerspace", patron_id=patron_id)
+
+    def close(self):
+        """Close the connection."""
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
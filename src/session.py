@@ -0,0 +1,216 @@
+"""
+Recording and replaying desk sessions.
+
+RecordingSource captures every line typed at a BatUI session to a JSON
+lines file, one {"prompt": ..., "input": ...} record per line. replay()
+pushes recorded sessions through many BatUI instances at once, each on
+its own thread with its own input source, against one shared DataManager,
+and measures how many inputs per second the UI-to-business-logic path
+sustains.
+"""
+import io
+import json
+import queue
+import sys
+import threading
+import time
+
+from src import user_input
+from src.bat_ui import BatUI
+from src.business_logic import BusinessLogic
+
+
+class RecordingSource:
+    """
+    Input source that records every line read to a session file.
+    """
+
+    def __init__(self, file, source=None):
+        """
+        Initialize the recorder.
+
+        Args:
+            file: Text file to append records to
+            source: Input source to record (default: input())
+        """
+        self._file = file
+        self._source = source if source is not None else input
+
+    def __call__(self, prompt):
+        """
+        Read a line from the wrapped source and record it.
+
+        Args:
+            prompt: The prompt to display
+
+        Returns:
+            The line read
+        """
+        line = self._source(prompt)
+        self._file.write(json.dumps({"prompt": prompt, "input": line}) + "\n")
+        self._file.flush()
+        return line
+
+
+class ScriptedSource:
+    """
+    Input source that answers prompts from a list of lines.
+    """
+
+    def __init__(self, lines):
+        """
+        Initialize the source.
+
+        Args:
+            lines: Lines to return, in order
+        """
+        self._lines = iter(lines)
+        self.reads = 0
+
+    def __call__(self, _prompt):
+        """
+        Return the next line.
+
+        Raises:
+            EOFError: When every line has been read
+        """
+        try:
+            line = next(self._lines)
+        except StopIteration:
+            raise EOFError("End of session") from None
+        self.reads += 1
+        return line
+
+
+def load_session(path):
+    """
+    Read the input lines of a recorded session.
+
+    Args:
+        path: Session file written by RecordingSource
+
+    Returns:
+        List of input lines
+    """
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line)["input"] for line in file if line.strip()]
+
+
+class _NullWriter:
+    """Text sink that discards everything."""
+
+    @staticmethod
+    def write(text):
+        """Discard text."""
+        return len(text)
+
+    @staticmethod
+    def flush():
+        """Do nothing."""
+
+
+class _ThreadOutput:
+    """
+    Standard output that each thread can redirect separately.
+
+    Threads without a sink of their own write to the original stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def set_sink(self, sink):
+        """Redirect the current thread's output."""
+        self._local.sink = sink
+
+    def write(self, text):
+        """Write to the current thread's sink."""
+        return getattr(self._local, "sink", self._stream).write(text)
+
+    def flush(self):
+        """Flush the current thread's sink."""
+        getattr(self._local, "sink", self._stream).flush()
+
+
+def replay(data_manager, sessions, threads=4, business_logic=BusinessLogic, capture=False):
+    """
+    Run recorded sessions through parallel BatUI instances.
+
+    Each session drives BatUI.menu_loop() from its first line until it
+    chooses Exit or runs out of input. The data is neither loaded nor
+    saved; the caller does both once around the whole replay.
+
+    Args:
+        data_manager: DataManager shared by every session
+        sessions: List of sessions, each a list of input lines
+        threads: Number of sessions run at once
+        business_logic: BusinessLogic for the BatUI instances
+        capture: Keep each session's output instead of discarding it
+
+    Returns:
+        Dictionary with sessions, inputs, errors (list of (session index,
+        exception)), seconds, inputs_per_second and, if capture is set,
+        outputs (one string per session)
+    """
+    work = queue.Queue()
+    for index, lines in enumerate(sessions):
+        work.put((index, lines))
+    outputs = [None] * len(sessions)
+    errors = []
+    reads = []
+    lock = threading.Lock()
+    output = _ThreadOutput(sys.stdout)
+
+    def worker():
+        ui = BatUI(data_manager, business_logic)
+        done = 0
+        while True:
+            try:
+                index, lines = work.get_nowait()
+            except queue.Empty:
+                break
+            source = ScriptedSource(lines)
+            sink = io.StringIO() if capture else _NullWriter()
+            output.set_sink(sink)
+            previous = user_input.set_input_source(source)
+            try:
+                ui.menu_loop()
+            except EOFError:
+                pass
+            except Exception as error:  # pylint: disable=broad-except
+                # A failing session is reported, not allowed to stop the others
+                with lock:
+                    errors.append((index, error))
+            finally:
+                user_input.set_input_source(previous)
+            done += source.reads
+            if capture:
+                outputs[index] = sink.getvalue()
+        with lock:
+            reads.append(done)
+
+    original_stdout = sys.stdout
+    sys.stdout = output
+    start = time.perf_counter()
+    try:
+        workers = [threading.Thread(target=worker) for _ in range(max(1, threads))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        seconds = time.perf_counter() - start
+        sys.stdout = original_stdout
+
+    inputs = sum(reads)
+    result = {
+        "sessions": len(sessions),
+        "inputs": inputs,
+        "errors": errors,
+        "seconds": seconds,
+        "inputs_per_second": inputs / seconds if seconds else 0.0,
+    }
+    if capture:
+        result["outputs"] = outputs
+    return result
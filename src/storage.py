@@ -0,0 +1,433 @@
+"""
+Versioned record storage shared by several BAT processes.
+
+Every patron and item is stored in its own small JSON file carrying a
+version counter. A commit only succeeds if every record it writes is still
+at the version the writer last read (compare-and-swap), so desks working on
+different patrons and items commit side by side, and a desk that lost a
+race is told about it instead of silently overwriting the winner.
+
+Layout:
+    <directory>/items/<item_id>.json
+    <directory>/patrons/<patron_id>.json
+    <directory>/locks/<kind>-<id>.lock   (only while a commit is running;
+                                          holds the owner's pid and a token)
+
+The pid check assumes every writer runs on the same host.
+"""
+import json
+import os
+import time
+import uuid
+
+from src import config
+from src.data_mgmt import (DataManager, item_from_record, item_to_record, loans_from_records,
+                           patron_from_record, patron_to_record)
+from src.events import get_event_bus
+
+ITEMS = "items"
+PATRONS = "patrons"
+
+
+def _read_lock(lock_path):
+    """Read the "pid token" owner line of a lock file."""
+    with open(lock_path, encoding="utf-8") as file:
+        return file.read()
+
+
+class ConflictError(Exception):
+    """
+    Raised when a commit finds records changed by another writer.
+    """
+
+    def __init__(self, conflicts):
+        """
+        Initialize the error.
+
+        Args:
+            conflicts: List of (kind, record_id, expected_version, stored_version);
+                stored_version is None when the record's lock was lost
+        """
+        self.conflicts = conflicts
+        described = ", ".join(
+            f"{kind[:-1]} {record_id} (expected v{expected}, "
+            f"{'lock lost' if stored is None else f'found v{stored}'})"
+            for kind, record_id, expected, stored in conflicts
+        )
+        super().__init__(f"Commit conflict on {described}")
+
+
+class VersionedStore:
+    """
+    Per-record JSON files with compare-and-swap commits.
+    """
+
+    def __init__(self, directory, lock_timeout=5.0):
+        """
+        Initialize the store, creating its directories if needed.
+
+        Args:
+            directory: Directory holding the records
+            lock_timeout: Seconds after which a lock with no owner written
+                in it is treated as stale
+        """
+        self._directory = directory
+        self._lock_timeout = lock_timeout
+        for sub_directory in (ITEMS, PATRONS, "locks"):
+            os.makedirs(os.path.join(directory, sub_directory), exist_ok=True)
+
+    def _path(self, kind, record_id):
+        """Path of a record file."""
+        return os.path.join(self._directory, kind, f"{record_id}.json")
+
+    def _lock_path(self, kind, record_id):
+        """Path of a record's lock file."""
+        return os.path.join(self._directory, "locks", f"{kind}-{record_id}.lock")
+
+    def _read(self, kind, record_id):
+        """
+        Read a stored record.
+
+        Returns:
+            Record dictionary, or None if the record does not exist
+        """
+        try:
+            with open(self._path(kind, record_id), encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, kind, record_id, record):
+        """Atomically replace a stored record."""
+        path = self._path(kind, record_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(record, file)
+        os.replace(temp_path, path)
+
+    def _acquire(self, kind, record_id):
+        """
+        Take the short-lived lock guarding one record's compare-and-swap.
+
+        The lock file holds the owner's pid and a token. A lock is only
+        broken when its owner's process has died (or, for a lock whose
+        owner never got to write its pid, after the lock timeout), so a
+        slow writer that is still running keeps its lock.
+
+        Returns:
+            str: Token identifying this hold of the lock
+        """
+        lock_path = self._lock_path(kind, record_id)
+        token = f"{os.getpid()} {uuid.uuid4().hex}"
+        while True:
+            try:
+                descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._is_stale(lock_path):
+                    self._break(lock_path, token)
+                else:
+                    time.sleep(0.0005)
+                continue
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                file.write(token)
+            return token
+
+    def _is_stale(self, lock_path):
+        """Check whether a lock was left by a writer that is no longer running."""
+        try:
+            owner = _read_lock(lock_path)
+            age = time.time() - os.path.getmtime(lock_path)
+        except FileNotFoundError:
+            return False
+        if not owner:
+            # Created but not yet written; only a crash leaves it empty for long
+            return age > self._lock_timeout
+        try:
+            os.kill(int(owner.split()[0]), 0)
+        except ProcessLookupError:
+            return True
+        except (PermissionError, ValueError):
+            return age > self._lock_timeout
+        return False
+
+    @staticmethod
+    def _break(lock_path, token):
+        """
+        Remove a stale lock.
+
+        The lock is renamed aside before it is removed, so when two writers
+        break the same stale lock the second cannot delete a fresh lock
+        taken by the first; a live lock moved aside by mistake is put back.
+        """
+        aside = f"{lock_path}.{token.split()[1]}"
+        try:
+            os.rename(lock_path, aside)
+        except FileNotFoundError:
+            return
+        try:
+            owner = _read_lock(aside)
+            if owner:
+                try:
+                    os.kill(int(owner.split()[0]), 0)
+                    os.link(aside, lock_path)
+                except (ProcessLookupError, ValueError, FileExistsError):
+                    pass
+        finally:
+            os.unlink(aside)
+
+    def _holds(self, kind, record_id, token):
+        """Check that a lock is still held under the given token."""
+        try:
+            return _read_lock(self._lock_path(kind, record_id)) == token
+        except FileNotFoundError:
+            return False
+
+    def _release(self, kind, record_id, token):
+        """Release a record lock, unless it is no longer ours."""
+        if self._holds(kind, record_id, token):
+            try:
+                os.unlink(self._lock_path(kind, record_id))
+            except FileNotFoundError:
+                pass
+
+    def is_empty(self):
+        """
+        Check whether the store has no records yet.
+
+        Returns:
+            bool: True if no item or patron has been stored
+        """
+        return not any(name.endswith(".json")
+                       for kind in (ITEMS, PATRONS)
+                       for name in os.listdir(os.path.join(self._directory, kind)))
+
+    def import_data(self, data_manager):
+        """
+        Write every patron and item of a DataManager into the store.
+
+        Args:
+            data_manager: DataManager to copy from
+        """
+        for item in data_manager.get_all_items():
+            self._write(ITEMS, item._id, item_to_record(item))
+        for patron in data_manager.get_all_patrons():
+            self._write(PATRONS, patron._id, patron_to_record(patron))
+
+    def load_into(self, data_manager):
+        """
+        Load every stored item and patron into a DataManager.
+
+        Args:
+            data_manager: DataManager to fill
+        """
+        for name in os.listdir(os.path.join(self._directory, ITEMS)):
+            if name.endswith(".json"):
+                data_manager.add_item(item_from_record(self._read(ITEMS, name[:-5])))
+        for name in os.listdir(os.path.join(self._directory, PATRONS)):
+            if name.endswith(".json"):
+                record = self._read(PATRONS, name[:-5])
+                data_manager.add_patron(patron_from_record(record, data_manager.get_item))
+
+    def refresh(self, data_manager, patron_ids=(), item_ids=()):
+        """
+        Reload some records in place, discarding any uncommitted changes.
+
+        Args:
+            data_manager: DataManager holding the records
+            patron_ids: IDs of the patrons to reload
+            item_ids: IDs of the items to reload
+        """
+        for item_id in item_ids:
+            record = self._read(ITEMS, item_id)
+            item = data_manager.get_item(item_id)
+            if record is None or item is None:
+                continue
+            item._num_copies = record["number_owned"]
+            item._on_loan = record["on_loan"]
+            item._version = record.get("version", 0)
+        for patron_id in patron_ids:
+            record = self._read(PATRONS, patron_id)
+            patron = data_manager.get_patron(patron_id)
+            if record is None or patron is None:
+                continue
+            patron._outstanding_fees = record["outstanding_fees"]
+            patron._loans = loans_from_records(record["loans"], data_manager.get_item)
+            patron._version = record.get("version", 0)
+
+    def commit(self, patrons=(), items=()):
+        """
+        Write changed records if nobody else has changed them first.
+
+        Each record must still be stored at the version it carries in
+        memory. On success every record's version goes up by one; on
+        conflict nothing is written.
+
+        Args:
+            patrons: Changed Patron objects
+            items: Changed BorrowableItem objects
+
+        Raises:
+            ConflictError: If any record was changed by another writer
+        """
+        records = sorted(
+            [(PATRONS, patron._id, patron) for patron in patrons] +
+            [(ITEMS, item._id, item) for item in items],
+            key=lambda entry: (entry[0], entry[1])
+        )
+        locked = []
+        try:
+            conflicts = []
+            for kind, record_id, _ in records:
+                locked.append((kind, record_id, self._acquire(kind, record_id)))
+            for kind, record_id, obj in records:
+                stored = self._read(kind, record_id)
+                stored_version = stored.get("version", 0) if stored else 0
+                if stored is not None and stored_version != obj._version:
+                    conflicts.append((kind, record_id, obj._version, stored_version))
+            # A lock is only lost if its owner was taken for dead; never write without it
+            conflicts += [(kind, record_id, obj._version, None)
+                          for (kind, record_id, token), (_, _, obj) in zip(locked, records)
+                          if not self._holds(kind, record_id, token)]
+            if conflicts:
+                raise ConflictError(conflicts)
+            for kind, record_id, obj in records:
+                to_record = patron_to_record if kind == PATRONS else item_to_record
+                record = to_record(obj)
+                record["version"] = obj._version + 1
+                self._write(kind, record_id, record)
+                # Only once the new version is on disk, so a failed write
+                # leaves memory at the version still stored
+                obj._version += 1
+        finally:
+            for kind, record_id, token in locked:
+                self._release(kind, record_id, token)
+
+    def transact(self, data_manager, operation, patron_ids=(), item_ids=(), retries=5):
+        """
+        Run an operation against fresh records and commit it, retrying on conflict.
+
+        Only records the operation actually changed are committed. Events
+        the operation publishes are delivered once, after the commit
+        succeeds, and dropped for attempts that conflict.
+
+        Args:
+            data_manager: DataManager holding the records
+            operation: Function with no arguments that changes the records
+            patron_ids: IDs of the patrons the operation changes
+            item_ids: IDs of the items the operation changes
+            retries: Number of times to retry after a conflict
+
+        Returns:
+            tuple: (result of the operation, number of conflicts retried)
+
+        Raises:
+            ConflictError: If the commit still conflicts after all retries
+        """
+        attempt = 0
+        while True:
+            self.refresh(data_manager, patron_ids, item_ids)
+            patrons = [data_manager.get_patron(patron_id) for patron_id in patron_ids]
+            items = [data_manager.get_item(item_id) for item_id in item_ids]
+            patrons = [patron for patron in patrons if patron is not None]
+            items = [item for item in items if item is not None]
+            before = [patron_to_record(patron) for patron in patrons]
+            before += [item_to_record(item) for item in items]
+
+            try:
+                # Events of an attempt are only sent once its commit succeeds
+                with get_event_bus().hold():
+                    result = operation()
+                    changed_patrons = [patron for patron, record in zip(patrons, before)
+                                       if patron_to_record(patron) != record]
+                    changed_items = [item for item, record in zip(items, before[len(patrons):])
+                                     if item_to_record(item) != record]
+                    self.commit(changed_patrons, changed_items)
+                return result, attempt
+            except ConflictError:
+                if attempt >= retries:
+                    self.refresh(data_manager, patron_ids, item_ids)
+                    raise
+                attempt += 1
+
+
+class StoredDataManager(DataManager):
+    """
+    DataManager whose changes are committed record by record to a VersionedStore.
+
+    Every loan, return and payment made through Circulation is committed
+    as it happens, so BAT processes sharing the store directory never
+    overwrite each other's work when they save.
+    """
+
+    def __init__(self, store, retries=5):
+        """
+        Initialize the data manager.
+
+        Args:
+            store: VersionedStore shared with the other processes
+            retries: Times a change is retried against fresh records after a conflict
+        """
+        super().__init__()
+        self._store = store
+        self._retries = retries
+
+    def get_store(self):
+        """
+        Get the shared store.
+
+        Returns:
+            VersionedStore the changes are committed to
+        """
+        return self._store
+
+    def load_data(self, catalogue_file=config.CATALOGUE_FILE,
+                  patron_file=config.PATRON_FILE, rebuild_counts=False):
+        """
+        Load the records from the store, seeding an empty store from the JSON files.
+
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+            rebuild_counts: Set each item's on_loan to its number of loans
+                when seeding the store
+        """
+        if self._store.is_empty():
+            super().load_data(catalogue_file, patron_file, rebuild_counts)
+            self._store.import_data(self)
+        else:
+            self._store.load_into(self)
+
+    def save_data(self, catalogue_file=config.CATALOGUE_FILE,
+                  patron_file=config.PATRON_FILE):
+        """
+        Export the store to the JSON files.
+
+        Changes are already committed, so the export is read afresh from
+        the store and includes the other processes' work.
+
+        Args:
+            catalogue_file: Path to the catalogue JSON file
+            patron_file: Path to the patron JSON file
+        """
+        snapshot = DataManager()
+        self._store.load_into(snapshot)
+        snapshot.save_data(catalogue_file, patron_file)
+
+    def transact(self, operation, patron_ids=(), item_ids=(), on_conflict=None):
+        """
+        Apply a change to fresh copies of some records and commit it.
+
+        Args:
+            operation: Function with no arguments that makes the change
+            patron_ids: IDs of the patrons the operation may change
+            item_ids: IDs of the items the operation may change
+            on_conflict: Result if the commit still conflicts after every retry
+
+        Returns:
+            The operation's result, or on_conflict
+        """
+        try:
+            return self._store.transact(self, operation, patron_ids, item_ids,
+                                        self._retries)[0]
+        except ConflictError:
+            return on_conflict
@@ -1,6 +1,45 @@
 """
 User input validation and handling functions.
+
+Input comes from the built-in input() unless a source has been set for
+the current thread with set_input_source(), which lets recorded sessions
+drive the UI without a terminal.
 """
+import threading
+
+_local = threading.local()
+
+
+def set_input_source(source):
+    """
+    Take this thread's input from a source instead of input().
+
+    Args:
+        source: Callable taking the prompt and returning a line, raising
+            EOFError when it has no more input; None restores input()
+
+    Returns:
+        The previous source, or None
+    """
+    previous = getattr(_local, "source", None)
+    _local.source = source
+    return previous
+
+
+def read_line(prompt):
+    """
+    Read one line of input.
+
+    Args:
+        prompt: The prompt to display
+
+    Returns:
+        The line, without its newline
+    """
+    source = getattr(_local, "source", None)
+    if source is None:
+        return input(prompt)
+    return source(prompt)
 
 
 def get_menu_choice(prompt, valid_choices):
@@ -15,7 +54,7 @@ def get_menu_choice(prompt, valid_choices):
         The validated user choice
     """
     while True:
-        choice = input(prompt).strip()
+        choice = read_line(prompt).strip()
         if choice in valid_choices:
             return choice
         print(f"Invalid choice. Please choose from: {valid_choices}")
@@ -32,7 +71,7 @@ def get_string_input(prompt):
         The user's input string
     """
     while True:
-        value = input(prompt).strip()
+        value = read_line(prompt).strip()
         if value:
             return value
         print("Input cannot be empty. Please try again.")
@@ -50,7 +89,7 @@ def get_int_input(prompt):
     """
     while True:
         try:
-            return int(input(prompt).strip())
+            return int(read_line(prompt).strip())
         except ValueError:
             print("Invalid input. Please enter a valid integer.")
 
@@ -89,7 +128,7 @@ def get_float_input(prompt):
     """
     while True:
         try:
-            return float(input(prompt).strip())
+            return float(read_line(prompt).strip())
         except ValueError:
             print("Invalid input. Please enter a valid number.")
 
@@ -127,7 +166,7 @@ def get_yes_no_input(prompt):
         True for 'y', False for 'n'
     """
     while True:
-        line = input(prompt).strip().lower()
+        line = read_line(prompt).strip().lower()
         if line in ('y', 'n'):
             return line == 'y'
         print("Invalid input. Please enter 'y' or 'n'.")
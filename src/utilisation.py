@@ -0,0 +1,250 @@
+"""
+Hourly utilisation history per catalogue item.
+
+Every sample records how many copies of each item are on loan. Each item
+gets a fixed-size ring buffer (an array with one slot per sample, 90 days
+of hours by default) the first time it is seen on loan, and loses it once
+it has been idle for a whole window. Items that are never lent therefore
+cost nothing, and answering a query for one of them reads as all zeros.
+
+sample_if_due places each sample in the slot of the hour it falls in,
+counted from the first sample, so hours with no sample (the service was
+down, or an old file was loaded) are recorded as nothing on loan rather
+than shifting later samples into the wrong hours.
+
+The history is saved to and loaded from a compact binary file: a struct
+header, then each item's ID followed by its ring written in bulk.
+"""
+import struct
+import time
+from array import array
+
+HOURS = 90 * 24
+SECONDS_PER_SAMPLE = 3600
+
+_MAGIC = b"BATU"
+_FORMAT_VERSION = 1
+# magic, version, typecode, slots, samples taken, first sample time, item count
+_HEADER = struct.Struct("<4sHcIqdI")
+_ITEM_HEADER = struct.Struct("<qq")
+
+
+class UtilisationHistory:
+    """
+    Ring buffers of copies on loan, one per item that has been lent.
+    """
+
+    def __init__(self, data_manager, slots=HOURS, typecode="B"):
+        """
+        Initialize an empty history.
+
+        Args:
+            data_manager: DataManager whose catalogue is sampled
+            slots: Samples kept per item (default: 90 days of hours)
+            typecode: Array typecode for a sample; "B" saturates at 255 copies
+        """
+        self.data_manager = data_manager
+        self._slots = slots
+        self._typecode = typecode
+        self._max_value = (1 << (8 * array(typecode).itemsize)) - 1
+        self._zeros = bytes(slots * array(typecode).itemsize)
+        self._rings = {}
+        self._last_busy = {}
+        self._samples = 0
+        self._started = None
+
+    @property
+    def samples(self):
+        """Number of samples taken."""
+        return self._samples
+
+    def __len__(self):
+        """Number of items with a ring buffer."""
+        return len(self._rings)
+
+    def sample(self, now=None):
+        """
+        Record the copies on loan of every item.
+
+        Args:
+            now: Time of the sample in seconds since the epoch (default: now)
+        """
+        if self._started is None:
+            self._started = time.time() if now is None else now
+        slot = self._samples % self._slots
+        rings = self._rings
+        last_busy = self._last_busy
+        samples = self._samples
+        for item in self.data_manager.iter_items():
+            on_loan = item._on_loan
+            ring = rings.get(item._id)
+            if ring is None:
+                if on_loan <= 0:
+                    continue
+                ring = rings[item._id] = array(self._typecode, self._zeros)
+            if on_loan > 0:
+                ring[slot] = min(on_loan, self._max_value)
+                last_busy[item._id] = samples
+            else:
+                ring[slot] = 0
+        self._samples += 1
+        self._release_idle(samples)
+
+    def sample_if_due(self, now=None):
+        """
+        Take a sample in the current hour's slot, unless it already has one.
+
+        Slots of the hours missed since the last sample are filled with zeros.
+
+        Args:
+            now: Current time in seconds since the epoch (default: now)
+
+        Returns:
+            True if a sample was taken
+        """
+        now = time.time() if now is None else now
+        if self._started is not None:
+            due = int((now - self._started) // SECONDS_PER_SAMPLE)
+            if due < self._samples:
+                return False
+            self._skip(due - self._samples)
+        self.sample(now)
+        return True
+
+    def _skip(self, count):
+        """Record count samples of nothing on loan, for hours that were not sampled."""
+        if count <= 0:
+            return
+        zeros = array(self._typecode, self._zeros)
+        start = self._samples % self._slots
+        # Slots up to the end of the ring, then any wrapped round to the start
+        first = min(count, self._slots - start)
+        wrapped = min(count, self._slots) - first
+        for ring in self._rings.values():
+            ring[start:start + first] = zeros[:first]
+            ring[:wrapped] = zeros[:wrapped]
+        previous = self._samples
+        self._samples += count
+        self._release_idle(previous)
+
+    def _release_idle(self, previous):
+        """Drop the rings of items idle for a whole window, once a window has passed."""
+        if previous // self._slots == self._samples // self._slots:
+            return
+        cutoff = self._samples - self._slots
+        for item_id in [item_id for item_id, busy in self._last_busy.items() if busy < cutoff]:
+            del self._rings[item_id]
+            del self._last_busy[item_id]
+
+    def history(self, item_id, hours=None):
+        """
+        Get an item's samples, oldest first.
+
+        Args:
+            item_id: ID of the item
+            hours: Number of most recent samples (default: the whole window)
+
+        Returns:
+            List of copies on loan per sample
+        """
+        count = min(self._samples, self._slots)
+        if hours is not None:
+            count = min(count, hours)
+        ring = self._rings.get(item_id)
+        if ring is None:
+            return [0] * count
+        end = self._samples % self._slots
+        ordered = ring[end:] + ring[:end] if self._samples >= self._slots else ring[:end]
+        return ordered[len(ordered) - count:].tolist()
+
+    def percentiles(self, item_id, percentiles=(50, 90, 99, 100), hours=None):
+        """
+        Get percentiles of an item's copies on loan.
+
+        Args:
+            item_id: ID of the item
+            percentiles: Percentiles wanted, 0 to 100
+            hours: Number of most recent samples to use (default: the whole window)
+
+        Returns:
+            Dictionary of percentile to copies on loan (nearest rank)
+        """
+        values = sorted(self.history(item_id, hours))
+        if not values:
+            return {percentile: 0 for percentile in percentiles}
+        last = len(values) - 1
+        return {percentile: values[min(last, max(0, -(-percentile * len(values) // 100) - 1))]
+                for percentile in percentiles}
+
+    def hours_fully_booked(self, item_id, hours=None):
+        """
+        Count the samples in which every copy of an item was on loan.
+
+        Args:
+            item_id: ID of the item
+            hours: Number of most recent samples to use (default: the whole window)
+
+        Returns:
+            int
+        """
+        item = self.data_manager.get_item(item_id)
+        if item is None or item._num_copies <= 0:
+            return 0
+        return sum(1 for value in self.history(item_id, hours) if value >= item._num_copies)
+
+    def save(self, path):
+        """
+        Write the history to a binary file.
+
+        Args:
+            path: File to write
+        """
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, self._typecode.encode(),
+                                    self._slots, self._samples, self._started or 0.0,
+                                    len(self._rings)))
+            for item_id, ring in self._rings.items():
+                file.write(_ITEM_HEADER.pack(item_id, self._last_busy.get(item_id, -1)))
+                ring.tofile(file)
+
+    def load(self, path):
+        """
+        Replace the history with the contents of a binary file.
+
+        Args:
+            path: File written by save()
+
+        Raises:
+            ValueError: If the file is not a utilisation history
+        """
+        with open(path, "rb") as file:
+            header = file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("Truncated utilisation history")
+            magic, version, typecode, slots, samples, started, count = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError("Not a utilisation history file")
+            typecode = typecode.decode()
+            rings = {}
+            last_busy = {}
+            for index in range(count):
+                item_header = file.read(_ITEM_HEADER.size)
+                if len(item_header) != _ITEM_HEADER.size:
+                    raise ValueError(f"Truncated utilisation history: item {index + 1} of "
+                                     f"{count} is missing its header")
+                item_id, busy = _ITEM_HEADER.unpack(item_header)
+                ring = array(typecode)
+                try:
+                    ring.fromfile(file, slots)
+                except EOFError as error:
+                    raise ValueError("Truncated utilisation history") from error
+                rings[item_id] = ring
+                last_busy[item_id] = busy
+        self._typecode = typecode
+        self._slots = slots
+        self._max_value = (1 << (8 * array(typecode).itemsize)) - 1
+        self._zeros = bytes(slots * array(typecode).itemsize)
+        self._samples = samples
+        self._started = started if samples else None
+        self._rings = rings
+        self._last_busy = last_busy
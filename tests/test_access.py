@@ -0,0 +1,73 @@
+"""
+Tests that the precomputed makerspace index agrees with the business rules
+"""
+
+import itertools
+import unittest
+
+from src.access import MAX_PATRON_ID, MakerspaceAccessIndex
+from src.business_logic import BusinessLogic, can_use_makerspace
+from src.data_mgmt import Patron
+
+
+class TestMakerspaceAccessIndex(unittest.TestCase):
+    """Equivalence and incremental update tests for MakerspaceAccessIndex"""
+
+    def test_matches_business_rules_exhaustively(self):
+        """Every age/fee/training combination gives the original answers"""
+        ages = [-1, 0, 17, 18, 49, 50, 64, 65, 89, 90, 120]
+        fees = [0.0, 0.01, 10.0]
+        patrons = [
+            Patron(patron_id, "Test", age, fee, makerspace_training=trained)
+            for patron_id, (age, fee, trained)
+            in enumerate(itertools.product(ages, fees, [False, True]))
+        ]
+        index = MakerspaceAccessIndex(patrons)
+
+        for patron in patrons:
+            self.assertEqual(index.check(patron._id),
+                             BusinessLogic.check_makerspace_access(patron))
+            self.assertEqual(index.can_use(patron._id),
+                             can_use_makerspace(patron._age, patron._outstanding_fees,
+                                                patron._makerspace_training))
+
+    def test_incremental_update(self):
+        """Paying fees or completing training is reflected after update()"""
+        patron = Patron(7, "Jane Smith", 30, outstanding_fees=4.0)
+        index = MakerspaceAccessIndex([patron])
+        self.assertEqual(index.check(7), (False, "Makerspace training required"))
+        self.assertFalse(index.can_use(7))
+
+        patron._makerspace_training = True
+        patron.pay_fee(4.0)
+        index.update(patron)
+
+        self.assertEqual(index.check(7), (True, "Access granted"))
+        self.assertTrue(index.can_use(7))
+
+    def test_unknown_patrons_are_denied(self):
+        """IDs never indexed, or removed, are refused"""
+        index = MakerspaceAccessIndex([Patron(3, "Bob", 40, makerspace_training=True)])
+        self.assertTrue(index.check(3)[0])
+        index.remove(3)
+        self.assertEqual(index.check(3), (False, "Patron not found"))
+        self.assertEqual(index.check(1000), (False, "Patron not found"))
+        self.assertFalse(index.can_use(-1))
+
+    def test_out_of_range_ids_are_kept_apart(self):
+        """IDs the array cannot hold are answered without touching other entries"""
+        patrons = [Patron(3, "Bob", 40, makerspace_training=True),
+                   Patron(MAX_PATRON_ID + 1, "Ann", 40, makerspace_training=True)]
+        with self.assertLogs("src.access", "WARNING"):
+            index = MakerspaceAccessIndex(patrons)
+            index.update_fields(-1, 40, 0.0, False)
+        self.assertTrue(index.check(3)[0])
+        self.assertTrue(index.check(MAX_PATRON_ID + 1)[0])
+        self.assertEqual(index.check(-1), (False, "Makerspace training required"))
+        self.assertLess(len(index._codes), 1024)
+        index.remove(MAX_PATRON_ID + 1)
+        self.assertEqual(index.check(MAX_PATRON_ID + 1), (False, "Patron not found"))
+
+
+if __name__ == '__main__':
+    unittest.main()
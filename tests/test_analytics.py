@@ -0,0 +1,83 @@
+"""
+Tests for the event bus and incremental circulation analytics
+"""
+
+import unittest
+from datetime import date
+
+from src import clock, events
+from src.analytics import CirculationAnalytics
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import DataManager, Patron
+
+
+class TestCirculationAnalytics(unittest.TestCase):
+    """Tests for CirculationAnalytics fed by BusinessLogic events"""
+
+    def setUp(self):
+        self.previous_bus = events.set_event_bus(None)
+        self.clock = clock.SimulatedClock(date(2025, 3, 1))
+        self.previous_clock = clock.set_clock(self.clock)
+        self.data_manager = DataManager()
+        self.data_manager.add_item(BorrowableItem(1, "Dune", "Fiction Book", 2))
+        self.data_manager.add_item(BorrowableItem(2, "Wired", "Magazine", 1))
+        self.data_manager.add_patron(Patron(1, "Ann", 40, outstanding_fees=2.0))
+        self.data_manager.add_patron(Patron(2, "Ben", 70))
+        self.analytics = CirculationAnalytics(self.data_manager)
+        self.analytics.attach()
+
+    def tearDown(self):
+        self.analytics.detach()
+        events.set_event_bus(self.previous_bus)
+        clock.set_clock(self.previous_clock)
+
+    def test_running_figures_match_recompute(self):
+        """Loans, returns and payments keep the figures in step with the data"""
+        ann = self.data_manager.get_patron(1)
+        ben = self.data_manager.get_patron(2)
+        dune = self.data_manager.get_item(1)
+        BusinessLogic.process_loan(ben, dune)
+        BusinessLogic.process_loan(ben, self.data_manager.get_item(2))
+        self.assertEqual(self.analytics.utilisation(1), 0.5)
+
+        self.clock.advance(10)
+        self.assertEqual(BusinessLogic.process_return(ben, 2)[2], 3.0)
+        BusinessLogic.process_payment(ann, 5.0)
+
+        self.assertEqual(self.analytics.verify(self.data_manager), [])
+        dashboard = self.analytics.dashboard()
+        self.assertEqual(dashboard["loans"], 2)
+        self.assertEqual(dashboard["returns"], 1)
+        self.assertEqual(dashboard["fees_charged"], 3.0)
+        self.assertEqual(dashboard["payments"], 2.0)
+        self.assertEqual(dashboard["active_loans_by_item_type"], {"Fiction Book": 1})
+        self.assertEqual(dashboard["fees_outstanding_by_patron_type"],
+                         {"Regular": 0.0, "Elderly": 3.0})
+
+    def test_verify_reports_drift(self):
+        """Changes made without events show up as differences"""
+        self.data_manager.get_patron(2).add_fee(1.5)
+        self.assertEqual(self.analytics.verify(self.data_manager),
+                         [("fees_by_patron_type", "Elderly", 0.0, 1.5)])
+        self.analytics.seed(self.data_manager)
+        self.assertEqual(self.analytics.verify(self.data_manager), [])
+
+    def test_detached_analytics_receive_nothing(self):
+        """Nothing is published once the only subscriber detaches"""
+        self.analytics.detach()
+        self.assertFalse(events.get_event_bus().has_subscribers(events.LoanEvent))
+        BusinessLogic.process_loan(self.data_manager.get_patron(2),
+                                   self.data_manager.get_item(1))
+        self.assertEqual(self.analytics.loans_by_item_type(), {})
+
+    def test_invalid_payment_rejected(self):
+        """Payments must be positive"""
+        success, _, remaining = BusinessLogic.process_payment(
+            self.data_manager.get_patron(1), 0)
+        self.assertFalse(success)
+        self.assertEqual(remaining, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the sharded nightly batch jobs
+"""
+
+import unittest
+from datetime import date, timedelta
+
+from src import batch
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+from src.loan import Loan
+
+TODAY = date(2025, 3, 1)
+
+
+class TestBatchJobs(unittest.TestCase):
+    """Tests for run_batch and its jobs"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        self.data_manager.add_item(BorrowableItem(1, "Dune", "Fiction Book", 50))
+        for patron_id in range(1, 41):
+            patron = Patron(patron_id, f"Patron {patron_id}", 5 + patron_id * 2,
+                            outstanding_fees=float(patron_id % 5 == 0))
+            patron._loans = [Loan(self.data_manager.get_item(1),
+                                  TODAY + timedelta(days=patron_id % 7 - 4 + offset))
+                             for offset in range(patron_id % 4)]
+            self.data_manager.add_patron(patron)
+        self.context = batch.make_context(TODAY)
+
+    def test_jobs_match_patron_objects(self):
+        """Each job agrees with the answers worked out from Patron objects"""
+        results = batch.run_batch(self.data_manager, workers=1, shards=3, context=self.context)
+        fees = dict(zip(*results["fees"]))
+        blocked = dict(zip(*results["blocked"]))
+        item = BorrowableItem(2, "Spare", "Magazine", 1)
+        for patron in self.data_manager.iter_patrons():
+            overdue_days = sum(max(0, (TODAY - loan._due_date).days) for loan in patron._loans)
+            self.assertEqual(fees.get(patron._id, 0.0),
+                             overdue_days * self.context.fee_per_day)
+            self.assertEqual(patron._id in blocked,
+                             not BusinessLogic.check_loan_allowed(patron, item)[0])
+        self.assertEqual(blocked[5], batch.BLOCKED_FEES)
+
+    def test_reminders(self):
+        """Loans due up to the reminder window are listed, in patron order"""
+        patrons, items, due_dates = batch.run_batch(
+            self.data_manager, ("reminders",), workers=1, context=self.context)["reminders"]
+        expected = [(patron._id, loan._due_date.toordinal())
+                    for patron in self.data_manager.iter_patrons() for loan in patron._loans
+                    if loan._due_date <= TODAY + timedelta(days=batch.REMIND_DAYS)]
+        self.assertEqual(list(zip(patrons, due_dates)), expected)
+        self.assertEqual(set(items), {1})
+
+    def test_process_pool_matches_in_process(self):
+        """Results do not depend on the number of workers or shards"""
+        serial = batch.run_batch(self.data_manager, workers=1, context=self.context)
+        pooled = batch.run_batch(self.data_manager, workers=2, shards=5, context=self.context)
+        self.assertEqual(serial, pooled)
+
+    def test_columnar_store_shards(self):
+        """Slicing a columnar store gives the same results as patron objects"""
+        columnar = ColumnarDataManager()
+        columnar.add_item(self.data_manager.get_item(1))
+        for patron in self.data_manager.iter_patrons():
+            columnar.add_patron(patron)
+        columnar.get_patron(7)._loans.append(Loan(columnar.get_item(1), TODAY))
+        self.data_manager.get_patron(7)._loans.append(Loan(self.data_manager.get_item(1), TODAY))
+        self.assertEqual(batch.run_batch(columnar, workers=1, shards=6, context=self.context),
+                         batch.run_batch(self.data_manager, workers=1, context=self.context))
+
+    def test_unknown_job(self):
+        """Asking for a job that does not exist is an error"""
+        with self.assertRaises(ValueError):
+            batch.run_batch(self.data_manager, ("fees", "shelving"), workers=1)
+
+    def test_records(self):
+        """Results convert to JSON-friendly records"""
+        records = batch.to_records(batch.run_batch(self.data_manager, workers=1,
+                                                   context=self.context))
+        self.assertEqual(records["blocked"][0], {"patron_id": 3, "fees": False,
+                                                 "loan_limit": True})
+        self.assertEqual(len(records["reminders"]),
+                         len(batch.run_batch(self.data_manager, ("reminders",), workers=1,
+                                             context=self.context)["reminders"][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Tests for the clock service
+"""
+
+import unittest
+from datetime import date
+
+from src import clock
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import Patron
+
+
+class TestClock(unittest.TestCase):
+    """Tests for simulated time and per-operation dates"""
+
+    def setUp(self):
+        self.clock = clock.SimulatedClock(date(2025, 3, 1))
+        self.previous = clock.set_clock(self.clock)
+
+    def tearDown(self):
+        clock.set_clock(self.previous)
+
+    def test_system_clock_gives_today(self):
+        """The cached system date is the real date"""
+        self.assertEqual(clock.SystemClock().today(), date.today())
+
+    def test_advancing_time_charges_fees(self):
+        """Loans fall overdue as the simulated clock moves on"""
+        patron = Patron(1, "Jane", 30)
+        item = BorrowableItem(1, "Dune", "Magazine", 1)
+        BusinessLogic.process_loan(patron, item)
+        self.assertEqual(patron._loans[0]._due_date, date(2025, 3, 8))
+
+        self.clock.advance(10)
+        self.assertIn("OVERDUE by 3 days", patron.to_full_string())
+        success, _, fees = BusinessLogic.process_return(patron, 1)
+        self.assertTrue(success)
+        self.assertEqual(fees, 3.0)
+
+    def test_operation_pins_date(self):
+        """Dates read inside an operation do not move"""
+        with clock.operation() as pinned:
+            self.clock.advance(5)
+            self.assertEqual(clock.today(), pinned)
+            with clock.operation() as nested:
+                self.assertEqual(nested, pinned)
+        self.assertEqual(clock.today(), date(2025, 3, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
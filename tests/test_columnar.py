@@ -0,0 +1,134 @@
+"""
+Tests for the columnar patron store
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date, timedelta
+
+from src import bat
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+from src.loan import Loan
+
+
+class TestColumnarPatronStore(unittest.TestCase):
+    """Tests for ColumnarDataManager and PatronView"""
+
+    def setUp(self):
+        self.data_manager = ColumnarDataManager()
+        self.book = BorrowableItem(1, "Dune", "Fiction Book", 3)
+        self.saw = BorrowableItem(2, "Saw", "Carpentry Tool", 1)
+        self.data_manager.add_item(self.book)
+        self.data_manager.add_item(self.saw)
+        overdue = Patron(10, "Ann", 30, carpentry_tool_training=True)
+        overdue._loans.append(Loan(self.book, date.today() - timedelta(days=4)))
+        self.data_manager.add_patron(overdue)
+        self.data_manager.add_patron(Patron(20, "Ben", 12, outstanding_fees=2.5))
+        self.data_manager.add_patron(Patron(5, "Cat", 70, makerspace_training=True))
+
+    def test_views_match_patron_objects(self):
+        """Views expose the same fields and methods as Patron"""
+        ann = self.data_manager.get_patron(10)
+        self.assertEqual((ann._id, ann._name, ann._age, ann.get_type()),
+                         (10, "Ann", 30, "Regular"))
+        self.assertTrue(ann._carpentry_tool_training)
+        self.assertFalse(ann._makerspace_training)
+        self.assertEqual(ann.calculate_overdue_fees(), 4.0)
+        self.assertIn("OVERDUE by 4 days", ann.to_full_string())
+        # ID 5 arrived out of order and is still found
+        self.assertEqual(self.data_manager.get_patron(5)._name, "Cat")
+        self.assertIsNone(self.data_manager.get_patron(99))
+
+    def test_changes_write_through(self):
+        """Loans, fees and flags changed through a view are stored"""
+        ann = self.data_manager.get_patron(10)
+        self.assertEqual(BusinessLogic.process_loan(ann, self.saw)[0], True)
+        ann.add_fee(3.0)
+        ann._makerspace_training = True
+
+        stored = self.data_manager.get_patron(10)
+        self.assertTrue(stored.has_item(2))
+        self.assertEqual(stored._outstanding_fees, 3.0)
+        self.assertTrue(stored._makerspace_training)
+        self.assertTrue(stored._carpentry_tool_training)
+
+        store = self.data_manager.get_patron_store()
+        store.compact()
+        self.assertEqual(len(self.data_manager.get_patron(10)._loans), 2)
+
+    def test_replacing_a_patron_renames_them(self):
+        """Replacing a patron stores their new name, as DataManager does"""
+        plain = DataManager()
+        for data_manager in (plain, self.data_manager):
+            data_manager.add_patron(Patron(20, "Renamed Person", 40))
+        self.assertEqual(self.data_manager.get_patron(20)._name,
+                         plain.get_patron(20)._name)
+        self.data_manager.get_patron_store().compact()
+        self.assertEqual([patron._name for patron in self.data_manager.get_all_patrons()],
+                         ["Ann", "Renamed Person", "Cat"])
+
+    def test_return_of_loaded_loan(self):
+        """A loan read from the arrays can be returned through a view"""
+        ann = self.data_manager.get_patron(10)
+        self.book._on_loan = 1
+        success, _, fees = BusinessLogic.process_return(ann, 1)
+        self.assertTrue(success)
+        self.assertEqual(fees, 4.0)
+        self.assertEqual(self.data_manager.get_patron(10)._loans, [])
+        self.assertEqual(self.book._on_loan, 0)
+        self.assertIs(ann._loans, self.data_manager.get_patron(10)._loans)
+
+    def test_scans(self):
+        """Array scans agree with the per-patron answers"""
+        store = self.data_manager.get_patron_store()
+        rows = {view._id: view._row for view in self.data_manager.get_all_patrons()}
+        self.assertEqual(store.rows_with_age(12), [rows[20]])
+        self.assertEqual(store.rows_with_fees_over(0), [rows[20]])
+        fees = store.overdue_fees(date.today())
+        self.assertEqual(fees[rows[10]], 4.0)
+        self.assertEqual(fees[rows[5]], 0.0)
+        self.assertEqual(list(store.makerspace_mask()), [0, 0, 1])
+        self.assertEqual(list(store.loan_eligibility_mask()), [1, 0, 1])
+
+    def test_save_and_load_round_trip(self):
+        """Files saved from the arrays load into either DataManager"""
+        self.data_manager.get_patron(20).pay_fee(1.0)
+        with tempfile.TemporaryDirectory() as directory:
+            catalogue = os.path.join(directory, "catalogue.json")
+            patrons = os.path.join(directory, "patrons.json")
+            self.data_manager.save_data(catalogue, patrons)
+
+            for manager in (DataManager(), ColumnarDataManager()):
+                manager.load_data(catalogue, patrons)
+                self.assertEqual(manager.get_patron(20)._outstanding_fees, 1.5)
+                self.assertEqual(manager.get_patron(10)._loans[0]._due_date,
+                                 date.today() - timedelta(days=4))
+
+    def test_selected_from_command_line(self):
+        """run.py --columnar runs the desk on the columnar store"""
+        self.assertFalse(hasattr(self.data_manager, "_patron_data"))
+        with tempfile.TemporaryDirectory() as directory:
+            catalogue = os.path.join(directory, "catalogue.json")
+            patrons = os.path.join(directory, "patrons.json")
+            script = os.path.join(directory, "commands.txt")
+            self.data_manager.save_data(catalogue, patrons)
+            with open(script, "w", encoding="utf-8") as file:
+                file.write("borrow 5 1\npay 20 2.5\n")
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                status = bat.main(["--columnar", "--catalogue", catalogue,
+                                   "--patrons", patrons, "--script", script])
+            self.assertEqual(status, 0)
+            manager = DataManager()
+            manager.load_data(catalogue, patrons)
+            self.assertTrue(manager.get_patron(5).has_item(1))
+            self.assertEqual(manager.get_patron(20)._outstanding_fees, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Stress tests for the per-patron and per-item locking in src.concurrency
+"""
+
+import random
+import threading
+import unittest
+
+from src.borrowable_item import BorrowableItem
+from src.concurrency import Circulation, LockManager
+from src.data_mgmt import DataManager, Patron
+
+
+ITEM_TYPES = ["Fiction Book", "Non-Fiction Book", "Magazine", "DVD"]
+
+
+def build_data(num_patrons, num_items, copies):
+    """Create a DataManager with adult patrons and scarce items"""
+    data_manager = DataManager()
+    for patron_id in range(1, num_patrons + 1):
+        data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+    for item_id in range(1, num_items + 1):
+        item_type = ITEM_TYPES[item_id % len(ITEM_TYPES)]
+        data_manager.add_item(
+            BorrowableItem(item_id, f"Item {item_id}", item_type, copies)
+        )
+    return data_manager
+
+
+class TestLockManager(unittest.TestCase):
+    """Tests for lock allocation and ordering"""
+
+    def test_same_id_shares_lock(self):
+        """Each patron and item ID maps to exactly one lock"""
+        locks = LockManager()
+        self.assertIs(locks.patron_lock(1), locks.patron_lock(1))
+        self.assertIs(locks.item_lock(1), locks.item_lock(1))
+        self.assertIsNot(locks.patron_lock(1), locks.item_lock(1))
+
+    def test_hold_releases_on_error(self):
+        """Locks are released even if the transaction raises"""
+        locks = LockManager()
+        with self.assertRaises(RuntimeError):
+            with locks.hold((2, 1), (5,)):
+                raise RuntimeError("boom")
+        self.assertFalse(locks.patron_lock(1).locked())
+        self.assertFalse(locks.patron_lock(2).locked())
+        self.assertFalse(locks.item_lock(5).locked())
+
+
+class TestCirculationStress(unittest.TestCase):
+    """Multi-threaded loan/return/pay stress test"""
+
+    def test_last_copy_is_never_oversubscribed(self):
+        """Many desks racing for one copy produce exactly one loan"""
+        data_manager = build_data(num_patrons=64, num_items=1, copies=1)
+        circulation = Circulation(data_manager)
+        barrier = threading.Barrier(64)
+        results = []
+
+        def desk(patron_id):
+            barrier.wait()
+            results.append(circulation.loan(patron_id, 1)[0])
+
+        threads = [threading.Thread(target=desk, args=(patron_id,))
+                   for patron_id in range(1, 65)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(data_manager.get_item(1)._on_loan, 1)
+
+    def test_counts_stay_consistent_under_load(self):
+        """Random loans, returns and payments leave counts consistent"""
+        data_manager = build_data(num_patrons=40, num_items=12, copies=2)
+        circulation = Circulation(data_manager)
+
+        def desk(seed):
+            rng = random.Random(seed)
+            for _ in range(2000):
+                patron_id = rng.randint(1, 40)
+                item_id = rng.randint(1, 12)
+                action = rng.random()
+                if action < 0.5:
+                    circulation.loan(patron_id, item_id)
+                elif action < 0.95:
+                    circulation.return_item(patron_id, item_id)
+                else:
+                    circulation.pay_fee(patron_id, 1.0)
+
+        threads = [threading.Thread(target=desk, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        loans_per_item = {}
+        for patron in data_manager.get_all_patrons():
+            for loan in patron._loans:
+                item_id = loan._item._id
+                loans_per_item[item_id] = loans_per_item.get(item_id, 0) + 1
+
+        for item in data_manager.get_all_items():
+            self.assertLessEqual(item._on_loan, item._num_copies)
+            self.assertEqual(item._on_loan, loans_per_item.get(item._id, 0))
+
+    def test_unknown_ids_are_reported(self):
+        """Unknown patrons and items are rejected without locking"""
+        circulation = Circulation(build_data(1, 1, 1))
+        self.assertEqual(circulation.loan(99, 1), (False, "Patron with ID 99 not found"))
+        self.assertEqual(circulation.loan(1, 99), (False, "Item with ID 99 not found"))
+        self.assertFalse(circulation.return_item(99, 1)[0])
+        self.assertFalse(circulation.pay_fee(1, -5)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for the synthetic dataset generator
+"""
+
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from src.data_mgmt import DataManager
+from src.datagen import generate
+from src.policy import get_policy
+
+
+class TestDatagen(unittest.TestCase):
+    """Tests for generate"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_generated_data_loads_and_is_consistent(self):
+        """Loans respect the copies owned and the one-per-type rule"""
+        catalogue_file, patron_file = generate(self.directory.name, 500, 60, seed=3)
+        data_manager = DataManager()
+        data_manager.load_data(catalogue_file, patron_file)
+
+        patrons = data_manager.get_all_patrons()
+        items = data_manager.get_all_items()
+        self.assertEqual((len(patrons), len(items)), (500, 60))
+        loans_per_item = Counter(loan._item._id for patron in patrons for loan in patron._loans)
+        self.assertGreater(sum(loans_per_item.values()), 0)
+        for item in items:
+            self.assertEqual(item._on_loan, loans_per_item[item._id])
+            self.assertLessEqual(item._on_loan, item._num_copies)
+        for patron in patrons:
+            types = [loan._item._type for loan in patron._loans]
+            self.assertEqual(len(types), len(set(types)))
+            if patron._age < 18:
+                self.assertFalse(patron._makerspace_training)
+
+    def test_loans_follow_the_rules(self):
+        """No loan breaks an item rule, and at least half of every item's copies stay in"""
+        catalogue_file, patron_file = generate(self.directory.name, 3000, seed=5)
+        data_manager = DataManager()
+        data_manager.load_data(catalogue_file, patron_file)
+
+        policy = get_policy()
+        for patron in data_manager.get_all_patrons():
+            for loan in patron._loans:
+                rule = policy.item_rule(loan._item._type)
+                self.assertFalse(rule.not_borrowable)
+                self.assertFalse(patron._age < 18 and rule.minor_restriction)
+                if rule.training_field:
+                    self.assertTrue(getattr(patron, rule.training_field))
+        for item in data_manager.get_all_items():
+            self.assertLessEqual(2 * item._on_loan, item._num_copies)
+
+    def test_same_seed_same_files(self):
+        """A seed reproduces the dataset"""
+        first = generate(os.path.join(self.directory.name, "a"), 50, seed=9)
+        second = generate(os.path.join(self.directory.name, "b"), 50, seed=9)
+        for first_path, second_path in zip(first, second):
+            with open(first_path, encoding="utf-8") as first_file, \
+                    open(second_path, encoding="utf-8") as second_file:
+                self.assertEqual(first_file.read(), second_file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
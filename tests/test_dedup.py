@@ -0,0 +1,50 @@
+"""
+Tests for duplicate patron detection
+"""
+
+import unittest
+
+from src import dedup
+from src.data_mgmt import DataManager, Patron
+
+
+class TestFindDuplicates(unittest.TestCase):
+    """Tests for blocking, scoring and clustering"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        patrons = [(1, "John Doe", 95), (2, "Jon Doe", 95), (3, "DOE, John", 95),
+                   (4, "John Doe", 40), (5, "Mary Smyth", 30), (6, "Mary Smith", 30),
+                   (7, "Peter Parker", 30), (8, "Anna Karenina", 30)]
+        for patron_id, name, age in patrons:
+            self.data_manager.add_patron(Patron(patron_id, name, age))
+
+    def test_clusters(self):
+        """Near-identical names of the same age are clustered; other ages are not"""
+        report = dedup.find_duplicates(self.data_manager, workers=1)
+        self.assertEqual([cluster.patron_ids for cluster in report.clusters],
+                         [(1, 2, 3), (5, 6)])
+        self.assertGreaterEqual(min(cluster.score for cluster in report.clusters),
+                                dedup.THRESHOLD)
+        self.assertEqual(report.patrons, 8)
+
+    def test_threshold(self):
+        """Only identical names match at a threshold of 1"""
+        report = dedup.find_duplicates(self.data_manager, threshold=1.0, workers=1)
+        self.assertEqual([cluster.patron_ids for cluster in report.clusters], [(1, 3)])
+
+    def test_pool_matches_single_process(self):
+        """Scoring blocks in worker processes finds the same clusters"""
+        single = dedup.find_duplicates(self.data_manager, workers=1)
+        pooled = dedup.find_duplicates(self.data_manager, workers=2)
+        self.assertEqual(pooled.clusters, single.clusters)
+        self.assertEqual(pooled.comparisons, single.comparisons)
+
+    def test_cluster_pairs(self):
+        """Chains of pairs join into one cluster with the lowest score"""
+        clusters = dedup.cluster_pairs([(4, 9, 0.9), (9, 2, 0.95), (7, 8, 1.0)])
+        self.assertEqual(clusters, [dedup.Cluster((2, 4, 9), 0.9), dedup.Cluster((7, 8), 1.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
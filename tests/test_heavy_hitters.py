@@ -0,0 +1,91 @@
+"""
+Tests for the bounded-memory heavy hitters
+"""
+
+import random
+import unittest
+from collections import Counter
+from datetime import date
+
+from src import clock, events
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import Patron
+from src.heavy_hitters import CirculationTrends, CountMinSketch, SpaceSaving
+
+
+def skewed_stream(length, keys, seed=1):
+    """A reproducible stream where low keys are much more common"""
+    rng = random.Random(seed)
+    return [int(keys ** rng.random()) for _ in range(length)]
+
+
+class TestHeavyHitters(unittest.TestCase):
+    """Tests for SpaceSaving, CountMinSketch and CirculationTrends"""
+
+    def test_space_saving_is_exact_below_capacity(self):
+        """With room for every key the counts are exact"""
+        counter = SpaceSaving(10)
+        for key in "abracadabra":
+            counter.add(key)
+        self.assertEqual(counter.top(2), [("a", 5, 0), ("b", 2, 0)])
+        self.assertEqual(counter.guaranteed("r"), 2)
+
+    def test_space_saving_within_bounds(self):
+        """Every reported count brackets the exact count"""
+        stream = skewed_stream(20000, 5000)
+        exact = Counter(stream)
+        counter = SpaceSaving(100)
+        for key in stream:
+            counter.add(key)
+        self.assertEqual(len(counter), 100)
+        for key, count, error in counter.top(100):
+            self.assertLessEqual(count - error, exact[key])
+            self.assertLessEqual(exact[key], count)
+            self.assertLessEqual(count - exact[key], counter.error_bound())
+        self.assertEqual([key for key, _, _ in counter.top(5)],
+                         [key for key, _ in exact.most_common(5)])
+
+    def test_count_min_never_underestimates(self):
+        """Estimates are never low and stay within the error bound"""
+        stream = skewed_stream(20000, 5000)
+        exact = Counter(stream)
+        sketch = CountMinSketch.from_error(0.001, 0.01)
+        for key in stream:
+            sketch.add(key)
+        for key, count in exact.items():
+            estimate = sketch.estimate(key)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate - count, sketch.error_bound())
+
+    def test_trends_follow_loans_by_month(self):
+        """Loans are counted per month and last month's top items are kept"""
+        previous_bus = events.set_event_bus(None)
+        simulated = clock.SimulatedClock(date(2025, 1, 30))
+        previous_clock = clock.set_clock(simulated)
+        try:
+            trends = CirculationTrends(item_capacity=5, patron_capacity=5)
+            trends.attach()
+            heavy = Patron(1, "Ann", 70)
+            light = Patron(2, "Ben", 40)
+            items = [BorrowableItem(item_id, f"Item {item_id}", item_type, 100)
+                     for item_id, item_type in enumerate(["Fiction Book", "Magazine", "DVD"])]
+            for item in items:
+                BusinessLogic.process_loan(heavy, item)
+            BusinessLogic.process_loan(light, items[0])
+            self.assertEqual(trends.top_items(1), [(0, 2, 0)])
+            self.assertEqual(trends.heavy_borrowers(min_loans=3), [(1, 3)])
+
+            simulated.advance(5)
+            BusinessLogic.process_loan(light, items[1])
+            trends.detach()
+            self.assertEqual(trends.month(), (2025, 2))
+            self.assertEqual(trends.loans_this_month(), 1)
+            self.assertEqual(trends.previous_month()[0], (2025, 1))
+        finally:
+            events.set_event_bus(previous_bus)
+            clock.set_clock(previous_clock)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for hold queues and allocation on return
+"""
+
+import unittest
+
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, Patron
+from src.holds import HoldQueues
+
+
+class TestHoldQueues(unittest.TestCase):
+    """Tests for FIFO holds, lazy cancellation and eligibility re-checks"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        for patron_id in range(1, 6):
+            self.data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+        self.item = BorrowableItem(10, "Dune", "Fiction Book", 1)
+        self.data_manager.add_item(self.item)
+        self.holds = HoldQueues(self.data_manager.get_patron)
+        BusinessLogic.process_loan(self.data_manager.get_patron(1), self.item)
+
+    def patron(self, patron_id):
+        """Look up a test patron"""
+        return self.data_manager.get_patron(patron_id)
+
+    def test_return_goes_to_first_holder(self):
+        """Holders are served in the order they queued"""
+        self.holds.place_hold(self.patron(3), self.item)
+        self.holds.place_hold(self.patron(2), self.item)
+
+        success, message, _ = BusinessLogic.process_return(self.patron(1), 10, self.holds)
+
+        self.assertTrue(success)
+        self.assertIn("Allocated to waiting patron 3", message)
+        self.assertTrue(self.patron(3).has_item(10))
+        self.assertEqual(self.holds.queue_length(10), 1)
+        self.assertEqual(self.holds.get_holds(3), [])
+
+    def test_cancelled_and_ineligible_holders_are_skipped(self):
+        """Cancelled holds and holders with fees are passed over"""
+        self.holds.place_hold(self.patron(2), self.item)
+        self.holds.place_hold(self.patron(3), self.item)
+        self.holds.place_hold(self.patron(4), self.item)
+        self.holds.cancel_hold(2, 10)
+        self.patron(3).add_fee(5.0)
+
+        BusinessLogic.process_return(self.patron(1), 10, self.holds)
+
+        self.assertTrue(self.patron(4).has_item(10))
+        self.assertFalse(self.patron(3).has_item(10))
+        self.assertEqual(self.holds.queue_length(10), 0)
+
+    def test_requeued_hold_goes_to_the_back(self):
+        """Cancelling and re-placing a hold loses the old place"""
+        self.holds.place_hold(self.patron(2), self.item)
+        self.holds.place_hold(self.patron(3), self.item)
+        self.holds.cancel_hold(2, 10)
+        self.holds.place_hold(self.patron(2), self.item)
+
+        self.assertEqual(self.holds.peek(10), 3)
+        self.assertFalse(self.holds.place_hold(self.patron(2), self.item)[0])
+
+    def test_cancel_between_peek_and_allocate(self):
+        """A hold cancelled after peek() is not allocated"""
+        self.holds.place_hold(self.patron(2), self.item)
+        BusinessLogic.process_return(self.patron(1), 10)
+        self.assertEqual(self.holds.peek(10), 2)
+        self.holds.cancel_hold(2, 10)
+
+        self.assertIsNone(self.holds.allocate_to(self.item, 2))
+        self.assertFalse(self.patron(2).has_item(10))
+        self.assertEqual(self.holds.queue_length(10), 0)
+        self.assertIsNone(self.holds.peek(10))
+
+    def test_finished_holds_leave_nothing_behind(self):
+        """Cancelled and allocated holds are pruned rather than kept forever"""
+        for _ in range(100):
+            self.holds.place_hold(self.patron(2), self.item)
+            self.holds.place_hold(self.patron(3), self.item)
+            self.holds.cancel_hold(2, 10)
+        self.assertEqual(self.holds.queue_length(10), 1)
+        self.assertLessEqual(len(self.holds._queues[10]), 2)
+
+        BusinessLogic.process_return(self.patron(1), 10, self.holds)
+        self.assertTrue(self.patron(3).has_item(10))
+        self.assertEqual((self.holds._active, self.holds._queues), ({}, {}))
+
+    def test_circulation_allocates_on_return(self):
+        """The locked circulation path also hands copies to holders"""
+        circulation = Circulation(self.data_manager, holds=self.holds)
+        self.assertFalse(circulation.loan(2, 10)[0])
+        self.assertTrue(circulation.place_hold(2, 10)[0])
+
+        success, message, _ = circulation.return_item(1, 10)
+
+        self.assertTrue(success)
+        self.assertIn("Allocated to waiting patron 2", message)
+        self.assertEqual(self.item._on_loan, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
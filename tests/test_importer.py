@@ -0,0 +1,130 @@
+"""
+Tests for bulk patron import
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from src import importer
+from src.borrowable_item import BorrowableItem
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+
+
+def record(patron_id, name, age, fees=0.0, loans=(), makerspace=False):
+    """A patrons.json record"""
+    return {"patron_id": patron_id, "name": name, "age": age, "outstanding_fees": fees,
+            "gardening_tool_training": False, "carpentry_tool_training": False,
+            "makerspace_training": makerspace, "version": 3,
+            "loans": [{"item": item_id, "due": "01/03/2025"} for item_id in loans]}
+
+
+class TestImportPatrons(unittest.TestCase):
+    """Tests for import_patrons"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.incoming = os.path.join(self.directory.name, "incoming.json")
+        with open(self.incoming, "w", encoding="utf-8") as file:
+            json.dump([
+                record(1, "SMITH, Anna", 40, fees=2.5, loans=[1], makerspace=True),
+                record(2, "Bob Jones", 30, loans=[1, 99]),
+                record(50, "Carol White", 25),
+                record(51, "Anne Smith", 41),
+                record(52, "bob jones", 30, fees=1.0),
+            ], file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def populate(self, data_manager):
+        """Our own catalogue and patrons"""
+        data_manager.add_item(BorrowableItem(1, "Dune", "Fiction Book", 5))
+        data_manager.add_patron(Patron(1, "Anna Smith", 40, outstanding_fees=1.0))
+        data_manager.add_patron(Patron(2, "Dan Brown", 60))
+        return data_manager
+
+    def test_merges_and_reassignments(self):
+        """Duplicates are merged, colliding IDs reassigned and near matches reported"""
+        data_manager = self.populate(DataManager())
+        report = importer.import_patrons(data_manager, self.incoming)
+        self.assertEqual((report.read, report.added), (5, 3))
+        self.assertEqual(report.merged, [(1, 1), (52, 3)])
+        self.assertEqual(report.reassigned, [(2, 3)])
+        self.assertEqual(report.possible, [(51, 1)])
+        self.assertEqual(report.dropped_loans, 1)
+
+        anna = data_manager.get_patron(1)
+        self.assertEqual((anna._outstanding_fees, anna._makerspace_training, len(anna._loans)),
+                         (3.5, True, 1))
+        bob = data_manager.get_patron(3)
+        self.assertEqual((bob._name, bob._outstanding_fees, bob._version), ("Bob Jones", 1.0, 0))
+        self.assertEqual(data_manager.get_patron(2)._name, "Dan Brown")
+        self.assertEqual(data_manager.get_item(1)._on_loan, 2)
+        self.assertIn("1 possible duplicates to check", importer.format_report(report))
+
+    def test_columnar_data_manager(self):
+        """Imports into a columnar store give the same result"""
+        data_manager = self.populate(ColumnarDataManager())
+        report = importer.import_patrons(data_manager, self.incoming)
+        self.assertEqual(report.merged, [(1, 1), (52, 3)])
+        self.assertEqual(data_manager.get_patron(1)._outstanding_fees, 3.5)
+        self.assertEqual(len(data_manager.get_all_patrons()), 5)
+
+    def test_reimport_does_not_double_loans(self):
+        """Importing the same file again leaves loans and copies on loan unchanged"""
+        data_manager = self.populate(DataManager())
+        importer.import_patrons(data_manager, self.incoming)
+        report = importer.import_patrons(data_manager, self.incoming)
+        self.assertEqual(report.duplicate_loans, 2)
+        self.assertEqual([len(data_manager.get_patron(patron_id)._loans)
+                          for patron_id in (1, 3)], [1, 1])
+        self.assertEqual(data_manager.get_item(1)._on_loan, 2)
+
+    def test_loans_beyond_copies_refused(self):
+        """Loans that would lend more copies than are owned are refused and reported"""
+        with open(self.incoming, "w", encoding="utf-8") as file:
+            json.dump([record(patron_id, f"Reader {patron_id}", 30, loans=[1])
+                       for patron_id in range(10, 17)], file)
+        data_manager = self.populate(DataManager())
+        report = importer.import_patrons(data_manager, self.incoming)
+        self.assertEqual(report.refused_loans, [(15, 1), (16, 1)])
+        item = data_manager.get_item(1)
+        self.assertEqual((item._on_loan, item._num_copies), (5, 5))
+        self.assertEqual(data_manager.get_patron(16)._loans, [])
+        self.assertIn("2 loans refused for lack of copies", importer.format_report(report))
+
+    def test_repeated_records_skipped(self):
+        """A record repeated in one file adds its fees and loans only once"""
+        with open(self.incoming, "w", encoding="utf-8") as file:
+            json.dump([record(10, "Eve Adams", 30, fees=2.0, loans=[1])] * 3, file)
+        data_manager = self.populate(DataManager())
+        report = importer.import_patrons(data_manager, self.incoming)
+        self.assertEqual((report.read, report.added, report.repeated), (3, 1, [10, 10]))
+        eve = data_manager.get_patron(10)
+        self.assertEqual((eve._outstanding_fees, len(eve._loans)), (2.0, 1))
+        self.assertEqual(data_manager.get_item(1)._on_loan, 1)
+
+    def test_command_line(self):
+        """The command line saves the merged data and writes the report"""
+        catalogue_file = os.path.join(self.directory.name, "catalogue.json")
+        patron_file = os.path.join(self.directory.name, "patrons.json")
+        report_file = os.path.join(self.directory.name, "report.json")
+        self.populate(DataManager()).save_data(catalogue_file, patron_file)
+        with redirect_stdout(io.StringIO()) as output:
+            importer.main([self.incoming, "--catalogue", catalogue_file, "--patrons",
+                           patron_file, "--report", report_file])
+        self.assertIn("5 patrons read", output.getvalue())
+        data_manager = DataManager()
+        data_manager.load_data(catalogue_file, patron_file)
+        self.assertEqual(len(data_manager.get_all_patrons()), 5)
+        with open(report_file, encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["reassigned"], [[2, 3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
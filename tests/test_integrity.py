@@ -0,0 +1,110 @@
+"""
+Tests for the load-time catalogue and loan integrity checks
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from src import integrity
+from src.data_mgmt import DataManager
+
+
+def item(item_id, on_loan, owned=2):
+    """A catalogue.json record"""
+    return {"item_id": item_id, "item_name": f"Item {item_id}", "item_type": "Fiction Book",
+            "year": 2000, "number_owned": owned, "on_loan": on_loan}
+
+
+def patron(patron_id, *item_ids):
+    """A patrons.json record with loans of the given items"""
+    return {"patron_id": patron_id, "name": f"Patron {patron_id}", "age": 30,
+            "outstanding_fees": 0.0, "gardening_tool_training": False,
+            "carpentry_tool_training": False, "makerspace_training": False,
+            "loans": [{"item": item_id, "due": "01/03/2025"} for item_id in item_ids]}
+
+
+class TestIntegrity(unittest.TestCase):
+    """Tests for integrity.check and its use on load"""
+
+    def setUp(self):
+        self.items = [item(1, 1), item(2, 0), item(3, 2, owned=1)]
+        self.patrons = [patron(10, 1, 99), patron(11, 2), patron(11, 3), patron(12, 3)]
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalogue_file = os.path.join(self.directory.name, "catalogue.json")
+        self.patron_file = os.path.join(self.directory.name, "patrons.json")
+        for path, records in ((self.catalogue_file, self.items),
+                              (self.patron_file, self.patrons)):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(records, file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_clean_data(self):
+        """Agreeing files produce an empty report"""
+        report = integrity.check([item(1, 1), item(2, 0)], [patron(10, 1), patron(11)])
+        self.assertTrue(integrity.is_clean(report))
+        self.assertEqual((report.items, report.patrons, report.loans), (2, 2, 1))
+        self.assertIn("No problems found", integrity.format_report(report))
+
+    def test_problems_found(self):
+        """Duplicates, dangling loans and count mismatches are all reported"""
+        report = integrity.check(self.items, self.patrons)
+        self.assertEqual(report.duplicate_patron_ids, [11])
+        self.assertEqual(report.dangling_loans, [(10, 99)])
+        # The first record of patron 11 is not loaded, so item 2 is not on loan
+        self.assertEqual(report.on_loan_mismatches, [])
+        self.assertEqual(report.over_lent, [(3, 1, 2)])
+        self.assertFalse(report.rebuilt)
+        self.assertEqual(self.items[0]["on_loan"], 1)
+
+    def test_rebuild_for_duplicate_item_ids(self):
+        """A rebuild caused only by duplicate item IDs is reported as a rebuild"""
+        items = [item(1, 0), item(1, 1)]
+        report = integrity.check(items, [patron(10, 1)], rebuild=True)
+        self.assertEqual((report.duplicate_item_ids, report.on_loan_mismatches), ([1], []))
+        self.assertTrue(report.rebuilt)
+        self.assertEqual([record["on_loan"] for record in items], [1, 1])
+
+    def test_rebuild_on_load(self):
+        """rebuild_counts sets on_loan from the loans that were loaded"""
+        self.items[1]["on_loan"] = 2
+        with open(self.catalogue_file, "w", encoding="utf-8") as file:
+            json.dump(self.items, file)
+        data_manager = DataManager()
+        data_manager.load_data(self.catalogue_file, self.patron_file)
+        self.assertEqual(data_manager.get_integrity_report().on_loan_mismatches, [(2, 2, 0)])
+        self.assertEqual(data_manager.get_item(2)._on_loan, 2)
+
+        data_manager = DataManager()
+        data_manager.load_data(self.catalogue_file, self.patron_file, rebuild_counts=True)
+        self.assertTrue(data_manager.get_integrity_report().rebuilt)
+        self.assertEqual(data_manager.get_item(2)._on_loan, 0)
+        self.assertEqual([len(data_manager.get_patron(patron_id)._loans)
+                          for patron_id in (10, 11, 12)], [1, 1, 1])
+
+    def test_command_line_fix(self):
+        """--fix saves the rebuilt counts; loans beyond the copies owned remain"""
+        self.items[0]["on_loan"] = 0
+        with open(self.catalogue_file, "w", encoding="utf-8") as file:
+            json.dump(self.items, file)
+        arguments = ["--catalogue", self.catalogue_file, "--patrons", self.patron_file]
+        with redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(integrity.main(arguments), 1)
+            self.assertEqual(integrity.main(arguments + ["--fix"]), 1)
+        self.assertIn("item 1: on_loan 0, 1 loans (rebuilt)", output.getvalue())
+
+        data_manager = DataManager()
+        data_manager.load_data(self.catalogue_file, self.patron_file)
+        report = data_manager.get_integrity_report()
+        self.assertEqual((report.duplicate_patron_ids, report.dangling_loans,
+                          report.on_loan_mismatches), ([], [], []))
+        self.assertEqual(report.over_lent, [(3, 1, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests for the JSON ID indexes and one-shot queries
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from src import bat, json_index
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron, item_to_record, patron_to_record, write_records
+from src.loan import Loan
+
+
+class TestIterRecords(unittest.TestCase):
+    """Tests for the streaming record scanner"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "records.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_offsets_cover_each_record(self):
+        """Every record is yielded with the exact bytes it occupies"""
+        records = [{"id": 1, "name": "Zoë"}, {"id": 2, "name": "Łukasz", "tags": [1, {"a": "]"}]}]
+        self.write(json.dumps(records, ensure_ascii=False, indent=2))
+        with open(self.path, "rb") as file:
+            data = file.read()
+        found = list(json_index.iter_records(self.path, chunk_size=5))
+        self.assertEqual([record for _, _, record in found], records)
+        for start, end, record in found:
+            self.assertEqual(json.loads(data[start:end]), record)
+
+    def test_empty_array(self):
+        """An empty array has no records"""
+        self.write("[ ]")
+        self.assertEqual(list(json_index.iter_records(self.path)), [])
+
+    def test_malformed_files(self):
+        """Files that are not arrays of objects are rejected"""
+        for text in ('{"id": 1}', "[1, 2]", '[{"id": 1}', '[{"id": 1},'):
+            self.write(text)
+            with self.assertRaises(ValueError, msg=text):
+                list(json_index.iter_records(self.path, chunk_size=4))
+
+
+class TestJsonIndex(unittest.TestCase):
+    """Tests for the sidecar index and partial loading"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalogue = os.path.join(self.directory.name, "catalogue.json")
+        self.patrons = os.path.join(self.directory.name, "patrons.json")
+        items = [BorrowableItem(item_id, f"Item {item_id}", "DVD", 2) for item_id in (5, 1, 3)]
+        write_records(self.catalogue, map(item_to_record, items))
+        patron = Patron(42, "Jane", 30, outstanding_fees=2.5)
+        patron._loans = [Loan(items[2], date(2025, 1, 1))]
+        write_records(self.patrons, [patron_to_record(patron),
+                                     patron_to_record(Patron(7, "Sam", 40))])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lookup(self):
+        """Records are found by ID whatever their order in the file"""
+        index = json_index.JsonIndex.open(self.catalogue, "item_id")
+        self.assertEqual(len(index), 3)
+        self.assertIn(3, index)
+        self.assertNotIn(2, index)
+        self.assertEqual(index.get(1)["item_name"], "Item 1")
+        self.assertIsNone(index.get(2))
+        self.assertEqual(sorted(index.get_many([5, 3, 9])), [3, 5])
+
+    def test_duplicate_ids_keep_the_last(self):
+        """With duplicate IDs the index returns the record load_data keeps"""
+        for order in ((4, 4, 2, 4), (2, 4, 4, 4)):
+            write_records(self.patrons, [patron_to_record(Patron(patron_id, f"P{place}", 30))
+                                         for place, patron_id in enumerate(order)])
+            index = json_index.JsonIndex.build(self.patrons, "patron_id")
+            data_manager = DataManager()
+            data_manager.load_data(self.catalogue, self.patrons)
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.get(4)["name"], data_manager.get_patron(4)._name)
+            self.assertEqual(index.get(4)["name"], "P3")
+            self.assertEqual(index.get(2)["name"], data_manager.get_patron(2)._name)
+
+    def test_sidecar_reused_until_file_changes(self):
+        """The sidecar is read back, and rebuilt once the JSON file changes"""
+        json_index.JsonIndex.open(self.patrons, "patron_id")
+        self.assertTrue(os.path.exists(f"{self.patrons}.idx"))
+        with patch.object(json_index.JsonIndex, "build") as build:
+            self.assertEqual(json_index.JsonIndex.open(self.patrons, "patron_id").get(7)["name"],
+                             "Sam")
+            build.assert_not_called()
+
+        write_records(self.patrons, [patron_to_record(Patron(8, "Kim Longer-Name", 50))])
+        index = json_index.JsonIndex.open(self.patrons, "patron_id")
+        self.assertNotIn(7, index)
+        self.assertEqual(index.get(8)["name"], "Kim Longer-Name")
+
+    def test_load_patron_reads_only_its_items(self):
+        """A patron is loaded with their loans and only the items they hold"""
+        with patch("src.json_index.item_from_record",
+                   wraps=json_index.item_from_record) as convert:
+            patron = json_index.load_patron(42, self.catalogue, self.patrons)
+        self.assertEqual(convert.call_count, 1)
+        self.assertEqual(patron._loans[0]._item._id, 3)
+        self.assertIsNone(json_index.load_patron(1, self.catalogue, self.patrons))
+
+    def test_subcommands(self):
+        """patron show, item show and fees answer from the indexed files"""
+        files = ["--catalogue", self.catalogue, "--patrons", self.patrons]
+        with patch("sys.stdout", new_callable=io.StringIO) as out:
+            self.assertEqual(bat.main(files + ["patron", "show", "42"]), 0)
+            self.assertEqual(bat.main(files + ["item", "show", "5"]), 0)
+            self.assertEqual(bat.main(files + ["fees", "7"]), 0)
+        text = out.getvalue()
+        self.assertIn("Jane (ID: 42", text)
+        self.assertIn("Item 5 (ID: 5", text)
+        self.assertIn("Outstanding fees: $0.00", text)
+        with patch("sys.stderr", new_callable=io.StringIO) as error:
+            self.assertEqual(bat.main(files + ["fees", "99"]), 1)
+        self.assertIn("not found", error.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the append-only fee ledger
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from src import clock, ledger
+from src.borrowable_item import BorrowableItem
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, Patron
+from src.events import EventBus, set_event_bus
+from src.loan import Loan
+
+START = date(2025, 3, 1)
+
+
+class TestFeeLedger(unittest.TestCase):
+    """Tests for FeeLedger entries, balances and statements"""
+
+    def setUp(self):
+        self.ledger = ledger.FeeLedger()
+        for day in range(10):
+            self.ledger.record(1, ledger.CHARGE, 150, START + timedelta(days=day))
+            if day % 3 == 2:
+                self.ledger.record(1, ledger.PAYMENT, -200, START + timedelta(days=day))
+        self.ledger.record(2, ledger.CHARGE, 5, START)
+
+    def test_balances(self):
+        """Balances are exact sums of the entries in cents"""
+        self.assertEqual(self.ledger.balance(1), 10 * 150 - 3 * 200)
+        self.assertEqual(self.ledger.balance(2), 5)
+        self.assertEqual(self.ledger.balance(3), 0)
+        self.assertEqual(len(self.ledger), 14)
+
+    def test_statement_for_range(self):
+        """A statement has the entries in the range and the balances either side"""
+        statement = self.ledger.statement(1, START + timedelta(days=2),
+                                          START + timedelta(days=4))
+        self.assertEqual(statement.opening, 300)
+        self.assertEqual([(line.date.day, line.kind, line.cents) for line in statement.entries],
+                         [(3, "charge", 150), (3, "payment", -200), (4, "charge", 150),
+                          (5, "charge", 150)])
+        self.assertEqual(statement.closing, 550)
+        full = self.ledger.statement(1)
+        self.assertEqual((full.opening, len(full.entries), full.closing),
+                         (0, 13, self.ledger.balance(1)))
+        empty = self.ledger.statement(1, date(2030, 1, 1))
+        self.assertEqual((empty.opening, empty.entries, empty.closing), (900, [], 900))
+        self.assertIn("Closing balance", ledger.format_statement(statement))
+
+    def test_entries_in_date_order(self):
+        """An entry dated before the patron's last one is refused"""
+        with self.assertRaises(ValueError):
+            self.ledger.record(1, ledger.CHARGE, 100, START)
+
+    def test_file_round_trip(self):
+        """Entries are read back from the file, less any half-written record"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fees.ledger")
+            written = ledger.FeeLedger(path)
+            written.record(7, ledger.CHARGE, 1234, START)
+            written.record(7, ledger.PAYMENT, -1000, START)
+            written.close()
+            with open(path, "ab") as file:
+                file.write(b"\x07\x00")
+            reopened = ledger.FeeLedger(path)
+            self.assertEqual((len(reopened), reopened.balance(7)), (2, 234))
+            reopened.close()
+            self.assertEqual(os.path.getsize(path), 48)
+
+    def test_format_cents(self):
+        """Cents format as dollars with a sign"""
+        self.assertEqual(ledger.format_cents(1250), "$12.50")
+        self.assertEqual(ledger.format_cents(-75), "-$0.75")
+
+
+class TestLedgerEvents(unittest.TestCase):
+    """Tests for recording circulation events in the ledger"""
+
+    def setUp(self):
+        self.previous_clock = clock.set_clock(clock.SimulatedClock(START))
+        self.previous_bus = set_event_bus(EventBus())
+        self.data_manager = DataManager()
+        book = BorrowableItem(1, "Dune", "Fiction Book", 1)
+        self.data_manager.add_item(book)
+        patron = Patron(1, "Ann", 30, outstanding_fees=0.1)
+        patron._loans.append(Loan(book, START - timedelta(days=3)))
+        book._on_loan = 1
+        self.data_manager.add_patron(patron)
+        self.ledger = ledger.FeeLedger()
+        self.ledger.attach()
+
+    def tearDown(self):
+        self.ledger.close()
+        set_event_bus(self.previous_bus)
+        clock.set_clock(self.previous_clock)
+
+    def test_fees_and_payments_recorded(self):
+        """Charges and payments are recorded, after the fees carried over"""
+        circulation = Circulation(self.data_manager)
+        fee = circulation.return_item(1, 1)[2]
+        for _ in range(3):
+            circulation.pay_fee(1, 0.1)
+        patron = self.data_manager.get_patron(1)
+        self.assertEqual([(line.kind, line.cents) for line in self.ledger.statement(1).entries],
+                         [("adjustment", 10), ("charge", ledger.to_cents(fee)),
+                          ("payment", -10), ("payment", -10), ("payment", -10)])
+        self.assertEqual(self.ledger.balance(1), ledger.to_cents(patron._outstanding_fees))
+
+    def test_event_before_last_entry(self):
+        """An event dated before the last entry is recorded on that date, not refused"""
+        later = START + timedelta(days=10)
+        self.ledger.record(1, ledger.ADJUSTMENT, 10, later)
+        success, _, remaining = Circulation(self.data_manager).pay_fee(1, 0.05)
+        self.assertTrue(success)
+        self.assertAlmostEqual(remaining, 0.05)
+        line = self.ledger.statement(1).entries[-1]
+        self.assertEqual((line.date, line.kind, line.cents), (later, "payment", -5))
+        self.assertEqual(self.ledger.balance(1), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tests for name normalisation and match keys
+"""
+
+import unittest
+
+from src import matching
+
+
+class TestMatching(unittest.TestCase):
+    """Tests for normalise_name and the match keys"""
+
+    def test_normalise_name(self):
+        """Accents, case, punctuation and word order do not matter"""
+        self.assertEqual(matching.normalise_name("O'Brien, Seán"), "obrien sean")
+        self.assertEqual(matching.normalise_name("  sean   OBRIEN "), "obrien sean")
+        self.assertEqual(matching.normalise_name("Zoë Smith-Jones"), "jones smith zoe")
+        self.assertEqual(matching.normalise_name("李 小龍"), "小龍 李")
+
+    def test_exact_key(self):
+        """The exact key combines the sorted words with the age"""
+        tokens = matching.name_tokens("Smith, Anna")
+        self.assertEqual(matching.exact_key(tokens, 40), ("anna smith", 40))
+        self.assertNotEqual(matching.exact_key(tokens, 40),
+                            matching.exact_key(matching.name_tokens("Anna Smith"), 41))
+
+    def test_blocking_keys(self):
+        """Blocking keys use surname and initial, and probes allow a birthday"""
+        tokens = matching.name_tokens("Anna Maria Smith")
+        self.assertEqual(matching.blocking_key(tokens, 40), ("smith", "a", 40))
+        self.assertIn(matching.blocking_key(matching.name_tokens("Ann Smith"), 41),
+                      matching.probe_keys(tokens, 40))
+        self.assertIsNone(matching.blocking_key([], 40))
+        self.assertEqual(matching.probe_keys([], 40), [])
+
+    def test_soundex(self):
+        """Names that sound alike share a Soundex code"""
+        codes = {word: matching.soundex(word)
+                 for word in ["robert", "rupert", "ashcraft", "tymczak", "pfister", "jon", "john"]}
+        self.assertEqual(codes, {"robert": "R163", "rupert": "R163", "ashcraft": "A261",
+                                 "tymczak": "T522", "pfister": "P236", "jon": "J500",
+                                 "john": "J500"})
+        self.assertEqual(matching.soundex("42"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for memory accounting
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+from src import memprofile
+from src.borrowable_item import BorrowableItem
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+from src.holds import HoldQueues
+from src.loan import Loan
+
+
+def make_data(data_manager):
+    """Add two items and two patrons with one loan each."""
+    for item_id in (1, 2):
+        data_manager.add_item(BorrowableItem(item_id, f"Item {item_id}", "Fiction Book", 3))
+    for patron_id in (1, 2):
+        patron = Patron(patron_id, f"Patron {patron_id}", 30)
+        patron._loans = [Loan(data_manager.get_item(patron_id), date(2025, 1, 1))]
+        data_manager.add_patron(patron)
+    return data_manager
+
+
+class TestDeepSize(unittest.TestCase):
+    """Tests for deep object sizing"""
+
+    def test_containers_and_slots(self):
+        """Sizes include referenced objects once"""
+        text = "x" * 1000
+        size, objects = memprofile.deep_size([text, text])
+        self.assertEqual(objects, 2)
+        self.assertEqual(size, sys.getsizeof([text, text]) + sys.getsizeof(text))
+
+        item = BorrowableItem(1, "A long title " * 10, "DVD", 2)
+        size, _ = memprofile.deep_size(item)
+        self.assertGreater(size, sys.getsizeof(item) + len(item._name))
+
+    def test_seen_objects_are_skipped(self):
+        """Objects already charged cost nothing the second time"""
+        seen = set()
+        payload = ["y" * 100]
+        memprofile.deep_size(payload, seen)
+        self.assertEqual(memprofile.deep_size(payload, seen), (0, 0))
+
+
+class TestProfile(unittest.TestCase):
+    """Tests for the per-subsystem report"""
+
+    def test_sections(self):
+        """Catalogue, loans, patrons and other state are charged separately"""
+        data_manager = make_data(DataManager())
+        holds = HoldQueues(data_manager.get_patron)
+        report = memprofile.profile(data_manager, extra={"holds": holds})
+        sections = {section["name"]: section for section in report["sections"]}
+        self.assertEqual(list(sections),
+                         ["catalogue", "loans", "patrons", "lock_manager", "integrity_report",
+                          "holds"])
+        # Two loan lists, two loans and their due dates; items belong to the catalogue
+        self.assertEqual(sections["loans"]["objects"], 6)
+        self.assertGreater(sections["patrons"]["bytes"], 0)
+        self.assertEqual(report["total"], sum(s["bytes"] for s in report["sections"]))
+        self.assertIsNone(report["tracemalloc"])
+
+    def test_columnar_store(self):
+        """The columnar store appears as its own section"""
+        data_manager = make_data(ColumnarDataManager())
+        sections = {section["name"]: section
+                    for section in memprofile.profile(data_manager)["sections"]}
+        self.assertGreater(sections["patron_store"]["bytes"], 0)
+        self.assertEqual(sections["loans"]["objects"], 0)
+
+    def test_write_report(self):
+        """Reports are written as text and JSON"""
+        report = memprofile.profile(make_data(DataManager()))
+        with tempfile.TemporaryDirectory() as directory:
+            path = memprofile.write_report(report, directory)
+            with open(path, encoding="utf-8") as file:
+                self.assertIn("catalogue", file.read())
+            with open(os.path.splitext(path)[0] + ".json", encoding="utf-8") as file:
+                self.assertEqual(json.load(file)["total"], report["total"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Tests for operation metrics
+"""
+
+import io
+import os
+import signal
+import unittest
+from unittest.mock import patch
+
+from src import metrics, search
+from src.bat_ui import BatUI
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Tests for the log-linear histogram"""
+
+    def test_buckets_hold_their_values(self):
+        """Every value falls inside its bucket, which is within about 3% wide"""
+        for value in list(range(200)) + [1000, 4095, 4096, 123456, 10 ** 9]:
+            low, high = metrics.bucket_bounds(metrics.bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertGreaterEqual(high, value)
+            self.assertLessEqual(high - low, max(1, value / 32))
+
+    def test_percentiles(self):
+        """Percentiles come within a bucket of the true values"""
+        histogram = metrics.LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(value * 1000)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 1000)
+        self.assertEqual(summary["max"], 1000000)
+        self.assertAlmostEqual(summary["mean"], 500500)
+        for key, expected in (("p50", 500000), ("p90", 900000), ("p99", 990000)):
+            self.assertGreaterEqual(summary[key], expected)
+            self.assertLessEqual(summary[key], expected * 1.04)
+
+    def test_huge_values_saturate(self):
+        """Values beyond the last bucket are kept there, with the exact maximum"""
+        histogram = metrics.LatencyHistogram()
+        histogram.record(2 ** 50)
+        self.assertEqual(histogram.percentile(50), 2 ** 50)
+
+    def test_merge(self):
+        """Merging adds the counts"""
+        first, second = metrics.LatencyHistogram(), metrics.LatencyHistogram()
+        first.record(10)
+        second.record(5000)
+        first.merge(second)
+        self.assertEqual(first.count, 2)
+        self.assertEqual(first.summary()["max"], 5000)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Tests for enabling metrics on the entry points"""
+
+    def setUp(self):
+        metrics.get_metrics().reset()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.get_metrics().reset()
+
+    def test_disabled_leaves_originals(self):
+        """Nothing is wrapped until metrics are enabled, and disable restores"""
+        original = BusinessLogic.__dict__["check_loan_allowed"]
+        original_search = search.search_patron_by_id
+        metrics.enable()
+        self.assertTrue(metrics.is_enabled())
+        self.assertIsNot(BusinessLogic.__dict__["check_loan_allowed"], original)
+        metrics.disable()
+        self.assertFalse(metrics.is_enabled())
+        self.assertIs(BusinessLogic.__dict__["check_loan_allowed"], original)
+        self.assertIs(search.search_patron_by_id, original_search)
+
+    def test_calls_are_counted(self):
+        """Instrumented calls record one latency each and still return normally"""
+        metrics.enable()
+        patron = Patron(1, "Jane", 30)
+        item = BorrowableItem(1, "Dune", "Fiction Book", 2)
+        self.assertTrue(BusinessLogic.process_loan(patron, item)[0])
+        self.assertIs(search.search_patron_by_id([patron], 1), patron)
+        data_manager = DataManager()
+        data_manager.add_patron(patron)
+        self.assertIs(data_manager.get_patron(1), patron)
+
+        snapshot = metrics.get_metrics().snapshot()
+        self.assertEqual(snapshot["BusinessLogic.process_loan"]["count"], 1)
+        # process_loan checks the loan through the instrumented entry point
+        self.assertEqual(snapshot["BusinessLogic.check_loan_allowed"]["count"], 1)
+        self.assertEqual(snapshot["search.search_patron_by_id"]["count"], 1)
+        self.assertEqual(snapshot["DataManager.get_patron"]["count"], 1)
+        self.assertNotIn("DataManager.load_data", snapshot)
+
+    def test_data_manager_subclasses_are_timed(self):
+        """Overrides in the DataManager subclasses are recorded under their own names"""
+        metrics.enable()
+        data_manager = ColumnarDataManager()
+        data_manager.add_patron(Patron(1, "Jane", 30))
+        self.assertEqual(data_manager.get_patron(1)._name, "Jane")
+        snapshot = metrics.get_metrics().snapshot()
+        self.assertEqual(snapshot["ColumnarDataManager.get_patron"]["count"], 1)
+        self.assertEqual(snapshot["ColumnarDataManager.add_patron"]["count"], 1)
+        metrics.disable()
+        self.assertFalse(hasattr(ColumnarDataManager.__dict__["get_patron"], "__wrapped__"))
+
+    def test_exceptions_are_timed(self):
+        """A call that raises is still recorded"""
+        recorded = metrics.Metrics()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            metrics.timed("fail", fail, recorded)()
+        self.assertEqual(recorded.snapshot()["fail"]["count"], 1)
+
+    def test_format_and_dump(self):
+        """The dump is a table with one line per operation"""
+        self.assertIn("No operations recorded", metrics.get_metrics().format())
+        metrics.get_metrics().record("search.search_item_by_id", 2500)
+        out = io.StringIO()
+        metrics.dump(out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("operation"))
+        self.assertTrue(lines[1].startswith("search.search_item_by_id"))
+        self.assertIn("2.5", lines[1])
+
+    @unittest.skipUnless(hasattr(signal, "SIGUSR1"), "needs SIGUSR1")
+    def test_signal_dumps(self):
+        """SIGUSR1 writes the table"""
+        out = io.StringIO()
+        previous = signal.getsignal(signal.SIGUSR1)
+        try:
+            self.assertTrue(metrics.install_signal_handler(file=out))
+            metrics.get_metrics().record("DataManager.save_data", 1000)
+            os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+        self.assertIn("DataManager.save_data", out.getvalue())
+
+    @patch('src.user_input.get_yes_no_input', return_value=True)
+    def test_ui_enables_metrics(self, _mock_input):
+        """The metrics screen offers to start recording"""
+        ui = BatUI(DataManager())
+        with patch('builtins.print'):
+            ui.view_metrics()
+        self.assertTrue(metrics.is_enabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
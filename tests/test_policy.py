@@ -0,0 +1,86 @@
+"""
+Tests for the loan policy engine and hot reload
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from src import policy
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.data_mgmt import Patron
+
+
+class TestLoanPolicy(unittest.TestCase):
+    """Tests for policy lookups and reloading"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "policy.json")
+
+    def tearDown(self):
+        policy.set_policy(policy.DEFAULT_POLICY)
+        self.directory.cleanup()
+
+    def write_policy(self, data):
+        """Write a policy file for the test"""
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def test_default_policy_keeps_existing_rules(self):
+        """The default policy gives the original limits, periods and reasons"""
+        self.assertEqual(BusinessLogic._get_loan_period("Laptop"), 3)
+        self.assertEqual(BusinessLogic._get_loan_period("Unknown"), 14)
+        minor = Patron(1, "Alice", 8)
+        tool = BorrowableItem(1, "Saw", "Carpentry Tool", 2)
+        self.assertEqual(BusinessLogic.check_loan_allowed(minor, tool),
+                         (False, "Minors cannot borrow tools"))
+        adult = Patron(2, "Bob", 40)
+        self.assertEqual(BusinessLogic.check_loan_allowed(adult, tool),
+                         (False, "Carpentry tool training required"))
+        reference = BorrowableItem(2, "Atlas", "Reference Book", 1)
+        self.assertEqual(BusinessLogic.check_loan_allowed(adult, reference),
+                         (False, "Reference books cannot be borrowed"))
+
+    def test_round_trip_and_read_only(self):
+        """Policies survive to_dict/from_dict and cannot be mutated"""
+        copy = policy.LoanPolicy.from_dict(policy.DEFAULT_POLICY.to_dict())
+        self.assertEqual(copy.to_dict(), policy.DEFAULT_POLICY.to_dict())
+        with self.assertRaises(TypeError):
+            copy._max_loans["Minor"] = 100
+
+    def test_hot_reload_changes_rules(self):
+        """A reloaded policy file takes effect on the next check"""
+        data = policy.DEFAULT_POLICY.to_dict()
+        data["loan_periods"]["Laptop"] = 0
+        data["overdue_fee_per_day"] = 0.5
+        self.write_policy(data)
+
+        policy.reload_policy(self.path)
+
+        patron = Patron(1, "Jane", 30)
+        laptop = BorrowableItem(1, "Laptop 1", "Laptop", 1)
+        self.assertEqual(BusinessLogic.check_loan_allowed(patron, laptop),
+                         (False, "Laptop cannot be borrowed"))
+        self.assertEqual(policy.get_policy().overdue_fee_per_day(), 0.5)
+        self.assertFalse(policy.reload_policy_if_changed(self.path))
+
+    def test_invalid_policy_keeps_current(self):
+        """A broken policy file is rejected and the old policy stays in force"""
+        self.write_policy({"loan_periods": {}})
+        with self.assertRaises(ValueError):
+            policy.reload_policy(self.path)
+        self.assertIs(policy.get_policy(), policy.DEFAULT_POLICY)
+
+        self.write_policy(dict(policy.DEFAULT_POLICY.to_dict(),
+                               training_required={"Laptop": "laptop_training"}))
+        with self.assertRaises(ValueError):
+            policy.reload_policy(self.path)
+        self.assertIs(policy.reload_policy(self.path + ".missing", missing_ok=True),
+                      policy.DEFAULT_POLICY)
+
+
+if __name__ == '__main__':
+    unittest.main()
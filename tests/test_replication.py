@@ -0,0 +1,116 @@
+"""
+Tests for multi-branch replication through event logs
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.borrowable_item import BorrowableItem
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, Patron
+from src.events import EventBus, set_event_bus
+from src.replication import LOG_SUFFIX, Replicator
+
+
+class Branch:
+    """One branch's data, event bus and replicator, all in this process"""
+
+    def __init__(self, shared_dir, name):
+        self.data_manager = DataManager()
+        self.data_manager.add_item(BorrowableItem(1, "Dune", "Fiction Book", 2))
+        self.data_manager.add_patron(Patron(1, "Ann", 30))
+        self.data_manager.add_patron(Patron(2, "Bob", 40))
+        self.event_bus = EventBus()
+        self.replicator = Replicator(self.data_manager, shared_dir, name)
+        self.replicator.attach(self.event_bus)
+        self.circulation = Circulation(self.data_manager)
+
+    def run(self, method, *args):
+        """Call a Circulation method with this branch's event bus in use"""
+        previous = set_event_bus(self.event_bus)
+        try:
+            return getattr(self.circulation, method)(*args)
+        finally:
+            set_event_bus(previous)
+
+    def state(self):
+        """Loans, fees and copies on loan, for comparing branches"""
+        patrons = {patron._id: (sorted((loan._item._id, loan._due_date)
+                                       for loan in patron._loans),
+                                round(patron._outstanding_fees, 2))
+                   for patron in self.data_manager.iter_patrons()}
+        return patrons, self.data_manager.get_item(1)._on_loan
+
+
+class TestReplication(unittest.TestCase):
+    """Tests for shipping and applying branch event logs"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.north = Branch(self.directory, "north")
+        self.south = Branch(self.directory, "south")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_loan_and_return_replicate(self):
+        """A loan made at one branch and returned at the other is gone at both"""
+        self.assertTrue(self.north.run("loan", 1, 1)[0])
+        self.assertEqual(self.south.replicator.poll(), (1, 0))
+        self.assertEqual(self.south.data_manager.get_item(1)._on_loan, 1)
+        self.assertTrue(self.south.run("return_item", 1, 1)[0])
+        self.assertEqual(self.north.replicator.poll(), (1, 0))
+        self.assertEqual(self.north.state(), self.south.state())
+        self.assertEqual(self.north.data_manager.get_item(1)._on_loan, 0)
+
+    def test_return_waits_for_its_loan(self):
+        """An event is held back until the events it depends on are applied"""
+        self.north.run("loan", 1, 1)
+        self.south.replicator.poll()
+        self.south.run("return_item", 1, 1)
+
+        east_dir = os.path.join(self.directory, "east")
+        os.makedirs(east_dir)
+        east = Branch(east_dir, "east")
+        shutil.copy(os.path.join(self.directory, "south" + LOG_SUFFIX), east_dir)
+        self.assertEqual(east.replicator.poll(), (0, 0))
+        shutil.copy(os.path.join(self.directory, "north" + LOG_SUFFIX), east_dir)
+        self.assertEqual(east.replicator.poll(), (2, 0))
+        self.assertEqual(east.state(), self.south.state())
+
+    def test_concurrent_transactions_converge(self):
+        """Both branches end up the same after lending and paying at once"""
+        self.north.run("loan", 1, 1)
+        self.south.run("loan", 2, 1)
+        for branch in (self.north, self.south):
+            branch.data_manager.get_patron(2)._outstanding_fees = 10.0
+        self.north.run("pay_fee", 2, 10.0)
+        self.south.run("pay_fee", 2, 4.0)
+        self.north.replicator.poll()
+        self.south.replicator.poll()
+        self.assertEqual(self.north.state(), self.south.state())
+        self.assertEqual(self.north.data_manager.get_item(1)._on_loan, 2)
+        # The patron paid twice, so the second payment is held as credit
+        self.assertEqual(self.north.data_manager.get_patron(2)._outstanding_fees, -4.0)
+
+    def test_restart_resumes_from_checkpoint(self):
+        """A restarted branch neither repeats applied events nor reuses sequence numbers"""
+        self.north.run("loan", 1, 1)
+        self.south.replicator.poll()
+        self.south.replicator.checkpoint()
+        log_path = os.path.join(self.directory, "north" + LOG_SUFFIX)
+        with open(log_path, "a", encoding="utf-8") as file:
+            file.write('{"type":"payment","pat')
+
+        restarted = Replicator(self.south.data_manager, self.directory, "south")
+        self.assertEqual(restarted.poll(), (0, 0))
+        north = Replicator(self.north.data_manager, self.directory, "north")
+        self.assertEqual(north.vector_clock(), {"north": 1})
+        with open(log_path, encoding="utf-8") as file:
+            self.assertTrue(file.read().endswith("\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the streaming report renderer
+"""
+
+import csv
+import io
+import json
+import unittest
+from datetime import date
+
+from src import clock, reporting
+from src.borrowable_item import BorrowableItem
+from src.columnar import ColumnarDataManager
+from src.data_mgmt import DataManager, Patron
+from src.loan import Loan
+
+
+def populate(data_manager):
+    """Add two items and three patrons, one with an overdue loan"""
+    book = BorrowableItem(1, "Dune", "Fiction Book", 2, year=1965)
+    data_manager.add_item(book)
+    data_manager.add_item(BorrowableItem(2, "Saw", "Carpentry Tool", 1))
+    ann = Patron(1, "Ann", 40, outstanding_fees=1.5)
+    ann._loans.append(Loan(book, date(2025, 3, 1)))
+    data_manager.add_patron(ann)
+    data_manager.add_patron(Patron(2, "Ben", 12))
+    data_manager.add_patron(Patron(3, "Cat", 70, outstanding_fees=4.0))
+
+
+class TestReporting(unittest.TestCase):
+    """Tests for write_report"""
+
+    def setUp(self):
+        self.previous = clock.set_clock(clock.SimulatedClock(date(2025, 3, 11)))
+
+    def tearDown(self):
+        clock.set_clock(self.previous)
+
+    def render(self, data_manager, **options):
+        """Write a report to a string"""
+        out = io.StringIO()
+        count = reporting.write_report(data_manager, out, **options)
+        return count, out.getvalue()
+
+    def test_text_report_lists_every_patron(self):
+        """The text report has a header, a rule and one line per patron"""
+        data_manager = DataManager()
+        populate(data_manager)
+        count, text = self.render(data_manager)
+        lines = text.splitlines()
+        self.assertEqual(count, 3)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0].split()[0], "ID")
+        self.assertIn("Ann", lines[2])
+        self.assertIn("10.00", lines[2])
+
+    def test_csv_columns_and_sorting(self):
+        """Selected columns are written in order, sorted by either manager"""
+        for data_manager in (DataManager(), ColumnarDataManager()):
+            populate(data_manager)
+            _, text = self.render(data_manager, output_format="csv",
+                                  columns=["name", "outstanding_fees"],
+                                  sort_by="outstanding_fees", descending=True)
+            rows = list(csv.reader(io.StringIO(text)))
+            self.assertEqual(rows, [["name", "outstanding_fees"], ["Cat", "4.0"],
+                                    ["Ann", "1.5"], ["Ben", "0.0"]])
+
+    def test_jsonl_loans_and_items(self):
+        """Loan and item reports produce one JSON object per line"""
+        data_manager = ColumnarDataManager()
+        populate(data_manager)
+        _, text = self.render(data_manager, report="loans", output_format="jsonl")
+        self.assertEqual([json.loads(line) for line in text.splitlines()], [{
+            "patron_id": 1, "patron_name": "Ann", "item_id": 1, "item_name": "Dune",
+            "due": "2025-03-01", "days_overdue": 10,
+        }])
+        count, text = self.render(data_manager, report="items", output_format="jsonl",
+                                  sort_by="available")
+        self.assertEqual(count, 2)
+        self.assertEqual(json.loads(text.splitlines()[0])["item_id"], 2)
+        # Reading loans for the report leaves the columnar arrays untouched
+        self.assertEqual(data_manager.get_patron_store()._loan_overlay, {})
+
+    def test_unknown_options_rejected(self):
+        """Unknown reports, columns and formats raise ValueError"""
+        data_manager = DataManager()
+        for options in ({"report": "fines"}, {"columns": ["shoe_size"]},
+                        {"sort_by": "shoe_size"}, {"output_format": "xml"}):
+            with self.assertRaises(ValueError):
+                self.render(data_manager, **options)
+
+    def test_full_string_unchanged(self):
+        """to_full_string still ends each line with a newline"""
+        patron = Patron(2, "Ben", 12)
+        self.assertEqual(patron.to_full_string(), f"{patron}\n  No current loans\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for the scripted command mode
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src import bat, datagen
+from src.bat_ui import BatUI
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron
+
+
+class TestRunScript(unittest.TestCase):
+    """Tests for BatUI.run_script"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        self.data_manager.add_item(BorrowableItem(4, "Dune", "Fiction Book", 1))
+        self.patron = Patron(12, "Jane", 30, outstanding_fees=5.0)
+        self.data_manager.add_patron(self.patron)
+        self.ui = BatUI(self.data_manager)
+
+    def run_lines(self, *lines):
+        out = io.StringIO()
+        counts = self.ui.run_script(lines, out)
+        return counts, [line.split("\t") for line in out.getvalue().splitlines()]
+
+    def test_commands(self):
+        """Borrow, return and pay run as transactions with one result line each"""
+        counts, results = self.run_lines("pay 12 3.50", "pay 12 1.50", "borrow 12 4",
+                                         "return 12 4")
+        self.assertEqual(counts, (4, 0))
+        self.assertEqual([result[:3] for result in results],
+                         [["1", "ok", "pay"], ["2", "ok", "pay"], ["3", "ok", "borrow"],
+                          ["4", "ok", "return"]])
+        self.assertEqual(results[0][3], "1.50")
+        self.assertEqual(results[1][3], "0.00")
+        self.assertEqual(results[3][3], "0.00")
+        self.assertEqual(self.patron._outstanding_fees, 0)
+        self.assertEqual(self.data_manager.get_item(4)._on_loan, 0)
+
+    def test_failures(self):
+        """Refused transactions are reported and counted as failures"""
+        counts, results = self.run_lines("return 12 4", "borrow 99 4")
+        self.assertEqual(counts, (0, 2))
+        self.assertEqual(results[0][1], "fail")
+        self.assertIn("not found", results[1][4])
+
+    def test_malformed_commands(self):
+        """Blank lines and comments are skipped; malformed lines are errors"""
+        counts, results = self.run_lines("", "# comment", "borrow 12", "pay 12 nan",
+                                         "renew 12 4", "pay twelve 1")
+        self.assertEqual(counts, (0, 4))
+        self.assertEqual([result[0] for result in results], ["3", "4", "5", "6"])
+        self.assertTrue(all(result[1] == "error" for result in results))
+        self.assertIn("Usage: borrow PATRON ITEM", results[0][4])
+
+
+class TestMain(unittest.TestCase):
+    """Tests for the --script command line"""
+
+    def test_script_file_saves_changes(self):
+        """A script runs against the given files and saves unless told not to"""
+        with tempfile.TemporaryDirectory() as directory:
+            catalogue, patrons = datagen.generate(directory, 20, 10, seed=1)
+            script = os.path.join(directory, "commands.txt")
+            with open(script, "w", encoding="utf-8") as file:
+                file.write("pay 1 0.01\n")
+            paths = ["--catalogue", catalogue, "--patrons", patrons, "--script", script]
+            with open(patrons, encoding="utf-8") as file:
+                fees = json.load(file)[0]["outstanding_fees"]
+
+            with patch("sys.stdout", new_callable=io.StringIO), \
+                    patch("sys.stderr", new_callable=io.StringIO):
+                self.assertEqual(bat.main(paths + ["--no-save"]), 0)
+                with open(patrons, encoding="utf-8") as file:
+                    self.assertEqual(json.load(file)[0]["outstanding_fees"], fees)
+                self.assertEqual(bat.main(paths), 0)
+            with open(patrons, encoding="utf-8") as file:
+                self.assertEqual(json.load(file)[0]["outstanding_fees"],
+                                 round(max(fees - 0.01, 0.0), 2))
+
+    def test_no_save_refused_with_shared_dir(self):
+        """Changes already shipped to the other branches cannot be discarded"""
+        with patch("sys.stderr", new_callable=io.StringIO) as error, \
+                self.assertRaises(SystemExit):
+            bat.parse_args(["--script", "s.txt", "--no-save", "--shared-dir", "logs",
+                            "--branch", "north"])
+        self.assertIn("--no-save", error.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Tests for the asyncio circulation service and its client
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron
+from src.service import CirculationServer
+from src.service_client import ServiceClient
+
+
+def build_data():
+    """Create a small DataManager for the service"""
+    data_manager = DataManager()
+    data_manager.add_patron(Patron(1, "Jane Smith", 23, makerspace_training=True))
+    data_manager.add_patron(Patron(2, "Alice Johnson", 8))
+    data_manager.add_item(BorrowableItem(10, "Dune", "Fiction Book", 1))
+    return data_manager
+
+
+class TestDispatch(unittest.TestCase):
+    """Tests for request handling without sockets"""
+
+    def setUp(self):
+        self.server = CirculationServer(build_data())
+
+    def test_borrow_then_return(self):
+        """Borrow and return go through the business rules"""
+        reply = self.server.dispatch({"op": "borrow", "patron_id": 1, "item_id": 10, "id": 7})
+        self.assertTrue(reply["ok"])
+        self.assertEqual(reply["id"], 7)
+
+        reply = self.server.dispatch({"op": "borrow", "patron_id": 2, "item_id": 10})
+        self.assertEqual(reply, {"ok": False, "message": "No copies available"})
+
+        reply = self.server.dispatch({"op": "return", "patron_id": 1, "item_id": 10})
+        self.assertTrue(reply["ok"])
+        self.assertEqual(reply["fees"], 0.0)
+
+    def test_search_and_makerspace(self):
+        """Search returns patron records; makerspace applies access rules"""
+        reply = self.server.dispatch({"op": "search", "by": "name", "name": "jane smith"})
+        self.assertEqual([p["patron_id"] for p in reply["patrons"]], [1])
+
+        reply = self.server.dispatch({"op": "search", "by": "age", "age": 8})
+        self.assertEqual([p["patron_id"] for p in reply["patrons"]], [2])
+
+        self.assertTrue(self.server.dispatch({"op": "makerspace", "patron_id": 1})["ok"])
+        self.assertFalse(self.server.dispatch({"op": "makerspace", "patron_id": 2})["ok"])
+
+    def test_bad_requests(self):
+        """Malformed requests produce error replies rather than exceptions"""
+        self.assertFalse(self.server.dispatch({"op": "fly"})["ok"])
+        self.assertFalse(self.server.dispatch({"op": "borrow", "patron_id": 1})["ok"])
+        self.assertFalse(self.server.dispatch({"op": "pay", "patron_id": 1,
+                                               "amount": "lots"})["ok"])
+        self.assertFalse(json.loads(self.server.handle_line(b"{not json"))["ok"])
+        self.assertFalse(self.server.dispatch({"op": ["borrow"]})["ok"])
+        self.assertFalse(json.loads(self.server.handle_line(
+            b'{"op": "borrow", "patron_id": 1e400, "item_id": 1}'))["ok"])
+
+    def test_handler_errors_are_replies(self):
+        """An unexpected error in a handler is answered, not raised"""
+        with patch.object(self.server.data_manager, "save_data", side_effect=KeyError(7)):
+            reply = self.server.dispatch({"op": "save", "id": 3})
+        self.assertEqual((reply["ok"], reply["id"]), (False, 3))
+
+    def test_large_patron_id_does_not_stop_the_service(self):
+        """A patron ID too large for the access array is still served"""
+        data_manager = build_data()
+        data_manager.add_patron(Patron(2 ** 26, "Ann Lee", 40, makerspace_training=True))
+        with self.assertLogs("src.access", "WARNING"):
+            server = CirculationServer(data_manager)
+        self.assertTrue(server.dispatch({"op": "makerspace", "patron_id": 2 ** 26})["ok"])
+        self.assertTrue(server.dispatch({"op": "borrow", "patron_id": 2 ** 26,
+                                         "item_id": 10})["ok"])
+
+    def test_non_finite_payment_refused(self):
+        """NaN and infinite payments leave the fees unchanged"""
+        self.server.data_manager.get_patron(1)._outstanding_fees = 4.5
+        for amount in ("nan", "inf", "-inf"):
+            reply = self.server.dispatch({"op": "pay", "patron_id": 1, "amount": amount})
+            self.assertFalse(reply["ok"])
+            self.assertEqual(reply["remaining"], 4.5)
+
+    def test_utilisation_sampler(self):
+        """The sampler takes the hour's sample once and saves it"""
+        self.server.data_manager.get_item(10)._on_loan = 1
+
+        async def sample_briefly(path):
+            sampler = asyncio.create_task(self.server.sample_utilisation(path, interval=0.001))
+            await asyncio.sleep(0.05)
+            sampler.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "utilisation.bin")
+            asyncio.run(sample_briefly(path))
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.server.utilisation.samples, 1)
+        self.assertEqual(self.server.utilisation.history(10), [1])
+
+
+class TestSocketRoundTrip(unittest.TestCase):
+    """Tests driving a real server through ServiceClient"""
+
+    def setUp(self):
+        self.server = CirculationServer(build_data())
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.server.start(port=0))
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def tearDown(self):
+        async def shutdown():
+            self.server._server.close()
+            await self.server._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_client_round_trip(self):
+        """Several clients share one loaded DataManager"""
+        port = self.server.get_port()
+        with ServiceClient(port=port) as first, ServiceClient(port=port) as second:
+            self.assertEqual(first.request("ping")["message"], "pong")
+            self.assertTrue(first.borrow(1, 10)["ok"])
+            self.assertEqual(second.borrow(2, 10)["message"], "No copies available")
+            patron = second.search_by_id(1)["patrons"][0]
+            self.assertEqual(patron["loans"][0]["item"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
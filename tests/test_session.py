@@ -0,0 +1,94 @@
+"""
+Tests for injectable input and session record/replay
+"""
+
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src import session, user_input
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager, Patron
+
+
+class TestInputSource(unittest.TestCase):
+    """Tests for per-thread input sources"""
+
+    def tearDown(self):
+        user_input.set_input_source(None)
+
+    def test_source_answers_prompts(self):
+        """Validation loops read from the source until they get a valid line"""
+        user_input.set_input_source(session.ScriptedSource(["x", "42", "7"]))
+        self.assertEqual(user_input.get_int_input("ID: "), 42)
+        self.assertEqual(user_input.read_integer_range(1, 7), 7)
+        with self.assertRaises(EOFError):
+            user_input.get_string_input("Name: ")
+
+    def test_sources_are_per_thread(self):
+        """A source set on one thread does not affect another"""
+        user_input.set_input_source(session.ScriptedSource(["main"]))
+        seen = []
+
+        def other():
+            user_input.set_input_source(session.ScriptedSource(["other"]))
+            seen.append(user_input.get_string_input("? "))
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, ["other"])
+        self.assertEqual(user_input.get_string_input("? "), "main")
+
+    def test_recording_round_trip(self):
+        """Recorded input loads back as the same lines"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "desk.jsonl")
+            with open(path, "w", encoding="utf-8") as file:
+                user_input.set_input_source(
+                    session.RecordingSource(file, session.ScriptedSource(["3", "Jane"])))
+                user_input.get_menu_choice("Enter choice: ", ["3"])
+                user_input.get_string_input("Enter patron name: ")
+            self.assertEqual(session.load_session(path), ["3", "Jane"])
+
+
+class TestReplay(unittest.TestCase):
+    """Tests for replaying sessions through parallel menus"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        self.data_manager.add_item(BorrowableItem(1, "Dune", "Fiction Book", 1))
+        for patron_id in range(1, 9):
+            self.data_manager.add_patron(Patron(patron_id, f"Patron {patron_id}", 30))
+
+    def test_parallel_sessions_share_the_data(self):
+        """Eight desks race for one copy; exactly one loan is made"""
+        sessions = [["1", "1", str(patron_id), "7"] for patron_id in range(1, 9)]
+        result = session.replay(self.data_manager, sessions, threads=4, capture=True)
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(result["inputs"], 32)
+        self.assertEqual(sum("Success!" in output for output in result["outputs"]), 1)
+        self.assertEqual(self.data_manager.get_item(1)._on_loan, 1)
+        self.assertEqual(sum(len(patron._loans) for patron in self.data_manager.iter_patrons()),
+                         1)
+
+    def test_session_without_exit(self):
+        """A session that runs out of input simply ends"""
+        result = session.replay(self.data_manager, [["3", "2", "1"]], threads=1, capture=True)
+        self.assertEqual(result["errors"], [])
+        self.assertIn("Found:", result["outputs"][0])
+
+    def test_output_is_restored(self):
+        """Standard output is the original stream after a replay"""
+        original = io.StringIO()
+        with patch("sys.stdout", original):
+            session.replay(self.data_manager, [["7"]], threads=2)
+            print("after")
+        self.assertEqual(original.getvalue(), "after\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+"""
+Tests for versioned compare-and-swap storage in src.storage
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.borrowable_item import BorrowableItem
+from src.business_logic import BusinessLogic
+from src.concurrency import Circulation
+from src.data_mgmt import DataManager, Patron
+from src.events import EventBus, LoanEvent, set_event_bus
+from src.storage import ConflictError, StoredDataManager, VersionedStore
+
+
+class TestVersionedStore(unittest.TestCase):
+    """Two desks (DataManagers) sharing one store directory"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        seed = DataManager()
+        seed.add_patron(Patron(1, "Jane Smith", 23))
+        seed.add_patron(Patron(2, "Bob Brown", 40))
+        seed.add_item(BorrowableItem(10, "Dune", "Fiction Book", 1))
+        seed.add_item(BorrowableItem(11, "Heat", "DVD", 3))
+        self.store = VersionedStore(self.directory.name)
+        self.store.import_data(seed)
+        self.desk_a = DataManager()
+        self.desk_b = DataManager()
+        self.store.load_into(self.desk_a)
+        self.store.load_into(self.desk_b)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stale_write_is_rejected(self):
+        """The second writer of the same item gets a conflict, not a lost update"""
+        BusinessLogic.process_loan(self.desk_a.get_patron(1), self.desk_a.get_item(10))
+        self.store.commit([self.desk_a.get_patron(1)], [self.desk_a.get_item(10)])
+
+        BusinessLogic.process_loan(self.desk_b.get_patron(2), self.desk_b.get_item(10))
+        with self.assertRaises(ConflictError) as raised:
+            self.store.commit([self.desk_b.get_patron(2)], [self.desk_b.get_item(10)])
+        self.assertEqual(raised.exception.conflicts, [("items", 10, 0, 1)])
+
+    def test_transact_retries_against_fresh_data(self):
+        """A retried transaction sees the winner's loan and fails cleanly"""
+        self.store.transact(
+            self.desk_a,
+            lambda: BusinessLogic.process_loan(self.desk_a.get_patron(1),
+                                               self.desk_a.get_item(10)),
+            patron_ids=(1,), item_ids=(10,)
+        )
+        result, retries = self.store.transact(
+            self.desk_b,
+            lambda: BusinessLogic.process_loan(self.desk_b.get_patron(2),
+                                               self.desk_b.get_item(10)),
+            patron_ids=(2,), item_ids=(10,)
+        )
+        self.assertEqual(result, (False, "No copies available"))
+        self.assertEqual(retries, 0)
+
+        check = DataManager()
+        self.store.load_into(check)
+        self.assertEqual(check.get_item(10)._on_loan, 1)
+        self.assertEqual(len(check.get_patron(1)._loans), 1)
+        self.assertEqual(check.get_patron(2)._loans, [])
+
+    def test_independent_records_commit_side_by_side(self):
+        """Desks touching different records never conflict"""
+        BusinessLogic.process_loan(self.desk_a.get_patron(1), self.desk_a.get_item(10))
+        BusinessLogic.process_loan(self.desk_b.get_patron(2), self.desk_b.get_item(11))
+        self.store.commit([self.desk_a.get_patron(1)], [self.desk_a.get_item(10)])
+        self.store.commit([self.desk_b.get_patron(2)], [self.desk_b.get_item(11)])
+        self.assertEqual(self.desk_b.get_item(11)._version, 1)
+
+    def test_failed_write_keeps_version(self):
+        """Memory stays at the stored version when a write fails"""
+        patron = self.desk_a.get_patron(1)
+        patron._outstanding_fees = 2.0
+        with patch.object(self.store, "_write", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.commit([patron])
+        self.assertEqual(patron._version, 0)
+        self.store.commit([patron])
+        self.assertEqual(patron._version, 1)
+
+    def test_locks_of_live_writers_are_kept(self):
+        """Only a lock whose owner has exited is broken, however old"""
+        lock_path = self.store._lock_path("items", 10)
+        with open(lock_path, "w", encoding="utf-8") as file:
+            file.write(f"{os.getpid()} other-token")
+        os.utime(lock_path, (0, 0))
+        self.assertFalse(self.store._is_stale(lock_path))
+
+        exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                                capture_output=True, text=True, check=True)
+        with open(lock_path, "w", encoding="utf-8") as file:
+            file.write(f"{exited.stdout.strip()} dead-token")
+        self.assertTrue(self.store._is_stale(lock_path))
+        self.store.commit(items=[self.desk_a.get_item(10)])
+        self.assertFalse(os.path.exists(lock_path))
+
+
+class TestStoredDataManager(unittest.TestCase):
+    """Two BAT processes' desks sharing one store through Circulation"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        seed = DataManager()
+        seed.add_patron(Patron(1, "Jane Smith", 23, outstanding_fees=3.0))
+        seed.add_patron(Patron(2, "Bob Brown", 40))
+        seed.add_patron(Patron(3, "Ann Lee", 35))
+        seed.add_item(BorrowableItem(10, "Dune", "Fiction Book", 1))
+        self.catalogue_file = os.path.join(self.directory.name, "catalogue.json")
+        self.patron_file = os.path.join(self.directory.name, "patrons.json")
+        seed.save_data(self.catalogue_file, self.patron_file)
+        store_directory = os.path.join(self.directory.name, "store")
+        self.desks = []
+        for _ in range(2):
+            desk = StoredDataManager(VersionedStore(store_directory))
+            desk.load_data(self.catalogue_file, self.patron_file)
+            self.desks.append(desk)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_changes_are_not_overwritten(self):
+        """Each desk sees the other's commits, and saving loses neither"""
+        desk_a, desk_b = (Circulation(desk) for desk in self.desks)
+        self.assertTrue(desk_a.loan(2, 10)[0])
+        self.assertEqual(desk_b.loan(3, 10), (False, "No copies available"))
+        self.assertTrue(desk_b.pay_fee(1, 1.0)[0])
+
+        self.desks[0].save_data(self.catalogue_file, self.patron_file)
+        self.desks[1].save_data(self.catalogue_file, self.patron_file)
+        with open(self.patron_file, encoding="utf-8") as file:
+            saved = {record["patron_id"]: record for record in json.load(file)}
+        self.assertEqual((saved[1]["outstanding_fees"], len(saved[2]["loans"])), (2.0, 1))
+
+    def test_conflict_after_retries(self):
+        """A change that keeps conflicting is refused and undone"""
+        circulation = Circulation(self.desks[0])
+        with patch.object(VersionedStore, "commit",
+                          side_effect=ConflictError([("patrons", 1, 0, 1)])):
+            success, message, _ = circulation.pay_fee(1, 1.0)
+        self.assertFalse(success)
+        self.assertIn("try again", message)
+        self.assertEqual(self.desks[0].get_patron(1)._outstanding_fees, 3.0)
+
+    def test_events_sent_once_per_commit(self):
+        """Attempts that conflict publish nothing; the one that commits publishes once"""
+        event_bus = EventBus()
+        loans = []
+        event_bus.subscribe(LoanEvent, loans.append)
+        previous = set_event_bus(event_bus)
+        self.addCleanup(set_event_bus, previous)
+        circulation = Circulation(self.desks[0])
+        commit = VersionedStore.commit
+        conflicts = [ConflictError([("items", 10, 0, 1)])] * 2
+
+        def flaky_commit(store, patrons=(), items=()):
+            if conflicts:
+                raise conflicts.pop()
+            return commit(store, patrons, items)
+
+        with patch.object(VersionedStore, "commit", flaky_commit):
+            self.assertTrue(circulation.loan(2, 10)[0])
+        self.assertEqual(len(loans), 1)
+
+        with patch.object(VersionedStore, "commit",
+                          side_effect=ConflictError([("items", 10, 0, 1)])):
+            self.assertFalse(circulation.return_item(2, 10)[0])
+            self.assertFalse(circulation.loan(3, 10)[0])
+        self.assertEqual(len(loans), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
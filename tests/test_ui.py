@@ -1,6 +1,10 @@
+import io
 import unittest
 from unittest.mock import patch, MagicMock
 from src.bat_ui import BatUI
+from src.borrowable_item import BorrowableItem
+from src.concurrency import CONFLICT_MESSAGE
+from src.data_mgmt import DataManager, Patron
 
 
 class TestMainMenu(unittest.TestCase):
@@ -101,5 +105,37 @@ class TestMainMenu(unittest.TestCase):
         self.assertEqual(mock_input.call_count, 4)
 
 
+class TestFailureMessages(unittest.TestCase):
+    """The return and payment screens report why a change was refused"""
+
+    def setUp(self):
+        data_manager = DataManager()
+        data_manager.add_item(BorrowableItem(4, "Dune", "Fiction Book", 1))
+        self.patron = Patron(12, "Jane", 30, outstanding_fees=5.0)
+        data_manager.add_patron(self.patron)
+        self.ui = BatUI(data_manager)
+
+    def test_refused_payment(self):
+        """A refused payment is not reported as successful"""
+        refused = (False, CONFLICT_MESSAGE, 5.0)
+        with patch('src.user_input.get_int_input', return_value=12), \
+                patch('src.user_input.get_float_input_in_range', return_value=2.0), \
+                patch.object(self.ui.circulation, 'pay_fee', return_value=refused), \
+                patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.ui.pay_fees()
+        self.assertIn(f"Payment failed: {CONFLICT_MESSAGE}", output.getvalue())
+        self.assertNotIn("successful", output.getvalue())
+
+    def test_refused_return(self):
+        """A refused return shows the reason it was refused"""
+        self.patron.add_loan(self.ui.data_manager.get_item(4))
+        refused = (False, CONFLICT_MESSAGE, 0.0)
+        with patch('src.user_input.get_int_input', side_effect=[12, 4]), \
+                patch.object(self.ui.circulation, 'return_item', return_value=refused), \
+                patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.ui.return_item()
+        self.assertIn(f"Cannot return: {CONFLICT_MESSAGE}", output.getvalue())
+
+
 if __name__ == '__main__':
     unittest.main()
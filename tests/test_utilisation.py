@@ -0,0 +1,94 @@
+"""
+Tests for the per-item utilisation ring buffers
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.borrowable_item import BorrowableItem
+from src.data_mgmt import DataManager
+from src.utilisation import UtilisationHistory
+
+
+class TestUtilisationHistory(unittest.TestCase):
+    """Tests for sampling, percentiles and the binary file"""
+
+    def setUp(self):
+        self.data_manager = DataManager()
+        self.laptop = BorrowableItem(1, "Laptop 1", "Laptop", 4)
+        self.data_manager.add_item(self.laptop)
+        self.data_manager.add_item(BorrowableItem(2, "Atlas", "Reference Book", 1))
+        self.history = UtilisationHistory(self.data_manager, slots=6)
+
+    def sample_loans(self, counts):
+        """Take one sample per count of laptops on loan"""
+        for on_loan in counts:
+            self.laptop._on_loan = on_loan
+            self.history.sample()
+
+    def test_only_lent_items_get_rings(self):
+        """Items never on loan cost no memory and read as zeros"""
+        self.sample_loans([0, 2, 4])
+        self.assertEqual(len(self.history), 1)
+        self.assertEqual(self.history.history(1), [0, 2, 4])
+        self.assertEqual(self.history.history(2), [0, 0, 0])
+
+    def test_ring_wraps_and_percentiles(self):
+        """Old samples are overwritten and percentiles use the window"""
+        self.sample_loans([1, 1, 1, 4, 4, 3, 2, 4])
+        self.assertEqual(self.history.history(1), [1, 4, 4, 3, 2, 4])
+        self.assertEqual(self.history.history(1, hours=2), [2, 4])
+        self.assertEqual(self.history.percentiles(1, (0, 50, 100)), {0: 1, 50: 3, 100: 4})
+        self.assertEqual(self.history.hours_fully_booked(1), 3)
+
+    def test_idle_rings_released(self):
+        """A ring is dropped once its item is idle for a whole window"""
+        self.sample_loans([1] + [0] * 11)
+        self.assertEqual(len(self.history), 0)
+
+    def test_samples_land_in_their_hour(self):
+        """Hours with no sample read as zeros, and a second sample in one hour is skipped"""
+        for now, on_loan in ((0, 3), (1800, 4), (3600, 2), (4 * 3600 + 60, 1)):
+            self.laptop._on_loan = on_loan
+            self.history.sample_if_due(now)
+        self.assertEqual(self.history.history(1), [3, 2, 0, 0, 1])
+        self.laptop._on_loan = 2
+        self.assertTrue(self.history.sample_if_due(20 * 3600))
+        self.assertEqual(self.history.samples, 21)
+        self.assertEqual(self.history.history(1), [0, 0, 0, 0, 0, 2])
+
+    def test_save_and_load(self):
+        """The binary file restores every ring and the sample count"""
+        self.sample_loans([1, 2, 3, 4, 3, 2, 1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "utilisation.bin")
+            self.history.save(path)
+            loaded = UtilisationHistory(self.data_manager)
+            loaded.load(path)
+            with open(path, "ab") as file:
+                file.write(b"\0")
+            with open(path, "r+b") as file:
+                file.write(b"NOPE")
+            with self.assertRaises(ValueError):
+                UtilisationHistory(self.data_manager).load(path)
+        self.assertEqual(loaded.samples, 7)
+        self.assertEqual(loaded.history(1), self.history.history(1))
+        self.laptop._on_loan = 0
+        loaded.sample()
+        self.assertEqual(loaded.history(1), [3, 4, 3, 2, 1, 0])
+
+    def test_truncated_item_header(self):
+        """A file cut inside an item header is rejected with ValueError"""
+        self.sample_loans([1, 2])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "utilisation.bin")
+            self.history.save(path)
+            with open(path, "r+b") as file:
+                file.truncate(31 + 5)
+            with self.assertRaisesRegex(ValueError, "Truncated"):
+                UtilisationHistory(self.data_manager).load(path)
+
+
+if __name__ == '__main__':
+    unittest.main()